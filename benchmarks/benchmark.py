@@ -0,0 +1,261 @@
+"""Micro-benchmarks of the script rendering hot path.
+
+Run from the repository root:
+
+    python -m benchmarks.benchmark --rows 1000 100000 --output baseline.json
+    python -m benchmarks.benchmark --rows 1000 100000 --compare baseline.json
+
+Each case reports rows/s, bytes/s and the peak memory traced by tracemalloc.
+The results are written as json, a later run compared with the baseline
+fails when a case throughput drops more than the tolerance.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from math import ceil
+from typing import Any, Callable
+
+from benchmarks.rowgen import RowGenerator
+from core.dbtable import DbTable
+from core.filewriter import FileWriter
+from core.sqlquerybuilder import SqlQueryBuilder
+from core.sqlservertemplates import SqlServerTemplates
+
+LOG_CONFIG = {"version": 1, "disable_existing_loggers": False,
+              "root": {"level": "WARNING"}}
+TABLE_NAME = "dbo.bench"
+LIQUIBASE_STRING = "--liquibase formatted sql\n"
+
+
+class BenchCursor:
+    """A cursor answering the DbTable queries with the generated rows."""
+
+    def __init__(self, generator: RowGenerator, rows: list[list[Any]]):
+        self.__columns = [[column, int(column.endswith("_updDT")),
+                           int(column == generator.primary_key), column_type]
+                          for column, column_type in zip(
+                              generator.columns, generator.column_types)]
+        self.__rows = rows
+        self.__result = []
+
+    def execute(self, query: str) -> "BenchCursor":
+        if "syscolumns" in query:
+            self.__result = self.__columns
+        elif "sys.foreign_key" in query:
+            self.__result = []
+        else:
+            self.__result = self.__rows
+        return self
+
+    def fetchall(self) -> list[list[Any]]:
+        return self.__result
+
+
+def bench_builder_upsert(generator: RowGenerator, rows: list[list[Any]],
+                         row_limit: int, folder: str) -> int:
+    """Renders the upsert statements of all rows by row_limit chunks."""
+
+    builder = SqlQueryBuilder(SqlServerTemplates())
+    columns = generator.columns
+    size = 0
+    for i in range(ceil(len(rows) / row_limit)):
+        size += len(builder.get_upsert_statement(
+            TABLE_NAME, columns, rows[i * row_limit: (i + 1) * row_limit],
+            generator.primary_key))
+    return size
+
+
+def bench_builder_json_upsert(generator: RowGenerator,
+                              rows: list[list[Any]], row_limit: int,
+                              folder: str) -> int:
+    """Renders the upsert statements of all rows by row_limit chunks with
+    the JSON payload."""
+
+    builder = SqlQueryBuilder(SqlServerTemplates(), json_payload=True)
+    size = 0
+    for i in range(ceil(len(rows) / row_limit)):
+        size += len(builder.get_upsert_statement(
+            TABLE_NAME, generator.columns,
+            rows[i * row_limit: (i + 1) * row_limit], generator.primary_key,
+            generator.column_types))
+    return size
+
+
+def bench_builder_delete(generator: RowGenerator, rows: list[list[Any]],
+                         row_limit: int, folder: str) -> int:
+    """Renders the delete statements of all row keys by row_limit chunks."""
+
+    builder = SqlQueryBuilder(SqlServerTemplates())
+    ids = [str(row[0]) for row in rows]
+    size = 0
+    for i in range(ceil(len(ids) / row_limit)):
+        size += len(builder.get_delete_statement(
+            TABLE_NAME, generator.primary_key,
+            ids[i * row_limit: (i + 1) * row_limit]))
+    return size
+
+
+def bench_dbtable_upsert(generator: RowGenerator, rows: list[list[Any]],
+                         row_limit: int, folder: str) -> int:
+    """Fetches the rows through DbTable and packs them into scripts."""
+
+    db_table = DbTable(LOG_CONFIG, BenchCursor(generator, rows),
+                       SqlQueryBuilder(SqlServerTemplates()), TABLE_NAME,
+                       "work", "clear")
+    return sum(len(script) for script, _, _
+               in db_table.iter_upsert_statements(row_limit=row_limit))
+
+
+def bench_filewriter(generator: RowGenerator, rows: list[list[Any]],
+                     row_limit: int, folder: str) -> int:
+    """Writes the rendered upsert scripts to the files."""
+
+    builder = SqlQueryBuilder(SqlServerTemplates())
+    writer = FileWriter(LOG_CONFIG, 10 ** 8, folder, LIQUIBASE_STRING)
+    size = 0
+    for i in range(ceil(len(rows) / row_limit)):
+        script = builder.get_upsert_statement(
+            TABLE_NAME, generator.columns,
+            rows[i * row_limit: (i + 1) * row_limit], generator.primary_key)
+        writer.save_scripts([script], "Bench")
+        size += len(script)
+    return size
+
+
+CASES: dict[str: Callable[[RowGenerator, list[list[Any]], int, str], int]] = {
+    "builder_upsert": bench_builder_upsert,
+    "builder_json_upsert": bench_builder_json_upsert,
+    "builder_delete": bench_builder_delete,
+    "dbtable_upsert": bench_dbtable_upsert,
+    "filewriter": bench_filewriter,
+}
+
+
+def run_case(case: Callable[[RowGenerator, list[list[Any]], int, str], int],
+             generator: RowGenerator, rows: list[list[Any]], row_limit: int,
+             repeat: int, trace_memory: bool) -> dict[str: float]:
+    """Runs the case repeat times and measures the best duration, then runs
+    it once more under tracemalloc for the peak memory."""
+
+    durations = []
+    size = 0
+    for _ in range(repeat):
+        folder = tempfile.mkdtemp()
+        try:
+            started = time.perf_counter()
+            size = case(generator, rows, row_limit, folder)
+            durations.append(time.perf_counter() - started)
+        finally:
+            shutil.rmtree(folder)
+    seconds = min(durations)
+    result = {"rows": len(rows), "bytes": size, "seconds": seconds,
+              "rows_per_s": len(rows) / seconds, "bytes_per_s": size / seconds}
+    if trace_memory:
+        folder = tempfile.mkdtemp()
+        tracemalloc.start()
+        try:
+            case(generator, rows, row_limit, folder)
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+            shutil.rmtree(folder)
+    return result
+
+
+def compare(results: dict[str: dict[str: float]],
+            baseline: dict[str: dict[str: float]],
+            tolerance: float) -> list[str]:
+    """Compares the throughput of the cases with the baseline and returns the
+    regression descriptions."""
+
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result["rows_per_s"] / baseline[name]["rows_per_s"]
+        line = f"{name}: {ratio:.2f}x of the baseline rows/s"
+        if ratio < 1 - tolerance:
+            regressions.append(line)
+        print(line)
+    return regressions
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses command line arguments."""
+
+    parser = argparse.ArgumentParser(description="Benchmarks of the script "
+                                                 "rendering hot path")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 100000],
+                        help="Row counts, up to 10000000 (needs several GB "
+                             "of memory for the wide mix)")
+    parser.add_argument("--mix", nargs="+", default=["narrow", "mixed"],
+                        choices=list(RowGenerator.MIXES),
+                        help="Column mixes of the generated rows")
+    parser.add_argument("--cases", nargs="+", default=list(CASES),
+                        choices=list(CASES), help="Cases to run")
+    parser.add_argument("--row-limit", type=int, default=500,
+                        help="Rows in one script")
+    parser.add_argument("--wide-length", type=int, default=1000,
+                        help="Length of the wide text values")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Repeats of each case, the best time is taken")
+    parser.add_argument("--no-memory", action="store_true",
+                        help="Skip the tracemalloc pass")
+    parser.add_argument("--output", help="Path to write the json results")
+    parser.add_argument("--compare", help="Path to the baseline json")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Allowed throughput drop against the baseline")
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Runs the benchmarks and writes or compares the results.
+
+    :return: the exit code, 1 if a regression is found.
+    """
+
+    args = parse_args()
+    results = {}
+    for mix in args.mix:
+        for row_count in args.rows:
+            generator = RowGenerator(mix, args.wide_length)
+            rows = list(generator.rows(row_count))
+            for case_name in args.cases:
+                name = f"{case_name}/{mix}/{row_count}"
+                results[name] = run_case(CASES[case_name], generator, rows,
+                                         args.row_limit, args.repeat,
+                                         not args.no_memory)
+                result = results[name]
+                line = (f"{name}: {result['rows_per_s']:,.0f} rows/s, "
+                        f"{result['bytes_per_s'] / 2 ** 20:,.1f} MiB/s")
+                if "peak_bytes" in result:
+                    line += f", peak {result['peak_bytes'] / 2 ** 20:,.1f} MiB"
+                print(line)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"meta": {"python": sys.version.split()[0],
+                                "platform": platform.platform(),
+                                "cpu_count": os.cpu_count(),
+                                "created": datetime.now().isoformat(),
+                                "row_limit": args.row_limit,
+                                "wide_length": args.wide_length},
+                       "results": results}, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"regression: {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,314 @@
+"""End-to-end benchmark of the ScriptGenerator pipeline on SQLite databases.
+
+Run from the repository root:
+
+    python -m benchmarks.pipeline --rows 100000 --tables 4 --output run.json
+    python -m benchmarks.pipeline --folder /data/bench --rows 20000000 --keep
+
+The work and clear databases are generated into the folder: the clear
+database gets the rows of the RowGenerator, the work database gets the same
+rows with the change rate of them updated, deleted and inserted. The
+databases are attached to one connection and the whole upsert run (diff,
+render, write, changelog and git commit) is run with the SQLite templates,
+the liquibase update is replaced by applying the scripts with sqlite3. The
+diff of the databases is checked to be empty after the run.
+A kept folder is reused by the next run with the same arguments, so the
+multi-GB databases are generated only once; the reused work database is
+copied before the run, since the run applies the scripts to the clear one.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Any, Iterator
+
+from git import Repo
+
+from benchmarks.rowgen import RowGenerator, Value
+from core.scriptgenerator import ScriptGenerator
+from core.sqlitetemplates import SqliteTemplates
+from core.sqlquerybuilder import SqlQueryBuilder
+
+LOG_CONFIG = {"version": 1, "disable_existing_loggers": False,
+              "root": {"level": "WARNING"}}
+LIQUIBASE_STRING = "--liquibase formatted sql\n"
+BATCH_SIZE = 10000
+
+
+def get_literal_row(row: list[Value]) -> list[Any]:
+    """Converts the datetime values to the text of the script literals, so
+    the applied rows are equal to the generated ones."""
+
+    return [value.isoformat(sep=" ", timespec="milliseconds")
+            if isinstance(value, datetime) else value for value in row]
+
+
+def create_tables(connection: sqlite3.Connection, db_name: str,
+                  generator: RowGenerator, table_count: int) -> None:
+    """Creates the benchmark tables in the database."""
+
+    for num in range(table_count):
+        columns = ",\n    ".join(
+            f"{column} integer primary key"
+            if column == generator.primary_key else column
+            for column in generator.columns)
+        connection.execute(f"create table {db_name}.bench_{num}(\n"
+                           f"    {columns})")
+
+
+def insert_rows(connection: sqlite3.Connection, table: str,
+                rows: Iterator[list[Value]]) -> None:
+    """Inserts the rows by batches."""
+
+    batch = []
+    for row in rows:
+        batch.append(get_literal_row(row))
+        if len(batch) == BATCH_SIZE:
+            connection.executemany(
+                f"insert into {table} values({','.join('?' * len(row))})",
+                batch)
+            batch = []
+    if batch:
+        connection.executemany(
+            f"insert into {table} values({','.join('?' * len(batch[0]))})",
+            batch)
+
+
+def fill_update_dates(connection: sqlite3.Connection, table: str,
+                      column: str) -> None:
+    """Fills the empty update dates of the generated rows, since the diff
+    doesn't see the rows without the update date."""
+
+    connection.execute(f"update {table} set {column} = ? "
+                       f"where {column} is null",
+                       ("2020-01-01 00:00:00.000",))
+
+
+def generate(folder: str, args: argparse.Namespace) -> None:
+    """Generates the clear database and the changed work database."""
+
+    generator = RowGenerator(args.mix, args.wide_length, seed=args.seed)
+    clear_path = os.path.join(folder, "clear.db")
+    connection = sqlite3.connect(clear_path)
+    connection.execute("pragma journal_mode = off")
+    connection.execute("pragma synchronous = off")
+    create_tables(connection, "main", generator, args.tables)
+    upd_column = generator.columns[-1]
+    for num in range(args.tables):
+        insert_rows(connection, f"bench_{num}", generator.rows(args.rows))
+        fill_update_dates(connection, f"bench_{num}", upd_column)
+    connection.commit()
+    connection.close()
+    shutil.copyfile(clear_path, os.path.join(folder, "work.db"))
+    connection = sqlite3.connect(os.path.join(folder, "work.db"))
+    rnd = random.Random(args.seed)
+    change_count = int(args.rows * args.change_rate)
+    updated = datetime.now().replace(microsecond=0)
+    for num in range(args.tables):
+        table = f"bench_{num}"
+        keys = rnd.sample(range(1, args.rows + 1), min(2 * change_count,
+                                                       args.rows))
+        connection.executemany(
+            f"update {table} set {generator.columns[1]} = ?, "
+            f"{upd_column} = ? where {generator.primary_key} = ?",
+            [(rnd.randint(0, 10 ** 6),
+              get_literal_row([updated + timedelta(seconds=key)])[0], key)
+             for key in keys[:change_count]])
+        connection.executemany(
+            f"delete from {table} where {generator.primary_key} = ?",
+            [(key,) for key in keys[change_count:]])
+        insert_rows(connection, table,
+                    generator.rows(change_count, args.rows + 1))
+        fill_update_dates(connection, table, upd_column)
+    connection.commit()
+    connection.close()
+    with open(os.path.join(folder, "params.json"), "w") as file:
+        json.dump(get_params(args), file)
+
+
+def get_params(args: argparse.Namespace) -> dict[str: Any]:
+    """Returns the arguments the generated databases depend on."""
+
+    return {"rows": args.rows, "tables": args.tables, "mix": args.mix,
+            "wide_length": args.wide_length, "seed": args.seed,
+            "change_rate": args.change_rate}
+
+
+def make_repository(folder: str) -> str:
+    """Creates a git repository with a bare remote for the run."""
+
+    Repo.init(os.path.join(folder, "remote.git"), bare=True)
+    repo = Repo.clone_from(os.path.join(folder, "remote.git"),
+                           os.path.join(folder, "repo"))
+    with repo.config_writer() as config:
+        config.set_value("user", "name", "bench")
+        config.set_value("user", "email", "bench@localhost")
+    os.makedirs(os.path.join(folder, "repo", "Bench"))
+    keep_path = os.path.join(folder, "repo", "Bench", ".keep")
+    open(keep_path, "w").close()
+    repo.index.add([keep_path])
+    repo.index.commit("init")
+    repo.remote("origin").push(f"HEAD:refs/heads/{repo.active_branch.name}")
+    repo.git.branch(f"--set-upstream-to=origin/{repo.active_branch.name}")
+    return repo.working_tree_dir
+
+
+def connect(folder: str) -> sqlite3.Connection:
+    """Opens the work database with the clear database attached. The
+    connections of the table workers are closed by the main thread."""
+
+    connection = sqlite3.connect(os.path.join(folder, "run_work.db"),
+                                 check_same_thread=False)
+    connection.execute("attach database ? as clear",
+                       (os.path.join(folder, "clear_run.db"),))
+    return connection
+
+
+def run(folder: str, args: argparse.Namespace) -> dict[str: Any]:
+    """Runs the upsert of the work database changes and applies the scripts
+    to the clear database."""
+
+    shutil.copyfile(os.path.join(folder, "work.db"),
+                    os.path.join(folder, "run_work.db"))
+    shutil.copyfile(os.path.join(folder, "clear.db"),
+                    os.path.join(folder, "clear_run.db"))
+    run_folder = tempfile.mkdtemp(dir=folder)
+    connection = connect(folder)
+    connections = [connection]
+
+    def open_cursor() -> sqlite3.Cursor:
+        connections.append(connect(folder))
+        return connections[-1].cursor()
+
+    try:
+        table_list = [f"bench_{num}" for num in range(args.tables)]
+        generator = ScriptGenerator(
+            LOG_CONFIG, connection.cursor(),
+            SqlQueryBuilder(SqliteTemplates()), "main", "clear",
+            make_repository(run_folder), "Bench",
+            {"table_list": table_list, "upsert_only_list": [],
+             "delete_only_list": [], "table_workers": args.workers},
+            {"skip_update": True, "liquibase_string": LIQUIBASE_STRING},
+            {"git_backoff_seconds": 0},
+            cursor_factory=open_cursor if args.workers > 1 else None)
+        started = time.perf_counter()
+        generator.upsert_tables(args.file_size, "Benchmark upsert",
+                                row_limit=args.row_limit)
+        seconds = time.perf_counter() - started
+        generator.close()
+        metrics = generator.run_metrics.to_dict()
+        applied = time.perf_counter()
+        clear = sqlite3.connect(os.path.join(folder, "clear_run.db"))
+        for path in generator.committed_files:
+            with open(path, encoding="utf-8") as file:
+                clear.executescript(file.read())
+        clear.commit()
+        clear.close()
+        apply_seconds = time.perf_counter() - applied
+        plan = generator.plan_tables(args.file_size, row_limit=args.row_limit)
+    finally:
+        for item in connections:
+            item.close()
+        shutil.rmtree(run_folder)
+    return {"seconds": seconds, "rows": metrics["rows_rendered"],
+            "rows_per_s": metrics["rows_rendered"] / seconds,
+            "bytes_per_s": metrics["bytes_written"] / seconds,
+            "files": metrics["files"], "stages": metrics["stages"],
+            "apply_seconds": apply_seconds,
+            "rows_left": plan.row_count}
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses command line arguments."""
+
+    parser = argparse.ArgumentParser(description="End-to-end benchmark of "
+                                                 "the pipeline on SQLite")
+    parser.add_argument("--rows", type=int, default=100000,
+                        help="Rows in each table of the clear database")
+    parser.add_argument("--tables", type=int, default=4,
+                        help="Number of the tables")
+    parser.add_argument("--mix", default="mixed",
+                        choices=list(RowGenerator.MIXES),
+                        help="Column mix of the generated rows")
+    parser.add_argument("--wide-length", type=int, default=1000,
+                        help="Length of the wide text values")
+    parser.add_argument("--change-rate", type=float, default=0.05,
+                        help="Part of the rows updated, deleted and "
+                             "inserted in the work database")
+    parser.add_argument("--seed", type=int, default=42,
+                        help="Seed of the generated rows")
+    parser.add_argument("--row-limit", type=int, default=500,
+                        help="Rows in one script")
+    parser.add_argument("--file-size", type=int, default=10 ** 8,
+                        help="Maximum size of a script file")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Number of the table workers")
+    parser.add_argument("--folder", help="Folder of the databases, a "
+                                         "temporary folder if empty")
+    parser.add_argument("--keep", action="store_true",
+                        help="Keep the databases for the next run")
+    parser.add_argument("--output", help="Path to write the json results")
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Generates the databases if needed, runs the pipeline and writes the
+    results.
+
+    :return: the exit code, 1 if the databases differ after the run.
+    """
+
+    args = parse_args()
+    folder = args.folder or tempfile.mkdtemp()
+    os.makedirs(folder, exist_ok=True)
+    try:
+        params_path = os.path.join(folder, "params.json")
+        params = None
+        if os.path.exists(params_path):
+            with open(params_path) as file:
+                params = json.load(file)
+        if params != get_params(args):
+            started = time.perf_counter()
+            generate(folder, args)
+            print(f"databases generated in "
+                  f"{time.perf_counter() - started:,.1f} s, work database "
+                  f"{os.path.getsize(os.path.join(folder, 'work.db')) / 2 ** 20:,.1f}"
+                  f" MiB")
+        result = run(folder, args)
+        print(f"upsert: {result['rows']:,} rows in {result['seconds']:,.2f} s"
+              f", {result['rows_per_s']:,.0f} rows/s, "
+              f"{result['bytes_per_s'] / 2 ** 20:,.1f} MiB/s, "
+              f"{result['files']} files")
+        for stage, seconds in result["stages"].items():
+            print(f"    {stage}: {seconds:,.2f} s")
+        print(f"apply: {result['apply_seconds']:,.2f} s, rows left: "
+              f"{result['rows_left']}")
+        if args.output:
+            with open(args.output, "w") as file:
+                json.dump({"meta": {"python": sys.version.split()[0],
+                                    "sqlite": sqlite3.sqlite_version,
+                                    "platform": platform.platform(),
+                                    "cpu_count": os.cpu_count(),
+                                    "created": datetime.now().isoformat(),
+                                    "row_limit": args.row_limit,
+                                    "workers": args.workers,
+                                    **get_params(args)},
+                           "results": result}, file, indent=2)
+    finally:
+        for name in ("run_work.db", "clear_run.db"):
+            if os.path.exists(os.path.join(folder, name)):
+                os.remove(os.path.join(folder, name))
+        if not args.keep:
+            shutil.rmtree(folder)
+    return 1 if result["rows_left"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
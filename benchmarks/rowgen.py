@@ -0,0 +1,119 @@
+import random
+import string
+from datetime import datetime, timedelta
+from typing import Callable, Iterator, Union
+
+Value = Union[None, int, float, str, datetime]
+
+BASE_DATE = datetime(2022, 1, 1)
+
+
+class RowGenerator:
+    """A class for generating deterministic synthetic table rows for the
+    benchmarks. A row starts with the integer primary key, the other columns
+    follow the column mix: int, float, str (short text), wide (a long text
+    with quotes to escape), dt (a datetime) and upd (the update date column).
+    Each non-key column is empty with the null_rate probability.
+
+    Properties
+    ----------
+    columns(self) -> list[str]:
+        Returns the column names of the generated rows.
+    primary_key(self) -> str:
+        Returns the name of the primary key column.
+    column_types(self) -> list[str]:
+        Returns the SQL Server types of the columns.
+
+    Methods
+    -------
+    rows(self, row_count: int, first_key: int = 1) -> Iterator[list[Value]]:
+        Generates the rows with the consecutive primary keys.
+    """
+
+    MIXES = {
+        "narrow": ["int", "float", "str", "upd"],
+        "mixed": ["int", "int", "float", "str", "str", "dt", "wide", "upd"],
+        "wide": ["int", "str", "wide", "wide", "wide", "upd"],
+    }
+
+    TYPES = {"int": "int", "float": "float", "str": "nvarchar(40)",
+             "wide": "nvarchar(max)", "dt": "datetime2(3)",
+             "upd": "datetime2(3)"}
+
+    def __init__(self, mix: str = "mixed", wide_length: int = 1000,
+                 null_rate: float = 0.05, seed: int = 42):
+        """
+        :param mix: the name of the column mix from MIXES.
+        :param wide_length: the length of the wide text values.
+        :param null_rate: the probability of an empty value.
+        :param seed: the seed of the random values.
+        """
+
+        self.__kinds: list[str] = RowGenerator.MIXES[mix]
+        self.__wide_length: int = wide_length
+        self.__null_rate: float = null_rate
+        self.__random: random.Random = random.Random(seed)
+        self.__makers: list[Callable[[], Value]] = [
+            self.__get_maker(kind) for kind in self.__kinds]
+
+    @property
+    def columns(self) -> list[str]:
+        """
+        :return: the column names of the generated rows.
+        """
+
+        return [self.primary_key] + [
+            f"col{num}_updDT" if kind == "upd" else f"col{num}_{kind}"
+            for num, kind in enumerate(self.__kinds)]
+
+    @property
+    def primary_key(self) -> str:
+        """
+        :return: the name of the primary key column.
+        """
+
+        return "row_id"
+
+    @property
+    def column_types(self) -> list[str]:
+        """
+        :return: the SQL Server types of the columns.
+        """
+
+        return ["int"] + [RowGenerator.TYPES[kind] for kind in self.__kinds]
+
+    def rows(self, row_count: int,
+             first_key: int = 1) -> Iterator[list[Value]]:
+        """Generates the rows with the consecutive primary keys.
+
+        :param row_count: the number of rows.
+        :param first_key: the primary key of the first row.
+        :return: an iterator of the rows.
+        """
+
+        rnd = self.__random.random
+        for key in range(first_key, first_key + row_count):
+            yield [key] + [None if rnd() < self.__null_rate else make()
+                           for make in self.__makers]
+
+    def __get_maker(self, kind: str) -> Callable[[], Value]:
+        """Returns the function generating a value of the column kind."""
+
+        rnd = self.__random
+        if kind == "int":
+            return lambda: rnd.randint(-2 ** 31, 2 ** 31 - 1)
+        if kind == "float":
+            return lambda: round(rnd.uniform(-1e6, 1e6), 4)
+        if kind == "str":
+            return lambda: "".join(rnd.choices(string.ascii_letters + " '",
+                                               k=rnd.randint(1, 40)))
+        if kind == "wide":
+            chunk = "".join(rnd.choices(string.ascii_letters + " '",
+                                        k=self.__wide_length * 2))
+            return lambda: chunk[rnd.randrange(self.__wide_length):][
+                :self.__wide_length]
+        if kind in ("dt", "upd"):
+            return lambda: BASE_DATE + timedelta(
+                seconds=rnd.randrange(365 * 24 * 3600),
+                milliseconds=rnd.randrange(1000))
+        raise ValueError(f"unknown column kind: {kind}")
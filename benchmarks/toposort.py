@@ -0,0 +1,117 @@
+"""Benchmarks of the topological sorting of the table dependency graph.
+
+Run from the repository root:
+
+    python -m benchmarks.toposort --vertices 10000 --edges 100000
+
+The random graph is acyclic, its edges lead from a vertex to a vertex with a
+greater number, the vertices are added in the shuffled order. The chain case
+sorts a single path through all the vertices, the deepest possible traversal.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from typing import Callable
+
+from core.toposorter import TopoSorter
+
+
+def get_random_graph(vertex_count: int, edge_count: int,
+                     seed: int) -> tuple[list[str], list[tuple[str, str]]]:
+    """Generates a random acyclic graph."""
+
+    rnd = random.Random(seed)
+    vertices = [f"dbo.table_{number}" for number in range(vertex_count)]
+    edges = []
+    for _ in range(edge_count):
+        source, target = sorted(rnd.sample(range(vertex_count), 2))
+        edges.append((vertices[source], vertices[target]))
+    shuffled = list(vertices)
+    rnd.shuffle(shuffled)
+    return shuffled, edges
+
+
+def get_chain_graph(vertex_count: int) -> tuple[list[str],
+                                                list[tuple[str, str]]]:
+    """Generates a single path through all the vertices."""
+
+    vertices = [f"dbo.table_{number}" for number in range(vertex_count)]
+    edges = [(vertices[number], vertices[number + 1])
+             for number in range(vertex_count - 1)]
+    return vertices[::-1], edges
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """Returns the best duration of the function in seconds."""
+
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return min(durations)
+
+
+def run_graph(vertices: list[str], edges: list[tuple[str, str]],
+              repeat: int) -> dict[str: float]:
+    """Measures building the sorter, the first and the cached sorting."""
+
+    def build() -> TopoSorter:
+        return TopoSorter(vertices, edges)
+
+    def sort() -> list[str]:
+        return build().topo_sorted_vertices
+
+    sorter = build()
+    sorter.topo_sorted_vertices
+    return {"vertices": len(vertices), "edges": len(edges),
+            "build_seconds": measure(build, repeat),
+            "sort_seconds": measure(sort, repeat),
+            "cached_seconds": measure(lambda: sorter.topo_sorted_vertices,
+                                      repeat)}
+
+
+def parse_args() -> argparse.Namespace:
+    """Parses command line arguments."""
+
+    parser = argparse.ArgumentParser(description="Benchmarks of the "
+                                                 "topological sorting")
+    parser.add_argument("--vertices", type=int, default=10000,
+                        help="Number of the graph vertices")
+    parser.add_argument("--edges", type=int, default=100000,
+                        help="Number of the random graph edges")
+    parser.add_argument("--seed", type=int, default=42,
+                        help="Seed of the random graph")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Repeats of each case, the best time is taken")
+    parser.add_argument("--output", help="Path to write the json results")
+    return parser.parse_args()
+
+
+def main() -> int:
+    """Runs the benchmarks and writes the results.
+
+    :return: the exit code.
+    """
+
+    args = parse_args()
+    results = {
+        "random": run_graph(*get_random_graph(args.vertices, args.edges,
+                                              args.seed), args.repeat),
+        "chain": run_graph(*get_chain_graph(args.vertices), args.repeat),
+    }
+    for name, result in results.items():
+        print(f"{name}/{result['vertices']}/{result['edges']}: "
+              f"build {result['build_seconds']:.3f}s, "
+              f"sort {result['sort_seconds']:.3f}s, "
+              f"cached {result['cached_seconds'] * 1000:.3f}ms")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"results": results}, file, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
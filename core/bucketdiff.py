@@ -0,0 +1,248 @@
+from logging import Logger
+import copy
+import logging
+from math import ceil
+from pyodbc import Error as DbError, Cursor
+from typing import Any, Union
+
+from core.loadgovernor import LoadGovernor
+from core.querystats import QueryStats
+from core.sqlquerybuilder import SqlQueryBuilder
+from core.tracing import Tracer
+
+
+class BucketDiff:
+    """A class for comparing a large database table of the work and clear
+    databases by the checksums of the primary key buckets, like a Merkle
+    tree. The key range is split into buckets, the row counts and the
+    aggregated checksums of the buckets are compared, and only the
+    mismatching buckets are split further, down to the buckets small enough
+    to compare the checksums of single rows. Only the aggregated bucket rows
+    and the row checksums of the mismatching leaf buckets are transferred,
+    so the rows read by the client are proportional to the number of
+    differing rows. The sides are queried with separate cursors, so the
+    databases can be on different servers.
+
+    The primary key has to be an integer. The checksums can miss a change
+    with a small probability, a full upload repairs such rows.
+
+    Properties
+    ----------
+    rows_read(self) -> int:
+        Returns the number of result rows read by the last comparison.
+
+    Methods
+    -------
+    get_diff(self, key_after: str = None) -> tuple[list[int], list[int]]:
+        Compares the table in the work and clear databases.
+    with_cursors(self, work_cursor: Cursor,
+                 clear_cursor: Cursor) -> "BucketDiff":
+        Returns a copy of the object querying with the other cursors.
+    """
+
+    def __init__(self, work_cursor: Cursor, clear_cursor: Cursor,
+                 queries: SqlQueryBuilder, table_name: str, primary_key: str,
+                 column_list: list[str], work_db_name: str, clear_db_name: str,
+                 fanout: int = 16, leaf_size: int = 1000,
+                 query_stats: QueryStats = None, tracer: Tracer = None,
+                 table_hint: str = None, governor: LoadGovernor = None):
+        """
+        :param work_cursor: a cursor of the work database server.
+        :param clear_cursor: a cursor of the clear database server.
+        :param queries: an SqlQueryBuilder class instance to build SQL queries.
+        :param table_name: the name of the target database table.
+        :param primary_key: the name of the integer primary key column.
+        :param column_list: the list of the column names for the table.
+        :param work_db_name: the name of the work database.
+        :param clear_db_name: the name of the clear database.
+        :param fanout: the number of buckets a mismatching bucket is split
+        into.
+        :param leaf_size: the maximum number of rows in a bucket whose rows
+        are compared one by one.
+        :param query_stats: a QueryStats object measuring the queries, the
+        queries are not measured if empty.
+        :param tracer: a Tracer object recording the queries as spans, the
+        spans are not recorded if empty.
+        :param table_hint: the table hint of the work table queries, like
+        nolock, no hint if empty.
+        :param governor: a LoadGovernor object limiting the load of the work
+        table queries, the queries are not limited if empty.
+        """
+
+        self.__logger: Logger = logging.getLogger(__name__)
+        self.__work_cursor: Cursor = work_cursor
+        self.__clear_cursor: Cursor = clear_cursor
+        self.__queries: SqlQueryBuilder = queries
+        self.__table_name: str = table_name
+        self.__primary_key: str = primary_key
+        self.__column_list: list[str] = column_list
+        self.__work_db_name: str = work_db_name
+        self.__clear_db_name: str = clear_db_name
+        self.__fanout: int = max(fanout, 2)
+        self.__leaf_size: int = max(leaf_size, 1)
+        self.__query_stats: Union[QueryStats, None] = query_stats
+        self.__tracer: Tracer = tracer or Tracer()
+        self.__table_hint: Union[str, None] = table_hint
+        self.__governor: Union[LoadGovernor, None] = governor
+        self.__rows_read: int = 0
+
+    @property
+    def rows_read(self) -> int:
+        """
+        :return: the number of result rows read by the last comparison.
+        """
+
+        return self.__rows_read
+
+    def with_cursors(self, work_cursor: Cursor,
+                     clear_cursor: Cursor) -> "BucketDiff":
+        """Returns a copy of the object querying with the other cursors, so
+        the comparison can run in another thread.
+
+        :param work_cursor: a cursor of the work database server.
+        :param clear_cursor: a cursor of the clear database server.
+        :return: the BucketDiff object.
+        """
+
+        bucket_diff = copy.copy(self)
+        bucket_diff.__work_cursor = work_cursor
+        bucket_diff.__clear_cursor = clear_cursor
+        bucket_diff.__rows_read = 0
+        return bucket_diff
+
+    def get_diff(self, key_after: str = None) -> tuple[list[int], list[int]]:
+        """Compares the table in the work and clear databases.
+
+        :param key_after: the SQL literal of the last processed primary key,
+        the comparison starts from the beginning if empty.
+        :raise RuntimeError: if database query execution failed.
+        :return: a tuple with the sorted keys of the rows to update or insert
+        and the sorted keys of the rows to delete.
+        """
+
+        self.__rows_read = 0
+        upsert_keys = []
+        delete_keys = []
+        ranges = [self.__get_key_range(True), self.__get_key_range(False)]
+        ranges = [key_range for key_range in ranges if key_range[0] is not None]
+        if not ranges:
+            return upsert_keys, delete_keys
+        low_key = min(key_range[0] for key_range in ranges)
+        high_key = max(key_range[1] for key_range in ranges)
+        if key_after is not None:
+            low_key = max(low_key, int(key_after) + 1)
+        stack = [(low_key, high_key)]
+        while stack:
+            low_key, high_key = stack.pop()
+            if high_key - low_key < self.__leaf_size:
+                self.__compare_rows(low_key, high_key, upsert_keys,
+                                    delete_keys)
+                continue
+            bucket_size = ceil((high_key - low_key + 1) / self.__fanout)
+            work_buckets = self.__get_buckets(True, low_key, high_key,
+                                              bucket_size)
+            clear_buckets = self.__get_buckets(False, low_key, high_key,
+                                               bucket_size)
+            for bucket in sorted(set(work_buckets) | set(clear_buckets),
+                                 reverse=True):
+                work_bucket = work_buckets.get(bucket, (0, None))
+                clear_bucket = clear_buckets.get(bucket, (0, None))
+                if work_bucket == clear_bucket:
+                    continue
+                bucket_low = low_key + bucket * bucket_size
+                bucket_high = min(high_key, bucket_low + bucket_size - 1)
+                if max(work_bucket[0], clear_bucket[0]) <= self.__leaf_size:
+                    self.__compare_rows(bucket_low, bucket_high, upsert_keys,
+                                        delete_keys)
+                else:
+                    stack.append((bucket_low, bucket_high))
+        self.__logger.info(f"table: {self.__table_name}, upsert: "
+                           f"{len(upsert_keys)}, delete: {len(delete_keys)}, "
+                           f"rows read: {self.__rows_read}")
+        return sorted(upsert_keys), sorted(delete_keys)
+
+    def __get_key_range(self, is_work: bool) -> tuple[Union[int, None],
+                                                      Union[int, None]]:
+        """Gets the minimum and the maximum primary key of the table side."""
+
+        query = self.__queries.get_key_range_query(
+            self.__primary_key, self.__get_db_name(is_work), self.__table_name,
+            self.__get_table_hint(is_work))
+        row = self.__get_query_result(is_work, query)[0]
+        return row[0], row[1]
+
+    def __get_buckets(self, is_work: bool, low_key: int, high_key: int,
+                      bucket_size: int) -> dict[int: tuple[int, int]]:
+        """Gets the row counts and the checksums of the buckets of the table
+        side in the key range."""
+
+        query, params = self.__queries.get_bucket_checksum_query(
+            self.__primary_key, self.__column_list,
+            self.__get_db_name(is_work), self.__table_name, low_key, high_key,
+            bucket_size, self.__get_table_hint(is_work))
+        return {row[0]: (row[1], row[2])
+                for row in self.__get_query_result(is_work, query, params)}
+
+    def __compare_rows(self, low_key: int, high_key: int,
+                       upsert_keys: list[int], delete_keys: list[int]) -> None:
+        """Compares the checksums of the rows in the key range and adds the
+        differing keys to the lists."""
+
+        work_rows = self.__get_row_hashes(True, low_key, high_key)
+        clear_rows = self.__get_row_hashes(False, low_key, high_key)
+        upsert_keys += [key for key, row_hash in work_rows.items()
+                        if key not in clear_rows
+                        or clear_rows[key] != row_hash]
+        delete_keys += [key for key in clear_rows if key not in work_rows]
+
+    def __get_row_hashes(self, is_work: bool, low_key: int,
+                         high_key: int) -> dict[int: int]:
+        """Gets the checksums of the rows of the table side in the key
+        range."""
+
+        query, params = self.__queries.get_row_checksum_query(
+            self.__primary_key, self.__column_list,
+            self.__get_db_name(is_work), self.__table_name, low_key, high_key,
+            self.__get_table_hint(is_work))
+        return {row[0]: row[1]
+                for row in self.__get_query_result(is_work, query, params)}
+
+    def __get_db_name(self, is_work: bool) -> str:
+        """Returns the database name of the table side."""
+
+        return self.__work_db_name if is_work else self.__clear_db_name
+
+    def __get_table_hint(self, is_work: bool) -> Union[str, None]:
+        """Returns the table hint of the table side, the clear table is
+        queried without a hint."""
+
+        return self.__table_hint if is_work else None
+
+    def __get_query_result(self, is_work: bool, query: str,
+                           params: list[Any] = None) -> list[list[Any]]:
+        """Executes SQL query with the parameter values on the table side and
+        gets the query result."""
+
+        cursor = self.__work_cursor if is_work else self.__clear_cursor
+        governor = self.__governor if is_work else None
+        try:
+            with self.__tracer.span("query", table=self.__table_name,
+                                    kind="bucket", work=is_work):
+                if self.__query_stats:
+                    result = self.__query_stats.fetch(
+                        cursor, self.__table_name, "bucket", query, governor,
+                        params)
+                elif governor:
+                    result = governor.fetch(cursor, query, params)[0]
+                elif params:
+                    cursor.execute(query, params)
+                    result = cursor.fetchall()
+                else:
+                    cursor.execute(query)
+                    result = cursor.fetchall()
+        except DbError as ex:
+            self.__logger.exception(ex)
+            self.__logger.error(f'query: {query}, params: {params}')
+            raise RuntimeError('query execution failed')
+        self.__rows_read += len(result)
+        return result
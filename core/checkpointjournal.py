@@ -0,0 +1,291 @@
+from logging import Logger
+import logging
+import json
+import os
+from typing import Any, Union
+
+
+class CheckpointJournal:
+    """A class for keeping the progress of a script generation run in a json
+    file, so that an interrupted run can be resumed from the last completed
+    script. The journal records the run parameters, the completed tables,
+    the last primary key (watermark) of the table in progress and the
+    written files with their sizes. It is rewritten atomically after each
+    checkpoint and removed when the run is committed. A run failing for good
+    is not resumed more than max_resumes times, the journal has to be
+    discarded then.
+
+    Run stages
+    ----------
+    GENERATE: the script files are being written.
+    CHANGELOG: the files are included into the changelog.
+    APPLIED: the changelog is applied to the clear database.
+
+    Properties
+    ----------
+    stage(self) -> str:
+        Returns the stage of the run.
+    params(self) -> dict[str: Any]:
+        Returns a copy of the run parameters.
+    files(self) -> list[str]:
+        Returns the paths of the files written by the run.
+
+    Methods
+    -------
+    begin(self, kind: str, params: dict[str: Any]) -> dict[str: Any]:
+        Starts a new run or resumes the unfinished run of the same kind.
+    is_table_done(self, phase: str, table_name: str) -> bool:
+        Shows whether all scripts of the table phase are written.
+    get_resume_key(self, phase: str, table_name: str) -> Union[str, None]:
+        Returns the last primary key written for the table phase.
+    chunk_done(self, phase: str, table_name: str, key: str,
+               files: list[str]) -> None:
+        Records a written script of the table phase.
+    table_done(self, phase: str, table_name: str, files: list[str]) -> None:
+        Records that all scripts of the table phase are written.
+    set_stage(self, stage: str) -> None:
+        Records the stage of the run.
+    finish(self) -> None:
+        Removes the journal after the run is committed.
+    discard(self) -> None:
+        Removes the journal of an unfinished run, so that it is not resumed.
+    """
+
+    GENERATE = "generate"
+    CHANGELOG = "changelog"
+    APPLIED = "applied"
+
+    def __init__(self, file_path: str, max_resumes: int = 3):
+        """
+        :param file_path: the path to the journal file.
+        :param max_resumes: the maximum number of times an unfinished run is
+        resumed, no limit if empty.
+        """
+
+        self.__logger: Logger = logging.getLogger(__name__)
+        self.__file_path: str = file_path
+        self.__max_resumes: Union[int, None] = max_resumes
+        self.__state: dict[str: Any] = CheckpointJournal.__new_state(None, {})
+
+    @property
+    def stage(self) -> str:
+        """
+        :return: the stage of the run.
+        """
+
+        return self.__state["stage"]
+
+    @property
+    def params(self) -> dict[str: Any]:
+        """
+        :return: a copy of the run parameters.
+        """
+
+        return dict(self.__state["params"])
+
+    @property
+    def files(self) -> list[str]:
+        """
+        :return: the paths of the files written by the run.
+        """
+
+        return [file["path"] for file in self.__state["files"]]
+
+    def begin(self, kind: str, params: dict[str: Any]) -> dict[str: Any]:
+        """Starts a new run or resumes the unfinished run of the same kind.
+        The files of an unfinished run are adopted by the new run, their
+        tails written after the last checkpoint are truncated. If the
+        unfinished run has another kind, only its files are adopted and the
+        tables are processed from the beginning.
+
+        :param kind: the kind of the run, like upsert or upload.
+        :param params: the run parameters, used for a new run only.
+        :raise RuntimeError: if the unfinished run was resumed max_resumes
+        times already.
+        :return: the parameters of the run, the recorded ones if the run is
+        resumed.
+        """
+
+        state = self.__read()
+        if state and state["kind"] == kind:
+            resumes = state.get("resumes", 0) + 1
+            if self.__max_resumes and resumes > self.__max_resumes:
+                raise RuntimeError(f"the {kind} run was resumed "
+                                   f"{resumes - 1} times, discard the "
+                                   f"checkpoint journal {self.__file_path} "
+                                   f"to start a new run")
+            self.__logger.warning(f"resume the {kind} run, attempt: "
+                                  f"{resumes}, stage: {state['stage']}, "
+                                  f"files: {len(state['files'])}")
+            if state["params"] != params:
+                self.__logger.warning(f"the recorded params {state['params']} "
+                                      f"of the resumed run override the "
+                                      f"params {params}")
+            state["resumes"] = resumes
+            self.__state = state
+        else:
+            self.__state = CheckpointJournal.__new_state(kind, params)
+            if state:
+                self.__logger.warning(f"adopt {len(state['files'])} files of "
+                                      f"the unfinished {state['kind']} run")
+                self.__state["files"] = state["files"]
+        self.__restore_files()
+        self.__write()
+        return self.params
+
+    def is_table_done(self, phase: str, table_name: str) -> bool:
+        """Shows whether all scripts of the table phase are written.
+
+        :param phase: the phase of the run, like upsert or delete.
+        :param table_name: the name of the database table.
+        :return: True if the table phase is completed otherwise False.
+        """
+
+        return table_name in self.__state["done"].get(phase, [])
+
+    def get_resume_key(self, phase: str, table_name: str) -> Union[str, None]:
+        """Returns the last primary key written for the table phase.
+
+        :param phase: the phase of the run, like upsert or delete.
+        :param table_name: the name of the database table.
+        :return: the SQL literal of the key, None if the table phase was not
+        started.
+        """
+
+        current = self.__state["current"]
+        if current and current["phase"] == phase \
+                and current["table"] == table_name:
+            return current["key"]
+        return None
+
+    def chunk_done(self, phase: str, table_name: str, key: str,
+                   files: list[str]) -> None:
+        """Records a written script of the table phase.
+
+        :param phase: the phase of the run, like upsert or delete.
+        :param table_name: the name of the database table.
+        :param key: the SQL literal of the last primary key of the script.
+        :param files: the paths of the files written by the run.
+        :return: None
+        """
+
+        current = self.__state["current"]
+        chunks = 0
+        if current and current["phase"] == phase \
+                and current["table"] == table_name:
+            chunks = current["chunks"]
+        self.__state["current"] = {"phase": phase, "table": table_name,
+                                   "chunks": chunks + 1, "key": key}
+        self.__set_files(files)
+        self.__write()
+
+    def table_done(self, phase: str, table_name: str,
+                   files: list[str]) -> None:
+        """Records that all scripts of the table phase are written.
+
+        :param phase: the phase of the run, like upsert or delete.
+        :param table_name: the name of the database table.
+        :param files: the paths of the files written by the run.
+        :return: None
+        """
+
+        self.__state["done"].setdefault(phase, []).append(table_name)
+        self.__state["current"] = None
+        self.__set_files(files)
+        self.__write()
+
+    def set_stage(self, stage: str) -> None:
+        """Records the stage of the run.
+
+        :param stage: one of GENERATE, CHANGELOG, APPLIED.
+        :return: None
+        """
+
+        self.__state["stage"] = stage
+        self.__write()
+
+    def finish(self) -> None:
+        """Removes the journal after the run is committed.
+
+        :return: None
+        """
+
+        if os.path.exists(self.__file_path):
+            os.remove(self.__file_path)
+        self.__state = CheckpointJournal.__new_state(None, {})
+
+    def discard(self) -> None:
+        """Removes the journal of an unfinished run, so that the next run
+        starts from the beginning. The files of the run are removed if they
+        are not included into the changelog yet, otherwise they are kept and
+        logged.
+
+        :return: None
+        """
+
+        state = self.__read()
+        if state:
+            self.__logger.warning(f"discard the unfinished {state['kind']} "
+                                  f"run, stage: {state['stage']}")
+            for file in state["files"]:
+                if state["stage"] != CheckpointJournal.GENERATE:
+                    self.__logger.warning(f"file {file['path']} is included "
+                                          f"into the changelog, kept")
+                elif os.path.exists(file["path"]):
+                    self.__logger.warning(f"remove file {file['path']}")
+                    os.remove(file["path"])
+        self.finish()
+
+    @staticmethod
+    def __new_state(kind: Union[str, None],
+                    params: dict[str: Any]) -> dict[str: Any]:
+        """Creates the state of a new run."""
+
+        return {"kind": kind, "params": dict(params),
+                "stage": CheckpointJournal.GENERATE, "done": {},
+                "current": None, "files": [], "resumes": 0}
+
+    def __set_files(self, files: list[str]) -> None:
+        """Records the files with their current sizes, keeping the adopted
+        files first."""
+
+        recorded = self.files
+        paths = recorded + [file for file in files if file not in recorded]
+        self.__state["files"] = [{"path": path,
+                                  "size": os.path.getsize(path)}
+                                 for path in paths if os.path.exists(path)]
+
+    def __restore_files(self) -> None:
+        """Truncates the recorded files to their checkpoint sizes, so that
+        the scripts written after the last checkpoint are not duplicated."""
+
+        files = []
+        for file in self.__state["files"]:
+            if not os.path.exists(file["path"]):
+                self.__logger.warning(f"recorded file {file['path']} is lost")
+                continue
+            if os.path.getsize(file["path"]) > file["size"]:
+                self.__logger.warning(f"truncate {file['path']} to "
+                                      f"{file['size']} bytes")
+                with open(file["path"], "r+b") as stream:
+                    stream.truncate(file["size"])
+            files.append(file)
+        self.__state["files"] = files
+
+    def __read(self) -> Union[dict, None]:
+        """Reads the journal file if it exists."""
+
+        if not os.path.exists(self.__file_path):
+            return None
+        with open(self.__file_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def __write(self) -> None:
+        """Writes the journal file atomically."""
+
+        temp_path = self.__file_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            json.dump(self.__state, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.__file_path)
@@ -1,11 +1,17 @@
 from logging import Logger
-import logging.config
+import copy
+import logging
 from pyodbc import Error as DbError, Cursor
 from datetime import datetime, timedelta
 from math import ceil
-from typing import Union
+from typing import Any, Iterator, Union
 
+from core.bucketdiff import BucketDiff
+from core.loadgovernor import LoadGovernor
+from core.logsetup import configure_logging
+from core.querystats import QueryStats
 from core.sqlquerybuilder import SqlQueryBuilder
+from core.tracing import Tracer
 
 
 class DbTable(object):
@@ -18,6 +24,8 @@ class DbTable(object):
     subordinate_tables(self) -> tuple[str]:
         Returns a tuple of database table names containing foreign keys to
         this table.
+    parent_key(self) -> str:
+        Returns the name of the column referring to the same table.
 
     Methods
     -------
@@ -36,36 +44,102 @@ class DbTable(object):
         (before the current date) received in the days_before parameter.
         If the all_rows parameter is True, uploads all rows from table in the
         work database.
+    iter_delete_statements(self, row_limit: int = None,
+                           key_after: str = None) \
+            -> Iterator[tuple[str, str, int]]:
+        Searches id rows to delete ordered by the primary key and yields the
+        delete scripts with the last primary key and the row count of each
+        script.
+    iter_upsert_statements(self, beg_date: datetime = None,
+                           row_limit: int = None, all_rows: bool = False,
+                           key_after: str = None) \
+            -> Iterator[tuple[str, str, int]]:
+        Searches rows to update or insert ordered by the primary key and
+        yields the upsert scripts with the last primary key and the row
+        count of each script.
+    get_delete_estimate(self, row_limit: int = None) -> tuple[int, int, int]:
+        Counts the rows to delete without fetching them and estimates the
+        number and the size of the delete scripts.
+    get_upsert_estimate(self, days_before: int = None, row_limit: int = None,
+                        all_rows: bool = False) -> tuple[int, int, int]:
+        Counts the rows to update or insert without fetching them and
+        estimates the number and the size of the upsert scripts.
+    with_cursor(self, cursor: Cursor, clear_cursor: Cursor = None) -> DbTable:
+        Returns a copy of the table querying with the other cursor.
+    reset_diff(self) -> None:
+        Drops the bucket diffs kept since the last reset.
     """
     
+    KEY_BATCH_SIZE = 1000
+
     def __init__(self, config_dict: dict[str: str], cursor: Cursor,
                  queries: SqlQueryBuilder, table_name: str, work_db_name: str,
-                 clear_db_name: str):
+                 clear_db_name: str, clear_cursor: Cursor = None,
+                 bucket_diff_settings: dict[str: int] = None,
+                 query_stats: QueryStats = None, tracer: Tracer = None,
+                 table_hint: str = None, governor: LoadGovernor = None):
         """
-        :param config_dict: a dictionary with the logger configuration.
+        :param config_dict: a dictionary with the logger configuration, used
+        if the logging is not configured yet.
         :param cursor: a database cursor for executing SQL queries.
         :param queries: an SqlQueryBuilder class instance to build SQL queries
         and statements.
         :param table_name: the name of the target database table.
         :param work_db_name: the name of the work database.
         :param clear_db_name: the name of the clear database.
+        :param clear_cursor: a cursor of the clear database server, used by
+        the bucket diff only. The cursor parameter is used if empty.
+        :param bucket_diff_settings: a dictionary with the bucket diff settings
+        (fanout, leaf_size). If filled in, the diffs are searched by the
+        checksums of the primary key buckets instead of the update date
+        column.
+        :param query_stats: a QueryStats object measuring the queries, the
+        queries are not measured if empty.
+        :param tracer: a Tracer object recording the queries and the rendered
+        scripts as spans, the spans are not recorded if empty.
+        :param table_hint: the table hint of the queries reading the work
+        table, like nolock or readpast, no hint if empty. The clear table is
+        read without a hint.
+        :param governor: a LoadGovernor object limiting the load of the
+        queries on the server, the queries are not limited if empty.
         :raise RuntimeError: if database query (search table columns) execution
         failed.
+        :raise ValueError: if the bucket diff settings are filled in for a
+        self-referencing table, the bucket diff keys are ordered by the
+        primary key only and can't keep the parents before the children.
         """
 
-        logging.config.dictConfig(config_dict)
+        configure_logging(config_dict)
         self.__logger: Logger = logging.getLogger(__name__)
-        self.__logger.info(f"table: {table_name}")
+        self.__logger.info("table: %s", table_name)
         self.__cursor: Cursor = cursor
         self.__queries: SqlQueryBuilder = queries
         self.__name: str = table_name
         self.__primary_key: str = ""
         self.__update_dt_field: str = ""
         self.__columns: list[str] = []
+        self.__column_types: list[str] = []
         self.__work_db_name: str = work_db_name
         self.__clear_db_name: str = clear_db_name
+        self.__query_stats: Union[QueryStats, None] = query_stats
+        self.__tracer: Tracer = tracer or Tracer()
+        self.__table_hint: Union[str, None] = table_hint
+        self.__governor: Union[LoadGovernor, None] = governor
         self.__subordinate_tables: list[str] = self.__get_subordinate_tables()
         self.__set_columns()
+        self.__parent_key: str = self.__get_parent_key()
+        self.__bucket_diff: Union[BucketDiff, None] = None
+        if bucket_diff_settings is not None and self.__parent_key:
+            raise ValueError(f"the bucket diff can't be used for the "
+                             f"self-referencing table: {table_name}")
+        self.__diff_cache: dict[str: tuple[list[int], list[int]]] = {}
+        if bucket_diff_settings is not None:
+            self.__bucket_diff = BucketDiff(
+                cursor, clear_cursor or cursor, queries, table_name,
+                self.__primary_key, self.__columns, work_db_name,
+                clear_db_name, query_stats=query_stats, tracer=tracer,
+                table_hint=table_hint, governor=governor,
+                **bucket_diff_settings)
 
     @property
     def name(self) -> str:
@@ -82,6 +156,45 @@ class DbTable(object):
         """
         return tuple(self.__subordinate_tables)
 
+    @property
+    def parent_key(self) -> str:
+        """
+        :return: the name of the column referring to the parent row of the
+        same table, an empty string if the table is not self-referencing.
+        The rows of a self-referencing table are upserted parents first and
+        deleted children first.
+        """
+        return self.__parent_key
+
+    def with_cursor(self, cursor: Cursor,
+                    clear_cursor: Cursor = None) -> "DbTable":
+        """Returns a copy of the table querying with the other cursor, so the
+        table can be processed in another thread. The columns and the foreign
+        keys are not searched again.
+
+        :param cursor: a database cursor for executing SQL queries.
+        :param clear_cursor: a cursor of the clear database server, used by
+        the bucket diff only. The cursor parameter is used if empty.
+        :return: the DbTable object.
+        """
+
+        db_table = copy.copy(self)
+        db_table.__cursor = cursor
+        if self.__bucket_diff:
+            db_table.__bucket_diff = self.__bucket_diff.with_cursors(
+                cursor, clear_cursor or cursor)
+        return db_table
+
+    def reset_diff(self) -> None:
+        """Drops the bucket diffs kept since the last reset, the next search
+        compares the databases again. The diffs are shared with the copies
+        of the table returned by the with_cursor method.
+
+        :return: None
+        """
+
+        self.__diff_cache.clear()
+
     def get_delete_statement_list(self, row_limit: int = None) -> list[str]:
         """Compares the data of two database(work and clear), searches id rows
         to delete and generate the necessary SQL statements to migrate work
@@ -95,20 +208,8 @@ class DbTable(object):
         :return: the list of scripts with delete statements.
         """
 
-        self.__logger.info(f'table: {self.__name}, row limit: {row_limit}')
-        ids = self.__get_list_to_delete()
-        script_list = []
-        if ids:
-            if not row_limit:
-                row_limit = len(ids)
-            for i in range(ceil(len(ids)/row_limit)):
-                ids_part = ids[i * row_limit: (i + 1) * row_limit]
-                script_list.append(
-                    self.__queries.get_delete_statement(self.__name,
-                                                        self.__primary_key,
-                                                        ids_part)
-                )
-        return script_list
+        return [script for script, _, _
+                in self.iter_delete_statements(row_limit)]
 
     def get_upsert_statement_list(self, days_before: int = None,
                                   row_limit: int = None,
@@ -132,40 +233,205 @@ class DbTable(object):
         :return: the list of scripts with insert/update statements.
         """
 
-        self.__logger.info(f'table: {self.__name}, days before: {days_before}, '
-                           f'row limit: {row_limit}, all rows: {all_rows}')
+        return [script for script, _, _
+                in self.iter_upsert_statements(DbTable.get_beg_date(days_before),
+                                               row_limit, all_rows)]
+
+    def iter_delete_statements(self, row_limit: int = None,
+                               key_after: str = None) \
+            -> Iterator[tuple[str, str, int]]:
+        """Searches id rows to delete ordered by the primary key and yields
+        the delete scripts packaged by constraint row_limit. Each script is
+        yielded with its last primary key, which can be passed as key_after
+        to continue from the next script.
+
+        :param row_limit: the maximum number of ids in one script. If the
+        row_limit parameter is not filled in, all statements will be packed
+        into one script.
+        :param key_after: the SQL literal of the last processed primary key,
+        the search starts from the beginning if empty.
+        :raise RuntimeError: if database query execution failed.
+        :return: an iterator of tuples with the script, the SQL literal of
+        its last primary key and the number of its rows.
+        """
+
+        self.__logger.info(f'table: {self.__name}, row limit: {row_limit}, '
+                           f'key after: {key_after}')
+        ids = self.__get_list_to_delete(key_after)
+        if ids:
+            if not row_limit:
+                row_limit = len(ids)
+            for i in range(ceil(len(ids)/row_limit)):
+                ids_part = ids[i * row_limit: (i + 1) * row_limit]
+                with self.__tracer.span("render", table=self.__name,
+                                        phase="delete", rows=len(ids_part)):
+                    script = self.__queries.get_delete_statement(
+                        self.__name, self.__primary_key, ids_part)
+                yield script, ids_part[-1], len(ids_part)
+
+    def iter_upsert_statements(self, beg_date: datetime = None,
+                               row_limit: int = None, all_rows: bool = False,
+                               key_after: str = None) \
+            -> Iterator[tuple[str, str, int]]:
+        """Searches rows to update or insert ordered by the primary key and
+        yields the upsert scripts packaged by constraint row_limit. Each
+        script is yielded with its last primary key, which can be passed as
+        key_after to continue from the next script.
+
+        :param beg_date: the start date to search updated or inserted rows,
+        not used by the bucket diff.
+        :param row_limit: the maximum number of ids in one script. If the
+        row_limit parameter is not filled in, all statements will be packed
+        into one script.
+        :param all_rows: if True uploads all rows from table in the work
+        database with the bulk copy of the dialect, otherwise uploads diffs
+        between work and clear databases.
+        :param key_after: the SQL literal of the last processed primary key,
+        the search starts from the beginning if empty.
+        :raise RuntimeError: if database query execution failed.
+        :return: an iterator of tuples with the script, the SQL literal of
+        its last primary key and the number of its rows.
+        """
+
+        self.__logger.info(f'table: {self.__name}, beg date: {beg_date}, '
+                           f'row limit: {row_limit}, all rows: {all_rows}, '
+                           f'key after: {key_after}')
         if all_rows:
-            data = self.__get_all_rows()
+            data = self.__get_ordered_rows(self.__get_all_rows_query(),
+                                           "upload", key_after)
+        elif self.__bucket_diff:
+            upsert_keys = self.__get_bucket_diff(key_after)[0]
+            data = []
+            for query, params in self.__get_keys_rows_queries(upsert_keys):
+                data += self.__get_ordered_rows(query, "upsert", params=params)
         else:
-            data = self.__get_list_to_upsert(days_before)
-        script_list = []
+            query, params = self.__get_upsert_query(beg_date)
+            data = self.__get_ordered_rows(query, "upsert", key_after, params)
         if data:
             if not row_limit:
                 row_limit = len(data)
+            key_index = self.__columns.index(self.__primary_key)
             for i in range(ceil(len(data)/row_limit)):
                 data_part = data[i * row_limit: (i + 1) * row_limit]
-                script_list.append(
-                    self.__queries.get_upsert_statement(self.__name,
-                                                        self.__columns,
-                                                        data_part,
-                                                        self.__primary_key)
-                )
-        return script_list
+                with self.__tracer.span("render", table=self.__name,
+                                        phase="upsert", rows=len(data_part)):
+                    if all_rows:
+                        script = self.__queries.get_upload_statement(
+                            self.__name, self.__columns, data_part,
+                            self.__primary_key, self.__column_types)
+                    else:
+                        script = self.__queries.get_upsert_statement(
+                            self.__name, self.__columns, data_part,
+                            self.__primary_key, self.__column_types)
+                yield (script,
+                       self.__queries.get_literal(data_part[-1][key_index]),
+                       len(data_part))
+
+    @staticmethod
+    def get_beg_date(days_before: int = None) -> Union[datetime, None]:
+        """Calculates the start date to search updated or inserted rows.
+
+        :param days_before: the number of days (before the current date) to
+        search database diffs.
+        :return: the start date or None if days_before is empty.
+        """
+
+        if not days_before:
+            return None
+        return datetime.now() - timedelta(days=days_before)
+
+    def get_delete_estimate(self, row_limit: int = None) \
+            -> tuple[int, int, int]:
+        """Counts the rows to delete without fetching them and estimates the
+        number and the size of the delete scripts.
+
+        :param row_limit: the maximum number of ids in one script.
+        :raise RuntimeError: if database query execution failed.
+        :return: a tuple with the number of rows, the number of scripts and
+        the estimated size of the scripts in bytes.
+        """
+
+        self.__logger.info(f'table: {self.__name}, row limit: {row_limit}')
+        if self.__bucket_diff:
+            ids = self.__get_list_to_delete()
+            row_count, data_length = len(ids), sum(len(key) for key in ids)
+        else:
+            query = self.__queries.get_count_query(self.__get_delete_query(),
+                                                   [self.__primary_key])
+            row_count, data_length = self.__get_query_result(query,
+                                                             "count")[0]
+        script_count = DbTable.__get_script_count(row_count, row_limit)
+        size = self.__queries.estimate_delete_size(self.__name,
+                                                   self.__primary_key,
+                                                   row_count, data_length,
+                                                   script_count)
+        return row_count, script_count, size
+
+    def get_upsert_estimate(self, days_before: int = None,
+                            row_limit: int = None,
+                            all_rows: bool = False) -> tuple[int, int, int]:
+        """Counts the rows to update or insert without fetching them and
+        estimates the number and the size of the upsert scripts.
+
+        :param days_before: the number of days (before the current date) to
+        search database diffs.
+        :param row_limit: the maximum number of rows in one script.
+        :param all_rows: if True counts all rows from table in the work
+        database, otherwise counts diffs between work and clear databases.
+        :raise RuntimeError: if database query execution failed.
+        :return: a tuple with the number of rows, the number of scripts and
+        the estimated size of the scripts in bytes.
+        """
+
+        self.__logger.info(f'table: {self.__name}, days before: {days_before}, '
+                           f'row limit: {row_limit}, all rows: {all_rows}')
+        if all_rows:
+            queries = [(self.__get_all_rows_query(), [])]
+        elif self.__bucket_diff:
+            queries = self.__get_keys_rows_queries(
+                self.__get_bucket_diff()[0])
+        else:
+            queries = [self.__get_upsert_query(
+                DbTable.get_beg_date(days_before))]
+        row_count, data_length = 0, 0
+        for query, params in queries:
+            query = self.__queries.get_count_query(query, self.__columns)
+            count, length = self.__get_query_result(query, "count",
+                                                    params)[0]
+            row_count, data_length = row_count + count, data_length + length
+        script_count = DbTable.__get_script_count(row_count, row_limit)
+        size = self.__queries.estimate_upsert_size(self.__name, self.__columns,
+                                                   self.__primary_key,
+                                                   row_count, data_length,
+                                                   script_count, all_rows,
+                                                   self.__column_types)
+        return row_count, script_count, size
+
+    @staticmethod
+    def __get_script_count(row_count: int, row_limit: int) -> int:
+        """Calculates the number of scripts to pack the rows into."""
+
+        if not row_count:
+            return 0
+        if not row_limit:
+            return 1
+        return ceil(row_count / row_limit)
 
     def __set_columns(self) -> None:
         """Gets table columns info from the database."""
         query = self.__queries.get_column_query(self.__name)
-        self.__logger.debug(f'get_column_query: {query}')
-        result = self.__get_query_result(query)
+        self.__logger.debug("get_column_query: %s", query)
+        result = self.__get_query_result(query, "columns")
         for item in result:
             column_name = item[0]
-            is_update_dt = bool(item[0])
+            is_update_dt = bool(item[1])
             is_primary_key = bool(item[2])
             if is_primary_key:
                 self.__primary_key = column_name
             elif is_update_dt:
                 self.__update_dt_field = column_name
             self.__columns.append(column_name)
+            self.__column_types.append(item[3])
 
     def __get_subordinate_tables(self) -> list[str]:
         """Gets a list of database table names containing foreign keys
@@ -173,58 +439,141 @@ class DbTable(object):
         """
 
         query = self.__queries.get_sub_tables_query(self.__name)
-        result = self.__get_query_result(query)
+        result = self.__get_query_result(query, "sub_tables")
         return [str(row[0]) for row in result]
 
-    def __get_list_to_delete(self) -> list[str]:
-        """Gets id rows to delete."""
+    def __get_parent_key(self) -> str:
+        """Gets the name of the column referring to the same table."""
 
-        query = self.__queries.get_search_del_query(self.__primary_key,
-                                                    self.__name,
-                                                    self.__work_db_name,
-                                                    self.__clear_db_name)
-        result = self.__get_query_result(query)
+        query = self.__queries.get_self_reference_query(self.__name)
+        result = self.__get_query_result(query, "parent_key")
+        return str(result[0][0]) if result else ""
+
+    def __get_list_to_delete(self, key_after: str = None) -> list[str]:
+        """Gets id rows to delete ordered by the primary key, the rows of a
+        self-referencing table are ordered children first."""
+
+        if self.__bucket_diff:
+            return [self.__queries.get_literal(key) for key
+                    in self.__get_bucket_diff(key_after)[1]]
+        if self.__parent_key:
+            query = self.__queries.get_hierarchy_ordered_query(
+                self.__get_delete_query(), self.__primary_key,
+                self.__clear_db_name, self.__name, self.__parent_key,
+                key_after, descending=True)
+        else:
+            query = self.__queries.get_ordered_query(
+                self.__get_delete_query(), self.__primary_key, key_after)
+        result = self.__get_query_result(query, "delete")
         return [str(row[0]) for row in result]
 
-    def __get_list_to_upsert(self, days_before: int) \
+    def __get_bucket_diff(self, key_after: str = None) \
+            -> tuple[list[int], list[int]]:
+        """Gets the keys of the rows to upsert and to delete found by the
+        bucket diff, the databases are compared once for the upserts and the
+        deletes until the diffs are reset."""
+
+        if key_after not in self.__diff_cache:
+            self.__diff_cache[key_after] = self.__bucket_diff.get_diff(
+                key_after)
+        return self.__diff_cache[key_after]
+
+    def __get_ordered_rows(self, query: str, kind: str,
+                           key_after: str = None,
+                           params: list[Any] = None) \
             -> list[list[Union[None, int, float, str, datetime]]]:
-        """Gets rows data to update or insert."""
-
-        beg_date = None
-        if days_before:
-            beg_date = datetime.now() - timedelta(days=days_before)
-            beg_date = beg_date.strftime("'%Y-%m-%d'")
-        query = self.__queries.get_search_upsert_query(self.__columns,
-                                                       self.__work_db_name,
-                                                       self.__name,
-                                                       self.__primary_key,
-                                                       self.__update_dt_field,
-                                                       self.__clear_db_name,
-                                                       beg_date)
-        result = self.__get_query_result(query)
+        """Gets rows data of the query with the parameter values ordered by
+        the primary key, the rows of a self-referencing table are ordered
+        parents first."""
+
+        if self.__parent_key:
+            query = self.__queries.get_hierarchy_ordered_query(
+                query, self.__primary_key, self.__work_db_name, self.__name,
+                self.__parent_key, key_after, table_hint=self.__table_hint)
+        else:
+            query = self.__queries.get_ordered_query(query,
+                                                     self.__primary_key,
+                                                     key_after)
+        result = self.__get_query_result(query, kind, params)
         return [list(row) for row in result]
 
-    def __get_all_rows(self) -> list[list[Union[None, int, float, str,
-                                                datetime]]]:
-        """Gets all rows data to insert."""
+    def __get_keys_rows_queries(self, key_list: list[int]) \
+            -> list[tuple[str, list[Any]]]:
+        """Builds the queries getting the rows by the primary keys with their
+        parameter values, a query for each batch of KEY_BATCH_SIZE keys."""
 
-        query = self.__queries.get_all_rows_query(self.__columns,
-                                                  self.__work_db_name,
-                                                  self.__name)
-        result = self.__get_query_result(query)
-        return [list(row) for row in result]
+        return [self.__queries.get_keys_rows_query(
+            self.__columns, self.__work_db_name, self.__name,
+            self.__primary_key, key_list[i: i + DbTable.KEY_BATCH_SIZE],
+            self.__table_hint)
+            for i in range(0, len(key_list), DbTable.KEY_BATCH_SIZE)]
+
+    def __get_delete_query(self) -> str:
+        """Builds the query searching id rows to delete."""
+
+        return self.__queries.get_search_del_query(self.__primary_key,
+                                                   self.__name,
+                                                   self.__work_db_name,
+                                                   self.__clear_db_name,
+                                                   self.__table_hint)
 
-    def __get_query_result(self, query: str) -> list[list[Union[None, int,
-                                                                float, str,
-                                                                datetime]]]:
-        """Executes SQL query and gets the query result."""
+    def __get_upsert_query(self, beg_date: datetime = None) \
+            -> tuple[str, list[Any]]:
+        """Builds the query searching rows to update or insert with its
+        parameter values. The rows of a table without the update date column
+        are compared by the row hashes, the start date is not used for
+        them."""
+
+        if not self.__update_dt_field:
+            return self.__queries.get_search_hash_upsert_query(
+                self.__columns, self.__work_db_name, self.__name,
+                self.__primary_key, self.__clear_db_name,
+                self.__table_hint), []
+        if beg_date:
+            beg_date = beg_date.replace(hour=0, minute=0, second=0,
+                                        microsecond=0)
+        return self.__queries.get_search_upsert_query(self.__columns,
+                                                      self.__work_db_name,
+                                                      self.__name,
+                                                      self.__primary_key,
+                                                      self.__update_dt_field,
+                                                      self.__clear_db_name,
+                                                      beg_date,
+                                                      self.__table_hint)
+
+    def __get_all_rows_query(self) -> str:
+        """Builds the query getting all rows to insert."""
+
+        return self.__queries.get_all_rows_query(self.__columns,
+                                                 self.__work_db_name,
+                                                 self.__name,
+                                                 self.__table_hint)
+
+    def __get_query_result(self, query: str, kind: str,
+                           params: list[Any] = None) \
+            -> list[list[Union[None, int, float, str, datetime]]]:
+        """Executes SQL query with the parameter values and gets the query
+        result, measuring it with the query stats and limiting it with the
+        load governor if they are set."""
 
         result = []
         try:
-            self.__cursor.execute(query)
-            result = self.__cursor.fetchall()
+            with self.__tracer.span("query", table=self.__name, kind=kind):
+                if self.__query_stats:
+                    result = self.__query_stats.fetch(self.__cursor,
+                                                      self.__name, kind, query,
+                                                      self.__governor, params)
+                elif self.__governor:
+                    result = self.__governor.fetch(self.__cursor, query,
+                                                   params)[0]
+                elif params:
+                    self.__cursor.execute(query, params)
+                    result = self.__cursor.fetchall()
+                else:
+                    self.__cursor.execute(query)
+                    result = self.__cursor.fetchall()
         except DbError as ex:
             self.__logger.exception(ex)
-            self.__logger.error(f'query: {query}')
+            self.__logger.error(f'query: {query}, params: {params}')
             raise RuntimeError('query execution failed')
         return result
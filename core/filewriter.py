@@ -1,9 +1,12 @@
 from logging import Logger
-import logging.config
+import logging
 import os
 from datetime import datetime
 from typing import Union
 
+from core.logsetup import configure_logging
+from core.tracing import Tracer
+
 
 class FileWriter:
     """A class for writing scripts to created files.
@@ -20,23 +23,28 @@ class FileWriter:
     """
     
     def __init__(self, config_dict: dict[str: str], file_size_limit: int,
-                 folder_path: str, liquibase_string: str):
+                 folder_path: str, liquibase_string: str,
+                 tracer: Tracer = None):
         """
-        :param config_dict: a dictionary with the logger configuration.
+        :param config_dict: a dictionary with the logger configuration, used
+        if the logging is not configured yet.
         :param file_size_limit: the maximum size of file with scripts.
         :param folder_path: a folder to create files.
         :param liquibase_string: the line to start the script file.
+        :param tracer: a Tracer object recording the writes as spans, the
+        spans are not recorded if empty.
         """
-        logging.config.dictConfig(config_dict)
+        configure_logging(config_dict)
         self.__logger: Logger = logging.getLogger(__name__)
-        self.__logger.info(f'file_size_limit: {file_size_limit}, '
-                           f'folder_path: {folder_path}')
+        self.__logger.info("file_size_limit: %s, folder_path: %s",
+                           file_size_limit, folder_path)
         self.__files: list[str] = []
         self.__cur_name: Union[str, None] = None
         self.__cur_size: int = file_size_limit + 1
         self.__limit: int = file_size_limit
         self.__folder_path: str = folder_path
         self.__liquibase_string: str = liquibase_string
+        self.__tracer: Tracer = tracer or Tracer()
 
     @property
     def files(self) -> list[str]:
@@ -59,8 +67,8 @@ class FileWriter:
         :return: None
         """
 
-        self.__logger.info(f'{len(scripts)} scripts, '
-                           f'prefix: {prefix}, into_new_file: {into_new_file}')
+        self.__logger.info("%d scripts, prefix: %s, into_new_file: %s",
+                           len(scripts), prefix, into_new_file)
         if into_new_file:
             self.__cur_size = self.__limit + 1
         for script in scripts:
@@ -68,10 +76,12 @@ class FileWriter:
                 self.__cur_name = self.__generate_file_name(prefix)
                 self.__files.append(os.path.abspath(self.__cur_path))
                 self.__cur_size = 0
-            self.__add_script_to_file(script)
-            self.__cur_size = os.path.getsize(self.__cur_path)
-            self.__logger.debug(f'file path: {self.__cur_path}, '
-                                f'size: {self.__cur_size}')
+            with self.__tracer.span("write", file=self.__cur_name,
+                                    chars=len(script)):
+                self.__add_script_to_file(script)
+                self.__cur_size = os.path.getsize(self.__cur_path)
+            self.__logger.debug("file path: %s, size: %d", self.__cur_path,
+                                self.__cur_size)
 
     @property
     def __cur_path(self) -> str:
@@ -111,7 +121,8 @@ class FileWriter:
         write_mode = 'w'
         if os.path.exists(self.__cur_path):
             write_mode = 'a'
-        self.__logger.debug(f'file path: {self.__cur_path}, mode: {write_mode}')
+        self.__logger.debug("file path: %s, mode: %s", self.__cur_path,
+                            write_mode)
         with open(self.__cur_path, write_mode, encoding="utf-8") as file:
             if write_mode == 'w':
                 file.write(self.__liquibase_string)
@@ -0,0 +1,383 @@
+from logging import Logger
+import logging
+import os
+import threading
+import time
+from typing import Callable, ContextManager
+from git import Repo, Remote, GitError
+
+from core.tracing import Tracer
+
+
+class GitSynchronizer:
+    """A class for synchronising the generated files with the remote git
+    repository. The remote is pulled once per run, all the files of the run
+    are staged with a single index operation, committed once and pushed once.
+    Failed network operations are repeated with an exponential backoff.
+    With the background push the commit is pushed by a worker thread, so the
+    next run can start while the push is in flight; a failed push stays in
+    the queue and is repeated later, the next push sends all the commits made
+    meanwhile in their order.
+
+    Properties
+    ----------
+    staged_files(self) -> tuple[str]:
+        Returns a tuple with the paths of the files staged for the next commit.
+    retry_count(self) -> int:
+        Returns the number of the repeated pull and push attempts of the
+        caller.
+
+    Methods
+    -------
+    open_repository(git_folder_path: str, target_folder: str,
+                    remote_url: str = None, branch: str = None,
+                    shallow_depth: int = None, sparse: bool = False) -> Repo:
+        Opens the git repository, bootstrapping a shallow and sparse clone of
+        the remote repository if the folder does not contain it yet.
+    pull(self) -> None:
+        Pulls the remote repository.
+    stage(self, files: list[str]) -> None:
+        Adds the files to the list of files for the next commit.
+    commit_and_push(self, message: str) -> bool:
+        Commits the staged files with the message and pushes the commit to the
+        remote repository.
+    wait_push(self) -> int:
+        Waits for the background push in flight and returns the number of its
+        repeated attempts.
+    flush(self) -> None:
+        Waits for the queued background push.
+    close(self) -> None:
+        Stops the background push worker and pushes the commits left in the
+        queue.
+    """
+
+    def __init__(self, repo: Repo, remote_name: str = "origin",
+                 max_attempts: int = 5, backoff_seconds: float = 1.0,
+                 max_backoff_seconds: float = 60.0,
+                 background_push: bool = False, lock: ContextManager = None,
+                 tracer: Tracer = None):
+        """
+        :param repo: a git repository object.
+        :param remote_name: the name of the remote repository.
+        :param max_attempts: the maximum number of attempts for a pull or push
+        operation.
+        :param backoff_seconds: the delay before the second attempt, doubled
+        for each next attempt.
+        :param max_backoff_seconds: the upper bound of the delay between
+        attempts, also the delay before a failed background push is queued
+        again.
+        :param background_push: if True, commit_and_push only queues the push
+        for the worker thread.
+        :param lock: a lock held during each git operation, a new thread lock
+        if empty. A process shared lock can be passed to serialise the
+        operations of several processes writing to the same repository.
+        :param tracer: a Tracer object recording the git operations as spans,
+        the spans are not recorded if empty.
+        """
+
+        self.__logger: Logger = logging.getLogger(__name__)
+        self.__repo: Repo = repo
+        self.__origin: Remote = repo.remote(name=remote_name)
+        self.__max_attempts: int = max(max_attempts, 1)
+        self.__backoff_seconds: float = backoff_seconds
+        self.__max_backoff_seconds: float = max_backoff_seconds
+        self.__staged_files: list[str] = []
+        self.__background_push: bool = background_push
+        self.__lock: ContextManager = \
+            lock if lock is not None else threading.Lock()
+        self.__push_condition: threading.Condition = threading.Condition()
+        self.__push_thread: threading.Thread = None
+        self.__push_pending: bool = False
+        self.__push_in_flight: bool = False
+        self.__push_failed: bool = False
+        self.__closed: bool = False
+        self.__retry_count: int = 0
+        self.__push_retries: int = 0
+        self.__tracer: Tracer = tracer or Tracer()
+
+    @staticmethod
+    def open_repository(git_folder_path: str, target_folder: str,
+                        remote_url: str = None, branch: str = None,
+                        shallow_depth: int = None,
+                        sparse: bool = False) -> Repo:
+        """Opens the git repository, bootstrapping a clone of the remote
+        repository if the folder does not contain it yet. The clone is limited
+        to the last shallow_depth commits, and with the sparse flag only the
+        target folder is checked out and its blobs are fetched on demand.
+        The target folder is added to the folders of a sparse checkout
+        already set up, so the pipelines sharing the repository keep their
+        folders checked out.
+        Later pulls fetch only the commits made after the clone, so the
+        checkout does not grow with the repository history.
+
+        :param git_folder_path: the path to the git repository folder.
+        :param target_folder: the folder name in the git repository for adding
+        script files.
+        :param remote_url: the url of the remote repository to clone.
+        :param branch: the branch to clone, the remote default if empty.
+        :param shallow_depth: the number of commits to clone, all if empty.
+        :param sparse: if True, checks out only the target folder.
+        :raise NotADirectoryError: if the git repository folder does not exist
+        and there is no remote url to clone it.
+        :return: the repository object.
+        """
+
+        logger = logging.getLogger(__name__)
+        is_cloned = False
+        if not os.path.exists(os.path.join(git_folder_path, ".git")) \
+                and remote_url:
+            logger.info(f"clone {remote_url}, depth: {shallow_depth}, "
+                        f"sparse: {sparse}")
+            clone_kwargs = {"no_checkout": True}
+            if branch:
+                clone_kwargs["branch"] = branch
+            if shallow_depth:
+                clone_kwargs["depth"] = shallow_depth
+            if sparse:
+                clone_kwargs["filter"] = "blob:none"
+                clone_kwargs["sparse"] = True
+            repo = Repo.clone_from(remote_url, git_folder_path, **clone_kwargs)
+            is_cloned = True
+        elif not os.path.exists(git_folder_path):
+            raise NotADirectoryError(
+                f"git_folder_path {git_folder_path} does not exist")
+        else:
+            repo = Repo(git_folder_path)
+        if sparse:
+            is_sparse = repo.git.config("--get", "core.sparseCheckout",
+                                        with_exceptions=False) == "true"
+            if is_sparse and not is_cloned:
+                repo.git.sparse_checkout("add", target_folder)
+                logger.info(f"{target_folder} is added to the sparse checkout")
+            else:
+                repo.git.sparse_checkout("set", target_folder)
+                logger.info(f"sparse checkout is limited to {target_folder}")
+        if is_cloned:
+            repo.git.checkout(repo.active_branch.name)
+        os.makedirs(os.path.join(git_folder_path, target_folder),
+                    exist_ok=True)
+        return repo
+
+    @property
+    def staged_files(self) -> tuple[str]:
+        """
+        :return: a tuple with the paths of the files staged for the next
+        commit.
+        """
+
+        return tuple(self.__staged_files)
+
+    @property
+    def retry_count(self) -> int:
+        """
+        :return: the number of the repeated pull and push attempts of the
+        caller since the synchronizer was created, the attempts of the
+        background push are counted by wait_push.
+        """
+
+        with self.__push_condition:
+            return self.__retry_count
+
+    def pull(self) -> None:
+        """Pulls the remote repository. A background push in flight is
+        completed first, with its retries; a failed push waiting to be queued
+        again is not waited for.
+
+        :raise RuntimeError: if all the pull attempts failed.
+        :return: None
+        """
+
+        with self.__push_condition:
+            while self.__push_in_flight:
+                self.__push_condition.wait()
+        self.__repeat(self.__origin.pull, "git pull")
+
+    def stage(self, files: list[str]) -> None:
+        """Adds the files to the list of files for the next commit.
+
+        :param files: the list of the file paths.
+        :return: None
+        """
+
+        for file in files:
+            if file not in self.__staged_files:
+                self.__staged_files.append(file)
+
+    def commit_and_push(self, message: str) -> bool:
+        """Commits the staged files with the message and pushes the commit to
+        the remote repository. If the files are committed already, only the
+        push is done. If the push is rejected, the remote repository is pulled
+        before the next attempt.
+
+        :param message: the commit message.
+        :raise RuntimeError: if all the push attempts failed.
+        :return: True if a commit was made, False if there was nothing to
+        commit.
+        """
+
+        self.__logger.info(f"commit {len(self.__staged_files)} files")
+        if not self.__staged_files:
+            return False
+        with self.__tracer.span("git commit",
+                                files=len(self.__staged_files)), self.__lock:
+            self.__repo.index.add(self.__staged_files)
+            self.__logger.info("git add finished")
+            self.__staged_files = []
+            if self.__repo.head.is_valid() \
+                    and not self.__repo.index.diff(self.__repo.head.commit):
+                self.__logger.warning("staged files are committed already")
+            else:
+                self.__repo.index.commit(message)
+                self.__logger.info("git commit finished")
+        if self.__background_push:
+            self.__queue_push()
+        else:
+            self.__push()
+        return True
+
+    def wait_push(self) -> int:
+        """Waits for the background push in flight, with its retries, and
+        returns the number of the repeated attempts of the background pushes
+        finished since the previous call. So the retries are counted for the
+        run which queued the push and not for the run during which the push
+        was done. A failed push waiting to be queued again is not waited for.
+
+        :return: the number of the repeated background push attempts.
+        """
+
+        with self.__push_condition:
+            while self.__push_in_flight:
+                self.__push_condition.wait()
+            retries = self.__push_retries
+            self.__push_retries = 0
+        return retries
+
+    def flush(self) -> None:
+        """Waits for the queued background push.
+
+        :raise RuntimeError: if the last push attempts failed, the commits are
+        kept in the queue.
+        :return: None
+        """
+
+        with self.__push_condition:
+            while self.__push_in_flight \
+                    or (self.__push_pending and not self.__push_failed):
+                self.__push_condition.wait()
+            if self.__push_pending:
+                raise RuntimeError("git push failed, the commits are queued")
+
+    def close(self) -> None:
+        """Stops the background push worker and pushes the commits left in
+        the queue.
+
+        :raise RuntimeError: if all the push attempts failed.
+        :return: None
+        """
+
+        with self.__push_condition:
+            self.__closed = True
+            self.__push_condition.notify_all()
+        if self.__push_thread:
+            self.__push_thread.join()
+            self.__push_thread = None
+        if self.__push_pending:
+            self.__push_pending = False
+            self.__push()
+
+    def __push(self) -> None:
+        """Pushes the commits to the remote repository.
+
+        :raise RuntimeError: if all the push attempts failed.
+        :return: None
+        """
+
+        self.__repeat(self.__origin.push, "git push",
+                      before_retry=self.__origin.pull)
+
+    def __queue_push(self) -> None:
+        """Queues the push for the worker thread and starts the worker if it
+        is not running.
+
+        :return: None
+        """
+
+        with self.__push_condition:
+            if self.__closed:
+                raise RuntimeError("the synchronizer is closed")
+            self.__push_pending = True
+            self.__push_failed = False
+            self.__push_condition.notify_all()
+            if not self.__push_thread:
+                self.__push_thread = threading.Thread(
+                    target=self.__push_worker, name="git-push", daemon=True)
+                self.__push_thread.start()
+        self.__logger.info("git push is queued")
+
+    def __push_worker(self) -> None:
+        """Pushes the queued commits until the synchronizer is closed. A
+        failed push is queued again after the maximum backoff delay.
+
+        :return: None
+        """
+
+        while True:
+            with self.__push_condition:
+                while not self.__push_pending and not self.__closed:
+                    self.__push_condition.wait()
+                if self.__closed:
+                    return
+                self.__push_pending = False
+                self.__push_in_flight = True
+            try:
+                self.__push()
+                failed = False
+            except RuntimeError as ex:
+                self.__logger.error(f"{ex}, the push is queued again")
+                failed = True
+            with self.__push_condition:
+                self.__push_in_flight = False
+                self.__push_failed = failed
+                if failed:
+                    self.__push_pending = True
+                self.__push_condition.notify_all()
+                if failed and not self.__closed:
+                    self.__push_condition.wait(self.__max_backoff_seconds)
+
+    def __repeat(self, operation: Callable[[], object], name: str,
+                 before_retry: Callable[[], object] = None) -> None:
+        """Runs the git operation and repeats it with an exponential backoff
+        until it succeeds or the attempts are over. The lock is held during
+        each attempt, not during the delay. The repeats of the background
+        push worker are counted apart from the repeats of the caller.
+
+        :param operation: the git operation to run.
+        :param name: the operation name for logging.
+        :param before_retry: an operation to run before each repeat.
+        :raise RuntimeError: if all the attempts failed.
+        :return: None
+        """
+
+        delay = self.__backoff_seconds
+        for attempt_num in range(1, self.__max_attempts + 1):
+            try:
+                with self.__tracer.span(name, attempt=attempt_num), \
+                        self.__lock:
+                    if attempt_num > 1 and before_retry:
+                        before_retry()
+                    operation()
+                self.__logger.info(f"{name} finished")
+                return
+            except GitError as ex:
+                self.__logger.exception(ex)
+                self.__logger.error(f"{name} attempt {attempt_num} of "
+                                    f"{self.__max_attempts} failed")
+            if attempt_num < self.__max_attempts:
+                with self.__push_condition:
+                    if threading.current_thread() is self.__push_thread:
+                        self.__push_retries += 1
+                    else:
+                        self.__retry_count += 1
+                time.sleep(delay)
+                delay = min(delay * 2, self.__max_backoff_seconds)
+        raise RuntimeError(f"{name} failed")
@@ -0,0 +1,234 @@
+from logging import Logger
+import logging
+import threading
+import time
+from pyodbc import Error as DbError, Cursor
+from typing import Any, Union
+
+from core.sqlquerybuilder import SqlQueryBuilder
+
+
+class LoadGovernor:
+    """A class for limiting the load of the diff queries on the work
+    database server. The governor caps the number of the queries running at
+    the same time, fetches the rows in batches within the rows per second
+    budget and adds the MAXDOP hint to the queries. If the latency of a
+    query (the time to its first rows) or the resource wait time of the
+    server per second rises above the threshold, the governor backs off:
+    each next query is delayed, the delay is doubled while the pressure
+    lasts and halved when it is gone. The wait time is sampled with the
+    cursor of the next query, not more often than the interval.
+    The governor can be shared by the threads of the table workers. A
+    governor without the settings runs the queries as is.
+
+    Properties
+    ----------
+    delay_seconds(self) -> float:
+        Returns the current backoff delay before a query.
+    throttled_seconds(self) -> float:
+        Returns the total time the queries were held by the governor.
+
+    Methods
+    -------
+    fetch(self, cursor: Cursor, query: str, params: list[Any] = None) \
+            -> tuple[list[Any], float]:
+        Executes the query within the limits and fetches all its rows.
+    reset(self) -> None:
+        Removes the throttled time of the previous run.
+    """
+
+    def __init__(self, queries: SqlQueryBuilder,
+                 max_concurrent_queries: int = None,
+                 rows_per_second: float = None, batch_size: int = 1000,
+                 maxdop: int = None, latency_seconds: float = None,
+                 wait_ms_per_second: float = None,
+                 wait_interval_seconds: float = 10,
+                 backoff_seconds: float = 1, max_backoff_seconds: float = 60):
+        """
+        :param queries: an SqlQueryBuilder class instance to build the MAXDOP
+        hint and the wait stats query.
+        :param max_concurrent_queries: the maximum number of the queries
+        running at the same time, not limited if empty.
+        :param rows_per_second: the budget of the fetched rows per second of
+        a query, not limited if empty.
+        :param batch_size: the number of the rows fetched at once within the
+        rows per second budget.
+        :param maxdop: the maximum degree of parallelism of the queries, the
+        hint is not added if empty.
+        :param latency_seconds: the time to the first rows of a query above
+        which the governor backs off, the latency is not watched if empty.
+        :param wait_ms_per_second: the resource wait time of the server in
+        milliseconds per second above which the governor backs off, the
+        wait stats are not sampled if empty.
+        :param wait_interval_seconds: the minimum interval between the wait
+        stats samples.
+        :param backoff_seconds: the first delay before a query when the
+        governor backs off.
+        :param max_backoff_seconds: the maximum delay before a query.
+        """
+
+        self.__logger: Logger = logging.getLogger(__name__)
+        self.__queries: SqlQueryBuilder = queries
+        self.__semaphore: Union[threading.BoundedSemaphore, None] = None
+        if max_concurrent_queries:
+            self.__semaphore = threading.BoundedSemaphore(
+                max_concurrent_queries)
+        self.__rows_per_second: Union[float, None] = rows_per_second
+        self.__batch_size: int = max(batch_size, 1)
+        self.__maxdop: Union[int, None] = maxdop
+        self.__latency_seconds: Union[float, None] = latency_seconds
+        self.__wait_ms_per_second: Union[float, None] = wait_ms_per_second
+        self.__wait_interval_seconds: float = wait_interval_seconds
+        self.__backoff_seconds: float = backoff_seconds
+        self.__max_backoff_seconds: float = max_backoff_seconds
+        self.__lock: threading.Lock = threading.Lock()
+        self.__sample_lock: threading.Lock = threading.Lock()
+        self.__wait_sample: Union[tuple[float, float], None] = None
+        self.__delay_seconds: float = 0.0
+        self.__throttled_seconds: float = 0.0
+
+    @property
+    def delay_seconds(self) -> float:
+        """
+        :return: the current backoff delay before a query in seconds, zero if
+        the governor does not back off.
+        """
+
+        return self.__delay_seconds
+
+    @property
+    def throttled_seconds(self) -> float:
+        """
+        :return: the total time in seconds the queries waited for a free slot,
+        the backoff delay or the rows per second budget.
+        """
+
+        return self.__throttled_seconds
+
+    def fetch(self, cursor: Cursor, query: str,
+              params: list[Any] = None) -> tuple[list[Any], float]:
+        """Executes the query with the MAXDOP hint when a slot of the
+        concurrent queries is free and the backoff delay has passed, fetches
+        all its rows within the rows per second budget and checks the latency
+        of the query.
+
+        :param cursor: a database cursor for executing the query.
+        :param query: the text of the query.
+        :param params: the values of the ? parameter markers of the query.
+        :raise pyodbc.Error: if the query execution failed.
+        :return: the rows of the query result and the time in seconds the
+        query was held by the governor.
+        """
+
+        started = time.perf_counter()
+        if self.__semaphore:
+            self.__semaphore.acquire()
+        try:
+            self.__sample_wait_stats(cursor)
+            if self.__delay_seconds:
+                time.sleep(self.__delay_seconds)
+            held = time.perf_counter() - started
+            if self.__maxdop:
+                query = self.__queries.get_maxdop_query(query, self.__maxdop)
+            executed = time.perf_counter()
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            if not self.__rows_per_second:
+                result = cursor.fetchall()
+                self.__check_latency(time.perf_counter() - executed)
+            else:
+                result = []
+                paused = 0.0
+                while True:
+                    rows = cursor.fetchmany(self.__batch_size)
+                    if not result:
+                        self.__check_latency(time.perf_counter() - executed)
+                    if not rows:
+                        break
+                    result += rows
+                    pause = len(result) / self.__rows_per_second \
+                        - (time.perf_counter() - executed)
+                    if pause > 0:
+                        time.sleep(pause)
+                        paused += pause
+                held += paused
+        finally:
+            if self.__semaphore:
+                self.__semaphore.release()
+        with self.__lock:
+            self.__throttled_seconds += held
+        return result, held
+
+    def reset(self) -> None:
+        """Removes the throttled time of the previous run. The backoff delay
+        is kept, since the load of the server does not depend on the run.
+
+        :return: None
+        """
+
+        with self.__lock:
+            self.__throttled_seconds = 0.0
+
+    def __check_latency(self, latency: float) -> None:
+        """Backs off if the latency of the query is above the threshold,
+        otherwise reduces the delay."""
+
+        if self.__latency_seconds is None:
+            return
+        self.__update_delay(latency > self.__latency_seconds,
+                            f"query latency {latency:.3f} s")
+
+    def __sample_wait_stats(self, cursor: Cursor) -> None:
+        """Samples the resource wait time of the server with the cursor if
+        the interval has passed and backs off if the wait time per second
+        since the previous sample is above the threshold. The sample is
+        skipped if another thread takes it. If the wait stats can't be read,
+        for example without the VIEW SERVER STATE permission, the sampling is
+        switched off."""
+
+        if self.__wait_ms_per_second is None:
+            return
+        now = time.monotonic()
+        if self.__wait_sample \
+                and now - self.__wait_sample[0] < self.__wait_interval_seconds:
+            return
+        if not self.__sample_lock.acquire(blocking=False):
+            return
+        try:
+            try:
+                cursor.execute(self.__queries.get_wait_stats_query())
+                wait_ms = float(cursor.fetchall()[0][0])
+            except DbError as ex:
+                self.__logger.warning("the wait stats are not sampled: %s",
+                                      ex)
+                self.__wait_ms_per_second = None
+                return
+            previous = self.__wait_sample
+            self.__wait_sample = (now, wait_ms)
+            if previous and now > previous[0]:
+                rate = (wait_ms - previous[1]) / (now - previous[0])
+                self.__update_delay(rate > self.__wait_ms_per_second,
+                                    f"server waits {rate:.0f} ms/s")
+        finally:
+            self.__sample_lock.release()
+
+    def __update_delay(self, pressure: bool, reason: str) -> None:
+        """Doubles the delay before the queries under the pressure, starting
+        from the backoff seconds, and halves it otherwise."""
+
+        with self.__lock:
+            delay = self.__delay_seconds
+            if pressure:
+                self.__delay_seconds = min(max(delay * 2,
+                                               self.__backoff_seconds),
+                                           self.__max_backoff_seconds)
+            elif delay:
+                self.__delay_seconds = delay / 2 \
+                    if delay / 2 >= self.__backoff_seconds else 0.0
+            if self.__delay_seconds > delay:
+                self.__logger.warning("%s, the queries are delayed by %.1f s",
+                                      reason, self.__delay_seconds)
+            elif delay and not self.__delay_seconds:
+                self.__logger.info("%s, the queries are not delayed", reason)
@@ -0,0 +1,113 @@
+import atexit
+import logging
+import logging.config
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any
+
+_lock = threading.Lock()
+_configured = False
+_listeners: list[QueueListener] = []
+_direct_handlers: dict[str: list[logging.Handler]] = {}
+
+
+def configure_logging(config_dict: dict[str: Any], use_queue: bool = False,
+                      force: bool = False) -> bool:
+    """Configures the logging with the dictionary once per process, the next
+    calls are skipped, so the objects created for each run or table do not
+    tear down and rebuild the handlers. With the queue the handlers of each
+    configured logger are moved behind a QueueHandler and a QueueListener
+    thread, so the file writes happen off the calling thread. A process
+    forked from the configured one keeps the configuration and writes through
+    the handlers directly, since the listener thread is not forked.
+
+    :param config_dict: a dictionary with the logger configuration.
+    :param use_queue: if True the records are handled by the listener
+    thread.
+    :param force: if True the logging is configured again.
+    :return: True if the logging was configured, False if the call was
+    skipped.
+    """
+
+    global _configured
+    with _lock:
+        if _configured and not force:
+            return False
+        _stop_listeners()
+        logging.config.dictConfig(config_dict)
+        _configured = True
+        if use_queue:
+            names = [""] + [name for name in config_dict.get("loggers", {})
+                            if name]
+            for name in names:
+                _move_behind_queue(logging.getLogger(name or None))
+        return True
+
+
+def shutdown_logging() -> None:
+    """Stops the listener threads, handling the queued records first, and
+    attaches the handlers to the loggers directly again. Is called at the
+    process exit.
+
+    :return: None
+    """
+
+    with _lock:
+        _stop_listeners()
+
+
+def _move_behind_queue(logger: logging.Logger) -> None:
+    """Replaces the handlers of the logger with a QueueHandler and starts
+    the listener thread handling the queued records with them."""
+
+    if not logger.handlers:
+        return
+    handlers = list(logger.handlers)
+    record_queue = queue.SimpleQueue()
+    listener = QueueListener(record_queue, *handlers,
+                             respect_handler_level=True)
+    _direct_handlers[logger.name] = handlers
+    for handler in handlers:
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(record_queue))
+    listener.start()
+    _listeners.append(listener)
+
+
+def _stop_listeners() -> None:
+    """Stops the listener threads and restores the direct handlers."""
+
+    for listener in _listeners:
+        listener.stop()
+    _listeners.clear()
+    _restore_direct_handlers()
+
+
+def _restore_direct_handlers() -> None:
+    """Attaches the handlers moved behind the queues to their loggers."""
+
+    for name, handlers in _direct_handlers.items():
+        logger = logging.getLogger(name if name != "root" else None)
+        for handler in list(logger.handlers):
+            if isinstance(handler, QueueHandler):
+                logger.removeHandler(handler)
+        for handler in handlers:
+            logger.addHandler(handler)
+    _direct_handlers.clear()
+
+
+def _after_fork_in_child() -> None:
+    """Writes through the direct handlers in a forked process, since the
+    listener threads are not forked."""
+
+    global _lock
+    _lock = threading.Lock()
+    _listeners.clear()
+    _restore_direct_handlers()
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
@@ -0,0 +1,307 @@
+from logging import Logger
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import threading
+from concurrent.futures import CancelledError, ProcessPoolExecutor, Future
+from contextlib import ExitStack, contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Iterator, Union
+
+_limits = None
+_stop_event = None
+
+
+class PipelineLimits:
+    """A class for holding the locks shared by the pipeline processes: the
+    semaphores limiting the database connections per server and the liquibase
+    processes, and a lock per git repository, so that only one pipeline
+    writes to a repository at a time.
+
+    Methods
+    -------
+    connection(self, server: str) -> ContextManager:
+        Returns the semaphore for a connection to the database server.
+    connections(self, servers: list[str]) -> ContextManager:
+        Returns a context manager holding a connection to each database
+        server.
+    acquire_connections(self, server: str, count: int) -> int:
+        Takes the free connections to the database server without waiting.
+    release_connections(self, server: str, count: int) -> None:
+        Returns the connections taken by acquire_connections.
+    liquibase(self) -> ContextManager:
+        Returns the semaphore for a liquibase process.
+    git(self, repo_path: str) -> Union[ContextManager, None]:
+        Returns the lock for writing to the git repository.
+    """
+
+    def __init__(self, connection_semaphores: dict[str: Any],
+                 liquibase_semaphore: Any, git_locks: dict[str: Any],
+                 connections_lock: Any = None):
+        """
+        :param connection_semaphores: a dictionary with the semaphores for
+        each database server name.
+        :param liquibase_semaphore: the semaphore for liquibase processes,
+        None for no limit.
+        :param git_locks: a dictionary with the locks for each git repository
+        absolute path.
+        :param connections_lock: a lock held while a pipeline takes the
+        connections to several servers, None if there are no semaphores.
+        """
+
+        self.__connection_semaphores: dict[str: Any] = connection_semaphores
+        self.__liquibase_semaphore: Any = liquibase_semaphore
+        self.__git_locks: dict[str: Any] = git_locks
+        self.__connections_lock: Any = connections_lock
+
+    def connection(self, server: str) -> ContextManager:
+        """
+        :param server: the database server name.
+        :return: the semaphore for a connection to the database server, a
+        context without limit if the server is unknown.
+        """
+
+        return self.__connection_semaphores.get(server.lower(), nullcontext())
+
+    @contextmanager
+    def connections(self, servers: list[str]) -> Iterator[None]:
+        """Holds a connection to each database server of the list, like the
+        work and the clear servers of a pipeline. A pipeline is counted once
+        for a server listed twice. All the connections are taken under the
+        connections lock, so two pipelines waiting for each other's servers
+        can't block each other forever.
+
+        :param servers: the list of the database server names.
+        :return: a context manager.
+        """
+
+        with ExitStack() as stack:
+            with self.__connections_lock or nullcontext():
+                for server in sorted(set(server.lower()
+                                         for server in servers)):
+                    stack.enter_context(self.connection(server))
+            yield
+
+    def acquire_connections(self, server: str, count: int) -> int:
+        """Takes up to count connections to the database server without
+        waiting, for the additional connections of a pipeline like the table
+        workers.
+
+        :param server: the database server name.
+        :param count: the number of connections wanted.
+        :return: the number of connections taken, all of them if the server
+        is unknown.
+        """
+
+        semaphore = self.__connection_semaphores.get(server.lower())
+        if semaphore is None:
+            return count
+        acquired = 0
+        while acquired < count and semaphore.acquire(False):
+            acquired += 1
+        return acquired
+
+    def release_connections(self, server: str, count: int) -> None:
+        """Returns the connections taken by the acquire_connections method.
+
+        :param server: the database server name.
+        :param count: the number of connections taken.
+        :return: None
+        """
+
+        semaphore = self.__connection_semaphores.get(server.lower())
+        if semaphore is not None:
+            for _ in range(count):
+                semaphore.release()
+
+    def liquibase(self) -> ContextManager:
+        """
+        :return: the semaphore for a liquibase process, a context without
+        limit if it is not configured.
+        """
+
+        return self.__liquibase_semaphore or nullcontext()
+
+    def git(self, repo_path: str) -> Union[ContextManager, None]:
+        """
+        :param repo_path: the path to the git repository folder.
+        :return: the lock for writing to the git repository, None if the
+        repository is unknown, so the writer uses a lock of its own.
+        """
+
+        return self.__git_locks.get(os.path.abspath(repo_path))
+
+
+class PipelineScheduler:
+    """A class for running several script generation pipelines, each with its
+    own work and clear databases, on a process pool with global concurrency
+    limits: the number of database connections per server, the number of
+    liquibase processes and one git writer per repository.
+
+    Methods
+    -------
+    get_server(conn_string: str) -> str:
+        Returns the database server name from the connection string.
+    run(self, pipelines: list[dict[str: Any]],
+        pipeline_func: Callable[[dict[str: Any], PipelineLimits], None]
+        ) -> dict[str: Union[BaseException, None]]:
+        Runs the pipelines on the process pool and waits for them.
+    """
+
+    def __init__(self, max_workers: int = None,
+                 max_connections_per_server: int = None,
+                 max_liquibase_processes: int = None):
+        """
+        :param max_workers: the maximum number of pipeline processes, the
+        number of cores if empty.
+        :param max_connections_per_server: the maximum number of pipelines
+        connected to the same database server, no limit if empty.
+        :param max_liquibase_processes: the maximum number of liquibase
+        processes run at the same time, no limit if empty.
+        """
+
+        self.__logger: Logger = logging.getLogger(__name__)
+        self.__max_workers: int = max_workers or os.cpu_count() or 1
+        self.__max_connections_per_server: int = max_connections_per_server
+        self.__max_liquibase_processes: int = max_liquibase_processes
+
+    @staticmethod
+    def get_server(conn_string: str) -> str:
+        """Returns the database server name from the ODBC connection string.
+
+        :param conn_string: the connection string.
+        :return: the server name in lower case, an empty string if the
+        connection string does not contain it.
+        """
+
+        match = re.search(r"(?:^|;)\s*(?:server|address|addr)\s*=\s*([^;]*)",
+                          conn_string, re.IGNORECASE)
+        return match.group(1).strip().lower() if match else ""
+
+    def run(self, pipelines: list[dict[str: Any]],
+            pipeline_func: Callable[[dict[str: Any], PipelineLimits], None]
+            ) -> dict[str: Union[BaseException, None]]:
+        """Runs the pipelines on the process pool and waits for them. Each
+        pipeline is an app config dictionary with the optional name key.
+        A SIGTERM of the scheduler process cancels the pipelines not started
+        yet and is forwarded to the pipeline processes, so the running
+        pipelines stop after their next checkpoint instead of being left
+        without their parent.
+
+        :param pipelines: the list of the app config dictionaries.
+        :param pipeline_func: a module level function running one pipeline
+        with its app config and the shared limits.
+        :raise ValueError: if two pipelines write to the same target folder of
+        the same git repository.
+        :return: a dictionary with the exception for each failed pipeline
+        name, a CancelledError for each cancelled one and None for each
+        succeeded one.
+        """
+
+        limits = self.__create_limits(pipelines)
+        workers = min(self.__max_workers, len(pipelines)) or 1
+        self.__logger.info(f"{len(pipelines)} pipelines run, "
+                           f"workers: {workers}")
+        futures: dict[str: Future] = {}
+        stop_event = multiprocessing.Event()
+
+        def handle_sigterm(signum, frame) -> None:
+            self.__logger.warning(f"signal {signum} received, the pipelines "
+                                  f"are stopped")
+            stop_event.set()
+            for future in futures.values():
+                future.cancel()
+            for process in multiprocessing.active_children():
+                process.terminate()
+        is_main_thread = threading.current_thread() is threading.main_thread()
+        if is_main_thread:
+            previous_handler = signal.signal(signal.SIGTERM, handle_sigterm)
+        try:
+            with ProcessPoolExecutor(max_workers=workers,
+                                     initializer=_init_worker,
+                                     initargs=(limits, stop_event)
+                                     ) as executor:
+                for num, pipeline in enumerate(pipelines):
+                    name = pipeline.get("name") or f"pipeline{num}"
+                    futures[name] = executor.submit(_run_worker,
+                                                    pipeline_func, pipeline)
+        finally:
+            if is_main_thread:
+                signal.signal(signal.SIGTERM, previous_handler)
+        results = {}
+        for name, future in futures.items():
+            if future.cancelled():
+                results[name] = CancelledError(f"{name} is cancelled")
+            else:
+                results[name] = future.exception()
+            if results[name]:
+                self.__logger.error(f"{name} failed: {results[name]}")
+            else:
+                self.__logger.info(f"{name} finished")
+        return results
+
+    def __create_limits(self, pipelines: list[dict[str: Any]]
+                        ) -> PipelineLimits:
+        """Creates the process shared semaphores and locks for the work and
+        the clear servers and the git repositories of the pipelines.
+
+        :param pipelines: the list of the app config dictionaries.
+        :raise ValueError: if two pipelines write to the same target folder of
+        the same git repository.
+        :return: the PipelineLimits object.
+        """
+
+        connection_semaphores = {}
+        git_locks = {}
+        target_folders = set()
+        for pipeline in pipelines:
+            conn_strings = [pipeline["connection"]["conn_string"],
+                            pipeline["connection"].get("clear_conn_string")]
+            for conn_string in conn_strings:
+                if not self.__max_connections_per_server or not conn_string:
+                    continue
+                server = self.get_server(conn_string)
+                if server not in connection_semaphores:
+                    connection_semaphores[server] = multiprocessing.Semaphore(
+                        self.__max_connections_per_server)
+            repository = pipeline["repository"]
+            repo_path = os.path.abspath(repository["git_folder_path"])
+            target_folder = (repo_path, repository["target_folder"])
+            if target_folder in target_folders:
+                raise ValueError(f"several pipelines write to "
+                                 f"{repository['target_folder']} of "
+                                 f"{repo_path}")
+            target_folders.add(target_folder)
+            if repo_path not in git_locks:
+                git_locks[repo_path] = multiprocessing.Lock()
+        liquibase_semaphore = None
+        if self.__max_liquibase_processes:
+            liquibase_semaphore = multiprocessing.Semaphore(
+                self.__max_liquibase_processes)
+        return PipelineLimits(connection_semaphores, liquibase_semaphore,
+                              git_locks, multiprocessing.Lock()
+                              if connection_semaphores else None)
+
+
+def _init_worker(limits: PipelineLimits, stop_event: Any) -> None:
+    """Keeps the shared limits and the stop event in the pipeline process.
+    The SIGTERM handler inherited from the scheduler process is replaced by
+    ignoring the signal, a pipeline function installs its own handler to
+    stop the pipeline."""
+
+    global _limits, _stop_event
+    _limits = limits
+    _stop_event = stop_event
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+
+def _run_worker(pipeline_func: Callable[[dict[str: Any], PipelineLimits],
+                                        None],
+                pipeline: dict[str: Any]) -> None:
+    """Runs the pipeline function with the shared limits of the process,
+    unless the scheduler is stopped."""
+
+    if _stop_event.is_set():
+        raise CancelledError("the scheduler is stopped")
+    pipeline_func(pipeline, _limits)
@@ -0,0 +1,635 @@
+from core.sqltemplates import SqlTemplates
+
+
+class PostgresTemplates(SqlTemplates):
+    """The class contains templates for SQL queries and statements used with
+    PostgreSQL databases. The work and clear data are kept in two schemas of
+    the same database, the schema names are used as the database names, so
+    the tables are named like work.report and clear.report. The table names
+    have no schema and the metadata is read from the current schema of the
+    connection, so the search path has to start with one of the schemas.
+    With the bulk copy of the query builder on, the full uploads are
+    rendered as COPY ... FROM STDIN blocks with the rows in the text format.
+    The liquibase can't run the inline COPY data, so the blocks have to be
+    run by psql; by default the uploads are insert ... on conflict
+    statements like the upserts.
+    PostgreSQL has no table hints, statistics messages or query hints, so
+    the table hints, the diagnostics and the MAXDOP hint of the load governor
+    can't be used with these templates. The snapshot read isolation is the
+    repeatable read of PostgreSQL.
+
+    Properties
+    -----------------
+    column_query: str
+        SQL query template for getting database table columns by table name
+    search_del_query: str
+        SQL query template for searching deleted rows in the database table.
+    search_upsert_query: str
+        SQL query template for searching updated rows in the database table.
+    all_rows_query: str
+        SQL query template for getting all rows from the database table.
+    delete_statement: str
+        SQL statement for deleting rows from the database table.
+    upsert_statement: str
+        SQL statement for updating and inserting rows to the database table.
+    upsert_link_pattern: str
+        SQL pattern of a column update in the upsert statement.
+    copy_statement: str
+        SQL statement for uploading rows to the database table with COPY.
+    stage_statement: str
+        SQL statement for upserting rows through a staging table, empty.
+    stage_insert_statement: str
+        SQL statement for inserting rows to the staging table, empty.
+    json_upsert_statement: str
+        SQL statement for upserting rows from a JSON payload, empty.
+    json_column_pattern: str
+        SQL pattern of a JSON payload column definition, empty.
+    count_query: str
+        SQL query template for counting rows and data length of a query result.
+    column_length_pattern: str
+        SQL expression pattern for the data length of a column value.
+    ordered_query: str
+        SQL query template for ordering a query result by the key column.
+    key_after_condition: str
+        SQL condition template for the rows after the key value.
+    schema_version_query: str
+        SQL query for getting the fingerprint of the database schema.
+    key_range_query: str
+        SQL query template for getting the primary key range of the table.
+    bucket_checksum_query: str
+        SQL query template for the checksums of the primary key buckets.
+    row_checksum_query: str
+        SQL query template for the checksums of the rows in a key range.
+    keys_rows_query: str
+        SQL query template for getting the rows by the primary key list.
+    search_hash_upsert_query: str
+        SQL query template for searching updated rows by the row values.
+    row_hash_pattern: str
+        SQL expression pattern for the row value of the row columns.
+    self_reference_query: str
+        SQL query template for getting the foreign key column referring to
+        the same table.
+    hierarchy_ordered_query: str
+        SQL query template for ordering a query result by the hierarchy depth
+        of the self-referencing table rows.
+    hierarchy_key_after_condition: str
+        SQL condition template for the rows after the key value in the
+        hierarchy ordered query.
+    wait_stats_query: str
+        SQL query for getting the total IO wait time of the server.
+    """
+
+    @property
+    def column_query(self) -> str:
+        """SQL query template for getting database table columns by table name.
+        The primary key column is read from the primary key constraint.
+        Uses the name of the database table as a placeholder 0.
+        """
+
+        return (
+            "select\n"
+            "   c.column_name as ColumnName,\n"
+            "   case when c.column_name ilike '%_updDT' then 1 else 0 end\n"
+            "       as IsUpdDT,\n"
+            "   case when exists(\n"
+            "       select 1\n"
+            "       from pg_constraint as con\n"
+            "           join pg_attribute as att\n"
+            "               on att.attrelid = con.conrelid\n"
+            "               and att.attnum = any(con.conkey)\n"
+            "       where con.conrelid = to_regclass('{0}')\n"
+            "           and con.contype = 'p'\n"
+            "           and att.attname = c.column_name) then 1 else 0 end\n"
+            "       as IsPrimaryKey,\n"
+            "   c.data_type as ColumnType\n"
+            "from information_schema.columns as c\n"
+            "where c.table_schema = current_schema()\n"
+            "    and c.table_name = '{0}'\n"
+            "order by c.ordinal_position\n")
+
+    @property
+    def sub_tables_query(self) -> str:
+        """SQL query template for getting database table names containing
+        foreign keys to this table.
+        Uses the name of the database table as a placeholder 0.
+        """
+
+        return (
+            "select distinct rel.relname as key_name\n"
+            "from pg_constraint as con\n"
+            "    join pg_class as rel on rel.oid = con.conrelid\n"
+            "where con.confrelid = to_regclass('{0}')\n"
+            "    and con.contype = 'f';")
+
+    @property
+    def search_del_query(self) -> str:
+        """SQL query template for searching deleted rows in the database table.
+        Uses the name of the primary key column as a placeholder 0.
+        Uses the name of the database table as a placeholder 1.
+        Uses the name of the work database as a placeholder 2.
+        Uses the name of the clear database as a placeholder 3.
+        Uses the table hint of the work table as a placeholder 4.
+        """
+
+        return (
+            "select clr.{0}\n"
+            "from {3}.{1} as clr\n"
+            "where not exists(\n"
+            "    select 1\n"
+            "    from {2}.{1} as src{4}\n"
+            "    where clr.{0} = src.{0});\n")
+
+    @property
+    def search_upsert_query(self) -> str:
+        """SQL query template for searching updated rows in the database table.
+        Uses the column names list as a placeholder 0.
+        Uses the name of the work database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the name of the update date column as a placeholder 4.
+        Uses the name of the clear database as a placeholder 5.
+        Uses the table hint of the work table as a placeholder 6.
+
+        Warning: please, don't add a semicolon at the end of query.
+        Day count condition can be added at the end of this query.
+        """
+
+        return (
+            "select\n"
+            "    {0}\n"
+            "from {1}.{2} as src{6}\n"
+            "where not exists(\n"
+            "    select 1\n"
+            "    from {5}.{2} as clr\n"
+            "    where clr.{3} = src.{3}\n"
+            "        and clr.{4} = src.{4})")
+
+    @property
+    def all_rows_query(self) -> str:
+        """SQL query template for getting all rows from the database table.
+        Uses the column names list as a placeholder 0.
+        Uses the name of the work database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the table hint of the work table as a placeholder 3.
+        """
+
+        return (
+            "select\n"
+            "    {0}\n"
+            "from {1}.{2} as src{3}\n")
+
+    @property
+    def delete_statement(self) -> str:
+        """SQL statement for deleting rows from the database table.
+        Uses the name of the database table as a placeholder 0.
+        Uses the name of the primary key column as a placeholder 1.
+        Uses the row identifiers list as a placeholder 2.
+        """
+
+        return "delete from {0} where {1} in ({2});\n"
+
+    @property
+    def upsert_statement(self) -> str:
+        """SQL statement for updating and inserting rows to the database table.
+        The rows are inserted with INSERT ... ON CONFLICT, the conflicting
+        rows are updated. The values of the identity columns are kept.
+        Uses the name of the database table as a placeholder 0.
+        Uses the column names list as a placeholder 1.
+        Uses the upsert values list as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the fields links list as a placeholder 4.
+        Example: column = excluded.column. The list must not contain
+        a primary key.
+        Uses the src.column list as a placeholder 5.
+        """
+
+        return (
+            "insert into {0}(\n"
+            "    {1})\n"
+            "overriding system value\n"
+            "values\n"
+            "        {2}\n"
+            "on conflict({3}) do update set\n"
+            "            {4};\n")
+
+    @property
+    def upsert_link_pattern(self) -> str:
+        """SQL pattern of a column update in the upsert statement.
+        Uses the name of the column as a placeholder 0.
+        """
+
+        return "{0} = excluded.{0}"
+
+    @property
+    def copy_statement(self) -> str:
+        """SQL statement for uploading rows to the database table. The rows
+        are copied into a temporary table with COPY ... FROM STDIN and
+        upserted from it, so the rows already in the table are updated.
+        Uses the name of the database table as a placeholder 0.
+        Uses the column names list as a placeholder 1.
+        Uses the rows in the COPY text format as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the fields links list as a placeholder 4.
+        Example: column = excluded.column. The list must not contain
+        a primary key.
+        """
+
+        return (
+            "drop table if exists pg_temp.copy_src;\n"
+            "create temporary table copy_src as\n"
+            "select\n"
+            "    {1}\n"
+            "from {0}\n"
+            "with no data;\n"
+            "copy copy_src(\n"
+            "    {1}) from stdin;\n"
+            "{2}\n"
+            "\\.\n"
+            "insert into {0}(\n"
+            "    {1})\n"
+            "overriding system value\n"
+            "select\n"
+            "    {1}\n"
+            "from copy_src\n"
+            "on conflict({3}) do update set\n"
+            "            {4};\n"
+            "drop table copy_src;\n")
+
+    @property
+    def stage_statement(self) -> str:
+        """PostgreSQL plans the insert on conflict statement without
+        per-row estimates, so the rows are never staged.
+        """
+
+        return ""
+
+    @property
+    def stage_insert_statement(self) -> str:
+        """No staging table, see stage_statement."""
+
+        return ""
+
+    @property
+    def json_upsert_statement(self) -> str:
+        """The rows are upserted as the values list, the full uploads are
+        streamed with COPY instead of a JSON payload.
+        """
+
+        return ""
+
+    @property
+    def json_column_pattern(self) -> str:
+        """No JSON payload, see json_upsert_statement."""
+
+        return ""
+
+    @property
+    def count_query(self) -> str:
+        """SQL query template for counting rows and data length of a query
+        result.
+        Uses the text of the query without a semicolon as a placeholder 0.
+        Uses the row data length expression as a placeholder 1.
+        """
+
+        return (
+            "select\n"
+            "    count(*) as row_count,\n"
+            "    coalesce(sum({1}), 0) as data_length\n"
+            "from(\n"
+            "{0}) as q;\n")
+
+    @property
+    def column_length_pattern(self) -> str:
+        """SQL expression pattern for the data length of a column value in
+        the count query, null values are counted as a literal length.
+        Uses the name of the column as a placeholder 0.
+        """
+
+        return "coalesce(octet_length(q.{0}::text), 4)"
+
+    @property
+    def ordered_query(self) -> str:
+        """SQL query template for ordering a query result by the key column.
+        Uses the text of the query without a semicolon as a placeholder 0.
+        Uses the name of the key column as a placeholder 1.
+        Uses the key condition (key_after_condition or an empty string) as
+        a placeholder 2.
+        """
+
+        return (
+            "select ord.*\n"
+            "from(\n"
+            "{0}) as ord\n"
+            "{2}"
+            "order by ord.{1};\n")
+
+    @property
+    def key_after_condition(self) -> str:
+        """SQL condition template for the rows after the key value in the
+        ordered query.
+        Uses the name of the key column as a placeholder 0.
+        Uses the key value as a placeholder 1.
+        """
+
+        return "where ord.{0} > {1}\n"
+
+    @property
+    def schema_version_query(self) -> str:
+        """SQL query for getting the fingerprint of the database schema, which
+        changes when a table or a foreign key is created, altered or dropped.
+        PostgreSQL has no modification dates of the tables, so the
+        fingerprint is the hash of the columns and the constraints of the
+        current schema.
+        """
+
+        return (
+            "select md5(string_agg(d.item, ',' order by d.item))\n"
+            "from(\n"
+            "    select c.table_name || '.' || c.column_name || ':'\n"
+            "        || c.data_type as item\n"
+            "    from information_schema.columns as c\n"
+            "    where c.table_schema = current_schema()\n"
+            "    union all\n"
+            "    select con.conname || ':' || pg_get_constraintdef(con.oid)\n"
+            "    from pg_constraint as con\n"
+            "    where con.connamespace = current_schema()::regnamespace\n"
+            "        and con.contype in ('p', 'f')) as d;\n")
+
+    @property
+    def key_range_query(self) -> str:
+        """SQL query template for getting the primary key range of the
+        database table.
+        Uses the name of the primary key column as a placeholder 0.
+        Uses the name of the database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the table hint as a placeholder 3.
+        """
+
+        return (
+            "select\n"
+            "    min(src.{0}) as min_key,\n"
+            "    max(src.{0}) as max_key\n"
+            "from {1}.{2} as src{3};\n")
+
+    @property
+    def bucket_checksum_query(self) -> str:
+        """SQL query template for the row counts and the checksums of the
+        primary key buckets in the key range. The key range is split into
+        the buckets of the same width, the buckets are numbered from zero.
+        The checksum of a bucket is the sum of the hashes of its rows.
+        Uses the name of the primary key column as a placeholder 0.
+        Uses the column names list as a placeholder 1.
+        Uses the name of the database as a placeholder 2.
+        Uses the name of the database table as a placeholder 3.
+        Uses the low key of the range as a placeholder 4.
+        Uses the high key of the range as a placeholder 5.
+        Uses the bucket width as a placeholder 6.
+        Uses the table hint as a placeholder 7.
+        """
+
+        return (
+            "select\n"
+            "    b.bucket,\n"
+            "    count(*) as row_count,\n"
+            "    sum(b.row_hash::bigint) as bucket_hash\n"
+            "from(\n"
+            "    select\n"
+            "        (src.{0} - {4}) / {6} as bucket,\n"
+            "        hashtext(row({1})::text) as row_hash\n"
+            "    from {2}.{3} as src{7}\n"
+            "    where src.{0} between {4} and {5}) as b\n"
+            "group by b.bucket;\n")
+
+    @property
+    def row_checksum_query(self) -> str:
+        """SQL query template for the checksums of the rows in the key
+        range.
+        Uses the name of the primary key column as a placeholder 0.
+        Uses the column names list as a placeholder 1.
+        Uses the name of the database as a placeholder 2.
+        Uses the name of the database table as a placeholder 3.
+        Uses the low key of the range as a placeholder 4.
+        Uses the high key of the range as a placeholder 5.
+        Uses the table hint as a placeholder 6.
+        """
+
+        return (
+            "select\n"
+            "    src.{0} as row_key,\n"
+            "    hashtext(row({1})::text) as row_hash\n"
+            "from {2}.{3} as src{6}\n"
+            "where src.{0} between {4} and {5};\n")
+
+    @property
+    def keys_rows_query(self) -> str:
+        """SQL query template for getting the rows by the primary key
+        list.
+        Uses the column names list as a placeholder 0.
+        Uses the name of the database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the primary key list as a placeholder 4.
+        Uses the table hint as a placeholder 5.
+
+        Warning: please, don't add a semicolon at the end of query.
+        """
+
+        return (
+            "select\n"
+            "    {0}\n"
+            "from {1}.{2} as src{5}\n"
+            "where src.{3} in ({4})")
+
+    @property
+    def search_hash_upsert_query(self) -> str:
+        """SQL query template for searching updated rows in the database
+        table without an update date column, the rows are compared by the
+        row values of their columns with the is not distinct from operator,
+        so null values are equal.
+        Uses the column names list as a placeholder 0.
+        Uses the name of the work database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the name of the clear database as a placeholder 4.
+        Uses the row value of the work table as a placeholder 5.
+        Uses the row value of the clear table as a placeholder 6.
+        Uses the table hint of the work table as a placeholder 7.
+
+        Warning: please, don't add a semicolon at the end of query.
+        """
+
+        return (
+            "select\n"
+            "    {0}\n"
+            "from {1}.{2} as src{7}\n"
+            "where not exists(\n"
+            "    select 1\n"
+            "    from {4}.{2} as clr\n"
+            "    where clr.{3} = src.{3}\n"
+            "        and {6} is not distinct from {5})")
+
+    @property
+    def row_hash_pattern(self) -> str:
+        """SQL expression pattern for the row value of the row columns, used
+        instead of a hash.
+        Uses the column names list with the table alias as a placeholder 0.
+        """
+
+        return "row({0})"
+
+    @property
+    def statistics_statement(self) -> str:
+        """PostgreSQL has no statistics messages of the queries.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the statistics messages are not supported "
+                                  "by PostgreSQL")
+
+    @property
+    def showplan_statement(self) -> str:
+        """PostgreSQL has no session switch of the plan output.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the plan output is not supported by "
+                                  "PostgreSQL")
+
+    @property
+    def self_reference_query(self) -> str:
+        """SQL query template for getting the foreign key column of the
+        database table referring to the same table.
+        Uses the name of the database table as a placeholder 0.
+        """
+
+        return (
+            "select att.attname as column_name\n"
+            "from pg_constraint as con\n"
+            "    join pg_attribute as att on att.attrelid = con.conrelid\n"
+            "        and att.attnum = con.conkey[1]\n"
+            "where con.conrelid = to_regclass('{0}')\n"
+            "    and con.confrelid = con.conrelid\n"
+            "    and con.contype = 'f';")
+
+    @property
+    def hierarchy_ordered_query(self) -> str:
+        """SQL query template for ordering a query result by the hierarchy
+        depth of the self-referencing table rows and by the key column. The
+        depth is computed by a recursive query from the root rows, the rows
+        not reachable from the roots are ordered as the deepest ones.
+        Uses the text of the query without a semicolon as a placeholder 0.
+        Uses the name of the key column as a placeholder 1.
+        Uses the key condition (hierarchy_key_after_condition or an empty
+        string) as a placeholder 2.
+        Uses the name of the database with the hierarchy as a placeholder 3.
+        Uses the name of the database table as a placeholder 4.
+        Uses the name of the parent key column as a placeholder 5.
+        Uses the depth order direction (asc or desc) as a placeholder 6.
+        Uses the table hint as a placeholder 7.
+        """
+
+        return (
+            "with recursive hierarchy(row_key, depth) as(\n"
+            "    select\n"
+            "        src.{1},\n"
+            "        0\n"
+            "    from {3}.{4} as src{7}\n"
+            "    where src.{5} is null\n"
+            "        or src.{5} = src.{1}\n"
+            "    union all\n"
+            "    select\n"
+            "        src.{1},\n"
+            "        hierarchy.depth + 1\n"
+            "    from {3}.{4} as src{7}\n"
+            "        join hierarchy on src.{5} = hierarchy.row_key\n"
+            "    where src.{5} <> src.{1})\n"
+            "select ord.*\n"
+            "from(\n"
+            "{0}) as ord\n"
+            "    left join hierarchy as hier on hier.row_key = ord.{1}\n"
+            "{2}"
+            "order by coalesce(hier.depth, 2147483647) {6}, ord.{1};\n")
+
+    @property
+    def hierarchy_key_after_condition(self) -> str:
+        """SQL condition template for the rows after the key value in the
+        hierarchy ordered query.
+        Uses the name of the key column as a placeholder 0.
+        Uses the key value as a placeholder 1.
+        Uses the depth comparison operator (> or <) as a placeholder 2.
+        """
+
+        return (
+            "where coalesce(hier.depth, 2147483647) {2} coalesce((\n"
+            "        select key_hier.depth\n"
+            "        from hierarchy as key_hier\n"
+            "        where key_hier.row_key = {1}), 2147483647)\n"
+            "    or (coalesce(hier.depth, 2147483647) = coalesce((\n"
+            "        select key_hier.depth\n"
+            "        from hierarchy as key_hier\n"
+            "        where key_hier.row_key = {1}), 2147483647)\n"
+            "        and ord.{0} > {1})\n")
+
+    @property
+    def table_hint_pattern(self) -> str:
+        """PostgreSQL has no table hints like nolock or readpast.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the table hints are not supported by "
+                                  "PostgreSQL")
+
+    @property
+    def isolation_level_statement(self) -> str:
+        """SQL statement template for setting the isolation level of the
+        transaction, it has to be the first statement of the transaction.
+        Uses the isolation level, like repeatable read or read committed, as
+        a placeholder 0.
+        """
+
+        return "set transaction isolation level {0};"
+
+    @property
+    def snapshot_isolation_level(self) -> str:
+        """The repeatable read of PostgreSQL reads all tables of a
+        transaction in the snapshot taken by its first query and does not
+        block the writers.
+        """
+
+        return "repeatable read"
+
+    @property
+    def query_option_pattern(self) -> str:
+        """PostgreSQL has no query hints.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the query hints are not supported by "
+                                  "PostgreSQL")
+
+    @property
+    def maxdop_option(self) -> str:
+        """PostgreSQL limits the parallel workers by the session settings,
+        not by a query hint.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the query hints are not supported by "
+                                  "PostgreSQL")
+
+    @property
+    def wait_stats_query(self) -> str:
+        """SQL query for getting the total time in milliseconds the sessions
+        of the server waited for reading and writing the data files since the
+        statistics reset. The time is counted only if track_io_timing is on.
+        """
+
+        return (
+            "select coalesce(sum(blk_read_time + blk_write_time), 0)\n"
+            "    as wait_time_ms\n"
+            "from pg_stat_database;")
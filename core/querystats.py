@@ -0,0 +1,247 @@
+from logging import Logger
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime
+from pyodbc import Cursor
+from typing import Any, Union
+
+from core.loadgovernor import LoadGovernor
+from core.sqlquerybuilder import SqlQueryBuilder
+
+
+class QueryStats:
+    """A class for executing the diff queries with the instrumentation: each
+    query is timed, the fetched rows and bytes are counted, the queries
+    slower than the threshold are logged with their text and, optionally,
+    with the STATISTICS IO/TIME messages and the estimated plan XML. The
+    measurements are aggregated by the table and the query kind into the
+    report of the run. The queries can be measured from several threads.
+
+    Properties
+    ----------
+    query_count(self) -> int:
+        Returns the number of the measured queries.
+    slow_queries(self) -> list[dict[str: Any]]:
+        Returns the records of the slow queries.
+    totals(self) -> dict[tuple[str, str]: dict[str: float]]:
+        Returns the measurements by the tables and the query kinds.
+
+    Methods
+    -------
+    fetch(self, cursor: Cursor, table_name: str, kind: str, query: str,
+          governor: LoadGovernor = None,
+          params: list[Any] = None) -> list[Any]:
+        Executes the query, fetches all its rows and records the measurements.
+    reset(self) -> None:
+        Removes the measurements of the previous run.
+    report(self) -> str:
+        Builds the text report of the measurements by tables.
+    """
+
+    def __init__(self, queries: SqlQueryBuilder,
+                 slow_query_seconds: float = None,
+                 statistics_io_time: bool = False, plan_folder: str = None):
+        """
+        :param queries: an SqlQueryBuilder class instance to build the session
+        statements.
+        :param slow_query_seconds: the duration of a slow query, the queries
+        are not logged if empty.
+        :param statistics_io_time: if True, the STATISTICS IO/TIME messages of
+        each query are captured.
+        :param plan_folder: the folder to save the estimated plans of the slow
+        queries, the plans are not captured if empty.
+        """
+
+        self.__logger: Logger = logging.getLogger(__name__)
+        self.__queries: SqlQueryBuilder = queries
+        self.__slow_query_seconds: float = slow_query_seconds
+        self.__statistics_io_time: bool = statistics_io_time
+        self.__plan_folder: str = plan_folder
+        self.__lock: threading.Lock = threading.Lock()
+        self.__statistics_cursors: list[Cursor] = []
+        self.__totals: dict[tuple[str, str]: dict[str: float]] = {}
+        self.__slow_queries: list[dict[str: Any]] = []
+
+    @property
+    def query_count(self) -> int:
+        """
+        :return: the number of the measured queries.
+        """
+
+        return sum(int(total["queries"]) for total in self.__totals.values())
+
+    @property
+    def slow_queries(self) -> list[dict[str: Any]]:
+        """
+        :return: the records of the slow queries with the table name, the
+        query kind, the duration, the query text, the parameter values, the
+        statistics messages and the plan file path.
+        """
+
+        return list(self.__slow_queries)
+
+    @property
+    def totals(self) -> dict[tuple[str, str]: dict[str: float]]:
+        """
+        :return: a dictionary with the tuples of the table name and the query
+        kind as keys and the measurements (queries, seconds, rows, bytes,
+        max_seconds) as values.
+        """
+
+        with self.__lock:
+            return {key: dict(total) for key, total in self.__totals.items()}
+
+    def fetch(self, cursor: Cursor, table_name: str, kind: str, query: str,
+              governor: LoadGovernor = None,
+              params: list[Any] = None) -> list[Any]:
+        """Executes the query, fetches all its rows and records the duration,
+        the number of rows and the data size. The time the query is held by
+        the load governor is not included in the duration.
+
+        :param cursor: a database cursor for executing the query.
+        :param table_name: the name of the database table of the query.
+        :param kind: the kind of the query, like upsert or delete.
+        :param query: the text of the query.
+        :param governor: a LoadGovernor object executing the query within the
+        load limits, the query is executed as is if empty.
+        :param params: the values of the ? parameter markers of the query.
+        :raise pyodbc.Error: if the query execution failed.
+        :return: the rows of the query result.
+        """
+
+        if self.__statistics_io_time \
+                and cursor not in self.__statistics_cursors:
+            cursor.execute(self.__queries.get_statistics_statement(True))
+            with self.__lock:
+                self.__statistics_cursors.append(cursor)
+        started = time.perf_counter()
+        held = 0.0
+        if governor:
+            result, held = governor.fetch(cursor, query, params)
+        else:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            result = cursor.fetchall()
+        messages = QueryStats.__get_messages(cursor)
+        while self.__statistics_io_time and cursor.nextset():
+            messages += QueryStats.__get_messages(cursor)
+        duration = time.perf_counter() - started - held
+        size = sum(QueryStats.__get_value_size(value)
+                   for row in result for value in row)
+        with self.__lock:
+            total = self.__totals.setdefault(
+                (table_name, kind), {"queries": 0, "seconds": 0.0, "rows": 0,
+                                     "bytes": 0, "max_seconds": 0.0})
+            total["queries"] += 1
+            total["seconds"] += duration
+            total["rows"] += len(result)
+            total["bytes"] += size
+            total["max_seconds"] = max(total["max_seconds"], duration)
+        self.__logger.debug("table: %s, kind: %s, seconds: %.3f, rows: %d, "
+                            "bytes: %d", table_name, kind, duration,
+                            len(result), size)
+        if self.__slow_query_seconds is not None \
+                and duration >= self.__slow_query_seconds:
+            self.__add_slow_query(cursor, table_name, kind, query, params,
+                                  duration, messages)
+        return result
+
+    def reset(self) -> None:
+        """Removes the measurements of the previous run.
+
+        :return: None
+        """
+
+        self.__totals = {}
+        self.__slow_queries = []
+
+    def report(self) -> str:
+        """Builds the text report of the measurements by tables and query
+        kinds, the slowest first.
+
+        :return: the report text.
+        """
+
+        name_width = max([len(name) for name, _ in self.__totals] + [5])
+        line = ("{0:<" + str(name_width) + "} {1:<10} {2:>8} {3:>10} "
+                "{4:>10} {5:>12} {6:>14}")
+        lines = [line.format("table", "kind", "queries", "seconds",
+                             "max", "rows", "bytes")]
+        for (name, kind), total in sorted(self.__totals.items(),
+                                          key=lambda item: -item[1]["seconds"]):
+            lines.append(line.format(name, kind, total["queries"],
+                                     f"{total['seconds']:.3f}",
+                                     f"{total['max_seconds']:.3f}",
+                                     total["rows"], total["bytes"]))
+        lines.append(f"slow queries: {len(self.__slow_queries)}")
+        return "\n".join(lines)
+
+    def __add_slow_query(self, cursor: Cursor, table_name: str, kind: str,
+                         query: str, params: Union[list[Any], None],
+                         duration: float, messages: list[str]) -> None:
+        """Logs the slow query with its parameters and records it with the
+        plan file path."""
+
+        plan_path = None
+        if self.__plan_folder:
+            plan_path = self.__save_plan(cursor, table_name, kind, query,
+                                         params)
+        with self.__lock:
+            self.__slow_queries.append({"table": table_name, "kind": kind,
+                                        "seconds": duration, "query": query,
+                                        "params": list(params or []),
+                                        "messages": messages,
+                                        "plan": plan_path})
+        self.__logger.warning(f"slow query, table: {table_name}, kind: {kind}, "
+                              f"seconds: {duration:.3f}\n{query}")
+        if params:
+            self.__logger.warning(f"params: {params}")
+        for message in messages:
+            self.__logger.warning(message)
+        if plan_path:
+            self.__logger.warning(f"plan: {plan_path}")
+
+    def __save_plan(self, cursor: Cursor, table_name: str, kind: str,
+                    query: str, params: Union[list[Any], None]) -> str:
+        """Gets the estimated plan XML of the query and saves it to the plan
+        folder."""
+
+        cursor.execute(self.__queries.get_showplan_statement(True))
+        try:
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            plan = "".join(str(row[0]) for row in cursor.fetchall())
+        finally:
+            cursor.execute(self.__queries.get_showplan_statement(False))
+        os.makedirs(self.__plan_folder, exist_ok=True)
+        file_name = "{0}_{1}_{2}.sqlplan".format(
+            re.sub(r"\W", "_", table_name), kind,
+            datetime.now().strftime("%Y%m%d%H%M%S%f"))
+        plan_path = os.path.join(self.__plan_folder, file_name)
+        with open(plan_path, "w", encoding="utf-8") as file:
+            file.write(plan)
+        return plan_path
+
+    @staticmethod
+    def __get_messages(cursor: Cursor) -> list[str]:
+        """Gets the informational messages of the current result set."""
+
+        return [str(message[1]) for message
+                in getattr(cursor, "messages", None) or []]
+
+    @staticmethod
+    def __get_value_size(value: Any) -> int:
+        """Approximates the data size of a fetched value."""
+
+        if value is None:
+            return 0
+        if isinstance(value, (str, bytes)):
+            return len(value)
+        return 8
@@ -0,0 +1,330 @@
+import json
+import os
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Iterator
+
+
+class RunMetrics:
+    """A class for collecting the metrics of a generator run: the durations
+    of the run stages, the queries, rows and scripts of each table phase,
+    the written files and the git retries. At the end of the run the metrics
+    are saved to a JSON report and to a Prometheus textfile collector file,
+    so the run duration and the change volume can be monitored.
+
+    Properties
+    ----------
+    kind(self) -> str:
+        Returns the kind of the run, like upsert or upload.
+    status(self) -> str:
+        Returns the status of the finished run.
+    stages(self) -> dict[str: float]:
+        Returns the durations of the run stages in seconds.
+    tables(self) -> dict[str: dict[str: Any]]:
+        Returns the metrics of the tables.
+
+    Methods
+    -------
+    begin(self, kind: str) -> None:
+        Starts collecting the metrics of a new run.
+    stage(self, name: str) -> Iterator[None]:
+        A context manager adding the duration of its block to the stage.
+    add_script(self, table_name: str, phase: str, row_count: int,
+               size: int) -> None:
+        Records a script written for the table phase.
+    add_queries(self, table_name: str, query_count: int, seconds: float,
+                row_count: int) -> None:
+        Records the queries of the table.
+    set_file_count(self, file_count: int) -> None:
+        Records the number of the written files.
+    finish(self, status: str, git_retries: int) -> None:
+        Finishes the run.
+    add_git_retries(self, git_retries: int) -> None:
+        Adds the git retries done after the run finished.
+    to_dict(self) -> dict[str: Any]:
+        Returns the metrics as a dictionary.
+    save_json(self, path: str) -> None:
+        Saves the metrics to the JSON report file.
+    save_prometheus(self, path: str, labels: dict[str: str] = None) -> None:
+        Saves the metrics to the Prometheus textfile collector file.
+    """
+
+    PREFIX = "scriptgen"
+
+    def __init__(self):
+        self.__kind: str = ""
+        self.__status: str = ""
+        self.__started: datetime = None
+        self.__start_time: float = 0.0
+        self.__duration: float = 0.0
+        self.__file_count: int = 0
+        self.__git_retries: int = 0
+        self.__stages: dict[str: float] = {}
+        self.__tables: dict[str: dict[str: Any]] = {}
+
+    @property
+    def kind(self) -> str:
+        """
+        :return: the kind of the run, like upsert or upload.
+        """
+
+        return self.__kind
+
+    @property
+    def status(self) -> str:
+        """
+        :return: the status of the finished run: success, interrupted or
+        failed, an empty string if the run is not finished.
+        """
+
+        return self.__status
+
+    @property
+    def stages(self) -> dict[str: float]:
+        """
+        :return: a dictionary with the stage names as keys and the stage
+        durations in seconds as values.
+        """
+
+        return dict(self.__stages)
+
+    @property
+    def tables(self) -> dict[str: dict[str: Any]]:
+        """
+        :return: a dictionary with the table names as keys and the table
+        metrics as values: the query count, seconds and fetched rows, and the
+        rendered rows, scripts and written bytes by the phases.
+        """
+
+        return {name: dict(table, phases={phase: dict(metrics) for
+                                           phase, metrics
+                                           in table["phases"].items()})
+                for name, table in self.__tables.items()}
+
+    def begin(self, kind: str) -> None:
+        """Removes the metrics of the previous run and starts collecting the
+        metrics of a new run.
+
+        :param kind: the kind of the run, like upsert or upload.
+        :return: None
+        """
+
+        self.__kind = kind
+        self.__status = ""
+        self.__started = datetime.now()
+        self.__start_time = time.perf_counter()
+        self.__duration = 0.0
+        self.__file_count = 0
+        self.__git_retries = 0
+        self.__stages = {}
+        self.__tables = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """A context manager adding the duration of its block to the stage,
+        the duration is added if the block failed too.
+
+        :param name: the name of the stage, like liquibase or git_push.
+        :return: a context manager.
+        """
+
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.__stages[name] = self.__stages.get(name, 0.0) \
+                + time.perf_counter() - started
+
+    def add_script(self, table_name: str, phase: str, row_count: int,
+                   size: int) -> None:
+        """Records a script written for the table phase.
+
+        :param table_name: the name of the database table.
+        :param phase: the phase of the run, like upsert or delete.
+        :param row_count: the number of the rows in the script.
+        :param size: the size of the script in bytes.
+        :return: None
+        """
+
+        phase_metrics = self.__get_table(table_name)["phases"].setdefault(
+            phase, {"scripts": 0, "rows_rendered": 0, "bytes_written": 0})
+        phase_metrics["scripts"] += 1
+        phase_metrics["rows_rendered"] += row_count
+        phase_metrics["bytes_written"] += size
+
+    def add_queries(self, table_name: str, query_count: int, seconds: float,
+                    row_count: int) -> None:
+        """Records the queries of the table.
+
+        :param table_name: the name of the database table.
+        :param query_count: the number of the queries.
+        :param seconds: the duration of the queries.
+        :param row_count: the number of the fetched rows.
+        :return: None
+        """
+
+        table = self.__get_table(table_name)
+        table["queries"] += query_count
+        table["query_seconds"] += seconds
+        table["rows_fetched"] += row_count
+
+    def set_file_count(self, file_count: int) -> None:
+        """Records the number of the written files.
+
+        :param file_count: the number of the written files.
+        :return: None
+        """
+
+        self.__file_count = file_count
+
+    def finish(self, status: str, git_retries: int) -> None:
+        """Finishes the run.
+
+        :param status: the status of the run: success, interrupted or failed.
+        :param git_retries: the number of the repeated git operations.
+        :return: None
+        """
+
+        self.__status = status
+        self.__duration = time.perf_counter() - self.__start_time
+        self.__git_retries = git_retries
+
+    def add_git_retries(self, git_retries: int) -> None:
+        """Adds the git retries done after the run finished, like the
+        retries of its background push.
+
+        :param git_retries: the number of the repeated git operations.
+        :return: None
+        """
+
+        self.__git_retries += git_retries
+
+    def to_dict(self) -> dict[str: Any]:
+        """
+        :return: a dictionary with the run metrics.
+        """
+
+        phases = [phase for table in self.__tables.values()
+                  for phase in table["phases"].values()]
+        return {
+            "kind": self.__kind,
+            "status": self.__status,
+            "started": self.__started.isoformat() if self.__started else None,
+            "duration_seconds": self.__duration,
+            "files": self.__file_count,
+            "scripts": sum(phase["scripts"] for phase in phases),
+            "rows_rendered": sum(phase["rows_rendered"] for phase in phases),
+            "bytes_written": sum(phase["bytes_written"] for phase in phases),
+            "git_retries": self.__git_retries,
+            "stages": self.stages,
+            "tables": self.tables,
+        }
+
+    def save_json(self, path: str) -> None:
+        """Saves the metrics to the JSON report file.
+
+        :param path: the path to the report file.
+        :return: None
+        """
+
+        RunMetrics.__write_file(path, json.dumps(self.to_dict(), indent=2))
+
+    def save_prometheus(self, path: str, labels: dict[str: str] = None) \
+            -> None:
+        """Saves the metrics to the Prometheus textfile collector file. The
+        file is replaced atomically, so the collector never reads a partial
+        file.
+
+        :param path: the path to the .prom file.
+        :param labels: the labels added to each metric, like the pipeline
+        name.
+        :return: None
+        """
+
+        labels = dict(labels or {}, kind=self.__kind)
+        lines = []
+        run_metrics = [
+            ("run_duration_seconds", "Duration of the last run.",
+             self.__duration),
+            ("run_success", "1 if the last run succeeded, otherwise 0.",
+             int(self.__status == "success")),
+            ("run_timestamp_seconds", "Start time of the last run.",
+             self.__started.timestamp() if self.__started else 0),
+            ("run_files", "Files written by the last run.",
+             self.__file_count),
+            ("run_git_retries", "Repeated git operations of the last run.",
+             self.__git_retries),
+        ]
+        for name, description, value in run_metrics:
+            lines += RunMetrics.__get_metric_lines(name, description,
+                                                   [(labels, value)])
+        lines += RunMetrics.__get_metric_lines(
+            "stage_seconds", "Duration of the run stages.",
+            [(dict(labels, stage=stage), seconds)
+             for stage, seconds in self.__stages.items()])
+        table_metrics = [
+            ("table_queries", "Diff queries of the table.", "queries"),
+            ("table_query_seconds", "Duration of the diff queries.",
+             "query_seconds"),
+            ("table_rows_fetched", "Rows fetched by the diff queries.",
+             "rows_fetched"),
+        ]
+        for name, description, key in table_metrics:
+            lines += RunMetrics.__get_metric_lines(
+                name, description,
+                [(dict(labels, table=table_name), table[key])
+                 for table_name, table in self.__tables.items()])
+        phase_metrics = [
+            ("table_scripts", "Scripts written for the table.", "scripts"),
+            ("table_rows_rendered", "Rows rendered into the scripts.",
+             "rows_rendered"),
+            ("table_bytes_written", "Bytes of the written scripts.",
+             "bytes_written"),
+        ]
+        for name, description, key in phase_metrics:
+            lines += RunMetrics.__get_metric_lines(
+                name, description,
+                [(dict(labels, table=table_name, phase=phase), metrics[key])
+                 for table_name, table in self.__tables.items()
+                 for phase, metrics in table["phases"].items()])
+        RunMetrics.__write_file(path, "\n".join(lines) + "\n")
+
+    def __get_table(self, table_name: str) -> dict[str: Any]:
+        """Returns the metrics of the table, adding them if they are absent."""
+
+        return self.__tables.setdefault(
+            table_name, {"queries": 0, "query_seconds": 0.0,
+                         "rows_fetched": 0, "phases": {}})
+
+    @staticmethod
+    def __get_metric_lines(name: str, description: str,
+                           samples: list[tuple[dict[str: str], float]]) \
+            -> list[str]:
+        """Formats the samples of a gauge in the Prometheus text format."""
+
+        if not samples:
+            return []
+        full_name = f"{RunMetrics.PREFIX}_{name}"
+        lines = [f"# HELP {full_name} {description}",
+                 f"# TYPE {full_name} gauge"]
+        for labels, value in samples:
+            label_str = ",".join(
+                '{0}="{1}"'.format(key, str(label_value)
+                                   .replace("\\", "\\\\")
+                                   .replace("\n", "\\n")
+                                   .replace('"', '\\"'))
+                for key, label_value in sorted(labels.items()))
+            lines.append(f"{full_name}{{{label_str}}} {value}")
+        return lines
+
+    @staticmethod
+    def __write_file(path: str, text: str) -> None:
+        """Writes the text to a temporary file and replaces the file."""
+
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(temp_path, path)
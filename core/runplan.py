@@ -0,0 +1,158 @@
+class RunPlan:
+    """A class for collecting the dry-run estimates of a script generation run
+    and building the plan report.
+
+    Properties
+    ----------
+    tables(self) -> list[str]:
+        Returns the names list of the planned database tables.
+    row_count(self) -> int:
+        Returns the total number of rows to upsert and delete.
+    script_count(self) -> int:
+        Returns the total number of scripts.
+    size(self) -> int:
+        Returns the total estimated size of the scripts in bytes.
+    file_count(self) -> int:
+        Returns the estimated number of script files.
+
+    Methods
+    -------
+    add_upsert(self, table_name: str, row_count: int, script_count: int,
+               size: int) -> None:
+        Adds the upsert estimate for the table.
+    add_delete(self, table_name: str, row_count: int, script_count: int,
+               size: int) -> None:
+        Adds the delete estimate for the table.
+    report(self) -> str:
+        Builds the text report of the plan.
+    """
+
+    def __init__(self, file_size_limit: int, header_size: int,
+                 file_per_table: bool = False):
+        """
+        :param file_size_limit: the maximum size of file with scripts.
+        :param header_size: the size of the line starting the script file.
+        :param file_per_table: if True, each table starts writing from a new
+        file, as the full upload does.
+        """
+
+        self.__file_size_limit: int = file_size_limit
+        self.__header_size: int = header_size
+        self.__file_per_table: bool = file_per_table
+        self.__tables: dict[str: dict[str: int]] = {}
+        self.__batches: list[tuple[str, int, int]] = []
+
+    @property
+    def tables(self) -> list[str]:
+        """
+        :return: the names list of the planned database tables.
+        """
+
+        return list(self.__tables)
+
+    @property
+    def row_count(self) -> int:
+        """
+        :return: the total number of rows to upsert and delete.
+        """
+
+        return sum(table["upsert_rows"] + table["delete_rows"]
+                   for table in self.__tables.values())
+
+    @property
+    def script_count(self) -> int:
+        """
+        :return: the total number of scripts.
+        """
+
+        return sum(table["scripts"] for table in self.__tables.values())
+
+    @property
+    def size(self) -> int:
+        """
+        :return: the total estimated size of the scripts in bytes.
+        """
+
+        return sum(table["size"] for table in self.__tables.values())
+
+    @property
+    def file_count(self) -> int:
+        """Estimates the number of files the same way as FileWriter fills
+        them: a new file is started when the current one exceeds the size
+        limit.
+
+        :return: the estimated number of script files.
+        """
+
+        file_count = 0
+        cur_size = self.__file_size_limit + 1
+        for table_name, script_count, size in self.__batches:
+            if self.__file_per_table:
+                cur_size = self.__file_size_limit + 1
+            script_size = size / script_count
+            for _ in range(script_count):
+                if cur_size > self.__file_size_limit:
+                    file_count += 1
+                    cur_size = self.__header_size
+                cur_size += script_size
+        return file_count
+
+    def add_upsert(self, table_name: str, row_count: int, script_count: int,
+                   size: int) -> None:
+        """Adds the upsert estimate for the table.
+
+        :param table_name: the name of the database table.
+        :param row_count: the number of rows to update or insert.
+        :param script_count: the number of scripts.
+        :param size: the estimated size of the scripts in bytes.
+        :return: None
+        """
+
+        self.__add(table_name, "upsert_rows", row_count, script_count, size)
+
+    def add_delete(self, table_name: str, row_count: int, script_count: int,
+                   size: int) -> None:
+        """Adds the delete estimate for the table.
+
+        :param table_name: the name of the database table.
+        :param row_count: the number of rows to delete.
+        :param script_count: the number of scripts.
+        :param size: the estimated size of the scripts in bytes.
+        :return: None
+        """
+
+        self.__add(table_name, "delete_rows", row_count, script_count, size)
+
+    def report(self) -> str:
+        """Builds the text report of the plan.
+
+        :return: the report text.
+        """
+
+        name_width = max([len(name) for name in self.__tables] + [5])
+        line = "{0:<" + str(name_width) + "} {1:>12} {2:>12} {3:>8} {4:>14}"
+        lines = [line.format("table", "upserts", "deletes", "scripts",
+                             "bytes")]
+        for name, table in self.__tables.items():
+            lines.append(line.format(name, table["upsert_rows"],
+                                     table["delete_rows"], table["scripts"],
+                                     table["size"]))
+        lines.append(line.format(
+            "total", sum(t["upsert_rows"] for t in self.__tables.values()),
+            sum(t["delete_rows"] for t in self.__tables.values()),
+            self.script_count, self.size))
+        lines.append(f"files: {self.file_count}")
+        return "\n".join(lines)
+
+    def __add(self, table_name: str, key: str, row_count: int,
+              script_count: int, size: int) -> None:
+        """Adds the estimate for the table under the key."""
+
+        table = self.__tables.setdefault(table_name,
+                                         {"upsert_rows": 0, "delete_rows": 0,
+                                          "scripts": 0, "size": 0})
+        table[key] += row_count
+        table["scripts"] += script_count
+        table["size"] += size
+        if script_count:
+            self.__batches.append((table_name, script_count, size))
@@ -1,22 +1,51 @@
 from logging import Logger
-import logging.config
+import logging
 import os
+import queue
 import subprocess
-from git import Repo, Remote,  GitError
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from git import Repo
 from datetime import datetime
-from pyodbc import Cursor
-from typing import Union
+from pyodbc import Error as DbError, Cursor
+from typing import Any, Callable, ContextManager, Iterator, Union
 
+from core.checkpointjournal import CheckpointJournal
 from core.dbtable import DbTable
 from core.filewriter import FileWriter
+from core.gitsynchronizer import GitSynchronizer
+from core.loadgovernor import LoadGovernor
+from core.logsetup import configure_logging
+from core.querystats import QueryStats
+from core.runmetrics import RunMetrics
+from core.runplan import RunPlan
+from core.stageprofiler import StageProfiler
 from core.sqlquerybuilder import SqlQueryBuilder
 from core.toposorter import TopoSorter
+from core.tracing import Tracer
 
 
 class ScriptGenerator:
     """A class for create script files with the SQL statements to migrate work
     database to clear.
 
+    The tables are grouped into the dependency levels by the foreign keys.
+    The tables of a level don't refer to each other, so if the table workers
+    and the cursor factory are set, the diffs of a level tables are searched
+    and rendered concurrently, each worker with its own cursor. The scripts
+    are written in the level order anyway, so the files stay the same. A
+    worker hands the scripts over through a small bounded queue, so it runs
+    only a few scripts ahead of the writer.
+
+    If the read isolation is snapshot, the diffs of a run are searched in a
+    single snapshot transaction of the work connection, so all tables are
+    read as of the same moment without blocking the writers of the work
+    database. The snapshot can't be shared by several connections, so the
+    table workers are off in this mode. The ALLOW_SNAPSHOT_ISOLATION option
+    has to be ON in the work and clear databases. The tables of the work
+    database can be read with a table hint (nolock or readpast) instead.
+
     Properties
     ----------
     table_names(self) -> list[str]:
@@ -25,6 +54,12 @@ class ScriptGenerator:
         Returns the filepath to the actual changelog file.
     committed_files(self) -> tuple[str]:
         Returns a tuple with the path of the committed files, except changelog.
+    query_stats(self) -> QueryStats:
+        Returns the QueryStats object measuring the queries of the last run.
+    run_metrics(self) -> RunMetrics:
+        Returns the RunMetrics object with the metrics of the last run.
+    tracer(self) -> Tracer:
+        Returns the Tracer object with the spans of the last run.
 
     Methods
     -------
@@ -45,15 +80,45 @@ class ScriptGenerator:
         Generated scripts applied the clear database with the liquibase.
         Created files committed into the git repository with tho commit message
         from the message parameter.
+    plan_tables(self, file_size_limit: int, days_before: int = None,
+                row_limit: int = None, all_rows: bool = False) -> RunPlan:
+        Counts the rows to migrate and estimates the scripts and files without
+        rendering, writing, applying or committing them.
+    refresh_metadata(self) -> bool:
+        Rediscovers the database tables if the database schema has changed.
+    reconnect(self, cursor: Cursor, clear_cursor: Cursor = None) -> None:
+        Replaces the database cursors after the connection was lost.
+    close(self) -> None:
+        Waits for the background git push, stops its worker and the table
+        workers.
+    request_stop(self) -> None:
+        Asks the running upsert_tables or upload_tables to stop after the
+        next checkpoint.
+    discard_journal(self) -> None:
+        Discards the checkpoint journal of an unfinished run.
     """
 
+    __SCRIPT_QUEUE_SIZE = 4
+
     def __init__(self, config_dict: dict[str: str], cursor: Cursor,
                  query_builder: SqlQueryBuilder, work_db_name: str,
                  clear_db_name: str, git_folder_path: str, target_folder: str,
                  table_settings: dict[str: str],
-                 liquibase_settings: dict[str: str]):
+                 liquibase_settings: dict[str: str],
+                 repository_settings: dict[str: Any] = None,
+                 dry_run: bool = False,
+                 liquibase_lock: ContextManager = None,
+                 git_lock: ContextManager = None,
+                 clear_cursor: Cursor = None,
+                 diagnostic_settings: dict[str: Any] = None,
+                 cursor_factory: Callable[[], Cursor] = None,
+                 metrics_settings: dict[str: Any] = None,
+                 tracing_settings: dict[str: Any] = None,
+                 profiler: StageProfiler = None,
+                 governor_settings: dict[str: Any] = None):
         """
-        :param config_dict: a dictionary with the logger configuration.
+        :param config_dict: a dictionary with the logger configuration, used
+        if the logging is not configured yet.
         :param cursor: a database cursor for executing SQL queries.
         :param query_builder: an SqlQueryBuilder object with templates.
         :param work_db_name: the name of the work database.
@@ -61,12 +126,50 @@ class ScriptGenerator:
         :param git_folder_path: the path to the git repository folder.
         :param target_folder: the folder name in the git repository for adding
         script files.
-        :param table_settings: a dictionary with the database table lists.
+        :param table_settings: a dictionary with the database table lists,
+        the bucket diff settings (bucket_diff_list, bucket_fanout,
+        bucket_leaf_size), the number of the table workers (table_workers),
+        the read isolation of the diff search (read_isolation, null or
+        snapshot) and the table hints of the work tables (table_hints, a
+        dictionary with the table names as keys and nolock or readpast as
+        values).
         :param liquibase_settings: a dictionary with the liquibase settings.
+        :param repository_settings: a dictionary with the git checkout and
+        synchronisation settings (remote_url, branch, shallow_depth,
+        sparse_checkout, git_max_attempts, git_backoff_seconds,
+        background_push, checkpoint_path, checkpoint_max_resumes).
+        :param dry_run: if True, the git repository is not touched and only
+        plan_tables can be used.
+        :param liquibase_lock: a lock or semaphore held while the liquibase
+        runs, shared by the generators of several pipelines.
+        :param git_lock: a lock held during each git operation, shared by the
+        generators writing to the same repository.
+        :param clear_cursor: a cursor of the clear database server for the
+        bucket diff tables, the cursor parameter is used if empty.
+        :param diagnostic_settings: a dictionary with the query
+        instrumentation settings (slow_query_seconds, statistics_io_time,
+        plan_folder). The query stats are not logged if empty.
+        :param cursor_factory: a function opening a new database cursor for
+        a table worker. The tables are processed one by one if empty.
+        :param metrics_settings: a dictionary with the run metrics export
+        settings (json_path, prometheus_path, labels). The metrics are not
+        saved if empty.
+        :param tracing_settings: a dictionary with the tracing settings (path,
+        format). The spans of the run are saved to the path in the chrome or
+        jsonl format, the spans are not recorded if the path is empty.
+        :param profiler: a StageProfiler object profiling the stages of the
+        generator, the stages are not profiled if empty.
+        :param governor_settings: a dictionary with the load limits of the
+        work database queries (max_concurrent_queries, rows_per_second,
+        batch_size, maxdop, latency_seconds, wait_ms_per_second,
+        wait_interval_seconds, backoff_seconds, max_backoff_seconds). The
+        queries are not limited if empty.
+        :raise ValueError: if the trace format is unknown.
+        :raise ValueError: if several tables of the list refer to each other.
         """
 
         self.__config_dict: dict[str: str] = config_dict
-        logging.config.dictConfig(config_dict)
+        configure_logging(config_dict)
         self.__logger: Logger = logging.getLogger(__name__)
         self.__logger.info(f'work_db: {work_db_name}, '
                            f'git_folder: {git_folder_path}, '
@@ -74,18 +177,73 @@ class ScriptGenerator:
 
         self.__git_folder_path: str = git_folder_path
         self.__target_folder: str = target_folder
+        self.__repository_settings: dict[str: Any] = repository_settings or {}
         self.__repo: Union[Repo, None] = None
-        self.__origin: Union[Remote, None] = None
+        self.__git_sync: Union[GitSynchronizer, None] = None
         self.__changelog_filepath: str = None
-        self.__init_git_objects()
+        self.__journal: Union[CheckpointJournal, None] = None
+        self.__git_prepared: bool = False
+        self.__push_queued: bool = False
+        self.__stop_requested: bool = False
+        self.__dry_run: bool = dry_run
+        self.__liquibase_lock: ContextManager = liquibase_lock or nullcontext()
+        self.__git_lock: Union[ContextManager, None] = git_lock
+        self.__tracing_settings: dict[str: Any] = tracing_settings or {}
+        if self.__tracing_settings.get("format", "chrome") \
+                not in Tracer.FORMATS:
+            raise ValueError(f"unknown trace format: "
+                             f"{self.__tracing_settings['format']}")
+        self.__tracer: Tracer = Tracer(
+            bool(self.__tracing_settings.get("path")))
+        if profiler:
+            self.__tracer.add_listener(profiler)
+        if not dry_run:
+            self.__init_git_objects()
             
         self.__committed_files: list[str] = []
         self.__cursor: Cursor = cursor
         self.__work_db_name: str = work_db_name
         self.__clear_db_name: str = clear_db_name
         self.__liquibase_settings: dict[str: str] = liquibase_settings
-        self.__db_table_list:  list[DbTable] = self.__get_db_table_list(
-            table_settings["table_list"], query_builder)
+        self.__query_builder: SqlQueryBuilder = query_builder
+        self.__table_list: list[str] = table_settings["table_list"]
+        self.__clear_cursor: Cursor = clear_cursor
+        self.__log_query_stats_on: bool = diagnostic_settings is not None
+        diagnostic_settings = diagnostic_settings or {}
+        self.__query_stats: QueryStats = QueryStats(
+            query_builder,
+            diagnostic_settings.get("slow_query_seconds"),
+            diagnostic_settings.get("statistics_io_time", False),
+            diagnostic_settings.get("plan_folder"))
+        self.__governor: Union[LoadGovernor, None] = None
+        if governor_settings:
+            self.__governor = LoadGovernor(query_builder, **governor_settings)
+        self.__run_metrics: RunMetrics = RunMetrics()
+        self.__metrics_settings: dict[str: Any] = metrics_settings or {}
+        self.__bucket_diff_list: list[str] = [
+            table.lower() for table
+            in table_settings.get("bucket_diff_list", [])]
+        self.__bucket_diff_settings: dict[str: int] = {
+            "fanout": table_settings.get("bucket_fanout", 16),
+            "leaf_size": table_settings.get("bucket_leaf_size", 1000)}
+        self.__cursor_factory: Union[Callable[[], Cursor], None] = \
+            cursor_factory
+        self.__table_workers: int = table_settings.get("table_workers", 1)
+        self.__read_isolation: Union[str, None] = table_settings.get(
+            "read_isolation")
+        self.__table_hints: dict[str: str] = {
+            table.lower(): hint for table, hint
+            in (table_settings.get("table_hints") or {}).items()}
+        self.__executor: Union[ThreadPoolExecutor, None] = None
+        self.__worker_local: threading.local = threading.local()
+        self.__worker_cursors: list[Cursor] = []
+        self.__schema_version: Any = self.__get_schema_version()
+        with self.__tracer.span("metadata"):
+            self.__db_table_levels: list[list[DbTable]] = \
+                self.__get_db_table_levels(table_settings["table_list"],
+                                           query_builder)
+        self.__db_table_list: list[DbTable] = [
+            table for level in self.__db_table_levels for table in level]
         self.__upsert_only_list: list[str] = [table.lower() for table in
                                               table_settings["upsert_only_list"]
                                               ]
@@ -109,6 +267,32 @@ class ScriptGenerator:
 
         return self.__changelog_filepath
 
+    @property
+    def query_stats(self) -> QueryStats:
+        """
+        :return: the QueryStats object measuring the queries of the last run.
+        """
+
+        return self.__query_stats
+
+    @property
+    def run_metrics(self) -> RunMetrics:
+        """
+        :return: the RunMetrics object with the metrics of the last upsert or
+        upload run.
+        """
+
+        return self.__run_metrics
+
+    @property
+    def tracer(self) -> Tracer:
+        """
+        :return: the Tracer object with the spans of the last upsert or upload
+        run.
+        """
+
+        return self.__tracer
+
     @property
     def committed_files(self) -> tuple[str]:
         """
@@ -134,6 +318,9 @@ class ScriptGenerator:
         Generated scripts applied the clear database with the liquibase.
         Created files committed into the git repository with tho commit message
         from the message parameter.
+        The progress is kept in the checkpoint journal, an interrupted run is
+        resumed from the last written script with the recorded start date
+        and row limit.
 
         :param file_size_limit: the maximum size of file with scripts.
         :param message: the commit message for the git repository.
@@ -142,32 +329,47 @@ class ScriptGenerator:
         :param row_limit: the maximum number of rows in one script.
         :raise RuntimeError: if the clear database update with the liquibase
         failed.
-        :raise RuntimeError: if git pull/push repeating fails over then 3 times.
+        :raise RuntimeError: if all git push attempts failed.
+        :raise InterruptedError: if the stop is requested.
         :return: None
         """
 
         self.__logger.info(f"file_size_limit: {file_size_limit},  days_before:"
                            f"{days_before}, row_limit: {row_limit}")
-        saver = FileWriter(self.__config_dict, file_size_limit,
-                           self.__target_folder_path,
-                           self.__liquibase_settings["liquibase_string"])
-        for db_table in [tb for tb in self.__db_table_list
-                         if tb.name not in self.__delete_only_list]:
-            scripts = db_table.get_upsert_statement_list(days_before, row_limit)
-            saver.save_scripts(scripts, "Rep")
-        for db_table in [tb for tb in self.__db_table_list[::-1]
-                         if tb.name not in self.__upsert_only_list]:
-            scripts = db_table.get_delete_statement_list(row_limit)
-            saver.save_scripts(scripts, "Rep")
-        self.__logger.info(f"{len(saver.files)} was generated")
-        if saver.files:
-            self.__update_changelog([os.path.basename(file)
-                                     for file in saver.files])
-            self.__update_clear_db()
-            self.__commit_files(saver.files, message)
-            self.__committed_files += [file for file in saver.files
-                                       if file != self.changelog_filepath
-                                       and file not in self.__committed_files]
+        with self.__measure_run("upsert"):
+            self.__begin_run()
+            beg_date = DbTable.get_beg_date(days_before)
+            params = self.__journal.begin(
+                "upsert",
+                {"beg_date": beg_date.isoformat() if beg_date else None,
+                 "row_limit": row_limit})
+            beg_date = params["beg_date"]
+            if beg_date:
+                beg_date = datetime.fromisoformat(beg_date)
+            row_limit = params["row_limit"]
+            saver = FileWriter(self.__config_dict, file_size_limit,
+                               self.__target_folder_path,
+                               self.__liquibase_settings["liquibase_string"],
+                               self.__tracer)
+            if self.__journal.stage == CheckpointJournal.GENERATE:
+                with self.__stage("generate"), self.__read_snapshot():
+                    for level in self.__db_table_levels:
+                        self.__save_level(
+                            saver, "upsert",
+                            [tb for tb in level
+                             if tb.name not in self.__delete_only_list],
+                            lambda tb: "Rep",
+                            lambda tb, key: tb.iter_upsert_statements(
+                                beg_date, row_limit, key_after=key))
+                    for level in self.__db_table_levels[::-1]:
+                        self.__save_level(
+                            saver, "delete",
+                            [tb for tb in level[::-1]
+                             if tb.name not in self.__upsert_only_list],
+                            lambda tb: "Rep",
+                            lambda tb, key: tb.iter_delete_statements(
+                                row_limit, key_after=key))
+            self.__finish_run(message)
 
     def upload_tables(self, file_size_limit: int, message: str,
                       row_limit: int = None) -> None:
@@ -177,130 +379,750 @@ class ScriptGenerator:
         Generated scripts applied the clear database with the liquibase.
         Created files committed into the git repository with tho commit message
         from the message parameter.
+        The progress is kept in the checkpoint journal, an interrupted run is
+        resumed from the last written script.
 
         :param file_size_limit: the maximum size of file with scripts.
         :param message: the commit message for the git repository.
         :param row_limit: the maximum number of rows in one script.
         :raise RuntimeError: if the clear database update with the liquibase
         failed.
-        :raise RuntimeError: if git pull/push repeating fails over then 3 times.
+        :raise RuntimeError: if all git push attempts failed.
+        :raise InterruptedError: if the stop is requested.
         :return: None
         """
         self.__logger.info(f'file_size_limit: {file_size_limit}, '
                            f'row_limit: {row_limit}')
-        saver = FileWriter(self.__config_dict, file_size_limit,
-                           self.__target_folder_path,
-                           self.__liquibase_settings['liquibase_string'])
-        for db_table in self.__db_table_list:
-            scripts = db_table.get_upsert_statement_list(row_limit=row_limit,
-                                                         all_rows=True)
-            saver.save_scripts(scripts, db_table.name.replace('.', '_'),
-                               into_new_file=True)
-        if saver.files:
-            self.__update_changelog([os.path.basename(file)
-                                     for file in saver.files])
-            self.__update_clear_db()
-            self.__commit_files(saver.files, message)
-            self.__committed_files += [file for file in saver.files
-                                       if file != self.changelog_filepath
-                                       and file not in self.__committed_files]
+        with self.__measure_run("upload"):
+            self.__begin_run()
+            row_limit = self.__journal.begin(
+                "upload", {"row_limit": row_limit})["row_limit"]
+            saver = FileWriter(self.__config_dict, file_size_limit,
+                               self.__target_folder_path,
+                               self.__liquibase_settings['liquibase_string'],
+                               self.__tracer)
+            if self.__journal.stage == CheckpointJournal.GENERATE:
+                with self.__stage("generate"), self.__read_snapshot():
+                    for level in self.__db_table_levels:
+                        self.__save_level(
+                            saver, "upload", level,
+                            lambda tb: tb.name.replace('.', '_'),
+                            lambda tb, key: tb.iter_upsert_statements(
+                                row_limit=row_limit, all_rows=True,
+                                key_after=key),
+                            into_new_file=True)
+            self.__finish_run(message)
 
-    def __init_git_objects(self) -> None:
-        """Sets private attributes to work with Git objects.
+    def refresh_metadata(self) -> bool:
+        """Rediscovers the columns and foreign keys of the database tables if
+        the database schema has changed since the last discovery. Lets a
+        long-running generator reuse the DbTable objects between runs.
 
-        :raise NotADirectoryError: if git repository folder does not exist.
+        :raise RuntimeError: if database query execution failed.
+        :raise ValueError: if several tables of the list refer to each other.
+        :return: True if the tables were rediscovered, otherwise False.
+        """
+
+        schema_version = self.__get_schema_version()
+        if schema_version == self.__schema_version:
+            self.__logger.info("schema is not changed")
+            return False
+        self.__logger.info("schema is changed, tables rediscovery run")
+        with self.__tracer.span("metadata"):
+            self.__db_table_levels = self.__get_db_table_levels(
+                self.__table_list, self.__query_builder)
+        self.__db_table_list = [table for level in self.__db_table_levels
+                                for table in level]
+        self.__schema_version = schema_version
+        return True
+
+    def discard_journal(self) -> None:
+        """Discards the checkpoint journal of an unfinished run, so that the
+        next run starts from the beginning instead of resuming a run failing
+        for good. The files of the run not included into the changelog yet
+        are removed.
+
+        :raise RuntimeError: if the generator was created for the dry run.
         :return: None
         """
 
-        self.__logger.info("run")
-        if not os.path.exists(self.__git_folder_path):
-            raise NotADirectoryError(
-                f"git_folder_path {self.__git_folder_path} does not exist")
-        self.__repo = Repo(self.__git_folder_path)
-        self.__origin = self.__repo.remote(name="origin")
+        self.__check_not_dry_run()
+        self.__journal.discard()
+
+    def request_stop(self) -> None:
+        """Asks the running upsert_tables or upload_tables to stop after the
+        next checkpoint, so that the run can be resumed cleanly. Can be called
+        from a signal handler.
+
+        :return: None
+        """
+
+        self.__logger.warning("stop requested")
+        self.__stop_requested = True
+
+    def close(self) -> None:
+        """Waits for the background git push and stops its worker, stops the
+        table workers and closes their cursors. Has to be called before the
+        process exits if the background push or the table workers are on.
+
+        :raise RuntimeError: if all git push attempts failed.
+        :return: None
+        """
+
+        self.__stop_table_workers()
+        if self.__git_sync:
+            self.__report_background_push()
+            self.__git_sync.close()
+
+    def reconnect(self, cursor: Cursor, clear_cursor: Cursor = None) -> None:
+        """Replaces the database cursors after the connection was lost, so a
+        long-running generator can continue with the new connection. The
+        table workers are stopped and their cursors are closed, the workers
+        open new cursors with the cursor factory on the next run. The table
+        metadata is kept.
+
+        :param cursor: a database cursor of the new connection.
+        :param clear_cursor: a cursor of the new clear database server
+        connection, the cursor parameter is used if empty.
+        :return: None
+        """
+
+        self.__logger.warning("database cursors are replaced")
+        self.__stop_table_workers()
+        self.__cursor = cursor
+        self.__clear_cursor = clear_cursor
+        self.__db_table_levels = [[table.with_cursor(cursor, clear_cursor)
+                                   for table in level]
+                                  for level in self.__db_table_levels]
+        self.__db_table_list = [table for level in self.__db_table_levels
+                                for table in level]
+
+    def plan_tables(self, file_size_limit: int, days_before: int = None,
+                    row_limit: int = None, all_rows: bool = False) -> RunPlan:
+        """Counts the rows to migrate and estimates the scripts and files
+        without rendering, writing, applying or committing them. Runs only
+        the diff side of upsert_tables, or of upload_tables if the all_rows
+        parameter is True.
+
+        :param file_size_limit: the maximum size of file with scripts.
+        :param days_before: the number of days (before the current date) to
+        search database diffs.
+        :param row_limit: the maximum number of rows in one script.
+        :param all_rows: if True plans the upload of all rows.
+        :raise RuntimeError: if database query execution failed.
+        :return: the RunPlan object with the estimates.
+        """
+
+        self.__logger.info(f"file_size_limit: {file_size_limit}, days_before: "
+                           f"{days_before}, row_limit: {row_limit}, "
+                           f"all_rows: {all_rows}")
+        plan = RunPlan(file_size_limit,
+                       len(self.__liquibase_settings["liquibase_string"]),
+                       file_per_table=all_rows)
+        self.__query_stats.reset()
+        for table in self.__db_table_list:
+            table.reset_diff()
+        if all_rows:
+            for level in self.__db_table_levels:
+                for name, estimate in self.__map_level(
+                        level, lambda tb: tb.get_upsert_estimate(
+                            row_limit=row_limit, all_rows=True)):
+                    plan.add_upsert(name, *estimate)
+        else:
+            for level in self.__db_table_levels:
+                for name, estimate in self.__map_level(
+                        [tb for tb in level
+                         if tb.name not in self.__delete_only_list],
+                        lambda tb: tb.get_upsert_estimate(days_before,
+                                                          row_limit)):
+                    plan.add_upsert(name, *estimate)
+            for level in self.__db_table_levels[::-1]:
+                for name, estimate in self.__map_level(
+                        [tb for tb in level[::-1]
+                         if tb.name not in self.__upsert_only_list],
+                        lambda tb: tb.get_delete_estimate(row_limit)):
+                    plan.add_delete(name, *estimate)
+        self.__log_query_stats()
+        return plan
+
+    def __save_level(self, saver: FileWriter, phase: str,
+                     tables: list[DbTable], prefix: Callable[[DbTable], str],
+                     statements: Callable[[DbTable, Union[str, None]],
+                                          Iterator[tuple[str, str, int]]],
+                     into_new_file: bool = False) -> None:
+        """Writes the scripts of the tables of a dependency level in the
+        level order. If the table workers are on, the scripts of the level
+        tables are searched and rendered concurrently and handed over to the
+        writer through the bounded queues, so each script is checkpointed
+        when it is written and the workers stop with the writer.
+
+        :param saver: the FileWriter object to write scripts.
+        :param phase: the phase of the run, like upsert or delete.
+        :param tables: the tables of the level.
+        :param prefix: a function returning the file name prefix of a table.
+        :param statements: a function building the scripts iterator of a
+        table from the last written primary key.
+        :param into_new_file: if True each table starts from a new file.
+        :raise InterruptedError: if the stop is requested.
+        :return: None
+        """
+
+        tables = [tb for tb in tables
+                  if not self.__journal.is_table_done(phase, tb.name)]
+        keys = {tb.name: self.__journal.get_resume_key(phase, tb.name)
+                for tb in tables}
+        queues = {tb.name: queue.Queue(ScriptGenerator.__SCRIPT_QUEUE_SIZE)
+                  for tb in tables}
+        cancelled = threading.Event()
+
+        def produce(db_table: DbTable) -> None:
+            scripts = queues[db_table.name]
+            try:
+                for item in statements(db_table, keys[db_table.name]):
+                    if not self.__put_script(scripts, item, cancelled):
+                        return
+            finally:
+                self.__put_script(scripts, None, cancelled)
+
+        def consume(name: str) -> Iterator[tuple[str, str, int]]:
+            item = queues[name].get()
+            while item is not None:
+                yield item
+                item = queues[name].get()
+            futures[name].result()
+
+        futures = self.__submit_level(tables, produce)
+        try:
+            for db_table in tables:
+                if db_table.name in futures:
+                    table_statements = \
+                        lambda key, name=db_table.name: consume(name)
+                else:
+                    table_statements = \
+                        lambda key, tb=db_table: statements(tb, key)
+                self.__save_table(saver, phase, db_table, prefix(db_table),
+                                  table_statements, into_new_file)
+        finally:
+            cancelled.set()
+            for future in futures.values():
+                future.cancel()
+
+    @staticmethod
+    def __put_script(scripts: queue.Queue,
+                     item: Union[tuple[str, str, int], None],
+                     cancelled: threading.Event) -> bool:
+        """Puts the script of a table worker into the queue, waiting while
+        the queue is full.
+
+        :param scripts: the queue of the table scripts.
+        :param item: the tuple with the script, its last primary key and its
+        row count, or None at the end of the table.
+        :param cancelled: the event set when the writer stops.
+        :return: True if the script is put, False if the writer stopped.
+        """
+
+        while not cancelled.is_set():
+            try:
+                scripts.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __map_level(self, tables: list[DbTable],
+                    func: Callable[[DbTable], Any]) -> list[tuple[str, Any]]:
+        """Runs the function for the tables of a dependency level, in the
+        table workers if they are on.
+
+        :param tables: the tables of the level.
+        :param func: the function to run for a table.
+        :return: the list of tuples with the table name and the function
+        result in the level order.
+        """
+
+        futures = self.__submit_level(tables, func)
+        return [(tb.name, futures[tb.name].result() if tb.name in futures
+                 else func(tb)) for tb in tables]
+
+    def __submit_level(self, tables: list[DbTable],
+                       func: Callable[[DbTable], Any]) -> dict[str: Future]:
+        """Starts the function for the level tables in the table workers if
+        they are on. The bucket diff tables of the separate clear database
+        server are left to the current thread, since the clear cursor can't
+        be shared. The workers are off if the diffs are read in a snapshot,
+        since the snapshot belongs to the connection of the current thread.
+
+        :param tables: the tables of the level.
+        :param func: the function to run for a table.
+        :return: a dictionary with the table names as keys and the futures
+        of the function results as values, empty if the workers are off.
+        """
+
+        if self.__cursor_factory is None or self.__table_workers < 2 \
+                or len(tables) < 2 or self.__read_isolation == "snapshot":
+            return {}
+        if self.__executor is None:
+            self.__executor = ThreadPoolExecutor(self.__table_workers,
+                                                 thread_name_prefix="table")
+        return {tb.name: self.__executor.submit(self.__run_in_worker, func, tb)
+                for tb in tables
+                if not (self.__clear_cursor
+                        and tb.name in self.__bucket_diff_list)}
+
+    def __run_in_worker(self, func: Callable[[DbTable], Any],
+                        db_table: DbTable) -> Any:
+        """Runs the function for a copy of the table querying with the cursor
+        of the current table worker, opening the cursor on the first call.
+
+        :param func: the function to run for a table.
+        :param db_table: the database table.
+        :return: the function result.
+        """
+
+        cursor = getattr(self.__worker_local, "cursor", None)
+        if cursor is None:
+            cursor = self.__cursor_factory()
+            self.__worker_local.cursor = cursor
+            self.__worker_cursors.append(cursor)
+        with self.__tracer.span("prefetch", table=db_table.name):
+            return func(db_table.with_cursor(cursor))
+
+    def __stop_table_workers(self) -> None:
+        """Stops the table workers and closes their cursors. A cursor of a
+        lost connection can't be closed, the error is logged.
+
+        :return: None
+        """
+
+        if self.__executor:
+            self.__executor.shutdown()
+            self.__executor = None
+        for cursor in self.__worker_cursors:
+            try:
+                cursor.close()
+            except DbError as ex:
+                self.__logger.warning(f"worker cursor close failed: {ex}")
+        self.__worker_cursors = []
+        self.__worker_local = threading.local()
+
+    def __save_table(self, saver: FileWriter, phase: str, db_table: DbTable,
+                     prefix: str,
+                     statements: Callable[[Union[str, None]],
+                                          Iterator[tuple[str, str, int]]],
+                     into_new_file: bool = False) -> None:
+        """Writes the scripts of the table phase, recording a checkpoint
+        after each script. A completed table phase is skipped without
+        querying, a started one continues after the recorded primary key.
+
+        :param saver: the FileWriter object to write scripts.
+        :param phase: the phase of the run, like upsert or delete.
+        :param db_table: the database table.
+        :param prefix: a string to start the file name.
+        :param statements: a function building the scripts iterator from the
+        last written primary key.
+        :param into_new_file: if True the table starts from a new file.
+        :raise InterruptedError: if the stop is requested.
+        :return: None
+        """
+
+        if self.__journal.is_table_done(phase, db_table.name):
+            self.__logger.info(f"{phase} {db_table.name} is done, skipped")
+            return
+        key_after = self.__journal.get_resume_key(phase, db_table.name)
+        with self.__tracer.span("table", table=db_table.name, phase=phase):
+            for script, key, row_count in statements(key_after):
+                saver.save_scripts([script], prefix,
+                                   into_new_file=into_new_file)
+                into_new_file = False
+                self.__run_metrics.add_script(db_table.name, phase, row_count,
+                                              len(script.encode("utf-8")))
+                self.__journal.chunk_done(phase, db_table.name, key,
+                                          saver.files)
+                if self.__stop_requested:
+                    raise InterruptedError(f"the run is stopped at {phase} "
+                                           f"{db_table.name}, see the "
+                                           f"checkpoint journal")
+        self.__journal.table_done(phase, db_table.name, saver.files)
+
+    def __finish_run(self, message: str) -> None:
+        """Includes the written files into the changelog, applies them to
+        the clear database, pulls the remote repository, commits the files
+        and removes the checkpoint journal. The completed steps of a resumed
+        run are skipped. The pull is done just before the commit, so the
+        commit is made on the latest state of the remote repository.
+
+        :param message: the commit message for the git repository.
+        :raise RuntimeError: if the clear database update with the liquibase
+        failed.
+        :raise RuntimeError: if all git pull or push attempts failed.
+        :return: None
+        """
+
+        self.__log_query_stats()
+        files = self.__journal.files
+        self.__run_metrics.set_file_count(len(files))
+        self.__logger.info(f"{len(files)} was generated")
+        if files:
+            if self.__journal.stage == CheckpointJournal.GENERATE:
+                with self.__stage("changelog"):
+                    self.__update_changelog([os.path.basename(file)
+                                             for file in files])
+                self.__journal.set_stage(CheckpointJournal.CHANGELOG)
+            if self.__journal.stage == CheckpointJournal.CHANGELOG:
+                with self.__stage("liquibase"):
+                    self.__update_clear_db()
+                self.__journal.set_stage(CheckpointJournal.APPLIED)
+        if files or self.__git_sync.staged_files:
+            with self.__stage("git_pull"):
+                self.__git_sync.pull()
+        with self.__stage("git_push"):
+            self.__commit_files(files, message)
+        self.__journal.finish()
+
+    def __begin_run(self) -> None:
+        """Prepares the changelog of the run, if it is not prepared yet, and
+        resets the query stats and the bucket diffs of the previous run.
+
+        :raise RuntimeError: if the generator was created for the dry run.
+        :return: None
+        """
+
+        self.__check_not_dry_run()
+        if not self.__git_prepared:
+            self.__prepare_git()
+        self.__git_prepared = False
+        self.__query_stats.reset()
+        for table in self.__db_table_list:
+            table.reset_diff()
+        if self.__governor:
+            self.__governor.reset()
+
+    @contextmanager
+    def __measure_run(self, kind: str) -> Iterator[None]:
+        """Collects the metrics and the spans of the run and saves them when
+        the run ends. The metrics and the spans of a failed or interrupted run
+        are saved too. The background push of the previous run is waited for
+        first, its retries and spans are saved with the previous run.
+
+        :param kind: the kind of the run, like upsert or upload.
+        :return: a context manager.
+        """
+
+        self.__report_background_push()
+        self.__run_metrics.begin(kind)
+        self.__tracer.reset()
+        retry_count = self.__git_sync.retry_count if self.__git_sync else 0
+        status = "failed"
         try:
-            self.__origin.pull()
-            self.__origin.push()
-        except GitError as ex:
+            with self.__tracer.span("run", kind=kind):
+                yield
+            status = "success"
+        except InterruptedError:
+            status = "interrupted"
+            raise
+        finally:
+            if status != "success" and self.__journal:
+                self.__run_metrics.set_file_count(len(self.__journal.files))
+            for (table_name, _), total in self.__query_stats.totals.items():
+                self.__run_metrics.add_queries(table_name, total["queries"],
+                                               total["seconds"], total["rows"])
+            self.__run_metrics.finish(
+                status, self.__git_sync.retry_count - retry_count
+                if self.__git_sync else 0)
+            self.__save_run_metrics()
+            self.__save_trace()
+
+    def __report_background_push(self) -> None:
+        """Waits for the background git push queued by the previous run and
+        saves the run metrics and the spans of that run again with the
+        retries and the spans of the push, so they are not counted for the
+        next run or removed by the tracer reset. The push has the time
+        between the runs to complete.
+
+        :return: None
+        """
+
+        if not self.__push_queued:
+            return
+        self.__push_queued = False
+        self.__run_metrics.add_git_retries(self.__git_sync.wait_push())
+        self.__save_run_metrics()
+        self.__save_trace()
+
+    @contextmanager
+    def __stage(self, name: str) -> Iterator[None]:
+        """Measures the stage of the run for the run metrics and records it
+        as a span.
+
+        :param name: the name of the stage, like liquibase or git_push.
+        :return: a context manager.
+        """
+
+        with self.__run_metrics.stage(name), self.__tracer.span(name):
+            yield
+
+    @contextmanager
+    def __read_snapshot(self) -> Iterator[None]:
+        """Reads the work database in a single snapshot transaction if the
+        read isolation is snapshot, otherwise does nothing. The open
+        transaction of the connection is committed first, since its isolation
+        level can't be changed to snapshot. The snapshot transaction is
+        committed after the block, rolled back if the block failed, and the
+        connection is switched back to the read committed level and its
+        autocommit mode. An error of the rollback or the restore after a
+        failed block is logged, and the error of the block is raised.
+
+        :raise RuntimeError: if the snapshot transaction can't be started or
+        the read committed level can't be restored.
+        :return: a context manager.
+        """
+
+        if self.__read_isolation != "snapshot":
+            yield
+            return
+        connection = self.__cursor.connection
+        autocommit = connection.autocommit
+        try:
+            connection.autocommit = False
+            connection.commit()
+            self.__cursor.execute(
+                self.__query_builder.get_isolation_level_statement("snapshot"))
+        except DbError as ex:
             self.__logger.exception(ex)
-            self.__git_pull_push_repeat(pull_repeat=True, push_repeat=True)
+            self.__restore_read_committed(autocommit)
+            raise RuntimeError("snapshot transaction start failed") from ex
+        self.__logger.info("the diffs are read in a snapshot transaction")
+        try:
+            yield
+            connection.commit()
+        except BaseException:
+            try:
+                connection.rollback()
+            except DbError as ex:
+                self.__logger.error(f"snapshot rollback failed: {ex}")
+            self.__restore_read_committed(autocommit)
+            raise
+        if not self.__restore_read_committed(autocommit):
+            raise RuntimeError("read committed level restore failed")
+
+    def __restore_read_committed(self, autocommit: bool) -> bool:
+        """Switches the connection back to the read committed level and its
+        autocommit mode after the snapshot transaction. An error of a lost
+        connection is logged, so it does not replace the error of the run.
+
+        :param autocommit: the autocommit mode of the connection.
+        :return: True if the connection is restored, otherwise False.
+        """
+
+        restored = True
+        try:
+            self.__cursor.execute(
+                self.__query_builder.get_isolation_level_statement(
+                    "read committed"))
+        except DbError as ex:
+            self.__logger.error(f"read committed level restore failed: {ex}")
+            restored = False
+        try:
+            self.__cursor.connection.autocommit = autocommit
+        except DbError as ex:
+            self.__logger.error(f"autocommit restore failed: {ex}")
+            restored = False
+        return restored
+
+    def __save_run_metrics(self) -> None:
+        """Saves the run metrics to the JSON report and the Prometheus
+        textfile, if their paths are set. A failed export is logged and does
+        not fail the run.
+
+        :return: None
+        """
+
+        labels = dict(self.__metrics_settings.get("labels") or {},
+                      target_folder=self.__target_folder)
+        try:
+            if self.__metrics_settings.get("json_path"):
+                self.__run_metrics.save_json(
+                    self.__metrics_settings["json_path"])
+            if self.__metrics_settings.get("prometheus_path"):
+                self.__run_metrics.save_prometheus(
+                    self.__metrics_settings["prometheus_path"], labels)
+        except OSError as ex:
+            self.__logger.error(f"run metrics saving failed: {ex}")
+
+    def __save_trace(self) -> None:
+        """Saves the spans of the run to the trace file, if its path is set.
+        A failed export is logged and does not fail the run.
+
+        :return: None
+        """
+
+        if not self.__tracer.enabled:
+            return
+        try:
+            self.__tracer.save(self.__tracing_settings["path"],
+                               self.__tracing_settings.get("format", "chrome"))
+        except OSError as ex:
+            self.__logger.error(f"trace saving failed: {ex}")
+
+    def __log_query_stats(self) -> None:
+        """Logs the report of the query stats of the run if the diagnostics
+        are on and the time the queries were held by the load governor.
+
+        :return: None
+        """
+
+        if self.__log_query_stats_on:
+            self.__logger.info(f"query stats:\n{self.__query_stats.report()}")
+        if self.__governor:
+            self.__logger.info(f"the queries were held by the load governor "
+                               f"for {self.__governor.throttled_seconds:.1f} "
+                               f"s, delay: {self.__governor.delay_seconds} s")
+
+    def __check_not_dry_run(self) -> None:
+        """Raises an error if the generator was created for the dry run.
+
+        :raise RuntimeError: if the generator was created for the dry run.
+        :return: None
+        """
+
+        if self.__dry_run:
+            raise RuntimeError("the generator is created for the dry run, "
+                               "only the plan is available")
+
+    def __init_git_objects(self) -> None:
+        """Sets private attributes to work with Git objects. Clones the remote
+        repository if it is configured and not cloned yet, pulls the remote
+        repository once and stages a new month changelog for the run commit.
+
+        :raise NotADirectoryError: if git repository folder does not exist
+        and the remote url is not configured.
+        :raise RuntimeError: if all git pull attempts failed.
+        :return: None
+        """
+
+        self.__logger.info("run")
+        settings = self.__repository_settings
+        with self.__git_lock or nullcontext():
+            self.__repo = GitSynchronizer.open_repository(
+                self.__git_folder_path, self.__target_folder,
+                remote_url=settings.get("remote_url"),
+                branch=settings.get("branch"),
+                shallow_depth=settings.get("shallow_depth"),
+                sparse=settings.get("sparse_checkout", False))
+        self.__git_sync = GitSynchronizer(
+            self.__repo,
+            max_attempts=settings.get("git_max_attempts", 5),
+            backoff_seconds=settings.get("git_backoff_seconds", 1.0),
+            background_push=settings.get("background_push", False),
+            lock=self.__git_lock, tracer=self.__tracer)
+        journal_name = self.__target_folder.replace("/", "_")
+        self.__journal = CheckpointJournal(
+            settings.get("checkpoint_path")
+            or os.path.join(self.__repo.git_dir,
+                            f"scriptgen_checkpoint_{journal_name}.json"),
+            settings.get("checkpoint_max_resumes", 3))
+        self.__git_sync.pull()
+        self.__prepare_git()
+
+    def __prepare_git(self) -> None:
+        """Stages a new month changelog for the run commit. Is called once for
+        each run, so that a long-running generator picks up the changelog of
+        the new month. The remote changes are pulled before the commit of the
+        run.
+
+        :return: None
+        """
+
         changelog_name = datetime.now().strftime("changelog_tree%Y%m.yml")
         changelog_name = self.__target_folder_path + "/" + changelog_name
         if not os.path.exists(changelog_name):
             self.__logger.info("New yml creating run")
             with open(changelog_name, "tw", encoding="utf-8") as file:
                 file.write("databaseChangeLog:")
-            self.__commit_files([os.path.abspath(changelog_name)],
-                                "new month changelog add",
-                                is_new_changelog=True)
+            self.__git_sync.stage([os.path.abspath(changelog_name)])
         self.__changelog_filepath = changelog_name
+        self.__git_prepared = True
 
-    def __get_db_table_list(self, table_list: list[str],
-                            query_builder: SqlQueryBuilder) -> list[DbTable]:
-        """Creates the list of the DbTable objects.
+    def __get_db_table_levels(self, table_list: list[str],
+                              query_builder: SqlQueryBuilder) \
+            -> list[list[DbTable]]:
+        """Creates the DbTable objects grouped into the dependency levels.
+        A self-referencing table is condensed into a single vertex of the
+        dependency graph instead of failing the sorting and orders its own
+        rows by the hierarchy. A cycle of several tables can't be ordered,
+        since the rows of each table can refer to the rows of the other ones.
 
         :param table_list: the list of the table names.
         :param query_builder: an SqlQueryBuilder object with templates.
-        :return: the list of the DbTable objects.
+        :raise ValueError: if several tables of the list refer to each other.
+        :return: the list of the levels, each level is a list of the DbTable
+        objects.
         """
         self.__logger.info("run")
         table_names = [name.lower() for name in table_list]
+        table_name_set = set(table_names)
         db_table_dict = {}
         topo_sorter = TopoSorter(table_names)
         for table_name in table_names:
+            bucket_diff_settings = None
+            if table_name in self.__bucket_diff_list:
+                bucket_diff_settings = self.__bucket_diff_settings
             db_table = DbTable(self.__config_dict, self.__cursor, query_builder,
                                table_name, self.__work_db_name,
-                               self.__clear_db_name)
+                               self.__clear_db_name, self.__clear_cursor,
+                               bucket_diff_settings, self.__query_stats,
+                               self.__tracer,
+                               self.__table_hints.get(table_name),
+                               self.__governor)
             db_table_dict[table_name] = db_table
             for sub_table in [name.lower() for name
                               in db_table.subordinate_tables]:
-                if sub_table in table_names:
+                if sub_table in table_name_set:
                     topo_sorter.add_edge(tuple((table_name, sub_table)))
-        return [db_table_dict[table]
-                for table in topo_sorter.topo_sorted_vertices]
+        cycles = [component for component in topo_sorter.cyclic_components
+                  if len(component) > 1]
+        if cycles:
+            tables = "; ".join(", ".join(component) for component in cycles)
+            raise ValueError(f"tables {tables} refer to each other, their "
+                             f"scripts can't keep the foreign keys, one "
+                             f"table of each cycle has to be removed from "
+                             f"table_list")
+        return [[db_table_dict[table] for table in level]
+                for level in topo_sorter.condensed_levels]
 
-    def __git_pull_push_repeat(self, pull_repeat: bool = False,
-                               push_repeat: bool = False) -> None:
-        """Repeats pull/push operations with the git repository.
+    def __get_schema_version(self) -> Any:
+        """Gets the fingerprint of the database schema.
 
-        :param pull_repeat: need to repeat a pull operation.
-        :param push_repeat: need to repeat a pull operation.
-        :raise RuntimeError: if repeating fails over then 3 times.
-        :return: None
+        :raise RuntimeError: if database query execution failed.
+        :return: a value changing with the tables and foreign keys.
         """
 
-        attempt_num = 1
-        pull_successful = not pull_repeat
-        push_successful = not push_repeat
-        while attempt_num < 3:
-            self.__logger.error(f"attempt_num: {attempt_num}")
-            attempt_num += 1
-            try:
-                if not pull_successful:
-                    self.__origin.pull()
-                    self.__logger.error("git pull finished")
-                    pull_successful = True
-                if not push_successful:
-                    self.__origin.push()
-                    self.__logger.error("git push finished")
-                    push_successful = True
-            except GitError as ex:
-                self.__logger.exception(ex)
-        if not pull_successful and push_successful:
-            self.__logger.error("git pull/push failed")
-            raise RuntimeError("git pull/push failed")
+        query = self.__query_builder.get_schema_version_query()
+        try:
+            self.__cursor.execute(query)
+            return self.__cursor.fetchall()[0][0]
+        except DbError as ex:
+            self.__logger.exception(ex)
+            self.__logger.error(f'query: {query}')
+            raise RuntimeError('query execution failed')
 
     def __update_changelog(self, file_list: list[str]) -> None:
-        """Includes the files with changesets into the changelog.
+        """Includes the files with changesets into the changelog. The files
+        already included are skipped, so a resumed run does not include them
+        twice.
 
         :param file_list: the list of file path to include into the changelog.
         :return: None
         """
 
         self.__logger.info(f"{len(file_list)} file references adding")
+        with open(self.__changelog_filepath, 'r', encoding="utf-8") as file:
+            changelog_text = file.read()
         with open(self.__changelog_filepath, 'a', encoding="utf-8") as file:
             for file_name in file_list:
-                file.write(self.__get_include_str(file_name))
+                include_str = self.__get_include_str(file_name)
+                if include_str not in changelog_text:
+                    file.write(include_str)
         self.__logger.info("file references added in yml")
 
     @staticmethod
@@ -332,44 +1154,33 @@ class ScriptGenerator:
         try:
             self.__logger.info(f"cmd: {cmd}\n cwd: "
                                f"{os.path.abspath(self.__git_folder_path)} ")
-            subprocess.run(cmd, shell=True, check=True,
-                           cwd=os.path.abspath(self.__git_folder_path))
+            with self.__liquibase_lock:
+                subprocess.run(cmd, shell=True, check=True,
+                               cwd=os.path.abspath(self.__git_folder_path))
             self.__logger.info(f"Clear db is updated")
         except Exception as ex:
             self.__logger.error(ex)
             raise RuntimeError("Update clear db failed! see the information "
                                "in the liquibase log")
 
-    def __commit_files(self, files: list[str], message: str,
-                       is_new_changelog: bool = False) -> None:
-        """Commit new files tho the git repository.
+    def __commit_files(self, files: list[str], message: str) -> None:
+        """Stages the new files with the changelog and commits them to the git
+        repository with a single commit and a single push.
 
         :param files: the list of the file paths.
         :param message: the commit message.
-        :param is_new_changelog: is need to commit the changelog file.
-        :raise RuntimeError: if pull/push repeating fails over then 3 times.
+        :raise RuntimeError: if all git push attempts failed.
         :return: None
         """
 
         self.__logger.info(f"commit {len(files)} scripts")
-        if not files:
-            return
-        if not is_new_changelog:
-            files.append(os.path.abspath(self.__changelog_filepath))
-        self.__logger.info("changelog file added in list to commit")
-        try:
-            self.__origin.pull()
-            self.__logger.info("git pull finished")
-        except GitError as ex:
-            self.__logger.exception(ex)
-            self.__git_pull_push_repeat(pull_repeat=True)
-        self.__repo.index.add(files)
-        self.__logger.info("git add finished")
-        self.__repo.index.commit(message)
-        self.__logger.info("git commit finished")
-        try:
-            self.__origin.push()
-            self.__logger.info("git push finished")
-        except GitError as ex:
-            self.__logger.exception(ex)
-            self.__git_pull_push_repeat(pull_repeat=True, push_repeat=True)
+        if files:
+            self.__git_sync.stage(
+                files + [os.path.abspath(self.__changelog_filepath)])
+            self.__logger.info("changelog file added in list to commit")
+        if self.__git_sync.commit_and_push(message):
+            self.__push_queued = \
+                self.__repository_settings.get("background_push", False)
+            self.__committed_files += [file for file in files
+                                       if file != self.changelog_filepath
+                                       and file not in self.__committed_files]
@@ -0,0 +1,542 @@
+from core.sqltemplates import SqlTemplates
+
+
+class SqliteTemplates(SqlTemplates):
+    """The class contains templates for SQL queries and statements used with
+    SQLite databases. The work and clear databases are attached to the same
+    connection, so the tables are named like work.report and clear.report.
+    The table names have no schema and the metadata is read from the main
+    database of the connection.
+    SQLite has no checksum functions, table hints, isolation levels,
+    statistics messages or query hints, so the bucket diff, the read
+    isolation, the table hints, the diagnostics and the MAXDOP hint of the
+    load governor can't be used with these templates.
+
+    Properties
+    -----------------
+    column_query: str
+        SQL query template for getting database table columns by table name
+    search_del_query: str
+        SQL query template for searching deleted rows in the database table.
+    search_upsert_query: str
+        SQL query template for searching updated rows in the database table.
+    all_rows_query: str
+        SQL query template for getting all rows from the database table.
+    delete_statement: str
+        SQL statement for deleting rows from the database table.
+    upsert_statement: str
+        SQL statement for updating and inserting rows to the database table.
+    upsert_link_pattern: str
+        SQL pattern of a column update in the upsert statement.
+    copy_statement: str
+        SQL statement for uploading rows with a bulk copy, empty.
+    stage_statement: str
+        SQL statement for upserting rows through a staging table, empty.
+    stage_insert_statement: str
+        SQL statement for inserting rows to the staging table, empty.
+    json_upsert_statement: str
+        SQL statement for upserting rows from a JSON payload, empty.
+    json_column_pattern: str
+        SQL pattern of a JSON payload column definition, empty.
+    count_query: str
+        SQL query template for counting rows and data length of a query result.
+    column_length_pattern: str
+        SQL expression pattern for the data length of a column value.
+    ordered_query: str
+        SQL query template for ordering a query result by the key column.
+    key_after_condition: str
+        SQL condition template for the rows after the key value.
+    schema_version_query: str
+        SQL query for getting the fingerprint of the database schema.
+    key_range_query: str
+        SQL query template for getting the primary key range of the table.
+    keys_rows_query: str
+        SQL query template for getting the rows by the primary key list.
+    search_hash_upsert_query: str
+        SQL query template for searching updated rows by the row values.
+    row_hash_pattern: str
+        SQL expression pattern for the row value of the row columns.
+    self_reference_query: str
+        SQL query template for getting the foreign key column referring to
+        the same table.
+    hierarchy_ordered_query: str
+        SQL query template for ordering a query result by the hierarchy depth
+        of the self-referencing table rows.
+    hierarchy_key_after_condition: str
+        SQL condition template for the rows after the key value in the
+        hierarchy ordered query.
+    """
+
+    @property
+    def column_query(self) -> str:
+        """SQL query template for getting database table columns by table name.
+        Uses the name of the database table as a placeholder 0.
+        """
+
+        return (
+            "select\n"
+            "   c.name as ColumnName,\n"
+            "   case when c.name like '%_updDT' then 1 else 0 end as IsUpdDT,\n"
+            "   case when c.pk > 0 then 1 else 0 end as IsPrimaryKey,\n"
+            "   c.type as ColumnType\n"
+            "from pragma_table_info('{0}') as c\n"
+            "order by c.cid\n")
+
+    @property
+    def sub_tables_query(self) -> str:
+        """SQL query template for getting database table names containing
+        foreign keys to this table.
+        Uses the name of the database table as a placeholder 0.
+        """
+
+        return (
+            "select distinct m.name as key_name\n"
+            "from sqlite_master as m\n"
+            "    join pragma_foreign_key_list(m.name) as fk\n"
+            "where m.type = 'table'\n"
+            "    and fk.\"table\" = '{0}' collate nocase;")
+
+    @property
+    def search_del_query(self) -> str:
+        """SQL query template for searching deleted rows in the database table.
+        Uses the name of the primary key column as a placeholder 0.
+        Uses the name of the database table as a placeholder 1.
+        Uses the name of the work database as a placeholder 2.
+        Uses the name of the clear database as a placeholder 3.
+        Uses the table hint of the work table as a placeholder 4.
+        """
+
+        return (
+            "select clr.{0}\n"
+            "from {3}.{1} as clr\n"
+            "where not exists(\n"
+            "    select 1\n"
+            "    from {2}.{1} as src{4}\n"
+            "    where clr.{0} = src.{0});\n")
+
+    @property
+    def search_upsert_query(self) -> str:
+        """SQL query template for searching updated rows in the database table.
+        Uses the column names list as a placeholder 0.
+        Uses the name of the work database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the name of the update date column as a placeholder 4.
+        Uses the name of the clear database as a placeholder 5.
+        Uses the table hint of the work table as a placeholder 6.
+
+        Warning: please, don't add a semicolon at the end of query.
+        Day count condition can be added at the end of this query.
+        """
+
+        return (
+            "select\n"
+            "    {0}\n"
+            "from {1}.{2} as src{6}\n"
+            "where not exists(\n"
+            "    select 1\n"
+            "    from {5}.{2} as clr\n"
+            "    where clr.{3} = src.{3}\n"
+            "        and clr.{4} = src.{4})")
+
+    @property
+    def all_rows_query(self) -> str:
+        """SQL query template for getting all rows from the database table.
+        Uses the column names list as a placeholder 0.
+        Uses the name of the work database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the table hint of the work table as a placeholder 3.
+        """
+
+        return (
+            "select\n"
+            "    {0}\n"
+            "from {1}.{2} as src{3}\n")
+
+    @property
+    def delete_statement(self) -> str:
+        """SQL statement for deleting rows from the database table.
+        Uses the name of the database table as a placeholder 0.
+        Uses the name of the primary key column as a placeholder 1.
+        Uses the row identifiers list as a placeholder 2.
+        """
+
+        return "delete from {0} where {1} in ({2});\n"
+
+    @property
+    def upsert_statement(self) -> str:
+        """SQL statement for updating and inserting rows to the database table.
+        The rows are inserted with INSERT ... ON CONFLICT, the conflicting
+        rows are updated.
+        Uses the name of the database table as a placeholder 0.
+        Uses the column names list as a placeholder 1.
+        Uses the upsert values list as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the fields links list as a placeholder 4.
+        Example: column = excluded.column. The list must not contain
+        a primary key.
+        Uses the src.column list as a placeholder 5.
+        """
+
+        return (
+            "with src(\n"
+            "    {1}) as(\n"
+            "    values\n"
+            "        {2})\n"
+            "insert into {0}(\n"
+            "    {1})\n"
+            "select\n"
+            "    {5}\n"
+            "from src\n"
+            "where true\n"
+            "on conflict({3}) do update set\n"
+            "            {4};\n")
+
+    @property
+    def upsert_link_pattern(self) -> str:
+        """SQL pattern of a column update in the upsert statement.
+        Uses the name of the column as a placeholder 0.
+        """
+
+        return "{0} = excluded.{0}"
+
+    @property
+    def copy_statement(self) -> str:
+        """SQLite has no bulk copy statement in a script, the rows of the
+        full uploads are upserted.
+        """
+
+        return ""
+
+    @property
+    def stage_statement(self) -> str:
+        """SQLite upserts with the on conflict clause, which has no
+        compilation cost per row, so the rows are never staged.
+        """
+
+        return ""
+
+    @property
+    def stage_insert_statement(self) -> str:
+        """No staging table, see stage_statement."""
+
+        return ""
+
+    @property
+    def json_upsert_statement(self) -> str:
+        """The JSON payload is shredded with the SQL Server openjson, SQLite
+        upserts the values list.
+        """
+
+        return ""
+
+    @property
+    def json_column_pattern(self) -> str:
+        """No JSON payload, see json_upsert_statement."""
+
+        return ""
+
+    @property
+    def count_query(self) -> str:
+        """SQL query template for counting rows and data length of a query
+        result.
+        Uses the text of the query without a semicolon as a placeholder 0.
+        Uses the row data length expression as a placeholder 1.
+        """
+
+        return (
+            "select\n"
+            "    count(*) as row_count,\n"
+            "    ifnull(sum({1}), 0) as data_length\n"
+            "from(\n"
+            "{0}) as q;\n")
+
+    @property
+    def column_length_pattern(self) -> str:
+        """SQL expression pattern for the data length of a column value in
+        the count query, null values are counted as a literal length.
+        Uses the name of the column as a placeholder 0.
+        """
+
+        return "ifnull(length(q.{0}), 4)"
+
+    @property
+    def ordered_query(self) -> str:
+        """SQL query template for ordering a query result by the key column.
+        Uses the text of the query without a semicolon as a placeholder 0.
+        Uses the name of the key column as a placeholder 1.
+        Uses the key condition (key_after_condition or an empty string) as
+        a placeholder 2.
+        """
+
+        return (
+            "select ord.*\n"
+            "from(\n"
+            "{0}) as ord\n"
+            "{2}"
+            "order by ord.{1};\n")
+
+    @property
+    def key_after_condition(self) -> str:
+        """SQL condition template for the rows after the key value in the
+        ordered query.
+        Uses the name of the key column as a placeholder 0.
+        Uses the key value as a placeholder 1.
+        """
+
+        return "where ord.{0} > {1}\n"
+
+    @property
+    def schema_version_query(self) -> str:
+        """SQL query for getting the fingerprint of the database schema, which
+        changes when a table or a foreign key is created, altered or dropped.
+        """
+
+        return "select schema_version from pragma_schema_version;\n"
+
+    @property
+    def key_range_query(self) -> str:
+        """SQL query template for getting the primary key range of the
+        database table.
+        Uses the name of the primary key column as a placeholder 0.
+        Uses the name of the database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the table hint as a placeholder 3.
+        """
+
+        return (
+            "select\n"
+            "    min(src.{0}) as min_key,\n"
+            "    max(src.{0}) as max_key\n"
+            "from {1}.{2} as src{3};\n")
+
+    @property
+    def bucket_checksum_query(self) -> str:
+        """SQLite has no checksum functions, the bucket diff is not
+        supported.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the bucket diff is not supported by "
+                                  "SQLite")
+
+    @property
+    def row_checksum_query(self) -> str:
+        """SQLite has no checksum functions, the bucket diff is not
+        supported.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the bucket diff is not supported by "
+                                  "SQLite")
+
+    @property
+    def keys_rows_query(self) -> str:
+        """SQL query template for getting the rows by the primary key
+        list.
+        Uses the column names list as a placeholder 0.
+        Uses the name of the database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the primary key list as a placeholder 4.
+        Uses the table hint as a placeholder 5.
+
+        Warning: please, don't add a semicolon at the end of query.
+        """
+
+        return (
+            "select\n"
+            "    {0}\n"
+            "from {1}.{2} as src{5}\n"
+            "where src.{3} in ({4})")
+
+    @property
+    def search_hash_upsert_query(self) -> str:
+        """SQL query template for searching updated rows in the database
+        table without an update date column, the rows are compared by the
+        row values of their columns with the is operator, so null values are
+        equal.
+        Uses the column names list as a placeholder 0.
+        Uses the name of the work database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the name of the clear database as a placeholder 4.
+        Uses the row value of the work table as a placeholder 5.
+        Uses the row value of the clear table as a placeholder 6.
+        Uses the table hint of the work table as a placeholder 7.
+
+        Warning: please, don't add a semicolon at the end of query.
+        """
+
+        return (
+            "select\n"
+            "    {0}\n"
+            "from {1}.{2} as src{7}\n"
+            "where not exists(\n"
+            "    select 1\n"
+            "    from {4}.{2} as clr\n"
+            "    where clr.{3} = src.{3}\n"
+            "        and {6} is {5})")
+
+    @property
+    def row_hash_pattern(self) -> str:
+        """SQL expression pattern for the row value of the row columns, used
+        instead of a hash.
+        Uses the column names list with the table alias as a placeholder 0.
+        """
+
+        return "({0})"
+
+    @property
+    def statistics_statement(self) -> str:
+        """SQLite has no statistics messages.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the statistics messages are not supported "
+                                  "by SQLite")
+
+    @property
+    def showplan_statement(self) -> str:
+        """SQLite has no session switch of the plan output.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the plan output is not supported by "
+                                  "SQLite")
+
+    @property
+    def self_reference_query(self) -> str:
+        """SQL query template for getting the foreign key column of the
+        database table referring to the same table.
+        Uses the name of the database table as a placeholder 0.
+        """
+
+        return (
+            "select fk.\"from\" as column_name\n"
+            "from pragma_foreign_key_list('{0}') as fk\n"
+            "where fk.\"table\" = '{0}' collate nocase;")
+
+    @property
+    def hierarchy_ordered_query(self) -> str:
+        """SQL query template for ordering a query result by the hierarchy
+        depth of the self-referencing table rows and by the key column. The
+        depth is computed by a recursive query from the root rows, the rows
+        not reachable from the roots are ordered as the deepest ones.
+        Uses the text of the query without a semicolon as a placeholder 0.
+        Uses the name of the key column as a placeholder 1.
+        Uses the key condition (hierarchy_key_after_condition or an empty
+        string) as a placeholder 2.
+        Uses the name of the database with the hierarchy as a placeholder 3.
+        Uses the name of the database table as a placeholder 4.
+        Uses the name of the parent key column as a placeholder 5.
+        Uses the depth order direction (asc or desc) as a placeholder 6.
+        Uses the table hint as a placeholder 7.
+        """
+
+        return (
+            "with recursive hierarchy(row_key, depth) as(\n"
+            "    select\n"
+            "        src.{1},\n"
+            "        0\n"
+            "    from {3}.{4} as src{7}\n"
+            "    where src.{5} is null\n"
+            "        or src.{5} = src.{1}\n"
+            "    union all\n"
+            "    select\n"
+            "        src.{1},\n"
+            "        hierarchy.depth + 1\n"
+            "    from {3}.{4} as src{7}\n"
+            "        join hierarchy on src.{5} = hierarchy.row_key\n"
+            "    where src.{5} <> src.{1})\n"
+            "select ord.*\n"
+            "from(\n"
+            "{0}) as ord\n"
+            "    left join hierarchy as hier on hier.row_key = ord.{1}\n"
+            "{2}"
+            "order by ifnull(hier.depth, 2147483647) {6}, ord.{1};\n")
+
+    @property
+    def hierarchy_key_after_condition(self) -> str:
+        """SQL condition template for the rows after the key value in the
+        hierarchy ordered query.
+        Uses the name of the key column as a placeholder 0.
+        Uses the key value as a placeholder 1.
+        Uses the depth comparison operator (> or <) as a placeholder 2.
+        """
+
+        return (
+            "where ifnull(hier.depth, 2147483647) {2} ifnull((\n"
+            "        select key_hier.depth\n"
+            "        from hierarchy as key_hier\n"
+            "        where key_hier.row_key = {1}), 2147483647)\n"
+            "    or (ifnull(hier.depth, 2147483647) = ifnull((\n"
+            "        select key_hier.depth\n"
+            "        from hierarchy as key_hier\n"
+            "        where key_hier.row_key = {1}), 2147483647)\n"
+            "        and ord.{0} > {1})\n")
+
+    @property
+    def table_hint_pattern(self) -> str:
+        """SQLite has no table hints like nolock or readpast.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the table hints are not supported by "
+                                  "SQLite")
+
+    @property
+    def isolation_level_statement(self) -> str:
+        """SQLite has no isolation levels, a read transaction of a database
+        in the WAL mode is a snapshot already.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the isolation levels are not supported by "
+                                  "SQLite")
+
+    @property
+    def snapshot_isolation_level(self) -> str:
+        """SQLite has no isolation levels.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the isolation levels are not supported by "
+                                  "SQLite")
+
+    @property
+    def query_option_pattern(self) -> str:
+        """SQLite has no query hints.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the query hints are not supported by "
+                                  "SQLite")
+
+    @property
+    def maxdop_option(self) -> str:
+        """SQLite has no parallel plans.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the query hints are not supported by "
+                                  "SQLite")
+
+    @property
+    def wait_stats_query(self) -> str:
+        """SQLite has no wait stats.
+
+        :raise NotImplementedError: always.
+        """
+
+        raise NotImplementedError("the wait stats are not supported by "
+                                  "SQLite")
@@ -1,5 +1,9 @@
+import json
+import re
 from datetime import datetime
-from typing import Union
+from decimal import Decimal
+from string import Formatter
+from typing import Any, Union
 
 from core.sqltemplates import SqlTemplates
 
@@ -15,33 +19,141 @@ class SqlQueryBuilder(object):
         Builds an SQL query for getting database table names containing
         foreign keys to this table.
     get_search_del_query(self, primary_key: str, table_name: str,
-                        work_db_name: str, clear_db_name: str) -> str:
+                        work_db_name: str, clear_db_name: str,
+                        table_hint: str = None) -> str:
         Builds an SQL query for searching deleted rows in the target database
         table.
     get_search_upsert_query(self, column_list: list[str], work_db_name: str,
                             table_name: str, primary_key: str,
                             update_dt_field: str, clear_db_name: str,
-                            beg_date: str = None) -> str:
+                            beg_date: datetime = None,
+                            table_hint: str = None) -> tuple[str, list[Any]]:
+        Builds a parameterized SQL query for searching updated or inserted
+        rows in the target database table.
+    get_search_hash_upsert_query(self, column_list: list[str],
+                                 work_db_name: str, table_name: str,
+                                 primary_key: str, clear_db_name: str,
+                                 table_hint: str = None) -> str:
         Builds an SQL query for searching updated or inserted rows in the
-        target database table.
+        target database table by the row hashes.
     get_all_rows_query(self, column_list: list[str], work_db_name: str,
-                       table_name: str) -> str:
+                       table_name: str, table_hint: str = None) -> str:
         Builds an SQL query for getting all rows from the target database table.
     get_delete_statement(self, table_name: str, primary_key: str,
                          id_list: list[str]) -> str:
         Builds an SQL statement for deleting rows from the database table.
     get_upsert_statement(self, table_name: str, column_list: list[str],
-                         data: list[list[str]], primary_key: str) -> str:
+                         data: list[list[str]], primary_key: str,
+                         type_list: list[str] = None) -> str:
         Builds an SQL statement for updating and inserting rows to the
-        database table.
+        database table, through a staging table above the stage threshold
+        or with a JSON payload.
+    get_upload_statement(self, table_name: str, column_list: list[str],
+                         data: list[list[str]], primary_key: str,
+                         type_list: list[str] = None) -> str:
+        Builds an SQL statement for uploading all rows to the database table
+        with the bulk copy of the dialect if it is on.
+    get_count_query(self, query: str, column_list: list[str]) -> str:
+        Builds an SQL query for counting rows and data length of the query
+        result.
+    estimate_upsert_size(self, table_name: str, column_list: list[str],
+                         primary_key: str, row_count: int, data_length: int,
+                         script_count: int, all_rows: bool = False,
+                         type_list: list[str] = None) -> int:
+        Estimates the size of the upsert scripts in bytes.
+    estimate_delete_size(self, table_name: str, primary_key: str,
+                         row_count: int, data_length: int,
+                         script_count: int) -> int:
+        Estimates the size of the delete scripts in bytes.
+    get_ordered_query(self, query: str, key_column: str,
+                      key_after: str = None) -> str:
+        Builds an SQL query ordering the query result by the key column and
+        skipping the rows up to the key value.
+    get_literal(value: Union[None, int, float, str, datetime]) -> str:
+        Formats the value as an SQL literal.
+    get_schema_version_query(self) -> str:
+        Builds an SQL query for getting the fingerprint of the database
+        schema.
+    get_key_range_query(self, primary_key: str, db_name: str,
+                        table_name: str, table_hint: str = None) -> str:
+        Builds an SQL query for getting the primary key range of the table.
+    get_bucket_checksum_query(self, primary_key: str, column_list: list[str],
+                              db_name: str, table_name: str, low_key: int,
+                              high_key: int, bucket_size: int,
+                              table_hint: str = None) -> tuple[str, list[Any]]:
+        Builds a parameterized SQL query for the checksums of the primary key
+        buckets.
+    get_row_checksum_query(self, primary_key: str, column_list: list[str],
+                           db_name: str, table_name: str, low_key: int,
+                           high_key: int, table_hint: str = None) \
+            -> tuple[str, list[Any]]:
+        Builds a parameterized SQL query for the checksums of the rows in the
+        key range.
+    get_keys_rows_query(self, column_list: list[str], db_name: str,
+                        table_name: str, primary_key: str,
+                        key_list: list[Any], table_hint: str = None) \
+            -> tuple[str, list[Any]]:
+        Builds a parameterized SQL query for getting the rows by the primary
+        key list.
+    get_statistics_statement(self, enabled: bool) -> str:
+        Builds an SQL statement switching the query statistics messages.
+    get_showplan_statement(self, enabled: bool) -> str:
+        Builds an SQL statement switching the estimated plan output.
+    get_self_reference_query(self, table_name: str) -> str:
+        Builds an SQL query for getting the foreign key column referring to
+        the same table.
+    get_hierarchy_ordered_query(self, query: str, key_column: str,
+                                db_name: str, table_name: str,
+                                parent_column: str, key_after: str = None,
+                                descending: bool = False,
+                                table_hint: str = None) -> str:
+        Builds an SQL query ordering the query result by the hierarchy depth
+        of the self-referencing table rows.
+    get_isolation_level_statement(self, level: str) -> str:
+        Builds an SQL statement setting the transaction isolation level.
+    get_maxdop_query(self, query: str, maxdop: int) -> str:
+        Builds an SQL query limiting the parallelism of the query.
+    get_wait_stats_query(self) -> str:
+        Builds an SQL query for getting the total resource wait time of the
+        server.
+    supports(self, feature: str) -> bool:
+        Checks the dialect of the templates has the feature.
     """
 
-    def __init__(self, templates: SqlTemplates):
+    __OPTION_RE = re.compile(r"\noption \(([^()]*)\)$", re.IGNORECASE)
+    __STAGE_BATCH_ROWS = 1000
+    __COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t',
+                                    '\n': '\\n', '\r': '\\r'})
+    __FEATURES = {"table_hint": ("table_hint_pattern",),
+                  "snapshot": ("isolation_level_statement",
+                               "snapshot_isolation_level"),
+                  "maxdop": ("query_option_pattern", "maxdop_option"),
+                  "wait_stats": ("wait_stats_query",),
+                  "statistics": ("statistics_statement",),
+                  "showplan": ("showplan_statement",),
+                  "bucket_diff": ("bucket_checksum_query",
+                                  "row_checksum_query")}
+
+    def __init__(self, templates: SqlTemplates, stage_threshold: int = None,
+                 json_payload: bool = False, bulk_copy: bool = False):
         """
         :param templates: a SqlTemplates subclass implemented template
         properties.
+        :param stage_threshold: the number of rows in the upsert statement
+        above which the rows are upserted through a staging table, if the
+        dialect has one. Never staged if empty.
+        :param json_payload: if True the rows of the upsert statement are
+        passed as a JSON payload, if the dialect has one and the column
+        types are known.
+        :param bulk_copy: if True the full uploads use the bulk copy of the
+        dialect, if it has one. The copy data is inline in the script, so
+        it has to be applied by a client streaming it, like psql, and not
+        by the liquibase.
         """
         self.__templates: SqlTemplates = templates
+        self.__stage_threshold: Union[int, None] = stage_threshold
+        self.__json_payload: bool = json_payload
+        self.__bulk_copy: bool = bulk_copy
 
     def get_column_query(self, table_name: str) -> str:
         """Builds an SQL query for getting table columns by table name.
@@ -62,7 +174,8 @@ class SqlQueryBuilder(object):
         return self.__templates.sub_tables_query.format(table_name)
 
     def get_search_del_query(self, primary_key: str, table_name: str,
-                             work_db_name: str, clear_db_name: str) -> str:
+                             work_db_name: str, clear_db_name: str,
+                             table_hint: str = None) -> str:
         """Builds an SQL query for searching deleted rows in the target database
         table.
 
@@ -70,19 +183,24 @@ class SqlQueryBuilder(object):
         :param table_name: the name of the target database table.
         :param work_db_name: the name of the work database.
         :param clear_db_name: the name of the clear database.
+        :param table_hint: the table hint of the work table, like nolock,
+        no hint if empty.
         :return: the text of the SQL query.
         """
 
-        return self.__templates.search_del_query.format(primary_key, table_name,
-                                                        work_db_name,
-                                                        clear_db_name)
+        return self.__templates.search_del_query.format(
+            primary_key, table_name, work_db_name, clear_db_name,
+            self.__get_table_hint(table_hint))
 
     def get_search_upsert_query(self, column_list: list[str], work_db_name: str,
                                 table_name: str, primary_key: str,
                                 update_dt_field: str, clear_db_name: str,
-                                beg_date: str = None) -> str:
+                                beg_date: datetime = None,
+                                table_hint: str = None) \
+            -> tuple[str, list[Any]]:
         """Builds an SQL query for searching updated or inserted rows in the
-        target database table.
+        target database table. The start date is passed as a parameter, so
+        the text of the query is the same in each run.
 
         :param column_list: the list of the column names for the table.
         :param work_db_name: the name of the work database.
@@ -91,32 +209,70 @@ class SqlQueryBuilder(object):
         :param update_dt_field: the name of the column with update date.
         :param clear_db_name: the name of the clear database.
         :param beg_date: the start date to search updated or inserted rows.
-        :return: the text of the SQL query.
+        :param table_hint: the table hint of the work table, like nolock,
+        no hint if empty.
+        :return: the text of the SQL query with the ? parameter markers and
+        the list of the parameter values.
         """
 
         query = self.__templates.search_upsert_query
         fields = SqlQueryBuilder.__get_columns_str(column_list, 'src.{0}')
+        args = [fields, work_db_name, table_name, primary_key,
+                update_dt_field, clear_db_name,
+                self.__get_table_hint(table_hint)]
         if beg_date:
-            query += "\n\tand src.{4} >= {6}"
-            return query.format(fields, work_db_name, table_name, primary_key,
-                                update_dt_field, clear_db_name, beg_date)
-        return query.format(fields, work_db_name, table_name, primary_key,
-                            update_dt_field, clear_db_name)
+            query += "\n\tand src.{4} >= {7}"
+            return SqlQueryBuilder.__format_with_params(query, args + [None],
+                                                        {7: beg_date})
+        return SqlQueryBuilder.__format_with_params(query, args, {})
+
+    def get_search_hash_upsert_query(self, column_list: list[str],
+                                     work_db_name: str, table_name: str,
+                                     primary_key: str, clear_db_name: str,
+                                     table_hint: str = None) -> str:
+        """Builds an SQL query for searching updated or inserted rows in the
+        target database table without an update date column. The rows are
+        compared by the hashes of all columns except the primary key.
+
+        :param column_list: the list of the column names for the table.
+        :param work_db_name: the name of the work database.
+        :param table_name: the name of the target database table.
+        :param primary_key: the name of the primary key column.
+        :param clear_db_name: the name of the clear database.
+        :param table_hint: the table hint of the work table, like nolock,
+        no hint if empty.
+        :return: the text of the SQL query.
+        """
+
+        fields = SqlQueryBuilder.__get_columns_str(column_list, 'src.{0}')
+        hash_columns = [col for col in column_list if col != primary_key]
+        if not hash_columns:
+            hash_columns = [primary_key]
+        pattern = self.__templates.row_hash_pattern
+        src_hash = pattern.format(SqlQueryBuilder.__get_columns_str(
+            hash_columns, 'src.{0}'))
+        clr_hash = pattern.format(SqlQueryBuilder.__get_columns_str(
+            hash_columns, 'clr.{0}'))
+        return self.__templates.search_hash_upsert_query.format(
+            fields, work_db_name, table_name, primary_key, clear_db_name,
+            src_hash, clr_hash, self.__get_table_hint(table_hint))
 
     def get_all_rows_query(self, column_list: list[str], work_db_name: str,
-                           table_name: str) -> str:
+                           table_name: str, table_hint: str = None) -> str:
         """Builds an SQL query for getting all rows from the target database
         table.
 
         :param column_list: the list of the column names for the table.
         :param work_db_name: the name of the work database.
         :param table_name: the name of the target database table.
+        :param table_hint: the table hint of the work table, like nolock,
+        no hint if empty.
         :return: the text of the SQL query.
         """
 
         fields = SqlQueryBuilder.__get_columns_str(column_list, 'src.{0}')
-        return self.__templates.all_rows_query.format(fields, work_db_name,
-                                                      table_name)
+        return self.__templates.all_rows_query.format(
+            fields, work_db_name, table_name, self.__get_table_hint(table_hint))
 
     def get_delete_statement(self, table_name: str, primary_key: str,
                              id_list: list[str]) -> str:
@@ -134,23 +290,38 @@ class SqlQueryBuilder(object):
     def get_upsert_statement(self, table_name: str, column_list: list[str],
                              data: list[list[Union[None, int, float, str,
                                                    datetime]]],
-                             primary_key: str) -> str:
+                             primary_key: str,
+                             type_list: list[str] = None) -> str:
         """Builds an SQL statement for updating and inserting rows to the
-        database table.
+        database table. The rows above the stage threshold are inserted into
+        a staging table by batches and upserted from it, since a single
+        statement with thousands of rows in a values list compiles slowly
+        and gets poor row estimates. Otherwise, if the JSON payload is on,
+        the rows are serialized to one JSON literal shredded by the server
+        with the column types.
 
         :param table_name: the name of the target database table.
         :param column_list: the list of the column names for the table.
         :param data: the list of rows. Each row is a list of values.
         :raise TypeError: if the value type from the data not in
-        Union[None, int, float, str, datetime].
+        Union[None, int, float, str, datetime], Decimal values are allowed
+        in the JSON payload.
         :param primary_key: the name of the primary key column.
+        :param type_list: the list of the column types for the table, the
+        JSON payload is not used if empty.
         :return: the text of the SQL statement.
         """
 
+        if self.__is_staged(len(data)):
+            return self.__get_stage_statement(table_name, column_list, data,
+                                              primary_key)
+        if self.__is_json(type_list):
+            return self.__get_json_statement(table_name, column_list,
+                                             type_list, data, primary_key)
         fields = SqlQueryBuilder.__get_columns_str(column_list)
         values = [SqlQueryBuilder.__get_str_value_row(row) for row in data]
         str_values = (',\n'+' ' * 8).join(values)
-        upd_pattern = 'trg.{0} = src.{0}'
+        upd_pattern = self.__templates.upsert_link_pattern
         upd_sep = ',\n'+' ' * 12
         upd_columns = [col for col in column_list if col != primary_key]
         upd_fields = SqlQueryBuilder.__get_columns_str(upd_columns, upd_pattern,
@@ -160,6 +331,519 @@ class SqlQueryBuilder(object):
                                                         str_values, primary_key,
                                                         upd_fields, src_fields)
 
+    def get_upload_statement(self, table_name: str, column_list: list[str],
+                             data: list[list[Union[None, int, float, str,
+                                                   datetime]]],
+                             primary_key: str,
+                             type_list: list[str] = None) -> str:
+        """Builds an SQL statement for uploading all rows to the database
+        table with the bulk copy of the dialect, like COPY ... FROM STDIN.
+        The rows are in the tab separated text format of COPY. If the bulk
+        copy is off or the dialect has no bulk copy, builds the upsert
+        statement.
+
+        :param table_name: the name of the target database table.
+        :param column_list: the list of the column names for the table.
+        :param data: the list of rows. Each row is a list of values.
+        :param primary_key: the name of the primary key column.
+        :param type_list: the list of the column types for the upsert
+        statement.
+        :raise TypeError: if the value type from the data not in
+        Union[None, int, float, str, datetime].
+        :return: the text of the SQL statement.
+        """
+
+        if not self.__is_copied():
+            return self.get_upsert_statement(table_name, column_list, data,
+                                             primary_key, type_list)
+        fields = SqlQueryBuilder.__get_columns_str(column_list)
+        rows = '\n'.join(SqlQueryBuilder.__get_copy_row(row) for row in data)
+        upd_columns = [col for col in column_list if col != primary_key]
+        upd_fields = SqlQueryBuilder.__get_columns_str(
+            upd_columns, self.__templates.upsert_link_pattern,
+            ',\n' + ' ' * 12)
+        return self.__templates.copy_statement.format(table_name, fields,
+                                                      rows, primary_key,
+                                                      upd_fields)
+
+    def get_count_query(self, query: str, column_list: list[str]) -> str:
+        """Builds an SQL query for counting rows and data length of the query
+        result.
+
+        :param query: the text of the query to count.
+        :param column_list: the list of the column names of the query result.
+        :return: the text of the SQL query.
+        """
+
+        query = query.rstrip().rstrip(';')
+        length = SqlQueryBuilder.__get_columns_str(
+            column_list, self.__templates.column_length_pattern, '+')
+        return self.__templates.count_query.format(query, length)
+
+    def estimate_upsert_size(self, table_name: str, column_list: list[str],
+                             primary_key: str, row_count: int,
+                             data_length: int, script_count: int,
+                             all_rows: bool = False,
+                             type_list: list[str] = None) -> int:
+        """Estimates the size of the upsert scripts in bytes without
+        rendering the rows.
+
+        :param table_name: the name of the target database table.
+        :param column_list: the list of the column names for the table.
+        :param primary_key: the name of the primary key column.
+        :param row_count: the number of rows to upsert.
+        :param data_length: the total data length of the rows.
+        :param script_count: the number of scripts to pack the rows into.
+        :param all_rows: if True estimates the scripts uploading all rows,
+        which use the bulk copy if it is on.
+        :param type_list: the list of the column types for the table, used
+        by the JSON payload.
+        :return: the estimated size of the scripts in bytes.
+        """
+
+        if not row_count:
+            return 0
+        script_rows = -(-row_count // max(script_count, 1))
+        if all_rows and self.__is_copied():
+            statement_size = len(self.get_upload_statement(
+                table_name, column_list, [], primary_key))
+            row_overhead = len(column_list)
+        elif self.__is_staged(script_rows):
+            batch_count = -(-script_rows // SqlQueryBuilder.__STAGE_BATCH_ROWS)
+            batch_size = len(self.__templates.stage_insert_statement.format(
+                SqlQueryBuilder.__get_columns_str(column_list), ''))
+            statement_size = (len(self.__get_stage_statement(
+                table_name, column_list, [], primary_key))
+                + batch_count * batch_size)
+            row_overhead = len(column_list) + 9
+        elif self.__is_json(type_list):
+            statement_size = len(self.__get_json_statement(
+                table_name, column_list, type_list, [], primary_key))
+            row_overhead = len(column_list) + 4
+        else:
+            statement_size = len(self.get_upsert_statement(
+                table_name, column_list, [], primary_key))
+            row_overhead = 3 * len(column_list) + 11
+        return (script_count * statement_size + row_count * row_overhead
+                + data_length)
+
+    def estimate_delete_size(self, table_name: str, primary_key: str,
+                             row_count: int, data_length: int,
+                             script_count: int) -> int:
+        """Estimates the size of the delete scripts in bytes without
+        rendering the identifiers.
+
+        :param table_name: the name of the target database table.
+        :param primary_key: the name of the primary key column.
+        :param row_count: the number of rows to delete.
+        :param data_length: the total data length of the identifiers.
+        :param script_count: the number of scripts to pack the ids into.
+        :return: the estimated size of the scripts in bytes.
+        """
+
+        if not row_count:
+            return 0
+        statement_size = len(self.get_delete_statement(table_name, primary_key,
+                                                       []))
+        return script_count * statement_size + row_count + data_length
+
+    def get_ordered_query(self, query: str, key_column: str,
+                          key_after: str = None) -> str:
+        """Builds an SQL query ordering the query result by the key column
+        and skipping the rows up to the key value.
+
+        :param query: the text of the query to order.
+        :param key_column: the name of the key column of the query result.
+        :param key_after: the SQL literal of the last processed key value, all
+        rows are returned if empty.
+        :return: the text of the SQL query.
+        """
+
+        condition = ''
+        if key_after is not None:
+            condition = self.__templates.key_after_condition.format(key_column,
+                                                                    key_after)
+        return self.__templates.ordered_query.format(
+            query.rstrip().rstrip(';'), key_column, condition)
+
+    def get_schema_version_query(self) -> str:
+        """Builds an SQL query for getting the fingerprint of the database
+        schema.
+
+        :return: the text of the SQL query.
+        """
+
+        return self.__templates.schema_version_query
+
+    def get_key_range_query(self, primary_key: str, db_name: str,
+                            table_name: str, table_hint: str = None) -> str:
+        """Builds an SQL query for getting the primary key range of the
+        table.
+
+        :param primary_key: the name of the primary key column.
+        :param db_name: the name of the database.
+        :param table_name: the name of the target database table.
+        :param table_hint: the table hint, like nolock, no hint if empty.
+        :return: the text of the SQL query.
+        """
+
+        return self.__templates.key_range_query.format(
+            primary_key, db_name, table_name, self.__get_table_hint(table_hint))
+
+    def get_bucket_checksum_query(self, primary_key: str,
+                                  column_list: list[str], db_name: str,
+                                  table_name: str, low_key: int,
+                                  high_key: int, bucket_size: int,
+                                  table_hint: str = None) \
+            -> tuple[str, list[Any]]:
+        """Builds an SQL query for the row counts and the checksums of the
+        primary key buckets in the key range. The keys and the bucket width
+        are passed as parameters.
+
+        :param primary_key: the name of the primary key column.
+        :param column_list: the list of the column names for the table.
+        :param db_name: the name of the database.
+        :param table_name: the name of the target database table.
+        :param low_key: the low key of the range.
+        :param high_key: the high key of the range.
+        :param bucket_size: the width of a bucket.
+        :param table_hint: the table hint, like nolock, no hint if empty.
+        :return: the text of the SQL query with the ? parameter markers and
+        the list of the parameter values.
+        """
+
+        fields = SqlQueryBuilder.__get_columns_str(column_list, 'src.{0}')
+        return SqlQueryBuilder.__format_with_params(
+            self.__templates.bucket_checksum_query,
+            [primary_key, fields, db_name, table_name, None, None, None,
+             self.__get_table_hint(table_hint)],
+            {4: low_key, 5: high_key, 6: bucket_size})
+
+    def get_row_checksum_query(self, primary_key: str, column_list: list[str],
+                               db_name: str, table_name: str, low_key: int,
+                               high_key: int, table_hint: str = None) \
+            -> tuple[str, list[Any]]:
+        """Builds an SQL query for the checksums of the rows in the key
+        range. The keys are passed as parameters.
+
+        :param primary_key: the name of the primary key column.
+        :param column_list: the list of the column names for the table.
+        :param db_name: the name of the database.
+        :param table_name: the name of the target database table.
+        :param low_key: the low key of the range.
+        :param high_key: the high key of the range.
+        :param table_hint: the table hint, like nolock, no hint if empty.
+        :return: the text of the SQL query with the ? parameter markers and
+        the list of the parameter values.
+        """
+
+        fields = SqlQueryBuilder.__get_columns_str(column_list, 'src.{0}')
+        return SqlQueryBuilder.__format_with_params(
+            self.__templates.row_checksum_query,
+            [primary_key, fields, db_name, table_name, None, None,
+             self.__get_table_hint(table_hint)],
+            {4: low_key, 5: high_key})
+
+    def get_keys_rows_query(self, column_list: list[str], db_name: str,
+                            table_name: str, primary_key: str,
+                            key_list: list[Any],
+                            table_hint: str = None) -> tuple[str, list[Any]]:
+        """Builds an SQL query for getting the rows by the primary key list.
+        The keys are passed as parameters, a marker for each key.
+
+        :param column_list: the list of the column names for the table.
+        :param db_name: the name of the database.
+        :param table_name: the name of the target database table.
+        :param primary_key: the name of the primary key column.
+        :param key_list: the list of the primary key values.
+        :param table_hint: the table hint, like nolock, no hint if empty.
+        :return: the text of the SQL query with the ? parameter markers and
+        the list of the parameter values.
+        """
+
+        fields = SqlQueryBuilder.__get_columns_str(column_list, 'src.{0}')
+        return SqlQueryBuilder.__format_with_params(
+            self.__templates.keys_rows_query,
+            [fields, db_name, table_name, primary_key, None,
+             self.__get_table_hint(table_hint)],
+            {4: list(key_list)})
+
+    def get_statistics_statement(self, enabled: bool) -> str:
+        """Builds an SQL statement switching the IO and time statistics
+        messages of the queries in the session.
+
+        :param enabled: True to switch the messages on, False to switch off.
+        :return: the text of the SQL statement.
+        """
+
+        return self.__templates.statistics_statement.format(
+            "on" if enabled else "off")
+
+    def get_showplan_statement(self, enabled: bool) -> str:
+        """Builds an SQL statement switching the session to return the
+        estimated plan XML instead of executing the queries.
+
+        :param enabled: True to switch the plan output on, False to switch
+        off.
+        :return: the text of the SQL statement.
+        """
+
+        return self.__templates.showplan_statement.format(
+            "on" if enabled else "off")
+
+    def get_self_reference_query(self, table_name: str) -> str:
+        """Builds an SQL query for getting the foreign key column of the
+        table referring to the same table.
+
+        :param table_name: the name of the target database table.
+        :return: the text of the SQL query.
+        """
+
+        return self.__templates.self_reference_query.format(table_name)
+
+    def get_hierarchy_ordered_query(self, query: str, key_column: str,
+                                    db_name: str, table_name: str,
+                                    parent_column: str, key_after: str = None,
+                                    descending: bool = False,
+                                    table_hint: str = None) -> str:
+        """Builds an SQL query ordering the query result by the hierarchy
+        depth of the self-referencing table rows, parents before children,
+        then by the key column, and skipping the rows up to the key value.
+
+        :param query: the text of the query to order.
+        :param key_column: the name of the key column of the query result.
+        :param db_name: the name of the database to compute the hierarchy.
+        :param table_name: the name of the self-referencing database table.
+        :param parent_column: the name of the column referring to the parent
+        row.
+        :param key_after: the SQL literal of the last processed key value, all
+        rows are returned if empty.
+        :param descending: if True orders children before parents.
+        :param table_hint: the table hint of the hierarchy table, like
+        nolock, no hint if empty.
+        :return: the text of the SQL query.
+        """
+
+        condition = ''
+        if key_after is not None:
+            condition = self.__templates.hierarchy_key_after_condition.format(
+                key_column, key_after, "<" if descending else ">")
+        return self.__templates.hierarchy_ordered_query.format(
+            query.rstrip().rstrip(';'), key_column, condition, db_name,
+            table_name, parent_column, "desc" if descending else "asc",
+            self.__get_table_hint(table_hint))
+
+    def get_isolation_level_statement(self, level: str) -> str:
+        """Builds an SQL statement setting the isolation level of the next
+        transactions in the session. The snapshot level is replaced with the
+        snapshot isolation level of the dialect.
+
+        :param level: the isolation level, like snapshot or read committed.
+        :return: the text of the SQL statement.
+        """
+
+        if level == "snapshot":
+            level = self.__templates.snapshot_isolation_level
+        return self.__templates.isolation_level_statement.format(level)
+
+    def get_maxdop_query(self, query: str, maxdop: int) -> str:
+        """Builds an SQL query limiting the number of the processors used by
+        a parallel plan of the query. The hint is added to the query hints of
+        the query if it has them already.
+
+        :param query: the text of the query.
+        :param maxdop: the maximum degree of parallelism.
+        :return: the text of the SQL query.
+        """
+
+        query = query.rstrip().rstrip(';')
+        options = self.__templates.maxdop_option.format(maxdop)
+        match = SqlQueryBuilder.__OPTION_RE.search(query)
+        if match:
+            query = query[:match.start()]
+            options = match.group(1) + ", " + options
+        return self.__templates.query_option_pattern.format(query, options)
+
+    def get_wait_stats_query(self) -> str:
+        """Builds an SQL query for getting the total resource wait time of
+        the server in milliseconds.
+
+        :return: the text of the SQL query.
+        """
+
+        return self.__templates.wait_stats_query
+
+    def supports(self, feature: str) -> bool:
+        """Checks the dialect of the templates has the feature, so the
+        settings using it can be rejected before the run.
+
+        :param feature: the feature name: table_hint, snapshot, maxdop,
+        wait_stats, statistics, showplan or bucket_diff.
+        :raise KeyError: if the feature name is unknown.
+        :return: True if the templates of the feature are implemented.
+        """
+
+        try:
+            for name in SqlQueryBuilder.__FEATURES[feature]:
+                getattr(self.__templates, name)
+        except NotImplementedError:
+            return False
+        return True
+
+    def __is_copied(self) -> bool:
+        """Checks the full uploads use the bulk copy.
+
+        :return: True if the bulk copy is on and the dialect has it.
+        """
+
+        return bool(self.__bulk_copy and self.__templates.copy_statement)
+
+    def __is_staged(self, row_count: int) -> bool:
+        """Checks the rows of the upsert statement are staged.
+
+        :param row_count: the number of rows in the statement.
+        :return: True if the rows are above the stage threshold and the
+        dialect has the stage statement.
+        """
+
+        return bool(self.__stage_threshold
+                    and row_count > self.__stage_threshold
+                    and self.__templates.stage_statement)
+
+    def __is_json(self, type_list: Union[list[str], None]) -> bool:
+        """Checks the rows of the upsert statement are passed as a JSON
+        payload.
+
+        :param type_list: the list of the column types for the table.
+        :return: True if the JSON payload is on, the column types are known
+        and the dialect has the JSON upsert statement.
+        """
+
+        return bool(self.__json_payload and type_list
+                    and self.__templates.json_upsert_statement)
+
+    def __get_json_statement(self, table_name: str, column_list: list[str],
+                             type_list: list[str],
+                             data: list[list[Union[None, int, float, str,
+                                                   datetime, Decimal]]],
+                             primary_key: str) -> str:
+        """Builds an SQL statement for upserting rows to the database table
+        from the JSON payload. The rows are serialized by json.dumps, the
+        values json has no type for are formatted by __get_json_value.
+
+        :param table_name: the name of the target database table.
+        :param column_list: the list of the column names for the table.
+        :param type_list: the list of the column types for the table.
+        :param data: the list of rows. Each row is a list of values.
+        :param primary_key: the name of the primary key column.
+        :raise TypeError: if the value type from the data not in
+        Union[None, int, float, str, datetime, Decimal].
+        :return: the text of the SQL statement.
+        """
+
+        fields = SqlQueryBuilder.__get_columns_str(column_list)
+        payload = json.dumps([tuple(row) for row in data],
+                             ensure_ascii=False, check_circular=False,
+                             separators=(',', ':'),
+                             default=SqlQueryBuilder.__get_json_value)
+        definitions = ',\n        '.join(
+            self.__templates.json_column_pattern.format(col, col_type, num)
+            for num, (col, col_type) in enumerate(zip(column_list,
+                                                      type_list)))
+        upd_columns = [col for col in column_list if col != primary_key]
+        upd_fields = SqlQueryBuilder.__get_columns_str(
+            upd_columns, self.__templates.upsert_link_pattern,
+            ',\n' + ' ' * 12)
+        src_fields = SqlQueryBuilder.__get_columns_str(column_list, 'src.{0}')
+        return self.__templates.json_upsert_statement.format(
+            table_name, fields, "N'" + payload.replace("'", "''") + "'",
+            primary_key, upd_fields, src_fields, definitions)
+
+    def __get_stage_statement(self, table_name: str, column_list: list[str],
+                              data: list[list[Union[None, int, float, str,
+                                                    datetime]]],
+                              primary_key: str) -> str:
+        """Builds an SQL statement for upserting rows to the database table
+        through the staging table, the rows are inserted into the staging
+        table by batches of at most 1000 rows.
+
+        :param table_name: the name of the target database table.
+        :param column_list: the list of the column names for the table.
+        :param data: the list of rows. Each row is a list of values.
+        :param primary_key: the name of the primary key column.
+        :raise TypeError: if the value type from the data not in
+        Union[None, int, float, str, datetime].
+        :return: the text of the SQL statement.
+        """
+
+        fields = SqlQueryBuilder.__get_columns_str(column_list)
+        batch_rows = SqlQueryBuilder.__STAGE_BATCH_ROWS
+        inserts = []
+        for start in range(0, len(data), batch_rows):
+            values = ',\n    '.join(
+                SqlQueryBuilder.__get_str_value_row(row)
+                for row in data[start:start + batch_rows])
+            inserts.append(self.__templates.stage_insert_statement.format(
+                fields, values))
+        upd_columns = [col for col in column_list if col != primary_key]
+        upd_fields = SqlQueryBuilder.__get_columns_str(
+            upd_columns, self.__templates.upsert_link_pattern, ',\n    ')
+        src_fields = SqlQueryBuilder.__get_columns_str(column_list, 'src.{0}')
+        return self.__templates.stage_statement.format(
+            table_name, fields, ''.join(inserts), primary_key, upd_fields,
+            src_fields)
+
+    def __get_table_hint(self, table_hint: str) -> str:
+        """Formats the table hint added after the table alias.
+
+        :param table_hint: the table hint, like nolock.
+        :return: the formatted hint or an empty string if the hint is empty.
+        """
+
+        if not table_hint:
+            return ''
+        return self.__templates.table_hint_pattern.format(table_hint)
+
+    @staticmethod
+    def get_literal(value: Union[None, int, float, str, datetime]) -> str:
+        """Formats the value as an SQL literal.
+
+        :param value: value to format.
+        :raise TypeError: if the value type not in Union[None, int, float, str,
+        datetime].
+        :return: formatted string presentation of the value.
+        """
+
+        return SqlQueryBuilder.__get_str_value(value)
+
+    @staticmethod
+    def __format_with_params(template: str, args: list[Any],
+                             params: dict[int: Any]) -> tuple[str, list[Any]]:
+        """Formats the template with the ? parameter markers in place of the
+        parameter placeholders and collects the parameter values in the order
+        of the markers in the template, so the order doesn't depend on the
+        dialect. A list value is expanded to a marker for each item.
+
+        :param template: the template of the SQL query.
+        :param args: the values of the placeholders, the values of the
+        parameter placeholders are not used.
+        :param params: a dictionary with the numbers of the parameter
+        placeholders as keys and the parameter values as values.
+        :return: the text of the SQL query and the list of the parameter
+        values.
+        """
+
+        args = list(args)
+        for index, value in params.items():
+            args[index] = ','.join('?' * len(value)) \
+                if isinstance(value, list) else '?'
+        values = []
+        for _, field, _, _ in Formatter().parse(template):
+            if field and int(field) in params:
+                value = params[int(field)]
+                values += value if isinstance(value, list) else [value]
+        return template.format(*args), values
+
     @staticmethod
     def __get_columns_str(column_list: list[str], pattern: str = '{0}',
                           sep: str = ',') -> str:
@@ -186,6 +870,51 @@ class SqlQueryBuilder(object):
         str_values = [SqlQueryBuilder.__get_str_value(value) for value in row]
         return '(' + ','.join(str_values) + ')'
 
+    @staticmethod
+    def __get_copy_row(row: list[Union[None, int, float, str,
+                                       datetime]]) -> str:
+        """Formats the row as a line of the COPY text format: the values are
+        separated by tabs, null values are written as \\N and the backslashes,
+        tabs and line breaks of the strings are escaped.
+
+        :param row: the list of the values to format.
+        :raise TypeError: if the value type from the row not in
+        Union[None, int, float, str, datetime].
+        :return: formatted line with the values.
+        """
+
+        values = []
+        for value in row:
+            if value is None:
+                values.append('\\N')
+            elif type(value) == int or type(value) == float:
+                values.append(str(value))
+            elif type(value) == str:
+                values.append(value.translate(SqlQueryBuilder.__COPY_ESCAPES))
+            elif type(value) == datetime:
+                values.append(value.isoformat(sep=' ',
+                                              timespec='milliseconds'))
+            else:
+                raise TypeError(
+                    f'indefinite type to formatting: {type(value)}')
+        return '\t'.join(values)
+
+    @staticmethod
+    def __get_json_value(value: Union[datetime, Decimal]) -> str:
+        """Formats the value json.dumps has no type for as a JSON string,
+        the server converts the string to the column type.
+
+        :param value: value to format.
+        :raise TypeError: if the value type not in Union[datetime, Decimal].
+        :return: formatted string presentation of the value.
+        """
+
+        if type(value) == datetime:
+            return value.isoformat(timespec='milliseconds')
+        elif type(value) == Decimal:
+            return str(value)
+        raise TypeError(f'indefinite type to formatting: {type(value)}')
+
     @staticmethod
     def __get_str_value(value: Union[None, int, float, str, datetime]) -> str:
         """Formats the value to include in the SQL statement.
@@ -19,6 +19,65 @@ class SqlServerTemplates(SqlTemplates):
         SQL statement for deleting rows from the database table.
     upsert_statement: str
         SQL statement for updating and inserting rows to the database table.
+    upsert_link_pattern: str
+        SQL pattern of a column update in the upsert statement.
+    copy_statement: str
+        SQL statement for uploading rows with a bulk copy, empty.
+    stage_statement: str
+        SQL statement for upserting rows through the #stage temporary table.
+    stage_insert_statement: str
+        SQL statement for inserting a batch of rows to the #stage table.
+    json_upsert_statement: str
+        SQL statement for upserting rows shredded from a JSON payload.
+    json_column_pattern: str
+        SQL pattern of a column definition in the openjson with clause.
+    count_query: str
+        SQL query template for counting rows and data length of a query result.
+    column_length_pattern: str
+        SQL expression pattern for the data length of a column value.
+    ordered_query: str
+        SQL query template for ordering a query result by the key column.
+    key_after_condition: str
+        SQL condition template for the rows after the key value.
+    schema_version_query: str
+        SQL query for getting the fingerprint of the database schema.
+    key_range_query: str
+        SQL query template for getting the primary key range of the table.
+    bucket_checksum_query: str
+        SQL query template for the checksums of the primary key buckets.
+    row_checksum_query: str
+        SQL query template for the checksums of the rows in a key range.
+    keys_rows_query: str
+        SQL query template for getting the rows by the primary key list.
+    search_hash_upsert_query: str
+        SQL query template for searching updated rows by the row hashes.
+    row_hash_pattern: str
+        SQL expression pattern for the hash of the row columns.
+    statistics_statement: str
+        SQL statement template for switching the query statistics messages.
+    showplan_statement: str
+        SQL statement template for switching the estimated plan output.
+    self_reference_query: str
+        SQL query template for getting the foreign key column referring to
+        the same table.
+    hierarchy_ordered_query: str
+        SQL query template for ordering a query result by the hierarchy depth
+        of the self-referencing table rows.
+    hierarchy_key_after_condition: str
+        SQL condition template for the rows after the key value in the
+        hierarchy ordered query.
+    table_hint_pattern: str
+        SQL pattern of the table hint added after a table alias.
+    isolation_level_statement: str
+        SQL statement template for setting the transaction isolation level.
+    snapshot_isolation_level: str
+        The name of the snapshot isolation level of the dialect.
+    query_option_pattern: str
+        SQL pattern of a query with the query hints.
+    maxdop_option: str
+        SQL query hint template limiting the parallelism of a query.
+    wait_stats_query: str
+        SQL query for getting the total resource wait time of the server.
     """
 
     @property
@@ -31,7 +90,22 @@ class SqlServerTemplates(SqlTemplates):
             "select \n"
             "   c.name as ColumnName,\n"
             "   case when c.name like '%_updDT' then 1 else 0 end as IsUpdDT,\n"
-            "   sign(c.status & 128) as IsIdentity\n"
+            "   sign(c.status & 128) as IsIdentity,\n"
+            "   type_name(c.xtype) + case\n"
+            "       when type_name(c.xtype) in ('decimal', 'numeric')\n"
+            "           then '(' + cast(c.xprec as varchar(10)) + ','\n"
+            "               + cast(c.xscale as varchar(10)) + ')'\n"
+            "       when type_name(c.xtype) in ('datetime2', 'time',\n"
+            "           'datetimeoffset')\n"
+            "           then '(' + cast(c.xscale as varchar(10)) + ')'\n"
+            "       when c.length = -1\n"
+            "           and type_name(c.xtype) like '%char'\n"
+            "           then '(max)'\n"
+            "       when type_name(c.xtype) in ('nchar', 'nvarchar')\n"
+            "           then '(' + cast(c.length / 2 as varchar(10)) + ')'\n"
+            "       when type_name(c.xtype) in ('char', 'varchar')\n"
+            "           then '(' + cast(c.length as varchar(10)) + ')'\n"
+            "       else '' end as ColumnType\n"
             "from syscolumns as c\n"
             "   inner join systypes as t on c.xtype = t.xtype\n"
             "       and c.usertype = t.usertype\n"
@@ -60,6 +134,7 @@ class SqlServerTemplates(SqlTemplates):
         Uses the name of the database table as a placeholder 1.
         Uses the name of the work database as a placeholder 2.
         Uses the name of the clear database as a placeholder 3.
+        Uses the table hint of the work table as a placeholder 4.
         """
 
         return (
@@ -67,7 +142,7 @@ class SqlServerTemplates(SqlTemplates):
             "from {3}.{1} as clr\n"
             "where not exists(\n"
             "    select 1\n"
-            "    from {2}.{1} as src\n"
+            "    from {2}.{1} as src{4}\n"
             "    where clr.{0} = src.{0});\n")
 
     @property
@@ -79,6 +154,7 @@ class SqlServerTemplates(SqlTemplates):
         Uses the name of the primary key column as a placeholder 3.
         Uses the name of the update date column as a placeholder 4.
         Uses the name of the clear database as a placeholder 5.
+        Uses the table hint of the work table as a placeholder 6.
 
         Warning: please, don't add a semicolon at the end of query.
         Day count condition can be added at the end of this query.
@@ -87,7 +163,7 @@ class SqlServerTemplates(SqlTemplates):
         return (
             "select\n"
             "    {0}\n"
-            "from {1}.{2} as src\n"
+            "from {1}.{2} as src{6}\n"
             "where not exists(\n"
             "    select 1\n"
             "    from {5}.{2} as clr\n"
@@ -99,13 +175,14 @@ class SqlServerTemplates(SqlTemplates):
         """SQL query template for getting all rows from the database table.
         Uses the column names list as a placeholder 0.
         Uses the name of the work database as a placeholder 1.
-        Uses the name of the clear database as a placeholder 3.
+        Uses the name of the database table as a placeholder 2.
+        Uses the table hint of the work table as a placeholder 3.
         """
 
         return (
             "select\n"
             "    {0}\n"
-            "from {1}.{2} as src\n")
+            "from {1}.{2} as src{3}\n")
 
     @property
     def delete_statement(self) -> str:
@@ -152,3 +229,465 @@ class SqlServerTemplates(SqlTemplates):
             "            {5});\n"
             "set identity_insert {0} off;\n"
             "GO\n")
+
+    @property
+    def upsert_link_pattern(self) -> str:
+        """SQL pattern of a column update in the upsert statement.
+        Uses the name of the column as a placeholder 0.
+        """
+
+        return "trg.{0} = src.{0}"
+
+    @property
+    def copy_statement(self) -> str:
+        """SQL Server bulk insert reads the rows from a file and not from
+        the script, so the rows of the full uploads are upserted.
+        """
+
+        return ""
+
+    @property
+    def stage_statement(self) -> str:
+        """SQL statement for updating and inserting rows to the database
+        table through the #stage temporary table. The union of the empty
+        selects creates #stage without the identity property of the table,
+        the index on the primary key lets the update and the insert join
+        #stage by the key instead of scanning it.
+        Uses the name of the database table as a placeholder 0.
+        Uses the column names list as a placeholder 1.
+        Uses the batch inserts (stage_insert_statement) as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the fields links list as a placeholder 4.
+        Example: trg.column = src.column. The list must not contain
+        a primary key.
+        Uses the src.column list as a placeholder 5.
+        """
+
+        return (
+            "if object_id('tempdb..#stage') is not null drop table #stage;\n"
+            "select top (0)\n"
+            "    {1}\n"
+            "into #stage\n"
+            "from {0}\n"
+            "union all\n"
+            "select top (0)\n"
+            "    {1}\n"
+            "from {0};\n"
+            "{2}"
+            "create unique clustered index ix_stage on #stage({3});\n"
+            "update trg set\n"
+            "    {4}\n"
+            "from {0} as trg\n"
+            "    join #stage as src on trg.{3} = src.{3};\n"
+            "set identity_insert {0} on;\n"
+            "insert into {0}(\n"
+            "    {1})\n"
+            "select\n"
+            "    {5}\n"
+            "from #stage as src\n"
+            "where not exists(\n"
+            "    select 1 from {0} as trg where trg.{3} = src.{3});\n"
+            "set identity_insert {0} off;\n"
+            "drop table #stage;\n"
+            "GO\n")
+
+    @property
+    def stage_insert_statement(self) -> str:
+        """SQL statement for inserting a batch of rows to the #stage table,
+        the values list of one insert is limited to 1000 rows.
+        Uses the column names list as a placeholder 0.
+        Uses the values list of the batch rows as a placeholder 1.
+        """
+
+        return (
+            "insert into #stage(\n"
+            "    {0})\n"
+            "values\n"
+            "    {1};\n")
+
+    @property
+    def json_upsert_statement(self) -> str:
+        """SQL statement for updating and inserting rows to the database
+        table, the merge source shreds the JSON payload with openjson. The
+        payload is parsed once instead of a literal per value.
+        Uses the name of the database table as a placeholder 0.
+        Uses the column names list as a placeholder 1.
+        Uses the JSON payload literal as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the fields links list as a placeholder 4.
+        Example: trg.column = src.column. The list must not contain
+        a primary key.
+        Uses the src.column list as a placeholder 5.
+        Uses the column definitions list of the with clause as
+        a placeholder 6.
+        """
+
+        return (
+            "set identity_insert {0} on;\n"
+            "with src as(\n"
+            "    select\n"
+            "        {1}\n"
+            "    from openjson({2})\n"
+            "    with(\n"
+            "        {6}))\n"
+            "merge {0} as trg\n"
+            "    using src on trg.{3} = src.{3}\n"
+            "    when matched then\n"
+            "        update set\n"
+            "            {4}\n"
+            "    when not matched by target then\n"
+            "        insert(\n"
+            "        {1})\n"
+            "        values(\n"
+            "            {5});\n"
+            "set identity_insert {0} off;\n"
+            "GO\n")
+
+    @property
+    def json_column_pattern(self) -> str:
+        """SQL pattern of a column definition in the openjson with clause,
+        the value is read by its index in the row array.
+        Uses the name of the column as a placeholder 0.
+        Uses the type of the column as a placeholder 1.
+        Uses the index of the value in the row array as a placeholder 2.
+        """
+
+        return "{0} {1} '$[{2}]'"
+
+    @property
+    def count_query(self) -> str:
+        """SQL query template for counting rows and data length of a query
+        result.
+        Uses the text of the query without a semicolon as a placeholder 0.
+        Uses the row data length expression as a placeholder 1.
+        """
+
+        return (
+            "select\n"
+            "    count(*) as row_count,\n"
+            "    isnull(sum(cast({1} as bigint)), 0) as data_length\n"
+            "from(\n"
+            "{0}) as q;\n")
+
+    @property
+    def column_length_pattern(self) -> str:
+        """SQL expression pattern for the data length of a column value in
+        the count query, null values are counted as a literal length.
+        Uses the name of the column as a placeholder 0.
+        """
+
+        return "isnull(datalength(q.{0}), 4)"
+
+    @property
+    def ordered_query(self) -> str:
+        """SQL query template for ordering a query result by the key column.
+        Uses the text of the query without a semicolon as a placeholder 0.
+        Uses the name of the key column as a placeholder 1.
+        Uses the key condition (key_after_condition or an empty string) as
+        a placeholder 2.
+        """
+
+        return (
+            "select ord.*\n"
+            "from(\n"
+            "{0}) as ord\n"
+            "{2}"
+            "order by ord.{1};\n")
+
+    @property
+    def key_after_condition(self) -> str:
+        """SQL condition template for the rows after the key value in the
+        ordered query.
+        Uses the name of the key column as a placeholder 0.
+        Uses the key value as a placeholder 1.
+        """
+
+        return "where ord.{0} > {1}\n"
+
+    @property
+    def schema_version_query(self) -> str:
+        """SQL query for getting the fingerprint of the database schema, which
+        changes when a table or a foreign key is created, altered or dropped.
+        """
+
+        return (
+            "select checksum_agg(checksum(o.object_id, o.modify_date))\n"
+            "from sys.objects as o\n"
+            "where o.type in ('U', 'F');\n")
+
+    @property
+    def key_range_query(self) -> str:
+        """SQL query template for getting the primary key range of the
+        database table.
+        Uses the name of the primary key column as a placeholder 0.
+        Uses the name of the database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the table hint as a placeholder 3.
+        """
+
+        return (
+            "select\n"
+            "    min(src.{0}) as min_key,\n"
+            "    max(src.{0}) as max_key\n"
+            "from {1}.{2} as src{3};\n")
+
+    @property
+    def bucket_checksum_query(self) -> str:
+        """SQL query template for the row counts and the checksums of the
+        primary key buckets in the key range. The key range is split into
+        the buckets of the same width, the buckets are numbered from zero.
+        Uses the name of the primary key column as a placeholder 0.
+        Uses the column names list as a placeholder 1.
+        Uses the name of the database as a placeholder 2.
+        Uses the name of the database table as a placeholder 3.
+        Uses the low key of the range as a placeholder 4.
+        Uses the high key of the range as a placeholder 5.
+        Uses the bucket width as a placeholder 6.
+        Uses the table hint as a placeholder 7.
+        """
+
+        return (
+            "select\n"
+            "    b.bucket,\n"
+            "    count(*) as row_count,\n"
+            "    checksum_agg(b.row_hash) as bucket_hash\n"
+            "from(\n"
+            "    select\n"
+            "        (src.{0} - {4}) / {6} as bucket,\n"
+            "        binary_checksum({1}) as row_hash\n"
+            "    from {2}.{3} as src{7}\n"
+            "    where src.{0} between {4} and {5}) as b\n"
+            "group by b.bucket;\n")
+
+    @property
+    def row_checksum_query(self) -> str:
+        """SQL query template for the checksums of the rows in the key
+        range.
+        Uses the name of the primary key column as a placeholder 0.
+        Uses the column names list as a placeholder 1.
+        Uses the name of the database as a placeholder 2.
+        Uses the name of the database table as a placeholder 3.
+        Uses the low key of the range as a placeholder 4.
+        Uses the high key of the range as a placeholder 5.
+        Uses the table hint as a placeholder 6.
+        """
+
+        return (
+            "select\n"
+            "    src.{0} as row_key,\n"
+            "    binary_checksum({1}) as row_hash\n"
+            "from {2}.{3} as src{6}\n"
+            "where src.{0} between {4} and {5};\n")
+
+    @property
+    def keys_rows_query(self) -> str:
+        """SQL query template for getting the rows by the primary key
+        list.
+        Uses the column names list as a placeholder 0.
+        Uses the name of the database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the primary key list as a placeholder 4.
+        Uses the table hint as a placeholder 5.
+
+        Warning: please, don't add a semicolon at the end of query.
+        """
+
+        return (
+            "select\n"
+            "    {0}\n"
+            "from {1}.{2} as src{5}\n"
+            "where src.{3} in ({4})")
+
+    @property
+    def search_hash_upsert_query(self) -> str:
+        """SQL query template for searching updated rows in the database
+        table without an update date column, the rows are compared by the
+        hashes of their columns.
+        Uses the column names list as a placeholder 0.
+        Uses the name of the work database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the name of the clear database as a placeholder 4.
+        Uses the row hash expression of the work table as a placeholder 5.
+        Uses the row hash expression of the clear table as a placeholder 6.
+        Uses the table hint of the work table as a placeholder 7.
+
+        Warning: please, don't add a semicolon at the end of query.
+        """
+
+        return (
+            "select\n"
+            "    {0}\n"
+            "from {1}.{2} as src{7}\n"
+            "where not exists(\n"
+            "    select 1\n"
+            "    from {4}.{2} as clr\n"
+            "    where clr.{3} = src.{3}\n"
+            "        and {6} = {5})")
+
+    @property
+    def row_hash_pattern(self) -> str:
+        """SQL expression pattern for the hash of the row columns, the
+        columns are serialized with their names, so null values and empty
+        strings give different hashes.
+        Uses the column names list with the table alias as a placeholder 0.
+        """
+
+        return (
+            "hashbytes('SHA2_256', cast((select {0}\n"
+            "            for xml raw, binary base64) as nvarchar(max)))")
+
+    @property
+    def statistics_statement(self) -> str:
+        """SQL statement template for switching the IO and time
+        statistics messages of the queries in the session.
+        Uses on or off as a placeholder 0.
+        """
+
+        return "set statistics io, time {0};"
+
+    @property
+    def showplan_statement(self) -> str:
+        """SQL statement template for switching the session to return the
+        estimated plan XML instead of executing the queries.
+        Uses on or off as a placeholder 0.
+        """
+
+        return "set showplan_xml {0};"
+
+    @property
+    def self_reference_query(self) -> str:
+        """SQL query template for getting the foreign key column of the
+        database table referring to the same table.
+        Uses the name of the database table as a placeholder 0.
+        """
+
+        return (
+            "select col_name(fkc.parent_object_id, fkc.parent_column_id)\n"
+            "    as column_name\n"
+            "from sys.foreign_key_columns as fkc\n"
+            "where fkc.parent_object_id = object_id('{0}')\n"
+            "    and fkc.referenced_object_id = object_id('{0}');")
+
+    @property
+    def hierarchy_ordered_query(self) -> str:
+        """SQL query template for ordering a query result by the hierarchy
+        depth of the self-referencing table rows and by the key column. The
+        depth is computed by a recursive query from the root rows, the rows
+        not reachable from the roots are ordered as the deepest ones.
+        Uses the text of the query without a semicolon as a placeholder 0.
+        Uses the name of the key column as a placeholder 1.
+        Uses the key condition (hierarchy_key_after_condition or an empty
+        string) as a placeholder 2.
+        Uses the name of the database with the hierarchy as a placeholder 3.
+        Uses the name of the database table as a placeholder 4.
+        Uses the name of the parent key column as a placeholder 5.
+        Uses the depth order direction (asc or desc) as a placeholder 6.
+        Uses the table hint as a placeholder 7.
+        """
+
+        return (
+            "with hierarchy as(\n"
+            "    select\n"
+            "        src.{1} as row_key,\n"
+            "        0 as depth\n"
+            "    from {3}.{4} as src{7}\n"
+            "    where src.{5} is null\n"
+            "        or src.{5} = src.{1}\n"
+            "    union all\n"
+            "    select\n"
+            "        src.{1},\n"
+            "        hierarchy.depth + 1\n"
+            "    from {3}.{4} as src{7}\n"
+            "        join hierarchy on src.{5} = hierarchy.row_key\n"
+            "    where src.{5} <> src.{1})\n"
+            "select ord.*\n"
+            "from(\n"
+            "{0}) as ord\n"
+            "    left join hierarchy as hier on hier.row_key = ord.{1}\n"
+            "{2}"
+            "order by isnull(hier.depth, 2147483647) {6}, ord.{1}\n"
+            "option (maxrecursion 0);\n")
+
+    @property
+    def hierarchy_key_after_condition(self) -> str:
+        """SQL condition template for the rows after the key value in the
+        hierarchy ordered query.
+        Uses the name of the key column as a placeholder 0.
+        Uses the key value as a placeholder 1.
+        Uses the depth comparison operator (> or <) as a placeholder 2.
+        """
+
+        return (
+            "where isnull(hier.depth, 2147483647) {2} isnull((\n"
+            "        select key_hier.depth\n"
+            "        from hierarchy as key_hier\n"
+            "        where key_hier.row_key = {1}), 2147483647)\n"
+            "    or (isnull(hier.depth, 2147483647) = isnull((\n"
+            "        select key_hier.depth\n"
+            "        from hierarchy as key_hier\n"
+            "        where key_hier.row_key = {1}), 2147483647)\n"
+            "        and ord.{0} > {1})\n")
+
+    @property
+    def table_hint_pattern(self) -> str:
+        """SQL pattern of the table hint added after a table alias, like
+        nolock or readpast.
+        Uses the table hint as a placeholder 0.
+        """
+
+        return " with ({0})"
+
+    @property
+    def isolation_level_statement(self) -> str:
+        """SQL statement template for setting the isolation level of the
+        next transactions in the session.
+        Uses the isolation level, like snapshot or read committed, as a
+        placeholder 0.
+        """
+
+        return "set transaction isolation level {0};"
+
+    @property
+    def snapshot_isolation_level(self) -> str:
+        """The name of the isolation level reading all tables of a
+        transaction as of the moment it started, without blocking the
+        writers. The ALLOW_SNAPSHOT_ISOLATION option of the database has to
+        be ON.
+        """
+
+        return "snapshot"
+
+    @property
+    def query_option_pattern(self) -> str:
+        """SQL pattern of a query with the query hints.
+        Uses the text of the query without a semicolon as a placeholder 0.
+        Uses the query hints list as a placeholder 1.
+        """
+
+        return "{0}\noption ({1});\n"
+
+    @property
+    def maxdop_option(self) -> str:
+        """SQL query hint template limiting the number of the processors
+        used by a parallel plan of the query.
+        Uses the maximum degree of parallelism as a placeholder 0.
+        """
+
+        return "maxdop {0}"
+
+    @property
+    def wait_stats_query(self) -> str:
+        """SQL query for getting the total time in milliseconds the sessions
+        of the server waited for the resources (disk, locks, memory, CPU)
+        since the server start.
+        """
+
+        return (
+            "select isnull(sum(wait_time_ms), 0) as wait_time_ms\n"
+            "from sys.dm_os_wait_stats\n"
+            "where wait_type like 'PAGEIOLATCH%'\n"
+            "    or wait_type like 'LCK_M_%'\n"
+            "    or wait_type in ('RESOURCE_SEMAPHORE', 'SOS_SCHEDULER_YIELD',\n"
+            "        'WRITELOG', 'CXPACKET');")
@@ -21,12 +21,76 @@ class SqlTemplates(metaclass=ABCMeta):
         SQL statement for deleting rows from the database table.
     upsert_statement: str
         SQL statement for updating and inserting rows to the database table.
+    upsert_link_pattern: str
+        SQL pattern of a column update in the upsert statement.
+    copy_statement: str
+        SQL statement for uploading rows to the database table with a bulk
+        copy.
+    stage_statement: str
+        SQL statement for upserting rows to the database table through
+        a staging table.
+    stage_insert_statement: str
+        SQL statement for inserting a batch of rows to the staging table.
+    json_upsert_statement: str
+        SQL statement for updating and inserting rows passed as a JSON
+        payload.
+    json_column_pattern: str
+        SQL pattern of a column definition reading the JSON payload rows.
+    count_query: str
+        SQL query template for counting rows and data length of a query result.
+    column_length_pattern: str
+        SQL expression pattern for the data length of a column value.
+    ordered_query: str
+        SQL query template for ordering a query result by the key column.
+    key_after_condition: str
+        SQL condition template for the rows after the key value.
+    schema_version_query: str
+        SQL query for getting the fingerprint of the database schema.
+    key_range_query: str
+        SQL query template for getting the primary key range of the table.
+    bucket_checksum_query: str
+        SQL query template for the checksums of the primary key buckets.
+    row_checksum_query: str
+        SQL query template for the checksums of the rows in a key range.
+    keys_rows_query: str
+        SQL query template for getting the rows by the primary key list.
+    search_hash_upsert_query: str
+        SQL query template for searching updated rows by the row hashes.
+    row_hash_pattern: str
+        SQL expression pattern for the hash of the row columns.
+    statistics_statement: str
+        SQL statement template for switching the query statistics messages.
+    showplan_statement: str
+        SQL statement template for switching the estimated plan output.
+    self_reference_query: str
+        SQL query template for getting the foreign key column referring to
+        the same table.
+    hierarchy_ordered_query: str
+        SQL query template for ordering a query result by the hierarchy depth
+        of the self-referencing table rows.
+    hierarchy_key_after_condition: str
+        SQL condition template for the rows after the key value in the
+        hierarchy ordered query.
+    table_hint_pattern: str
+        SQL pattern of the table hint added after a table alias.
+    isolation_level_statement: str
+        SQL statement template for setting the transaction isolation level.
+    snapshot_isolation_level: str
+        The name of the snapshot isolation level of the dialect.
+    query_option_pattern: str
+        SQL pattern of a query with the query hints.
+    maxdop_option: str
+        SQL query hint template limiting the parallelism of a query.
+    wait_stats_query: str
+        SQL query for getting the total resource wait time of the server.
     """
 
     @property
     @abstractmethod
     def column_query(self) -> str:
         """SQL query template for getting database table columns by table name.
+        The columns of the result: the column name, the update date flag, the
+        primary key flag and the column type.
         Uses the name of the database table as a placeholder 0.
         """
 
@@ -50,6 +114,7 @@ class SqlTemplates(metaclass=ABCMeta):
         Uses the name of the database table as a placeholder 1.
         Uses the name of the work database as a placeholder 2.
         Uses the name of the clear database as a placeholder 3.
+        Uses the table hint of the work table as a placeholder 4.
         """
 
         pass
@@ -64,6 +129,7 @@ class SqlTemplates(metaclass=ABCMeta):
         Uses the name of the primary key column as a placeholder 3.
         Uses the name of the update date column as a placeholder 4.
         Uses the name of the clear database as a placeholder 5.
+        Uses the table hint of the work table as a placeholder 6.
 
         Warning: please, don't add a semicolon at the end of query.
         Day count condition can be added at the end of this query.
@@ -77,7 +143,8 @@ class SqlTemplates(metaclass=ABCMeta):
         """SQL query template for getting all rows from the database table.
         Uses the column names list as a placeholder 0.
         Uses the name of the work database as a placeholder 1.
-        Uses the name of the clear database as a placeholder 3.
+        Uses the name of the database table as a placeholder 2.
+        Uses the table hint of the work table as a placeholder 3.
         """
 
         pass
@@ -107,3 +174,364 @@ class SqlTemplates(metaclass=ABCMeta):
         """
 
         pass
+
+    @property
+    @abstractmethod
+    def upsert_link_pattern(self) -> str:
+        """SQL pattern of a column update in the upsert statement, like
+        trg.column = src.column.
+        Uses the name of the column as a placeholder 0.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def copy_statement(self) -> str:
+        """SQL statement for uploading all rows to the database table with
+        the bulk copy of the dialect, an empty string if the dialect has no
+        bulk copy and the rows are uploaded with the upsert statement.
+        Uses the name of the database table as a placeholder 0.
+        Uses the column names list as a placeholder 1.
+        Uses the rows in the copy format as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the fields links list as a placeholder 4.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def stage_statement(self) -> str:
+        """SQL statement for updating and inserting rows to the database
+        table through a staging table: the rows are inserted into the
+        staging table by batches, then the target rows are updated and
+        inserted with two set-based statements joining the staging table.
+        An empty string if the dialect has no staging strategy.
+        Uses the name of the database table as a placeholder 0.
+        Uses the column names list as a placeholder 1.
+        Uses the batch inserts (stage_insert_statement) as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the fields links list as a placeholder 4.
+        Uses the src.column list as a placeholder 5.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def stage_insert_statement(self) -> str:
+        """SQL statement for inserting a batch of rows to the staging table
+        of the stage statement.
+        Uses the column names list as a placeholder 0.
+        Uses the values list of the batch rows as a placeholder 1.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def json_upsert_statement(self) -> str:
+        """SQL statement for updating and inserting rows to the database
+        table, the rows are passed as one JSON array of the row arrays and
+        shredded to the columns by the server. An empty string if the
+        dialect has no JSON payload.
+        Uses the name of the database table as a placeholder 0.
+        Uses the column names list as a placeholder 1.
+        Uses the JSON payload literal as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the fields links list as a placeholder 4.
+        Uses the src.column list as a placeholder 5.
+        Uses the column definitions list (json_column_pattern) as
+        a placeholder 6.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def json_column_pattern(self) -> str:
+        """SQL pattern of a column definition reading the value of the JSON
+        payload rows.
+        Uses the name of the column as a placeholder 0.
+        Uses the type of the column as a placeholder 1.
+        Uses the index of the value in the row array as a placeholder 2.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def count_query(self) -> str:
+        """SQL query template for counting rows and data length of a query
+        result.
+        Uses the text of the query without a semicolon as a placeholder 0.
+        Uses the row data length expression as a placeholder 1.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def column_length_pattern(self) -> str:
+        """SQL expression pattern for the data length of a column value in
+        the count query, null values are counted as a literal length.
+        Uses the name of the column as a placeholder 0.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def ordered_query(self) -> str:
+        """SQL query template for ordering a query result by the key column.
+        Uses the text of the query without a semicolon as a placeholder 0.
+        Uses the name of the key column as a placeholder 1.
+        Uses the key condition (key_after_condition or an empty string) as
+        a placeholder 2.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def key_after_condition(self) -> str:
+        """SQL condition template for the rows after the key value in the
+        ordered query.
+        Uses the name of the key column as a placeholder 0.
+        Uses the key value as a placeholder 1.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def schema_version_query(self) -> str:
+        """SQL query for getting the fingerprint of the database schema, which
+        changes when a table or a foreign key is created, altered or dropped.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def key_range_query(self) -> str:
+        """SQL query template for getting the primary key range of the
+        database table.
+        Uses the name of the primary key column as a placeholder 0.
+        Uses the name of the database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the table hint as a placeholder 3.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def bucket_checksum_query(self) -> str:
+        """SQL query template for the row counts and the checksums of the
+        primary key buckets in the key range. The key range is split into
+        the buckets of the same width, the buckets are numbered from zero.
+        Uses the name of the primary key column as a placeholder 0.
+        Uses the column names list as a placeholder 1.
+        Uses the name of the database as a placeholder 2.
+        Uses the name of the database table as a placeholder 3.
+        Uses the low key of the range as a placeholder 4.
+        Uses the high key of the range as a placeholder 5.
+        Uses the bucket width as a placeholder 6.
+        Uses the table hint as a placeholder 7.
+
+        Warning: the keys and the width are filled in with the parameter
+        markers, so an expression with them can't be repeated in the group by
+        clause, group by a column of a derived table instead.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def row_checksum_query(self) -> str:
+        """SQL query template for the checksums of the rows in the key
+        range.
+        Uses the name of the primary key column as a placeholder 0.
+        Uses the column names list as a placeholder 1.
+        Uses the name of the database as a placeholder 2.
+        Uses the name of the database table as a placeholder 3.
+        Uses the low key of the range as a placeholder 4.
+        Uses the high key of the range as a placeholder 5.
+        Uses the table hint as a placeholder 6.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def keys_rows_query(self) -> str:
+        """SQL query template for getting the rows by the primary key
+        list.
+        Uses the column names list as a placeholder 0.
+        Uses the name of the database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the primary key list as a placeholder 4.
+        Uses the table hint as a placeholder 5.
+
+        Warning: please, don't add a semicolon at the end of query.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def search_hash_upsert_query(self) -> str:
+        """SQL query template for searching updated rows in the database
+        table without an update date column, the rows are compared by the
+        hashes of their columns.
+        Uses the column names list as a placeholder 0.
+        Uses the name of the work database as a placeholder 1.
+        Uses the name of the database table as a placeholder 2.
+        Uses the name of the primary key column as a placeholder 3.
+        Uses the name of the clear database as a placeholder 4.
+        Uses the row hash expression of the work table as a placeholder 5.
+        Uses the row hash expression of the clear table as a placeholder 6.
+        Uses the table hint of the work table as a placeholder 7.
+
+        Warning: please, don't add a semicolon at the end of query.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def row_hash_pattern(self) -> str:
+        """SQL expression pattern for the hash of the row columns, the
+        columns are serialized with their names, so null values and empty
+        strings give different hashes.
+        Uses the column names list with the table alias as a placeholder 0.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def statistics_statement(self) -> str:
+        """SQL statement template for switching the IO and time
+        statistics messages of the queries in the session.
+        Uses on or off as a placeholder 0.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def showplan_statement(self) -> str:
+        """SQL statement template for switching the session to return the
+        estimated plan XML instead of executing the queries.
+        Uses on or off as a placeholder 0.
+        """
+
+        pass
+
+
+    @property
+    @abstractmethod
+    def self_reference_query(self) -> str:
+        """SQL query template for getting the foreign key column of the
+        database table referring to the same table.
+        Uses the name of the database table as a placeholder 0.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def hierarchy_ordered_query(self) -> str:
+        """SQL query template for ordering a query result by the hierarchy
+        depth of the self-referencing table rows and by the key column. The
+        depth is computed by a recursive query from the root rows, the rows
+        not reachable from the roots are ordered as the deepest ones.
+        Uses the text of the query without a semicolon as a placeholder 0.
+        Uses the name of the key column as a placeholder 1.
+        Uses the key condition (hierarchy_key_after_condition or an empty
+        string) as a placeholder 2.
+        Uses the name of the database with the hierarchy as a placeholder 3.
+        Uses the name of the database table as a placeholder 4.
+        Uses the name of the parent key column as a placeholder 5.
+        Uses the depth order direction (asc or desc) as a placeholder 6.
+        Uses the table hint as a placeholder 7.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def hierarchy_key_after_condition(self) -> str:
+        """SQL condition template for the rows after the key value in the
+        hierarchy ordered query.
+        Uses the name of the key column as a placeholder 0.
+        Uses the key value as a placeholder 1.
+        Uses the depth comparison operator (> or <) as a placeholder 2.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def table_hint_pattern(self) -> str:
+        """SQL pattern of the table hint added after a table alias, like
+        nolock or readpast.
+        Uses the table hint as a placeholder 0.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def isolation_level_statement(self) -> str:
+        """SQL statement template for setting the isolation level of the
+        next transactions in the session.
+        Uses the isolation level, like snapshot or read committed, as a
+        placeholder 0.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def snapshot_isolation_level(self) -> str:
+        """The name of the isolation level reading all tables of a
+        transaction as of the moment it started, without blocking the
+        writers.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def query_option_pattern(self) -> str:
+        """SQL pattern of a query with the query hints.
+        Uses the text of the query without a semicolon as a placeholder 0.
+        Uses the query hints list as a placeholder 1.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def maxdop_option(self) -> str:
+        """SQL query hint template limiting the number of the processors
+        used by a parallel plan of the query.
+        Uses the maximum degree of parallelism as a placeholder 0.
+        """
+
+        pass
+
+    @property
+    @abstractmethod
+    def wait_stats_query(self) -> str:
+        """SQL query for getting the total time in milliseconds the sessions
+        of the server waited for the resources (disk, locks, memory, CPU)
+        since the server start.
+        """
+
+        pass
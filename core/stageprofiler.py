@@ -0,0 +1,211 @@
+import cProfile
+import os
+import re
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any, Union
+
+from core.tracing import SpanListener
+
+
+class StageProfiler(SpanListener):
+    """A class for profiling the stages of the generator runs with cProfile
+    and tracemalloc. The profiler listens to the spans of the Tracer and maps
+    them to the stages: metadata, diff and render of each table, write,
+    changelog, apply, pull, commit and run. The stages are profiled
+    exclusively: a nested stage pauses the profile of the outer one, so the
+    run stage keeps only the time not spent in the other stages.
+    For each stage the profiler counts the calls, the net allocated bytes and
+    the peak traced memory. The allocation sites are compared by the
+    tracemalloc snapshots of the first calls of each stage only, since a
+    snapshot is slow. The allocations of a snapshot comparison include the
+    nested stages.
+    Only the spans of the thread which created the profiler are profiled,
+    so the table workers should be off while profiling.
+
+    Properties
+    ----------
+    stages(self) -> list[str]:
+        Returns the names of the profiled stages.
+    memory(self) -> dict[str: dict[str: Any]]:
+        Returns the memory measurements of the stages.
+
+    Methods
+    -------
+    span_started(self, name: str, attrs: dict[str: Any]) -> None:
+        Starts profiling the stage of the span.
+    span_finished(self, name: str, attrs: dict[str: Any]) -> None:
+        Stops profiling the stage of the span.
+    save(self) -> None:
+        Writes the .pstats file of each stage and the allocation summary.
+    stop(self) -> None:
+        Stops the tracemalloc tracing started by the profiler.
+    """
+
+    STAGES = {"metadata": "metadata", "query": "diff", "render": "render",
+              "write": "write", "changelog": "changelog",
+              "liquibase": "apply", "git_pull": "pull", "git_push": "commit",
+              "run": "run"}
+    TABLE_STAGES = ("diff", "render")
+    MEMORY_FILE = "memory.txt"
+
+    def __init__(self, folder: str, top_n: int = 20, snapshot_limit: int = 3,
+                 frames: int = 1):
+        """
+        :param folder: the folder to write the profiles.
+        :param top_n: the number of the allocation sites in the summary of a
+        stage.
+        :param snapshot_limit: the number of the first calls of a stage
+        compared by the tracemalloc snapshots.
+        :param frames: the number of the frames stored by tracemalloc for an
+        allocation.
+        """
+
+        self.__folder: str = folder
+        self.__top_n: int = top_n
+        self.__snapshot_limit: int = snapshot_limit
+        self.__thread_id: int = threading.get_ident()
+        self.__profiles: dict[str: cProfile.Profile] = {}
+        self.__memory: dict[str: dict[str: Any]] = {}
+        self.__stack: list[tuple[str, Union[tracemalloc.Snapshot, None],
+                                 int]] = []
+        self.__tracemalloc_started: bool = not tracemalloc.is_tracing()
+        if self.__tracemalloc_started:
+            tracemalloc.start(frames)
+
+    @property
+    def stages(self) -> list[str]:
+        """
+        :return: the names of the profiled stages, like diff.dbo.report.
+        """
+
+        return list(self.__profiles)
+
+    @property
+    def memory(self) -> dict[str: dict[str: Any]]:
+        """
+        :return: a dictionary with the stage names as keys and the memory
+        measurements as values: the calls, the net allocated bytes, the peak
+        traced bytes, the compared snapshots and the allocation sites with
+        the size of their new allocations.
+        """
+
+        return {stage: dict(memory, sites=Counter(memory["sites"]))
+                for stage, memory in self.__memory.items()}
+
+    def span_started(self, name: str, attrs: dict[str: Any]) -> None:
+        """Pauses the profile of the outer stage and starts profiling the
+        stage of the span. The spans of the other stages are skipped.
+
+        :param name: the name of the span.
+        :param attrs: the attributes of the span.
+        :return: None
+        """
+
+        stage = self.__get_stage(name, attrs)
+        if stage is None:
+            return
+        if self.__stack:
+            self.__pause(self.__stack[-1][0])
+        profile = self.__profiles.setdefault(stage, cProfile.Profile())
+        memory = self.__memory.setdefault(
+            stage, {"calls": 0, "net_bytes": 0, "peak_bytes": 0,
+                    "snapshots": 0, "sites": Counter()})
+        snapshot = None
+        if memory["snapshots"] < self.__snapshot_limit:
+            memory["snapshots"] += 1
+            snapshot = self.__take_snapshot()
+        tracemalloc.reset_peak()
+        self.__stack.append((stage, snapshot,
+                             tracemalloc.get_traced_memory()[0]))
+        profile.enable()
+
+    def span_finished(self, name: str, attrs: dict[str: Any]) -> None:
+        """Stops profiling the stage of the span, records its memory
+        measurements and resumes the profile of the outer stage.
+
+        :param name: the name of the span.
+        :param attrs: the attributes of the span.
+        :return: None
+        """
+
+        stage = self.__get_stage(name, attrs)
+        if stage is None:
+            return
+        self.__pause(stage)
+        stage, snapshot, started_bytes = self.__stack.pop()
+        memory = self.__memory[stage]
+        memory["calls"] += 1
+        memory["net_bytes"] += tracemalloc.get_traced_memory()[0] \
+            - started_bytes
+        if snapshot:
+            for stat in self.__take_snapshot().compare_to(snapshot, "lineno"):
+                if stat.size_diff > 0:
+                    memory["sites"][str(stat.traceback)] += stat.size_diff
+        tracemalloc.reset_peak()
+        if self.__stack:
+            self.__profiles[self.__stack[-1][0]].enable()
+
+    def save(self) -> None:
+        """Writes the .pstats file of each stage, which can be read with the
+        pstats module or snakeviz, and the allocation summary with the top
+        allocation sites of each stage.
+
+        :return: None
+        """
+
+        os.makedirs(self.__folder, exist_ok=True)
+        for stage, profile in self.__profiles.items():
+            profile.dump_stats(os.path.join(
+                self.__folder, re.sub(r"[^\w.-]", "_", stage) + ".pstats"))
+        lines = []
+        for stage, memory in sorted(self.__memory.items()):
+            lines.append(f"{stage}: calls {memory['calls']}, net "
+                         f"{memory['net_bytes'] / 1024:,.1f} KiB, peak "
+                         f"{memory['peak_bytes'] / 1024:,.1f} KiB, top "
+                         f"allocations of {memory['snapshots']} calls:")
+            for site, size in memory["sites"].most_common(self.__top_n):
+                lines.append(f"    {size / 1024:12,.1f} KiB  {site}")
+        with open(os.path.join(self.__folder, StageProfiler.MEMORY_FILE), "w",
+                  encoding="utf-8") as file:
+            file.write("\n".join(lines) + "\n")
+
+    def stop(self) -> None:
+        """Stops the tracemalloc tracing if it was started by the profiler.
+
+        :return: None
+        """
+
+        if self.__tracemalloc_started and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def __get_stage(self, name: str, attrs: dict[str: Any]) \
+            -> Union[str, None]:
+        """Returns the stage name of the span, None if the span is not a
+        stage or is opened in another thread."""
+
+        stage = StageProfiler.STAGES.get(name)
+        if stage is None or threading.get_ident() != self.__thread_id:
+            return None
+        if stage in StageProfiler.TABLE_STAGES and attrs.get("table"):
+            stage = f"{stage}.{attrs['table']}"
+        return stage
+
+    def __pause(self, stage: str) -> None:
+        """Disables the profile of the stage and records its peak memory."""
+
+        self.__profiles[stage].disable()
+        memory = self.__memory[stage]
+        memory["peak_bytes"] = max(memory["peak_bytes"],
+                                   tracemalloc.get_traced_memory()[1])
+
+    @staticmethod
+    def __take_snapshot() -> tracemalloc.Snapshot:
+        """Takes the tracemalloc snapshot without the allocations of the
+        profiler, tracemalloc and cProfile modules."""
+
+        return tracemalloc.take_snapshot().filter_traces(
+            (tracemalloc.Filter(False, __file__),
+             tracemalloc.Filter(False, tracemalloc.__file__),
+             tracemalloc.Filter(False, cProfile.__file__)))
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Callable
+from typing import Union
 
 
 class VertexColor(Enum):
@@ -32,6 +32,12 @@ class TopoSorter:
     Note: A graph with a loop can't be sorted. TotoSorter raises
     GraphHasLoopError in this case.
 
+    The vertices are indexed by a set and the edges by an adjacency
+    dictionary, so the vertex lookups and adding an edge take a constant
+    time. The depth-first search is iterative, so long chains of the edges
+    don't hit the recursion limit. The sorted vertices are cached until the
+    graph is changed.
+
     Properties
     ----------
     vertices: tuple[str]
@@ -46,6 +52,17 @@ class TopoSorter:
     topo_sorted_vertices: list[str]
         Sorts the vertices of the graph in topological order. Returns sorted
         list of graph vertices names.
+    topo_levels: list[list[str]]
+        Groups the vertices of the graph into the dependency levels. Returns
+        the list of the levels in topological order.
+    strongly_connected_components: list[list[str]]
+        Splits the graph into the strongly connected components. Returns the
+        list of the components in topological order.
+    cyclic_components: list[list[str]]
+        Returns the strongly connected components containing a loop.
+    condensed_levels: list[list[str]]
+        Groups the vertices of the graph into the dependency levels of the
+        strongly connected components. Can be used for a graph with a loop.
 
     Methods
     -------
@@ -72,7 +89,13 @@ class TopoSorter:
         """
 
         self.__vertices: list[str] = []
+        self.__vertex_set: set[str] = set()
         self.__edges: list[tuple[str, str]] = []
+        self.__adj_dict: dict[str: list[str]] = {}
+        self.__sorted_vertices: Union[list[str], None] = None
+        self.__levels: Union[list[list[str]], None] = None
+        self.__components: Union[list[list[str]], None] = None
+        self.__has_loop: Union[bool, None] = None
         self.set_vertices_and_clean_edges(vertices)
         self.add_edges(edges)
 
@@ -89,12 +112,14 @@ class TopoSorter:
         :return: None
         """
 
-        if len(vertices) == 0:
-            self.__vertices = []
-        if len(set(vertices)) != len(vertices):
+        vertex_set = set(vertices)
+        if len(vertex_set) != len(vertices):
             raise ValueError("vertices contains duplicates")
         self.__edges = []
-        self.__vertices = vertices
+        self.__vertices = list(vertices)
+        self.__vertex_set = vertex_set
+        self.__adj_dict = {vertex: [] for vertex in self.__vertices}
+        self.__clean_cache()
 
     def has_vertex(self, vertex: str) -> bool:
         """Shows whether the graph contains the vertex.
@@ -103,7 +128,7 @@ class TopoSorter:
         :return: True if graph contains the vertex otherwise False
         """
 
-        return vertex in self.__vertices
+        return vertex in self.__vertex_set
 
     def add_edge(self, edge: tuple[str, str]) -> None:
         """Adds edge into the graph edges list.
@@ -118,6 +143,8 @@ class TopoSorter:
             if not self.has_vertex(vertex):
                 raise ValueError(f"vertex: {vertex} is not in graph")
         self.__edges.append(edge)
+        self.__adj_dict[edge[0]].append(edge[1])
+        self.__clean_cache()
 
     def add_edges(self, edges: list[tuple[str, str]]) -> None:
         """Adds edges into the graph edges list.
@@ -161,18 +188,12 @@ class TopoSorter:
         :return: True if the graph contains a loop otherwise False.
         """
 
-        colored_vertices = {vertex: VertexColor.WHITE
-                            for vertex in self.__vertices}
-        adj_dict = self.__get_adg_dict()
-
-        def pass_func(vertex: str):
-            pass
-        try:
-            for vertex in self.__vertices:
-                self.__dfs(vertex, colored_vertices, adj_dict, pass_func)
-        except GraphHasLoopError as ex:
-            return True
-        return False
+        if self.__has_loop is None:
+            try:
+                self.__sort()
+            except GraphHasLoopError:
+                pass
+        return self.__has_loop
 
     @property
     def topo_sorted_vertices(self) -> list[str]:
@@ -182,56 +203,230 @@ class TopoSorter:
         :return: a sorted list of graph vertices names.
         """
 
-        colored_vertices = {vertex: VertexColor.WHITE
-                            for vertex in self.__vertices}
-        adj_dict = self.__get_adg_dict()
-        processed_vertices = []
+        if self.__has_loop:
+            raise GraphHasLoopError()
+        if self.__sorted_vertices is None:
+            self.__sort()
+        return list(self.__sorted_vertices)
 
-        def vertex_process(vertex):
-            processed_vertices.append(vertex)
-        for vertex in self.__vertices:
-            self.__dfs(vertex, colored_vertices, adj_dict, vertex_process)
-        return processed_vertices[::-1]
+    @property
+    def topo_levels(self) -> list[list[str]]:
+        """Groups the vertices of the graph into the dependency levels with
+        the Kahn algorithm. The first level contains the vertices without
+        incoming edges, each next level contains the vertices whose incoming
+        edges all start in the previous levels. There are no edges between
+        the vertices of one level, so they can be processed concurrently, and
+        the concatenated levels are a topological order. The vertices of a
+        level keep the order of the graph vertices.
+        :raises GraphHasLoopError: A graph with a loop can't be sorted.
+        TotoSorter raises GraphHasLoopError in this case.
+        :return: the list of the levels, each level is a list of graph
+        vertices names.
+        """
+
+        if self.__has_loop:
+            raise GraphHasLoopError()
+        if self.__levels is None:
+            self.__levels = self.__get_levels()
+        return [list(level) for level in self.__levels]
+
+    @property
+    def strongly_connected_components(self) -> list[list[str]]:
+        """Splits the graph into the strongly connected components with the
+        Tarjan algorithm. Each vertex of a component is reachable from the
+        other vertices of the component, so a component with several vertices
+        or with an edge from the vertex to itself contains a loop. The
+        components are ordered topologically, the vertices of a component
+        keep the order of the graph vertices.
+        :return: the list of the components, each component is a list of
+        graph vertices names.
+        """
 
-    def __get_adg_dict(self) -> dict[str: list[str]]:
+        if self.__components is None:
+            self.__components = self.__get_components()
+        return [list(component) for component in self.__components]
+
+    @property
+    def cyclic_components(self) -> list[list[str]]:
         """
-        :return: a dictionary with vertices as a keys and lists of the adjacent
-        vertices as a values.
+        :return: the strongly connected components containing a loop, in
+        topological order.
         """
 
-        adj_dict = {vertex: [] for vertex in self.__vertices}
-        for edge in self.__edges:
-            (adj_dict[edge[0]]).append(edge[1])
-        return adj_dict
-
-    def __dfs(self, vertex: str, colored_vertices: dict[str: VertexColor],
-              adj_dict: dict[str: list[str]],
-              vertex_process: Callable[[str], None]) -> None:
-        """A recursive algorithm for depth-first search in the graph.
-        Runs the vertex_process function for each vertex of the graph at the
-        end of processing.
-
-        :param vertex: a current vertex.
-        :param colored_vertices: a dictionary with vertices as a keys
-        and vertices colors as a values.
-        :param adj_dict: a dictionary with vertices as a keys and lists of the
-        adjacent vertices as a values.
-        :param vertex_process: a function run at the end of vertex processing.
+        return [component for component in self.strongly_connected_components
+                if len(component) > 1
+                or component[0] in self.__adj_dict[component[0]]]
+
+    @property
+    def condensed_levels(self) -> list[list[str]]:
+        """Groups the vertices of the graph into the dependency levels of the
+        strongly connected components: each component is replaced with a
+        single vertex, the edges inside the components are ignored and the
+        acyclic graph of the components is grouped into the levels like
+        topo_levels. The vertices of a component are placed in one level one
+        after another. For a graph without loops the result equals
+        topo_levels.
+        :return: the list of the levels, each level is a list of graph
+        vertices names.
+        """
+
+        components = self.strongly_connected_components
+        position = {vertex: number
+                    for number, vertex in enumerate(self.__vertices)}
+        component_numbers = {vertex: number
+                             for number, component in enumerate(components)
+                             for vertex in component}
+        adj_components = [[] for _ in components]
+        in_degrees = [0] * len(components)
+        for source, target in self.__edges:
+            source_number = component_numbers[source]
+            target_number = component_numbers[target]
+            if source_number != target_number:
+                adj_components[source_number].append(target_number)
+                in_degrees[target_number] += 1
+        level = [number for number in range(len(components))
+                 if in_degrees[number] == 0]
+        levels = []
+        while level:
+            level.sort(key=lambda number: position[components[number][0]])
+            levels.append([vertex for number in level
+                           for vertex in components[number]])
+            next_level = []
+            for number in level:
+                for adj_number in adj_components[number]:
+                    in_degrees[adj_number] -= 1
+                    if in_degrees[adj_number] == 0:
+                        next_level.append(adj_number)
+            level = next_level
+        return levels
+
+    def __clean_cache(self) -> None:
+        """Removes the cached sorting result after the graph change."""
+
+        self.__sorted_vertices = None
+        self.__levels = None
+        self.__components = None
+        self.__has_loop = None
+
+    def __sort(self) -> None:
+        """An iterative depth-first search in the graph. Stores the vertices
+        in the reverse order of the processing end as the sorting result.
+
         :raise: GraphHasLoopError
         :return: None
         """
 
-        if colored_vertices[vertex] == VertexColor.BLACK:
-            return
-        colored_vertices[vertex] = VertexColor.GRAY
-        for adj_vertex in adj_dict[vertex]:
-            if colored_vertices[adj_vertex] == VertexColor.WHITE:
-                self.__dfs(adj_vertex, colored_vertices, adj_dict,
-                           vertex_process)
-            if colored_vertices[adj_vertex] == VertexColor.GRAY:
-                raise GraphHasLoopError()
-        colored_vertices[vertex] = VertexColor.BLACK
-        vertex_process(vertex)
+        colored_vertices = {vertex: VertexColor.WHITE
+                            for vertex in self.__vertices}
+        processed_vertices = []
+        for root in self.__vertices:
+            if colored_vertices[root] is not VertexColor.WHITE:
+                continue
+            colored_vertices[root] = VertexColor.GRAY
+            stack = [(root, iter(self.__adj_dict[root]))]
+            while stack:
+                vertex, adj_iter = stack[-1]
+                for adj_vertex in adj_iter:
+                    color = colored_vertices[adj_vertex]
+                    if color is VertexColor.WHITE:
+                        colored_vertices[adj_vertex] = VertexColor.GRAY
+                        stack.append((adj_vertex,
+                                      iter(self.__adj_dict[adj_vertex])))
+                        break
+                    if color is VertexColor.GRAY:
+                        self.__has_loop = True
+                        raise GraphHasLoopError()
+                else:
+                    stack.pop()
+                    colored_vertices[vertex] = VertexColor.BLACK
+                    processed_vertices.append(vertex)
+        self.__has_loop = False
+        self.__sorted_vertices = processed_vertices[::-1]
+
+    def __get_levels(self) -> list[list[str]]:
+        """Groups the vertices into the dependency levels, removing the
+        vertices without incoming edges level by level.
+
+        :raise: GraphHasLoopError
+        :return: the list of the levels.
+        """
+
+        position = {vertex: number
+                    for number, vertex in enumerate(self.__vertices)}
+        in_degrees = {vertex: 0 for vertex in self.__vertices}
+        for edge in self.__edges:
+            in_degrees[edge[1]] += 1
+        level = [vertex for vertex in self.__vertices
+                 if in_degrees[vertex] == 0]
+        levels = []
+        processed_count = 0
+        while level:
+            levels.append(level)
+            processed_count += len(level)
+            next_level = []
+            for vertex in level:
+                for adj_vertex in self.__adj_dict[vertex]:
+                    in_degrees[adj_vertex] -= 1
+                    if in_degrees[adj_vertex] == 0:
+                        next_level.append(adj_vertex)
+            level = sorted(next_level, key=position.__getitem__)
+        if processed_count != len(self.__vertices):
+            self.__has_loop = True
+            raise GraphHasLoopError()
+        return levels
+
+    def __get_components(self) -> list[list[str]]:
+        """An iterative Tarjan algorithm searching the strongly connected
+        components of the graph.
+
+        :return: the list of the components in topological order.
+        """
+
+        position = {vertex: number
+                    for number, vertex in enumerate(self.__vertices)}
+        indexes = {}
+        low_links = {}
+        stack = []
+        on_stack = set()
+        components = []
+        for root in self.__vertices:
+            if root in indexes:
+                continue
+            indexes[root] = low_links[root] = len(indexes)
+            stack.append(root)
+            on_stack.add(root)
+            path = [(root, iter(self.__adj_dict[root]))]
+            while path:
+                vertex, adj_iter = path[-1]
+                for adj_vertex in adj_iter:
+                    if adj_vertex not in indexes:
+                        indexes[adj_vertex] = low_links[adj_vertex] = \
+                            len(indexes)
+                        stack.append(adj_vertex)
+                        on_stack.add(adj_vertex)
+                        path.append((adj_vertex,
+                                     iter(self.__adj_dict[adj_vertex])))
+                        break
+                    if adj_vertex in on_stack:
+                        low_links[vertex] = min(low_links[vertex],
+                                                indexes[adj_vertex])
+                else:
+                    path.pop()
+                    if path:
+                        parent = path[-1][0]
+                        low_links[parent] = min(low_links[parent],
+                                                low_links[vertex])
+                    if low_links[vertex] == indexes[vertex]:
+                        component = []
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.append(member)
+                            if member == vertex:
+                                break
+                        components.append(sorted(component,
+                                                 key=position.__getitem__))
+        return components[::-1]
 
     def __edges_to_str(self) -> str:
         """
@@ -0,0 +1,224 @@
+import itertools
+import json
+import os
+import threading
+import time
+from abc import ABCMeta, abstractmethod
+from contextlib import contextmanager, nullcontext
+from typing import Any, ContextManager, Iterator
+
+NULL_SPAN = nullcontext()
+
+
+class SpanListener(metaclass=ABCMeta):
+    """The abstract class of a listener notified when a span of the Tracer
+    starts and finishes. The listener is called in the thread of the span.
+
+    Abstract methods
+    ----------------
+    span_started(self, name: str, attrs: dict[str: Any]) -> None:
+        Is called before the block of the span.
+    span_finished(self, name: str, attrs: dict[str: Any]) -> None:
+        Is called after the block of the span, if the block failed too.
+    """
+
+    @abstractmethod
+    def span_started(self, name: str, attrs: dict[str: Any]) -> None:
+        """Is called before the block of the span.
+
+        :param name: the name of the span.
+        :param attrs: the attributes of the span.
+        :return: None
+        """
+        pass
+
+    @abstractmethod
+    def span_finished(self, name: str, attrs: dict[str: Any]) -> None:
+        """Is called after the block of the span, if the block failed too.
+
+        :param name: the name of the span.
+        :param attrs: the attributes of the span.
+        :return: None
+        """
+        pass
+
+
+class Tracer:
+    """A class for tracing a generator run with nested spans: the run, the
+    stages, the tables, the queries, the rendered chunks, the file writes
+    and the git operations. Each thread has its own stack of the open spans,
+    so a span opened in a table worker is nested into the worker spans only.
+    The spans of a run are saved to a JSON lines file or to a Chrome trace
+    file, which can be opened in a trace viewer like chrome://tracing or
+    Perfetto to find the critical path of the run.
+    The listeners are notified of the spans even if the tracer is disabled,
+    so a profiler can hook the stages without recording the trace. A
+    disabled tracer without listeners returns the same empty context manager
+    for each span and records nothing.
+
+    Properties
+    ----------
+    enabled(self) -> bool:
+        Returns True if the spans are recorded.
+    spans(self) -> list[dict[str: Any]]:
+        Returns the records of the finished spans.
+
+    Methods
+    -------
+    span(self, name: str, **attrs: Any) -> ContextManager:
+        Returns a context manager recording its block as a span.
+    add_listener(self, listener: SpanListener) -> None:
+        Adds the listener notified of the spans.
+    reset(self) -> None:
+        Removes the spans of the previous run.
+    save(self, path: str, trace_format: str = "chrome") -> None:
+        Saves the spans to the trace file.
+    """
+
+    FORMATS = ("chrome", "jsonl")
+
+    def __init__(self, enabled: bool = False):
+        """
+        :param enabled: if True the spans are recorded.
+        """
+
+        self.__enabled: bool = enabled
+        self.__listeners: list[SpanListener] = []
+        self.__ids: Iterator[int] = itertools.count(1)
+        self.__local: threading.local = threading.local()
+        self.__lock: threading.Lock = threading.Lock()
+        self.__origin: float = time.perf_counter()
+        self.__spans: list[dict[str: Any]] = []
+        self.__thread_names: dict[int: str] = {}
+
+    @property
+    def enabled(self) -> bool:
+        """
+        :return: True if the spans are recorded.
+        """
+
+        return self.__enabled
+
+    @property
+    def spans(self) -> list[dict[str: Any]]:
+        """
+        :return: the records of the finished spans in the finish order: the
+        span id, the parent span id, the name, the thread id, the start in
+        seconds from the tracer reset, the duration in seconds and the
+        attributes. The error attribute is set if the block failed.
+        """
+
+        with self.__lock:
+            return [dict(span, attrs=dict(span["attrs"]))
+                    for span in self.__spans]
+
+    def span(self, name: str, **attrs: Any) -> ContextManager:
+        """Returns a context manager recording its block as a span nested
+        into the open span of the current thread.
+
+        :param name: the name of the span, like query or write.
+        :param attrs: the attributes of the span, like the table name.
+        :return: a context manager.
+        """
+
+        if not self.__enabled and not self.__listeners:
+            return NULL_SPAN
+        return self.__record(name, attrs)
+
+    def add_listener(self, listener: SpanListener) -> None:
+        """Adds the listener notified when a span starts and finishes.
+
+        :param listener: the SpanListener object.
+        :return: None
+        """
+
+        self.__listeners.append(listener)
+
+    def reset(self) -> None:
+        """Removes the spans of the previous run and starts the time from
+        zero.
+
+        :return: None
+        """
+
+        with self.__lock:
+            self.__origin = time.perf_counter()
+            self.__spans = []
+            self.__thread_names = {}
+
+    def save(self, path: str, trace_format: str = "chrome") -> None:
+        """Saves the spans to the trace file: a Chrome trace JSON object or a
+        JSON line for each span.
+
+        :param path: the path to the trace file.
+        :param trace_format: the format of the file, chrome or jsonl.
+        :raise ValueError: if the format is unknown.
+        :return: None
+        """
+
+        if trace_format not in Tracer.FORMATS:
+            raise ValueError(f"unknown trace format: {trace_format}")
+        spans = self.spans
+        if trace_format == "jsonl":
+            text = "".join(json.dumps(span, default=str) + "\n"
+                           for span in spans)
+        else:
+            text = json.dumps(self.__get_chrome_trace(spans), default=str)
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    @contextmanager
+    def __record(self, name: str, attrs: dict[str: Any]) -> Iterator[None]:
+        """Records the block as a span of the current thread and notifies
+        the listeners."""
+
+        for listener in self.__listeners:
+            listener.span_started(name, attrs)
+        stack = getattr(self.__local, "stack", None)
+        if stack is None:
+            stack = self.__local.stack = []
+        span_id = next(self.__ids)
+        parent_id = stack[-1] if stack else None
+        stack.append(span_id)
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException as ex:
+            attrs["error"] = type(ex).__name__
+            raise
+        finally:
+            finished = time.perf_counter()
+            stack.pop()
+            for listener in self.__listeners[::-1]:
+                listener.span_finished(name, attrs)
+            if self.__enabled:
+                thread = threading.current_thread()
+                with self.__lock:
+                    self.__thread_names[thread.ident] = thread.name
+                    self.__spans.append(
+                        {"id": span_id, "parent_id": parent_id, "name": name,
+                         "thread": thread.ident,
+                         "start": started - self.__origin,
+                         "duration": finished - started, "attrs": attrs})
+
+    def __get_chrome_trace(self, spans: list[dict[str: Any]]) \
+            -> dict[str: Any]:
+        """Converts the spans to the complete events of the Chrome trace
+        format with the thread names as metadata events."""
+
+        pid = os.getpid()
+        with self.__lock:
+            thread_names = dict(self.__thread_names)
+        events = [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                   "args": {"name": thread_name}}
+                  for tid, thread_name in thread_names.items()]
+        events += [{"name": span["name"], "ph": "X", "pid": pid,
+                    "tid": span["thread"],
+                    "ts": round(span["start"] * 10 ** 6, 3),
+                    "dur": round(span["duration"] * 10 ** 6, 3),
+                    "args": dict(span["attrs"], id=span["id"],
+                                 parent_id=span["parent_id"])}
+                   for span in sorted(spans, key=lambda span: span["start"])]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
@@ -1,17 +1,25 @@
 import os
-from typing import Any
+from typing import Any, Callable
 import pyodbc
 import logging
-import logging.config
 import json
 import argparse
+import functools
+import signal
+import threading
+import time
 
+from core.logsetup import configure_logging
+from core.postgrestemplates import PostgresTemplates
 from core.sqlservertemplates import SqlServerTemplates
 from core.sqlquerybuilder import SqlQueryBuilder
 from core.scriptgenerator import ScriptGenerator
+from core.pipelinescheduler import PipelineLimits, PipelineScheduler
+from core.stageprofiler import StageProfiler
 
 LOG_CONF_FILE_PATH = "config/logger_conf.json"
 APP_CONF_FILE_PATH = "config/app_conf.json"
+DIALECTS = {"sqlserver": SqlServerTemplates, "postgres": PostgresTemplates}
 
 
 def parse_args(script_config: dict[str: Any]) -> argparse.Namespace:
@@ -25,6 +33,7 @@ def parse_args(script_config: dict[str: Any]) -> argparse.Namespace:
     days_before = script_config["days_before"]
     row_limit = script_config["row_limit"]
     file_size_limit = script_config["file_size_limit"]
+    interval = script_config.get("daemon_interval", 600)
     parser = argparse.ArgumentParser(description="A tool for generate scripts "
                                                  "with the database changes")
     parser.add_argument("-a", "--all", action="store_true", default=all_rows,
@@ -36,6 +45,27 @@ def parse_args(script_config: dict[str: Any]) -> argparse.Namespace:
     parser.add_argument("-s", "--size", type=int, default=file_size_limit,
                         help=f"File size limit in bytes, "
                              f"default {file_size_limit}")
+    parser.add_argument("-p", "--plan", action="store_true", default=False,
+                        help="Dry run: print the number of rows, scripts and "
+                             "files without writing, applying or committing")
+    parser.add_argument("--daemon", action="store_true", default=False,
+                        help="Run the script generation repeatedly, keeping "
+                             "the connection, the git repository and the "
+                             "table metadata between runs")
+    parser.add_argument("-i", "--interval", type=int, default=interval,
+                        help=f"Seconds between the daemon runs, "
+                             f"default {interval}")
+    parser.add_argument("--discard-journal", action="store_true",
+                        default=False,
+                        help="Discard the checkpoint journal of an unfinished "
+                             "run and start a new run instead of resuming it")
+    parser.add_argument("--trace", metavar="FILE", default=None,
+                        help="Save the spans of the run to the trace file, "
+                             "overrides the tracing path of the config")
+    parser.add_argument("--profile", metavar="DIR", default=None,
+                        help="Profile the stages with cProfile and "
+                             "tracemalloc, write the .pstats files and the "
+                             "allocation summary into the folder")
     return parser.parse_args()
 
 
@@ -57,6 +87,26 @@ def check_table_settings(table_settings: dict[str: Any]) -> None:
         if table not in table_list:
             raise Exception(f"upsert_only_list has table({table}), "
                             "which is not include in the table_list")
+    for table in [table.lower() for table
+                  in table_settings.get("bucket_diff_list", [])]:
+        if table not in table_list:
+            raise Exception(f"bucket_diff_list has table({table}), "
+                            "which is not include in the table_list")
+    if table_settings.get("table_workers", 1) < 1:
+        raise Exception("table_workers has to be greater than zero")
+    read_isolation = table_settings.get("read_isolation")
+    if read_isolation not in (None, "snapshot"):
+        raise Exception(f"read_isolation has unknown value({read_isolation})")
+    for table, hint in (table_settings.get("table_hints") or {}).items():
+        if table.lower() not in table_list:
+            raise Exception(f"table_hints has table({table}), "
+                            "which is not include in the table_list")
+        if hint not in ("nolock", "readpast"):
+            raise Exception(f"table_hints has unknown hint({hint}) "
+                            f"for table({table})")
+        if hint == "readpast" and read_isolation == "snapshot":
+            raise Exception(f"table_hints has readpast hint for table({table}),"
+                            " which can't be used with snapshot read_isolation")
     for table in delete_only_list:
         if table not in table_list:
             raise Exception(f"delete_only_list has table({table}), "
@@ -66,10 +116,315 @@ def check_table_settings(table_settings: dict[str: Any]) -> None:
                             "which is include in the upsert_only_list")
 
 
+def check_dialect_settings(app_config: dict[str: Any],
+                           query_builder: SqlQueryBuilder) -> None:
+    """Checks the settings from the dictionary use only the features of the
+    dialect and raises error if the check failed, so that an unsupported
+    setting does not fail the run in the middle.
+
+    :param app_config: a dictionary with the app settings.
+    :param query_builder: an SqlQueryBuilder object with the templates of
+    the dialect.
+    :return: None
+    """
+    table_settings = app_config["table_settings"]
+    diagnostics = app_config.get("diagnostics") or {}
+    governor = app_config.get("load_governor") or {}
+    settings = {"table_hints": ("table_hint",
+                                table_settings.get("table_hints")),
+                "read_isolation": ("snapshot",
+                                   table_settings.get("read_isolation")),
+                "bucket_diff_list": ("bucket_diff",
+                                     table_settings.get("bucket_diff_list")),
+                "statistics_io_time": ("statistics",
+                                       diagnostics.get("statistics_io_time")),
+                "plan_folder": ("showplan", diagnostics.get("plan_folder")),
+                "maxdop": ("maxdop", governor.get("maxdop")),
+                "wait_ms_per_second": ("wait_stats",
+                                       governor.get("wait_ms_per_second"))}
+    dialect = app_config["connection"].get("dialect", "sqlserver")
+    for name, (feature, value) in settings.items():
+        if value and not query_builder.supports(feature):
+            raise Exception(f"{name} is set, which is not supported by the "
+                            f"dialect({dialect})")
+
+
+def run_generation(generator: ScriptGenerator, args: argparse.Namespace,
+                   script_config: dict[str: Any]) -> None:
+    """Runs a single script generation: the full upload or the upsert of the
+    changes.
+
+    :param generator: a ScriptGenerator object.
+    :param args: a Namespace object with arguments values.
+    :param script_config: a dictionary with the commit messages.
+    :return: None
+    """
+
+    if args.all:
+        generator.upload_tables(args.size, script_config["upload_message"],
+                                args.rows)
+    else:
+        generator.upsert_tables(args.size, script_config["upsert_message"],
+                                args.days, args.rows)
+
+
+def is_connection_error(ex: BaseException) -> bool:
+    """Checks the exception or one of the exceptions it was raised from is
+    a lost database connection.
+
+    :param ex: the exception.
+    :return: True if the connection is lost.
+    """
+
+    while ex is not None:
+        if isinstance(ex, (pyodbc.OperationalError, pyodbc.InterfaceError)):
+            return True
+        if isinstance(ex, pyodbc.Error) and ex.args \
+                and str(ex.args[0]).startswith("08"):
+            return True
+        ex = ex.__cause__ or ex.__context__
+    return False
+
+
+def run_daemon(generator: ScriptGenerator, args: argparse.Namespace,
+               script_config: dict[str: Any],
+               stop_event: threading.Event,
+               reconnect: Callable[[], None] = None) -> None:
+    """Runs the script generation every interval seconds until the stop event
+    is set. The database connection, the git repository and the table metadata
+    are kept between runs; the tables are rediscovered only when the database
+    schema changes. A failed run is logged and repeated in the next cycle, an
+    interrupted run is resumed by the next start of the tool. If a run failed
+    because the database connection was lost, the connection is opened again
+    before the next cycle.
+
+    :param generator: a ScriptGenerator object.
+    :param args: a Namespace object with arguments values.
+    :param script_config: a dictionary with the commit messages.
+    :param stop_event: the event to stop the daemon.
+    :param reconnect: a function opening the database connections again and
+    passing the new cursors to the generator, the connections are not
+    reopened if empty.
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+    logger.info(f"daemon start, interval: {args.interval}")
+    cycle_num = 0
+    while not stop_event.is_set():
+        cycle_num += 1
+        started = time.monotonic()
+        try:
+            if cycle_num > 1:
+                generator.refresh_metadata()
+            run_generation(generator, args, script_config)
+            logger.info(f"cycle {cycle_num} finished in "
+                        f"{time.monotonic() - started:.1f} seconds")
+        except InterruptedError:
+            logger.warning(f"cycle {cycle_num} interrupted")
+            break
+        except Exception as ex:
+            logger.exception(ex)
+            logger.error(f"cycle {cycle_num} failed")
+            if reconnect and is_connection_error(ex):
+                try:
+                    reconnect()
+                    logger.info("database connection is reopened")
+                except Exception as reconnect_ex:
+                    logger.exception(reconnect_ex)
+                    logger.error("database reconnect failed")
+        remaining = args.interval - (time.monotonic() - started)
+        if remaining > 0:
+            stop_event.wait(remaining)
+    logger.info("daemon stop")
+
+
+def load_pipelines(app_config: dict[str: Any]) -> list[dict[str: Any]]:
+    """Loads the pipeline app configs listed in the orchestration config. An
+    item of the pipelines list is either an app config dictionary or the path
+    to an app config json file.
+
+    :param app_config: a dictionary with the pipelines list.
+    :return: the list of the app config dictionaries with the name key.
+    """
+
+    pipelines = []
+    for num, item in enumerate(app_config["pipelines"]):
+        if isinstance(item, str):
+            with open(item, 'r') as conf_file:
+                pipeline = json.load(conf_file)
+            pipeline.setdefault("name", os.path.splitext(
+                os.path.basename(item))[0])
+        else:
+            pipeline = dict(item)
+        pipeline.setdefault("name", f"pipeline{num}")
+        pipelines.append(pipeline)
+    return pipelines
+
+
+def run_pipeline(app_config: dict[str: Any], limits: PipelineLimits = None,
+                 log_config: dict[str: Any] = None, outer_cursor=None) -> None:
+    """Generates changeset and changelog files for one pair of the work and
+    clear databases and applies them on the clear database.
+
+    :param app_config: a dictionary with the app settings.
+    :param limits: the locks shared with other pipelines, no limits if empty.
+    :param log_config: a dictionary with the logger settings.
+    :param outer_cursor: database cursor, uses for the unit tests.
+    :return: None
+    """
+
+    logger = logging.getLogger(__name__)
+    if limits is None:
+        limits = PipelineLimits({}, None, {})
+    if log_config is None:
+        with open(LOG_CONF_FILE_PATH, 'r') as conf_file:
+            log_config = json.load(conf_file)
+    configure_logging(log_config)
+    table_settings = app_config["table_settings"]
+    check_table_settings(table_settings)
+    dialect = app_config["connection"].get("dialect", "sqlserver")
+    if dialect not in DIALECTS:
+        raise Exception(f"connection has unknown dialect({dialect})")
+    if app_config["script_settings"].get("bulk_copy") \
+            and not app_config["liquibase_settings"]["skip_update"]:
+        raise Exception("bulk_copy scripts can't be applied by the liquibase, "
+                        "skip_update has to be set")
+    query_builder = SqlQueryBuilder(
+        DIALECTS[dialect](),
+        app_config["script_settings"].get("stage_threshold"),
+        app_config["script_settings"].get("json_payload", False),
+        app_config["script_settings"].get("bulk_copy", False))
+    check_dialect_settings(app_config, query_builder)
+    conn_string = app_config["connection"]["conn_string"]
+    server = PipelineScheduler.get_server(conn_string)
+    clear_conn_string = app_config["connection"].get("clear_conn_string")
+    servers = [server]
+    if clear_conn_string and not outer_cursor:
+        servers.append(PipelineScheduler.get_server(clear_conn_string))
+    repository = app_config["repository"]
+    worker_permits = 0
+    worker_connections = []
+    connection = None
+    cursor = None
+    clear_connection = None
+    generator = None
+    profiler = None
+    with limits.connections(servers):
+        try:
+            if outer_cursor:
+                cursor = outer_cursor
+            else:
+                connection = pyodbc.connect(conn_string)
+                cursor = connection.cursor()
+            clear_cursor = None
+            if clear_conn_string and not outer_cursor:
+                clear_connection = pyodbc.connect(clear_conn_string)
+                clear_cursor = clear_connection.cursor()
+            args = parse_args(app_config["script_settings"])
+            tracing_settings = dict(app_config.get("tracing") or {})
+            if args.trace:
+                tracing_settings["path"] = args.trace
+            if args.profile:
+                profiler = StageProfiler(os.path.join(
+                    args.profile, app_config.get("name", "")))
+                if table_settings.get("table_workers", 1) > 1:
+                    logger.warning("the table workers are off while "
+                                   "profiling")
+                    table_settings = dict(table_settings, table_workers=1)
+            table_workers = table_settings.get("table_workers", 1)
+            if table_workers > 1 and not outer_cursor:
+                worker_permits = limits.acquire_connections(server,
+                                                            table_workers)
+                if worker_permits < table_workers:
+                    logger.warning(f"{worker_permits} of {table_workers} "
+                                   f"table workers got a connection to "
+                                   f"{server}")
+                if worker_permits < 2:
+                    limits.release_connections(server, worker_permits)
+                    worker_permits = 0
+                table_settings = dict(table_settings,
+                                      table_workers=max(worker_permits, 1))
+
+            def open_worker_cursor() -> pyodbc.Cursor:
+                worker_connection = pyodbc.connect(conn_string)
+                worker_connections.append(worker_connection)
+                return worker_connection.cursor()
+            generator = ScriptGenerator(
+                log_config, cursor, query_builder,
+                app_config["connection"]["work_db_name"],
+                app_config["connection"]["clear_db_name"],
+                repository["git_folder_path"], repository["target_folder"],
+                table_settings, app_config["liquibase_settings"], repository,
+                dry_run=args.plan, liquibase_lock=limits.liquibase(),
+                git_lock=limits.git(repository["git_folder_path"]),
+                clear_cursor=clear_cursor,
+                diagnostic_settings=app_config.get("diagnostics"),
+                cursor_factory=None if outer_cursor else open_worker_cursor,
+                metrics_settings=app_config.get("metrics"),
+                tracing_settings=tracing_settings, profiler=profiler,
+                governor_settings=app_config.get("load_governor"))
+            stop_event = threading.Event()
+
+            def reconnect() -> None:
+                nonlocal connection, cursor, clear_connection
+                for old_connection in (connection, clear_connection):
+                    try:
+                        if old_connection:
+                            old_connection.close()
+                    except pyodbc.Error as ex:
+                        logger.warning(f"connection close failed: {ex}")
+                connection, cursor, clear_connection = None, None, None
+                connection = pyodbc.connect(conn_string)
+                cursor = connection.cursor()
+                new_clear_cursor = None
+                if clear_conn_string:
+                    clear_connection = pyodbc.connect(clear_conn_string)
+                    new_clear_cursor = clear_connection.cursor()
+                generator.reconnect(cursor, new_clear_cursor)
+
+            def handle_sigterm(signum, frame) -> None:
+                logger.warning(f"signal {signum} received")
+                stop_event.set()
+                generator.request_stop()
+            signal.signal(signal.SIGTERM, handle_sigterm)
+            if args.discard_journal and not args.plan:
+                generator.discard_journal()
+            if args.plan:
+                plan = generator.plan_tables(args.size, args.days, args.rows,
+                                             args.all)
+                logger.info(f"{plan.file_count} files planned")
+                print(plan.report())
+            elif args.daemon:
+                run_daemon(generator, args, app_config["script_settings"],
+                           stop_event, None if outer_cursor else reconnect)
+            else:
+                run_generation(generator, args, app_config["script_settings"])
+        finally:
+            if generator:
+                generator.close()
+            for worker_connection in worker_connections:
+                worker_connection.close()
+            limits.release_connections(server, worker_permits)
+            if profiler:
+                profiler.save()
+                profiler.stop()
+                logger.info(f"profiles are saved to {args.profile}")
+            if cursor and not outer_cursor:
+                cursor.close()
+            if connection:
+                connection.close()
+            if clear_connection:
+                clear_connection.close()
+            logger.info('Connection close')
+
+
 def main(outer_log_config: dict[str: Any] = None,
          outer_app_config: dict[str: Any] = None, outer_cursor=None) -> None:
     """The main function to generate changeset and changelog files and apply it
-    on the clear database.
+    on the clear database. If the app config has the pipelines list, each
+    pipeline is run in a separate process with the limits from the
+    orchestration settings.
 
     :param outer_log_config: a dictionary with the logger settings, uses for the
     unit tests.
@@ -92,48 +447,33 @@ def main(outer_log_config: dict[str: Any] = None,
         folder = os.path.split(file_path)[0]
         if not os.path.isdir(folder):
             os.mkdir(folder)
-    logging.config.dictConfig(log_config)
+    configure_logging(log_config, use_queue=True, force=True)
     logger = logging.getLogger(__name__)
     logger.info("Start app")
-    connection = None
-    cursor = None
 
     try:
         app_config = outer_app_config
         if not app_config:
             with open(APP_CONF_FILE_PATH, 'r') as conf_file:
                 app_config = json.load(conf_file)
-        table_settings = app_config["table_settings"]
-        check_table_settings(table_settings)
-        if outer_cursor:
-            cursor = outer_cursor
-        else:
-            connection = pyodbc.connect(app_config["connection"]["conn_string"])
-            cursor = connection.cursor()
-        query_builder = SqlQueryBuilder(SqlServerTemplates())
-        generator = ScriptGenerator(log_config, cursor, query_builder,
-                                    app_config["connection"]["work_db_name"],
-                                    app_config["connection"]["clear_db_name"],
-                                    app_config["repository"]["git_folder_path"],
-                                    app_config["repository"]["target_folder"],
-                                    table_settings,
-                                    app_config["liquibase_settings"])
-        args = parse_args(app_config["script_settings"])
-        if args.all:
-            message = app_config["script_settings"]["upload_message"]
-            generator.upload_tables(args.size, message, args.rows)
+        if "pipelines" in app_config:
+            orchestration = app_config.get("orchestration", {})
+            scheduler = PipelineScheduler(
+                orchestration.get("max_workers"),
+                orchestration.get("max_connections_per_server"),
+                orchestration.get("max_liquibase_processes"))
+            results = scheduler.run(
+                load_pipelines(app_config),
+                functools.partial(run_pipeline, log_config=log_config))
+            failed = [name for name, ex in results.items() if ex]
+            if failed:
+                raise RuntimeError(f"pipelines failed: {', '.join(failed)}")
         else:
-            message = app_config["script_settings"]["upsert_message"]
-            generator.upsert_tables(args.size, message, args.days, args.rows)
+            run_pipeline(app_config, log_config=log_config,
+                         outer_cursor=outer_cursor)
     except Exception as ex:
         logger.exception(ex)
         exit(1)
-    finally:
-        if cursor and not outer_cursor:
-            cursor.close()
-        if connection:
-            connection.close()
-        logger.info('Connection close')
 
 
 if __name__ == '__main__':
@@ -51,6 +51,7 @@ FLOAT_COL = "test_float"
 STR_COL = "test_str"
 UPDATE_DT_COL = "test_upddt"
 COLUMNS = [PRIMARY_KEY_COL, INT_COL, FLOAT_COL, STR_COL, UPDATE_DT_COL]
+TYPES = ["bigint", "bigint", "float", "varchar(100)", "datetime"]
 STR_COLUMNS = ",".join(COLUMNS)
 LINK_COLUMNS = (',\n' + ' ' * 12).join(["trg.{0} = src.{0}".format(col)
                                         for col in COLUMNS
@@ -6,6 +6,22 @@ from testdbtable import TestDbTable
 from testfilewriter import TestFileWriter
 from testscriptgenerator import TestScriptGenerator
 from testmain import TestMain
+from testgitsynchronizer import TestGitSynchronizer
+from testrunplan import TestRunPlan
+from testcheckpointjournal import TestCheckpointJournal
+from testpipelinescheduler import TestPipelineScheduler
+from testbucketdiff import TestBucketDiff
+from testquerystats import TestQueryStats
+from testrunmetrics import TestRunMetrics
+from testtracing import TestTracing
+from teststageprofiler import TestStageProfiler
+from testlogsetup import TestLogSetup
+from testloadgovernor import TestLoadGovernor
+from testsqlitetemplates import TestSqliteTemplates
+from testpostgrestemplates import TestPostgresTemplates
+from testrundaemon import TestRunDaemon
+from testtableworkers import TestTableWorkers
+from testreadsnapshot import TestReadSnapshot
 
 
 suite = unittest.TestSuite()
@@ -16,6 +32,22 @@ suite.addTest(unittest.makeSuite(TestDbTable))
 suite.addTest(unittest.makeSuite(TestFileWriter))
 suite.addTest(unittest.makeSuite(TestScriptGenerator))
 suite.addTest(unittest.makeSuite(TestMain))
+suite.addTest(unittest.makeSuite(TestGitSynchronizer))
+suite.addTest(unittest.makeSuite(TestRunPlan))
+suite.addTest(unittest.makeSuite(TestCheckpointJournal))
+suite.addTest(unittest.makeSuite(TestPipelineScheduler))
+suite.addTest(unittest.makeSuite(TestBucketDiff))
+suite.addTest(unittest.makeSuite(TestQueryStats))
+suite.addTest(unittest.makeSuite(TestRunMetrics))
+suite.addTest(unittest.makeSuite(TestTracing))
+suite.addTest(unittest.makeSuite(TestStageProfiler))
+suite.addTest(unittest.makeSuite(TestLogSetup))
+suite.addTest(unittest.makeSuite(TestLoadGovernor))
+suite.addTest(unittest.makeSuite(TestSqliteTemplates))
+suite.addTest(unittest.makeSuite(TestPostgresTemplates))
+suite.addTest(unittest.makeSuite(TestRunDaemon))
+suite.addTest(unittest.makeSuite(TestTableWorkers))
+suite.addTest(unittest.makeSuite(TestReadSnapshot))
 
 runner = unittest.TextTestRunner(verbosity=2)
 runner.run(suite)
@@ -0,0 +1,124 @@
+import re
+import unittest
+
+from core.bucketdiff import BucketDiff
+from core.sqlquerybuilder import SqlQueryBuilder
+from core.sqlservertemplates import SqlServerTemplates
+from dbconstatnts import TABLE_NAME, PRIMARY_KEY_COL, WORK_DB_NAME, \
+    CLEAR_DB_NAME
+
+COLUMNS = [PRIMARY_KEY_COL, "test_str"]
+
+
+class TableCursor:
+    """Executes the bucket diff queries on the rows of one table side."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.result = []
+        self.queries = []
+
+    def execute(self, query, params=None):
+        self.queries.append(query)
+        if "min_key" in query:
+            keys = list(self.rows) or [None]
+            self.result = [(min(keys) if self.rows else None,
+                            max(keys) if self.rows else None)]
+            return self
+        self.check_params(query, params)
+        if "bucket_hash" in query:
+            low, size, _, high = params
+        else:
+            low, high = params
+        rows = {key: hash(value) for key, value in self.rows.items()
+                if low <= key <= high}
+        if "bucket_hash" not in query:
+            self.result = list(rows.items())
+        else:
+            buckets = {}
+            for key, row_hash in rows.items():
+                count, bucket_hash = buckets.get((key - low) // size, (0, 0))
+                buckets[(key - low) // size] = (count + 1,
+                                                bucket_hash ^ row_hash)
+            self.result = [(bucket, count, bucket_hash) for bucket,
+                           (count, bucket_hash) in buckets.items()]
+        return self
+
+    def fetchall(self):
+        return self.result
+
+    @staticmethod
+    def check_params(query, params):
+        if query.count("?") != len(params) \
+                or re.search(r"between -?\d", query):
+            raise AssertionError(f"query is not parameterized: {query}")
+
+
+class TestBucketDiff(unittest.TestCase):
+    builder = SqlQueryBuilder(SqlServerTemplates())
+
+    def __diff(self, work_rows, clear_rows, **kwargs):
+        self.work_cursor = TableCursor(work_rows)
+        self.clear_cursor = TableCursor(clear_rows)
+        return BucketDiff(self.work_cursor, self.clear_cursor, self.builder,
+                          TABLE_NAME, PRIMARY_KEY_COL, COLUMNS, WORK_DB_NAME,
+                          CLEAR_DB_NAME, **kwargs)
+
+    def test_empty_tables(self):
+        diff = self.__diff({}, {})
+        self.assertEqual(diff.get_diff(), ([], []))
+
+    def test_equal_tables(self):
+        rows = {key: f"v{key}" for key in range(1, 10001)}
+        diff = self.__diff(rows, dict(rows), fanout=10, leaf_size=100)
+        self.assertEqual(diff.get_diff(), ([], []))
+        self.assertEqual(diff.rows_read, 2 + 2 * 10)
+
+    def test_diff(self):
+        work_rows = {key: f"v{key}" for key in range(1, 100001)}
+        clear_rows = dict(work_rows)
+        clear_rows[500] = "changed"
+        del clear_rows[77777]
+        clear_rows[100005] = "deleted"
+        del work_rows[3]
+        diff = self.__diff(work_rows, clear_rows, fanout=10, leaf_size=100)
+        self.assertEqual(diff.get_diff(), ([500, 77777], [3, 100005]))
+        self.assertLess(diff.rows_read, 2000)
+
+    def test_with_cursors(self):
+        diff = self.__diff({1: "a"}, {1: "a"})
+        copy = diff.with_cursors(TableCursor({1: "b", 2: "c"}),
+                                 TableCursor({3: "d"}))
+        self.assertEqual(copy.get_diff(), ([1, 2], [3]))
+        self.assertEqual(diff.get_diff(), ([], []))
+
+    def test_diff_key_after(self):
+        work_rows = {key: f"v{key}" for key in range(1, 1001)}
+        clear_rows = {key: f"c{key}" for key in range(1, 1001)}
+        diff = self.__diff(work_rows, clear_rows, fanout=4, leaf_size=10)
+        upsert_keys, delete_keys = diff.get_diff("990")
+        self.assertEqual(upsert_keys, list(range(991, 1001)))
+        self.assertEqual(delete_keys, [])
+
+    def test_diff_other_side_empty(self):
+        rows = {key: f"v{key}" for key in range(10, 60)}
+        diff = self.__diff(rows, {}, fanout=2, leaf_size=8)
+        self.assertEqual(diff.get_diff(), (list(range(10, 60)), []))
+        diff = self.__diff({}, rows, fanout=2, leaf_size=8)
+        self.assertEqual(diff.get_diff(), ([], list(range(10, 60))))
+
+    def test_table_hint(self):
+        work_rows = {key: f"v{key}" for key in range(1, 101)}
+        clear_rows = dict(work_rows)
+        clear_rows[50] = "changed"
+        diff = self.__diff(work_rows, clear_rows, fanout=4, leaf_size=10,
+                           table_hint="nolock")
+        self.assertEqual(diff.get_diff(), ([50], []))
+        self.assertTrue(all("as src with (nolock)" in query
+                            for query in self.work_cursor.queries))
+        self.assertFalse(any("with (nolock)" in query
+                             for query in self.clear_cursor.queries))
+
+
+if __name__ == '__main__':
+    unittest.main()
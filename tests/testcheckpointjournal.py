@@ -0,0 +1,109 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.checkpointjournal import CheckpointJournal
+
+
+class TestCheckpointJournal(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.journal_path = os.path.join(self.folder, "journal.json")
+        self.journal = CheckpointJournal(self.journal_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def __write_file(self, name, text):
+        path = os.path.join(self.folder, name)
+        with open(path, "a") as file:
+            file.write(text)
+        return path
+
+    def test_begin_new_run(self):
+        params = self.journal.begin("upsert", {"row_limit": 10})
+        self.assertEqual(params, {"row_limit": 10})
+        self.assertEqual(self.journal.stage, CheckpointJournal.GENERATE)
+        self.assertEqual(self.journal.files, [])
+        self.assertTrue(os.path.exists(self.journal_path))
+
+    def test_resume_same_kind(self):
+        self.journal.begin("upsert", {"row_limit": 10})
+        path = self.__write_file("1.sql", "script1")
+        self.journal.table_done("upsert", "dbo.a", [path])
+        self.journal.chunk_done("upsert", "dbo.b", "5", [path])
+        journal = CheckpointJournal(self.journal_path)
+        params = journal.begin("upsert", {"row_limit": 20})
+        self.assertEqual(params, {"row_limit": 10})
+        self.assertTrue(journal.is_table_done("upsert", "dbo.a"))
+        self.assertFalse(journal.is_table_done("upsert", "dbo.b"))
+        self.assertEqual(journal.get_resume_key("upsert", "dbo.b"), "5")
+        self.assertIsNone(journal.get_resume_key("delete", "dbo.b"))
+        self.assertEqual(journal.files, [path])
+
+    def test_resume_truncates_unrecorded_tail(self):
+        self.journal.begin("upload", {})
+        path = self.__write_file("1.sql", "script1")
+        self.journal.chunk_done("upload", "dbo.a", "1", [path])
+        self.__write_file("1.sql", "script2")
+        CheckpointJournal(self.journal_path).begin("upload", {})
+        with open(path) as file:
+            self.assertEqual(file.read(), "script1")
+
+    def test_other_kind_adopts_files(self):
+        self.journal.begin("upload", {})
+        path = self.__write_file("1.sql", "script1")
+        self.journal.chunk_done("upload", "dbo.a", "1", [path])
+        journal = CheckpointJournal(self.journal_path)
+        journal.begin("upsert", {"row_limit": 1})
+        self.assertEqual(journal.files, [path])
+        self.assertIsNone(journal.get_resume_key("upload", "dbo.a"))
+        path2 = self.__write_file("2.sql", "script2")
+        journal.chunk_done("upsert", "dbo.a", "1", [path2])
+        self.assertEqual(journal.files, [path, path2])
+
+    def test_stage_and_finish(self):
+        self.journal.begin("upsert", {})
+        self.journal.set_stage(CheckpointJournal.APPLIED)
+        journal = CheckpointJournal(self.journal_path)
+        journal.begin("upsert", {})
+        self.assertEqual(journal.stage, CheckpointJournal.APPLIED)
+        journal.finish()
+        self.assertFalse(os.path.exists(self.journal_path))
+        self.assertEqual(journal.stage, CheckpointJournal.GENERATE)
+
+
+    def test_resume_limit(self):
+        self.journal.begin("upsert", {"row_limit": 10})
+        for _ in range(2):
+            CheckpointJournal(self.journal_path, 2).begin("upsert", {})
+        with self.assertLogs("core.checkpointjournal", "WARNING") as logs:
+            CheckpointJournal(self.journal_path).begin("upsert",
+                                                       {"row_limit": 20})
+        self.assertIn("override the params {'row_limit': 20}",
+                      "".join(logs.output))
+        with self.assertRaises(RuntimeError):
+            CheckpointJournal(self.journal_path).begin("upsert", {})
+        CheckpointJournal(self.journal_path, None).begin("upsert", {})
+
+    def test_discard(self):
+        self.journal.begin("upsert", {})
+        path = self.__write_file("1.sql", "script1")
+        self.journal.chunk_done("upsert", "dbo.a", "1", [path])
+        CheckpointJournal(self.journal_path).discard()
+        self.assertFalse(os.path.exists(self.journal_path))
+        self.assertFalse(os.path.exists(path))
+        self.journal.begin("upsert", {})
+        path = self.__write_file("2.sql", "script2")
+        self.journal.chunk_done("upsert", "dbo.a", "1", [path])
+        self.journal.set_stage(CheckpointJournal.CHANGELOG)
+        journal = CheckpointJournal(self.journal_path)
+        journal.discard()
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual(journal.begin("upsert", {"row_limit": 1}),
+                         {"row_limit": 1})
+
+
+if __name__ == '__main__':
+    unittest.main()
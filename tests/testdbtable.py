@@ -1,11 +1,12 @@
 import unittest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
+from core.bucketdiff import BucketDiff
 from core.dbtable import DbTable
 from core.sqlquerybuilder import SqlQueryBuilder
 from core.sqlservertemplates import SqlServerTemplates
 from dbconstatnts import DbConnector, LOGGER_DICT_STUB, IS_CONNECTED, \
     WORK_DB_NAME, CLEAR_DB_NAME, TABLE_NAME, PRIMARY_KEY_COL, UPDATE_DT_COL,\
-    COLUMNS, STR_COLUMNS, LINK_COLUMNS, INS_COLUMNS, DT, DT_STR, SUB_TABLES,\
+    COLUMNS, TYPES, STR_COLUMNS, LINK_COLUMNS, INS_COLUMNS, DT, DT_STR, SUB_TABLES,\
     CREATE_SUB_TABLES_SCRIPTS, DROP_SUB_TABLES_SCRIPTS, CREATE_DB_SCRIPT,\
     INIT_SCRIPT, TRUNCATE_SCRIPT, DROP_SCRIPT
 
@@ -21,8 +22,10 @@ class TestDbTable(unittest.TestCase):
     mock_cursor.fetchall = MagicMock(return_value=
                                      [[col,
                                        1 if col == UPDATE_DT_COL else 0,
-                                       1 if col == PRIMARY_KEY_COL else 0]
-                                      for col in COLUMNS])
+                                       1 if col == PRIMARY_KEY_COL else 0,
+                                       col_type]
+                                      for col, col_type in zip(COLUMNS,
+                                                               TYPES)])
     mock_table = DbTable(LOGGER_DICT_STUB, mock_cursor, queries, TABLE_NAME,
                          WORK_DB_NAME, CLEAR_DB_NAME)
 
@@ -87,6 +90,24 @@ class TestDbTable(unittest.TestCase):
         self.cursor.execute("\n".join(DROP_SUB_TABLES_SCRIPTS))
         self.assertCountEqual(sub_tables, tuple(SUB_TABLES))
 
+    def test_bucket_diff_once_per_run(self):
+        columns = self.mock_cursor.fetchall.return_value
+        cursor = MagicMock()
+        cursor.fetchall = MagicMock(side_effect=[[], columns, [], [(2, 20)],
+                                                 [(2, 20)]])
+        table = DbTable(LOGGER_DICT_STUB, cursor, self.queries, TABLE_NAME,
+                        WORK_DB_NAME, CLEAR_DB_NAME, bucket_diff_settings={})
+        with patch.object(BucketDiff, "get_diff",
+                          return_value=([1, 2], [3])) as get_diff:
+            self.assertEqual(table.get_upsert_estimate()[0], 2)
+            self.assertEqual(table.get_delete_estimate()[0], 1)
+            copy = table.with_cursor(cursor)
+            self.assertIn("(3)", list(copy.iter_delete_statements())[0][0])
+            self.assertEqual(get_diff.call_count, 1)
+            table.reset_diff()
+            self.assertEqual(copy.get_upsert_estimate()[0], 2)
+            self.assertEqual(get_diff.call_count, 2)
+
     @unittest.skipIf(not IS_CONNECTED, "Is not connected")
     def test_get_delete_statement_list_empty(self):
         self.assertEqual(self.table.get_delete_statement_list(), [])
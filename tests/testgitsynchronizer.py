@@ -0,0 +1,220 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from git import GitCommandError, Repo
+
+from core.gitsynchronizer import GitSynchronizer
+from core.pipelinescheduler import PipelineLimits
+
+
+class SlowRemote:
+    """A remote recording whether a pull runs while a push is in flight."""
+
+    def __init__(self):
+        self.pushing = threading.Event()
+        self.in_push = False
+        self.pulls_in_push = []
+
+    def push(self):
+        self.in_push = True
+        self.pushing.set()
+        time.sleep(0.2)
+        self.in_push = False
+
+    def pull(self):
+        self.pulls_in_push.append(self.in_push)
+
+
+class FlakyRemote:
+    """A remote failing the first push attempt and recording whether a pull
+    of the caller runs before the push is done."""
+
+    def __init__(self):
+        self.pushing = threading.Event()
+        self.attempts = 0
+        self.pushed = False
+        self.pulls_pushed = []
+
+    def push(self):
+        self.attempts += 1
+        self.pushing.set()
+        if self.attempts == 1:
+            raise GitCommandError("git push", 1)
+        self.pushed = True
+
+    def pull(self):
+        if threading.current_thread().name != "git-push":
+            self.pulls_pushed.append(self.pushed)
+
+
+class TestGitSynchronizer(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.remote_path = os.path.join(self.folder, "remote.git")
+        Repo.init(self.remote_path, bare=True)
+        self.repo = Repo.clone_from(self.remote_path,
+                                    os.path.join(self.folder, "local"))
+        self.__write_file("init.txt")
+        self.repo.index.add(["init.txt"])
+        self.repo.index.commit("init")
+        self.repo.remote("origin").push("HEAD:refs/heads/master")
+        self.repo.git.branch("--set-upstream-to=origin/master")
+        self.sync = GitSynchronizer(self.repo, max_attempts=2,
+                                    backoff_seconds=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def __write_file(self, name):
+        path = os.path.join(self.repo.working_tree_dir, name)
+        with open(path, "w") as file:
+            file.write(name)
+        return path
+
+    def __remote_commit_count(self):
+        return int(Repo(self.remote_path).git.rev_list("--count", "master"))
+
+    def test_stage_without_duplicates(self):
+        self.sync.stage(["a", "b"])
+        self.sync.stage(["b", "c"])
+        self.assertEqual(self.sync.staged_files, ("a", "b", "c"))
+
+    def test_commit_and_push_empty(self):
+        self.assertFalse(self.sync.commit_and_push("empty"))
+        self.assertEqual(self.__remote_commit_count(), 1)
+
+    def test_commit_and_push_single_commit(self):
+        self.sync.pull()
+        self.sync.stage([self.__write_file("1.sql")])
+        self.sync.stage([self.__write_file("2.sql")])
+        self.assertTrue(self.sync.commit_and_push("scripts"))
+        self.assertEqual(self.sync.staged_files, tuple())
+        self.assertEqual(self.__remote_commit_count(), 2)
+        remote_files = Repo(self.remote_path).git.ls_tree(
+            "--name-only", "master").split()
+        self.assertCountEqual(remote_files, ["init.txt", "1.sql", "2.sql"])
+
+    def test_push_failed(self):
+        self.repo.remote("origin").set_url(
+            os.path.join(self.folder, "missing.git"))
+        self.sync.stage([self.__write_file("1.sql")])
+        self.assertRaises(RuntimeError, self.sync.commit_and_push, "scripts")
+        self.assertEqual(self.sync.retry_count, 1)
+
+    def test_open_repository_shallow_sparse(self):
+        os.mkdir(os.path.join(self.repo.working_tree_dir, "Report"))
+        os.mkdir(os.path.join(self.repo.working_tree_dir, "Other"))
+        self.sync.stage([self.__write_file("Report/1.sql"),
+                         self.__write_file("Other/1.txt")])
+        self.sync.commit_and_push("scripts")
+        clone_path = os.path.join(self.folder, "clone")
+        repo = GitSynchronizer.open_repository(
+            clone_path, "Report", remote_url="file://" + self.remote_path,
+            shallow_depth=1, sparse=True)
+        self.assertTrue(os.path.exists(os.path.join(clone_path, "Report",
+                                                    "1.sql")))
+        self.assertFalse(os.path.exists(os.path.join(clone_path, "Other")))
+        self.assertEqual(repo.git.rev_list("--count", "HEAD"), "1")
+        reopened = GitSynchronizer.open_repository(clone_path, "Report",
+                                                   sparse=True)
+        self.assertEqual(reopened.head.commit, repo.head.commit)
+
+    def test_open_repository_sparse_shared(self):
+        for folder in ("Report", "Other", "Third"):
+            os.mkdir(os.path.join(self.repo.working_tree_dir, folder))
+            self.sync.stage([self.__write_file(f"{folder}/1.sql")])
+        self.sync.commit_and_push("scripts")
+        clone_path = os.path.join(self.folder, "clone")
+        GitSynchronizer.open_repository(
+            clone_path, "Report", remote_url="file://" + self.remote_path,
+            sparse=True)
+        GitSynchronizer.open_repository(clone_path, "Other", sparse=True)
+        for folder, is_checked_out in (("Report", True), ("Other", True),
+                                       ("Third", False)):
+            self.assertEqual(os.path.exists(os.path.join(
+                clone_path, folder, "1.sql")), is_checked_out)
+
+    def test_open_repository_missing_folder(self):
+        self.assertRaises(NotADirectoryError, GitSynchronizer.open_repository,
+                          os.path.join(self.folder, "missing"), "Report")
+
+    def test_background_push(self):
+        sync = GitSynchronizer(self.repo, max_attempts=2, backoff_seconds=0,
+                               background_push=True)
+        sync.stage([self.__write_file("1.sql")])
+        self.assertTrue(sync.commit_and_push("first"))
+        sync.stage([self.__write_file("2.sql")])
+        self.assertTrue(sync.commit_and_push("second"))
+        sync.flush()
+        self.assertEqual(self.__remote_commit_count(), 3)
+        self.assertEqual(Repo(self.remote_path).git.log(
+            "--format=%s", "master").split(), ["second", "first", "init"])
+        sync.close()
+        sync.stage([self.__write_file("3.sql")])
+        self.assertRaises(RuntimeError, sync.commit_and_push, "closed")
+
+    def test_background_push_failed(self):
+        sync = GitSynchronizer(self.repo, max_attempts=1, backoff_seconds=0,
+                               max_backoff_seconds=60, background_push=True)
+        url = self.repo.remote("origin").url
+        self.repo.remote("origin").set_url(
+            os.path.join(self.folder, "missing.git"))
+        sync.stage([self.__write_file("1.sql")])
+        self.assertTrue(sync.commit_and_push("scripts"))
+        self.assertRaises(RuntimeError, sync.flush)
+        self.repo.remote("origin").set_url(url)
+        sync.close()
+        self.assertEqual(self.__remote_commit_count(), 2)
+
+    def test_default_limits_lock(self):
+        limits = PipelineLimits({}, None, {})
+        sync = GitSynchronizer(self.repo, max_attempts=1, backoff_seconds=0,
+                               background_push=True,
+                               lock=limits.git(self.repo.working_tree_dir))
+        remote = SlowRemote()
+        sync._GitSynchronizer__origin = remote
+        sync.stage([self.__write_file("1.sql")])
+        sync.commit_and_push("scripts")
+        self.assertTrue(remote.pushing.wait(5))
+        sync.pull()
+        sync.close()
+        self.assertEqual(remote.pulls_in_push, [False])
+
+    def test_pull_waits_push_retries(self):
+        sync = GitSynchronizer(self.repo, max_attempts=2, backoff_seconds=0.2,
+                               background_push=True)
+        remote = FlakyRemote()
+        sync._GitSynchronizer__origin = remote
+        sync.stage([self.__write_file("1.sql")])
+        sync.commit_and_push("scripts")
+        self.assertTrue(remote.pushing.wait(5))
+        sync.pull()
+        sync.close()
+        self.assertEqual(remote.pulls_pushed, [True])
+
+    def test_wait_push_retries(self):
+        sync = GitSynchronizer(self.repo, max_attempts=2, backoff_seconds=0.1,
+                               background_push=True)
+        remote = FlakyRemote()
+        sync._GitSynchronizer__origin = remote
+        sync.stage([self.__write_file("1.sql")])
+        sync.commit_and_push("scripts")
+        self.assertTrue(remote.pushing.wait(5))
+        self.assertEqual(sync.wait_push(), 1)
+        self.assertTrue(remote.pushed)
+        self.assertEqual(sync.retry_count, 0)
+        self.assertEqual(sync.wait_push(), 0)
+        sync.close()
+
+    def test_pull_failed(self):
+        self.repo.remote("origin").set_url(
+            os.path.join(self.folder, "missing.git"))
+        self.assertRaises(RuntimeError, self.sync.pull)
+        self.assertEqual(self.sync.retry_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+import threading
+import time
+import unittest
+
+from pyodbc import Error as DbError
+
+from core.loadgovernor import LoadGovernor
+from core.querystats import QueryStats
+from core.sqlquerybuilder import SqlQueryBuilder
+from core.sqlservertemplates import SqlServerTemplates
+
+
+class GovernedCursor:
+    """Returns the rows for each query, answers the wait stats query with the
+    next wait time and counts the queries running at the same time."""
+
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def __init__(self, rows, wait_times=None, seconds=0.0):
+        self.rows = rows
+        self.wait_times = list(wait_times or [])
+        self.seconds = seconds
+        self.queries = []
+        self.result = []
+        self.messages = []
+
+    def execute(self, query):
+        self.queries.append(query)
+        if "dm_os_wait_stats" in query:
+            if not self.wait_times:
+                raise DbError("VIEW SERVER STATE permission was denied")
+            self.result = [(self.wait_times.pop(0),)]
+            return self
+        with GovernedCursor.lock:
+            GovernedCursor.running += 1
+            GovernedCursor.max_running = max(GovernedCursor.max_running,
+                                             GovernedCursor.running)
+        time.sleep(self.seconds)
+        with GovernedCursor.lock:
+            GovernedCursor.running -= 1
+        self.result = list(self.rows)
+        return self
+
+    def fetchall(self):
+        result, self.result = self.result, []
+        return result
+
+    def fetchmany(self, size):
+        result, self.result = self.result[:size], self.result[size:]
+        return result
+
+    def nextset(self):
+        return False
+
+
+class TestLoadGovernor(unittest.TestCase):
+    builder = SqlQueryBuilder(SqlServerTemplates())
+
+    def setUp(self):
+        GovernedCursor.max_running = 0
+
+    def test_no_limits(self):
+        cursor = GovernedCursor([(1,), (2,)])
+        governor = LoadGovernor(self.builder)
+        self.assertEqual(governor.fetch(cursor, "select 1;")[0],
+                         [(1,), (2,)])
+        self.assertEqual(cursor.queries, ["select 1;"])
+        self.assertEqual(governor.delay_seconds, 0)
+
+    def test_maxdop(self):
+        cursor = GovernedCursor([])
+        governor = LoadGovernor(self.builder, maxdop=2)
+        governor.fetch(cursor, "select 1;")
+        self.assertEqual(cursor.queries, ["select 1\noption (maxdop 2);\n"])
+
+    def test_rows_per_second(self):
+        cursor = GovernedCursor([(num,) for num in range(30)])
+        governor = LoadGovernor(self.builder, rows_per_second=300,
+                                batch_size=10)
+        started = time.perf_counter()
+        result, held = governor.fetch(cursor, "select 1;")
+        self.assertEqual(len(result), 30)
+        self.assertGreaterEqual(time.perf_counter() - started, 0.09)
+        self.assertGreater(held, 0.05)
+        self.assertAlmostEqual(governor.throttled_seconds, held)
+        governor.reset()
+        self.assertEqual(governor.throttled_seconds, 0)
+
+    def test_max_concurrent_queries(self):
+        governor = LoadGovernor(self.builder, max_concurrent_queries=1)
+        threads = [threading.Thread(
+            target=governor.fetch,
+            args=(GovernedCursor([], seconds=0.02), "select 1;"))
+            for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(GovernedCursor.max_running, 1)
+        self.assertGreater(governor.throttled_seconds, 0)
+
+    def test_latency_backoff(self):
+        governor = LoadGovernor(self.builder, latency_seconds=0.01,
+                                backoff_seconds=0.01, max_backoff_seconds=0.03)
+        slow_cursor = GovernedCursor([], seconds=0.02)
+        governor.fetch(slow_cursor, "select 1;")
+        self.assertEqual(governor.delay_seconds, 0.01)
+        governor.fetch(slow_cursor, "select 1;")
+        governor.fetch(slow_cursor, "select 1;")
+        self.assertEqual(governor.delay_seconds, 0.03)
+        fast_cursor = GovernedCursor([])
+        governor.fetch(fast_cursor, "select 1;")
+        self.assertEqual(governor.delay_seconds, 0.015)
+        governor.fetch(fast_cursor, "select 1;")
+        self.assertEqual(governor.delay_seconds, 0)
+
+    def test_wait_stats_backoff(self):
+        cursor = GovernedCursor([(1,)], wait_times=[0, 10 ** 9, 10 ** 9])
+        governor = LoadGovernor(self.builder, wait_ms_per_second=1000,
+                                wait_interval_seconds=0,
+                                backoff_seconds=0.01)
+        self.assertEqual(governor.fetch(cursor, "select 1;")[0], [(1,)])
+        self.assertEqual(governor.delay_seconds, 0)
+        governor.fetch(cursor, "select 1;")
+        self.assertEqual(governor.delay_seconds, 0.01)
+        governor.fetch(cursor, "select 1;")
+        self.assertEqual(governor.delay_seconds, 0)
+        self.assertEqual(len([query for query in cursor.queries
+                              if "dm_os_wait_stats" in query]), 3)
+
+    def test_wait_stats_denied(self):
+        cursor = GovernedCursor([(1,)])
+        governor = LoadGovernor(self.builder, wait_ms_per_second=1000,
+                                wait_interval_seconds=0)
+        self.assertEqual(governor.fetch(cursor, "select 1;")[0], [(1,)])
+        governor.fetch(cursor, "select 1;")
+        self.assertEqual(len(cursor.queries), 3)
+
+    def test_query_stats(self):
+        cursor = GovernedCursor([(1,)])
+        governor = LoadGovernor(self.builder, maxdop=1, backoff_seconds=0.05,
+                                latency_seconds=0)
+        stats = QueryStats(self.builder)
+        governor.fetch(cursor, "select 1;")
+        self.assertEqual(stats.fetch(cursor, "dbo.a", "upsert", "select 1;",
+                                     governor), [(1,)])
+        self.assertLess(stats.totals[("dbo.a", "upsert")]["seconds"], 0.04)
+        self.assertTrue(cursor.queries[-1].endswith("option (maxdop 1);\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import logging
+import threading
+import unittest
+from logging.handlers import QueueHandler
+
+from core.logsetup import configure_logging, shutdown_logging
+
+
+class ListHandler(logging.Handler):
+    """Keeps the handled records with the name of the handling thread."""
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append((self.format(record),
+                             threading.current_thread().name))
+
+
+def get_config(level="INFO"):
+    return {"version": 1, "disable_existing_loggers": False,
+            "handlers": {"list": {"()": ListHandler, "level": level}},
+            "root": {"handlers": ["list"], "level": "DEBUG"}}
+
+
+class TestLogSetup(unittest.TestCase):
+    def setUp(self):
+        self.assertTrue(configure_logging(get_config(), force=True))
+        self.handler = logging.getLogger().handlers[0]
+
+    def tearDown(self):
+        shutdown_logging()
+
+    def test_once(self):
+        self.assertFalse(configure_logging(get_config("DEBUG")))
+        self.assertIs(logging.getLogger().handlers[0], self.handler)
+        logging.getLogger("core.test").info("message %s", 1)
+        self.assertEqual(self.handler.records,
+                         [("message 1", threading.current_thread().name)])
+
+    def test_queue(self):
+        self.assertTrue(configure_logging(get_config(), use_queue=True,
+                                          force=True))
+        root = logging.getLogger()
+        self.assertEqual(len(root.handlers), 1)
+        self.assertIsInstance(root.handlers[0], QueueHandler)
+        logger = logging.getLogger("core.test")
+        logger.debug("skipped by the handler level")
+        logger.info("message %s", 2)
+        try:
+            raise ValueError("failed")
+        except ValueError as ex:
+            logger.exception(ex)
+        shutdown_logging()
+        self.assertEqual(len(root.handlers), 1)
+        handler = root.handlers[0]
+        self.assertIsInstance(handler, ListHandler)
+        self.assertEqual(handler.records[0][0], "message 2")
+        self.assertNotEqual(handler.records[0][1],
+                            threading.current_thread().name)
+        self.assertIn("ValueError: failed", handler.records[1][0])
+        self.assertEqual(len(handler.records), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import multiprocessing
+import os
+import shutil
+import signal
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import CancelledError
+
+from core.pipelinescheduler import PipelineLimits, PipelineScheduler
+
+
+def record_pipeline(pipeline, limits):
+    servers = [PipelineScheduler.get_server(conn_string) for conn_string in
+               (pipeline["connection"]["conn_string"],
+                pipeline["connection"].get("clear_conn_string")) if conn_string]
+    with limits.connections(servers):
+        beg = time.monotonic()
+        time.sleep(0.1)
+        end = time.monotonic()
+    if pipeline.get("fail"):
+        raise RuntimeError("pipeline failed")
+    with open(os.path.join(pipeline["folder"], pipeline["name"]), "w") as file:
+        file.write(f"{beg} {end}")
+
+
+def stoppable_pipeline(pipeline, limits):
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    path = os.path.join(pipeline["folder"], pipeline["name"])
+    with open(path, "w") as file:
+        file.write("started")
+    stopped = stop_event.wait(10)
+    with open(path, "w") as file:
+        file.write("stopped" if stopped else "finished")
+
+
+class TestPipelineScheduler(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def __pipeline(self, name, server, target_folder, **kwargs):
+        pipeline = {"name": name, "folder": self.folder,
+                    "connection": {"conn_string": f"DRIVER={{ODBC Driver 17 "
+                                                  f"for SQL Server}};"
+                                                  f"SERVER={server};"
+                                                  f"UID=user"},
+                    "repository": {"git_folder_path": self.folder,
+                                   "target_folder": target_folder}}
+        pipeline.update(kwargs)
+        return pipeline
+
+    def __intervals(self, names):
+        intervals = []
+        for name in names:
+            with open(os.path.join(self.folder, name)) as file:
+                intervals.append(tuple(map(float, file.read().split())))
+        return sorted(intervals)
+
+    def test_get_server(self):
+        self.assertEqual(PipelineScheduler.get_server(
+            "DRIVER={SQL Server};SERVER=Host\\Inst,1433;DATABASE=db"),
+            "host\\inst,1433")
+        self.assertEqual(PipelineScheduler.get_server("Server = host ;"),
+                         "host")
+        self.assertEqual(PipelineScheduler.get_server("DSN=work"), "")
+
+    def test_limits_without_locks(self):
+        limits = PipelineLimits({}, None, {})
+        with limits.connection("host"), limits.liquibase():
+            pass
+        self.assertIsNone(limits.git(self.folder))
+
+    def test_acquire_connections(self):
+        semaphore = multiprocessing.Semaphore(3)
+        limits = PipelineLimits({"host": semaphore}, None, {})
+        with limits.connection("HOST"):
+            self.assertEqual(limits.acquire_connections("HOST", 4), 2)
+            self.assertEqual(limits.acquire_connections("host", 1), 0)
+            limits.release_connections("host", 2)
+        self.assertEqual(limits.acquire_connections("host", 2), 2)
+        self.assertEqual(limits.acquire_connections("other", 4), 4)
+
+    def test_connections(self):
+        semaphores = {"host1": multiprocessing.Semaphore(1),
+                      "host2": multiprocessing.Semaphore(1)}
+        limits = PipelineLimits(semaphores, None, {}, multiprocessing.Lock())
+        with limits.connections(["HOST1", "host2", "host1", "other"]):
+            self.assertEqual(limits.acquire_connections("host1", 1), 0)
+            self.assertEqual(limits.acquire_connections("host2", 1), 0)
+        self.assertEqual(limits.acquire_connections("host1", 1), 1)
+        self.assertEqual(limits.acquire_connections("host2", 1), 1)
+
+    def test_run_clear_server_limit(self):
+        pipelines = [self.__pipeline("p1", "host1", "a"),
+                     self.__pipeline("p2", "host2", "b")]
+        pipelines[1]["connection"]["clear_conn_string"] = "SERVER=host1"
+        scheduler = PipelineScheduler(max_workers=2,
+                                      max_connections_per_server=1)
+        results = scheduler.run(pipelines, record_pipeline)
+        self.assertEqual(results, {"p1": None, "p2": None})
+        first, second = self.__intervals(["p1", "p2"])
+        self.assertLessEqual(first[1], second[0])
+
+    def test_run_sigterm(self):
+        pipelines = [self.__pipeline("p1", "host1", "a"),
+                     self.__pipeline("p2", "host1", "b")]
+        handler = signal.getsignal(signal.SIGTERM)
+        started_path = os.path.join(self.folder, "p1")
+
+        def send_sigterm():
+            while not os.path.exists(started_path):
+                time.sleep(0.01)
+            os.kill(os.getpid(), signal.SIGTERM)
+        sender = threading.Thread(target=send_sigterm, daemon=True)
+        sender.start()
+        results = PipelineScheduler(max_workers=1).run(pipelines,
+                                                       stoppable_pipeline)
+        sender.join(5)
+        self.assertIsNone(results["p1"])
+        self.assertIsInstance(results["p2"], CancelledError)
+        with open(started_path) as file:
+            self.assertEqual(file.read(), "stopped")
+        self.assertFalse(os.path.exists(os.path.join(self.folder, "p2")))
+        self.assertIs(signal.getsignal(signal.SIGTERM), handler)
+
+    def test_run_connection_limit(self):
+        pipelines = [self.__pipeline("p1", "host1", "a"),
+                     self.__pipeline("p2", "HOST1", "b"),
+                     self.__pipeline("p3", "host2", "c")]
+        scheduler = PipelineScheduler(max_workers=3,
+                                      max_connections_per_server=1)
+        results = scheduler.run(pipelines, record_pipeline)
+        self.assertEqual(results, {"p1": None, "p2": None, "p3": None})
+        first, second = self.__intervals(["p1", "p2"])
+        self.assertLessEqual(first[1], second[0])
+
+    def test_run_failed_pipeline(self):
+        pipelines = [self.__pipeline("p1", "host1", "a", fail=True),
+                     self.__pipeline("p2", "host1", "b")]
+        results = PipelineScheduler(max_workers=2).run(pipelines,
+                                                       record_pipeline)
+        self.assertIsInstance(results["p1"], RuntimeError)
+        self.assertIsNone(results["p2"])
+
+    def test_run_same_target_folder(self):
+        pipelines = [self.__pipeline("p1", "host1", "a"),
+                     self.__pipeline("p2", "host2", "a")]
+        self.assertRaises(ValueError, PipelineScheduler().run, pipelines,
+                          record_pipeline)
+
+
+if __name__ == '__main__':
+    unittest.main()
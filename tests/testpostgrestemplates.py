@@ -0,0 +1,137 @@
+import unittest
+from datetime import datetime
+
+from core.postgrestemplates import PostgresTemplates
+from core.sqlquerybuilder import SqlQueryBuilder
+from core.sqltemplates import SqlTemplates
+
+TABLE_NAME = "report"
+COLUMNS = ["id", "name", "amount", "report_upddt"]
+PRIMARY_KEY_COL = "id"
+
+
+class TestPostgresTemplates(unittest.TestCase):
+    def setUp(self) -> None:
+        self.templates = PostgresTemplates()
+        self.builder = SqlQueryBuilder(self.templates)
+        self.copy_builder = SqlQueryBuilder(self.templates, bulk_copy=True)
+
+    def test_derive(self):
+        self.assertIsInstance(self.templates, SqlTemplates)
+
+    def test_upsert_statement(self):
+        dt = datetime(2022, 1, 2, 3, 4, 5)
+        statement = self.builder.get_upsert_statement(
+            TABLE_NAME, COLUMNS, [[1, "a'b", None, dt]], PRIMARY_KEY_COL)
+        self.assertEqual(statement, (
+            "insert into report(\n"
+            "    id,name,amount,report_upddt)\n"
+            "overriding system value\n"
+            "values\n"
+            "        (1,'a''b',null,'2022-01-02 03:04:05.000')\n"
+            "on conflict(id) do update set\n"
+            "            name = excluded.name,\n"
+            "            amount = excluded.amount,\n"
+            "            report_upddt = excluded.report_upddt;\n"))
+
+    def test_upload_statement(self):
+        dt = datetime(2022, 1, 2, 3, 4, 5)
+        data = [[1, "tab\there", None, dt],
+                [2, "line\nbreak\\", 1.5, None]]
+        statement = self.copy_builder.get_upload_statement(
+            TABLE_NAME, COLUMNS, data, PRIMARY_KEY_COL)
+        self.assertEqual(statement, (
+            "drop table if exists pg_temp.copy_src;\n"
+            "create temporary table copy_src as\n"
+            "select\n"
+            "    id,name,amount,report_upddt\n"
+            "from report\n"
+            "with no data;\n"
+            "copy copy_src(\n"
+            "    id,name,amount,report_upddt) from stdin;\n"
+            "1\ttab\\there\t\\N\t2022-01-02 03:04:05.000\n"
+            "2\tline\\nbreak\\\\\t1.5\t\\N\n"
+            "\\.\n"
+            "insert into report(\n"
+            "    id,name,amount,report_upddt)\n"
+            "overriding system value\n"
+            "select\n"
+            "    id,name,amount,report_upddt\n"
+            "from copy_src\n"
+            "on conflict(id) do update set\n"
+            "            name = excluded.name,\n"
+            "            amount = excluded.amount,\n"
+            "            report_upddt = excluded.report_upddt;\n"
+            "drop table copy_src;\n"))
+
+    def test_upload_statement_without_bulk_copy(self):
+        data = [[1, "a", None, None]]
+        self.assertEqual(self.builder.get_upload_statement(
+            TABLE_NAME, COLUMNS, data, PRIMARY_KEY_COL),
+            self.builder.get_upsert_statement(TABLE_NAME, COLUMNS, data,
+                                              PRIMARY_KEY_COL))
+
+    def test_upload_statement_type_error(self):
+        self.assertRaises(TypeError, self.copy_builder.get_upload_statement,
+                          TABLE_NAME, COLUMNS, [[tuple()]], PRIMARY_KEY_COL)
+
+    def test_estimate_upload_size(self):
+        data = [[num, "name", 1.5, "2022-01-02"] for num in range(100)]
+        statement = self.copy_builder.get_upload_statement(
+            TABLE_NAME, COLUMNS, data, PRIMARY_KEY_COL)
+        data_length = sum(len(str(num)) + 4 + 3 + 10 for num in range(100))
+        size = self.copy_builder.estimate_upsert_size(
+            TABLE_NAME, COLUMNS, PRIMARY_KEY_COL, 100, data_length, 1,
+            all_rows=True)
+        self.assertAlmostEqual(size, len(statement), delta=len(statement) / 10)
+
+    def test_upsert_statement_not_staged(self):
+        builder = SqlQueryBuilder(self.templates, stage_threshold=1)
+        data = [[1, "a", None, None], [2, "b", None, None]]
+        self.assertEqual(builder.get_upsert_statement(TABLE_NAME, COLUMNS,
+                                                      data, PRIMARY_KEY_COL),
+                         self.builder.get_upsert_statement(
+                             TABLE_NAME, COLUMNS, data, PRIMARY_KEY_COL))
+
+    def test_search_hash_upsert_query(self):
+        query = self.builder.get_search_hash_upsert_query(
+            COLUMNS, "work", TABLE_NAME, PRIMARY_KEY_COL, "clear")
+        self.assertIn("from work.report as src\n", query)
+        self.assertIn("from clear.report as clr\n", query)
+        self.assertTrue(query.endswith(
+            "and row(clr.name,clr.amount,clr.report_upddt) is not distinct "
+            "from row(src.name,src.amount,src.report_upddt))"))
+
+    def test_hierarchy_ordered_query(self):
+        query = self.builder.get_hierarchy_ordered_query(
+            "select src.id from work.report as src", "id", "work", TABLE_NAME,
+            "parent_id", "5")
+        self.assertTrue(query.startswith("with recursive hierarchy"))
+        self.assertNotIn("option", query)
+        self.assertNotIn("isnull", query)
+
+    def test_isolation_level_statement(self):
+        self.assertEqual(self.builder.get_isolation_level_statement("snapshot"),
+                         "set transaction isolation level repeatable read;")
+        self.assertEqual(
+            self.builder.get_isolation_level_statement("read committed"),
+            "set transaction isolation level read committed;")
+
+    def test_supports(self):
+        for feature in ("snapshot", "wait_stats", "bucket_diff"):
+            self.assertTrue(self.builder.supports(feature), feature)
+        for feature in ("table_hint", "maxdop", "statistics", "showplan"):
+            self.assertFalse(self.builder.supports(feature), feature)
+
+    def test_not_supported(self):
+        with self.assertRaises(NotImplementedError):
+            self.builder.get_all_rows_query(COLUMNS, "work", TABLE_NAME,
+                                            "nolock")
+        with self.assertRaises(NotImplementedError):
+            self.builder.get_maxdop_query("select 1;", 1)
+        with self.assertRaises(NotImplementedError):
+            self.builder.get_statistics_statement(True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,82 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.querystats import QueryStats
+from core.sqlquerybuilder import SqlQueryBuilder
+from core.sqlservertemplates import SqlServerTemplates
+
+
+class StatsCursor:
+    """Returns the same rows for each query and a statistics message."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.showplan = False
+        self.messages = []
+
+    def execute(self, query):
+        self.queries.append(query)
+        if query.startswith("set showplan_xml"):
+            self.showplan = query.endswith("on;")
+        self.messages = [("[01000] (0)", "Table 't'. Scan count 1")]
+        return self
+
+    def fetchall(self):
+        if self.showplan:
+            return [("<ShowPlanXML/>",)]
+        return self.rows
+
+    def nextset(self):
+        self.messages = []
+        return False
+
+
+class TestQueryStats(unittest.TestCase):
+    builder = SqlQueryBuilder(SqlServerTemplates())
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.cursor = StatsCursor([(1, "ab"), (2, None)])
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_fetch(self):
+        stats = QueryStats(self.builder)
+        self.assertEqual(stats.fetch(self.cursor, "dbo.a", "upsert", "q"),
+                         [(1, "ab"), (2, None)])
+        stats.fetch(self.cursor, "dbo.a", "delete", "q")
+        stats.fetch(self.cursor, "dbo.b", "upsert", "q")
+        self.assertEqual(stats.query_count, 3)
+        self.assertEqual(stats.slow_queries, [])
+        self.assertEqual(self.cursor.queries, ["q", "q", "q"])
+        report = stats.report().split("\n")
+        self.assertEqual(len(report), 5)
+        self.assertEqual(report[1].split()[0:3], ["dbo.a", "upsert", "1"])
+        self.assertEqual(report[1].split()[-2:], ["2", "18"])
+        stats.reset()
+        self.assertEqual(stats.query_count, 0)
+
+    def test_slow_query(self):
+        stats = QueryStats(self.builder, slow_query_seconds=0,
+                           statistics_io_time=True, plan_folder=self.folder)
+        stats.fetch(self.cursor, "dbo.a", "upsert", "q1")
+        stats.fetch(self.cursor, "dbo.a", "upsert", "q2")
+        self.assertEqual(self.cursor.queries.count(
+            self.builder.get_statistics_statement(True)), 1)
+        slow_queries = stats.slow_queries
+        self.assertEqual([query["query"] for query in slow_queries],
+                         ["q1", "q2"])
+        self.assertEqual(slow_queries[0]["messages"],
+                         ["Table 't'. Scan count 1"])
+        with open(slow_queries[0]["plan"]) as file:
+            self.assertEqual(file.read(), "<ShowPlanXML/>")
+        self.assertFalse(self.cursor.showplan)
+        self.assertTrue(stats.report().endswith("slow queries: 2"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from git import Repo
+
+import pyodbc
+from core.scriptgenerator import ScriptGenerator
+from core.sqlquerybuilder import SqlQueryBuilder
+from core.sqlservertemplates import SqlServerTemplates
+from dbconstatnts import LOGGER_DICT_STUB
+from testtableworkers import LIQUIBASE_SKIP, StubTable
+
+
+class LostConnection:
+    """A connection failing the statements after the loss."""
+
+    def __init__(self):
+        self.autocommit = True
+        self.lost = False
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        if self.lost:
+            raise pyodbc.Error("08S01", "communication link failure")
+
+
+class LostCursor:
+    """A cursor failing the isolation level statements given in fail_on or
+    all statements after the connection loss."""
+
+    def __init__(self, fail_on=()):
+        self.connection = LostConnection()
+        self.fail_on = fail_on
+        self.statements = []
+
+    def execute(self, query, params=None):
+        self.statements.append(query)
+        if self.connection.lost \
+                or any(level in query for level in self.fail_on):
+            raise pyodbc.Error("08S01", "communication link failure")
+        return self
+
+    def fetchall(self):
+        return [(1,)]
+
+
+class TestReadSnapshot(unittest.TestCase):
+    """Runs the diffs of the ScriptGenerator in a snapshot transaction on a
+    connection lost in the middle of the run."""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        origin = Repo.init(os.path.join(self.folder, "origin.git"), bare=True)
+        self.git_folder = os.path.join(self.folder, "repo")
+        repo = Repo.init(self.git_folder)
+        with open(os.path.join(self.git_folder, "init.txt"), "w") as file:
+            file.write("init")
+        repo.index.add(["init.txt"])
+        repo.index.commit("init")
+        repo.create_remote("origin", origin.git_dir)
+        repo.git.push("-u", "origin", repo.active_branch.name)
+        self.settings = {"order": []}
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def __generator(self, cursor):
+        table_settings = {"table_list": ["a"], "upsert_only_list": [],
+                          "delete_only_list": [], "read_isolation": "snapshot"}
+        with patch("core.scriptgenerator.DbTable",
+                   lambda config_dict, cursor, queries, table_name, *args:
+                   StubTable(self.settings, table_name)):
+            return ScriptGenerator(
+                LOGGER_DICT_STUB, cursor, SqlQueryBuilder(SqlServerTemplates()),
+                "work", "clear", self.git_folder, "out", table_settings,
+                LIQUIBASE_SKIP)
+
+    def test_snapshot_start_failed(self):
+        cursor = LostCursor(fail_on=("snapshot", "read committed"))
+        generator = self.__generator(cursor)
+        with self.assertRaises(RuntimeError) as context:
+            generator.upsert_tables(100000, "scripts")
+        self.assertIsInstance(context.exception.__cause__, pyodbc.Error)
+        generator.close()
+
+    def test_connection_lost(self):
+        cursor = LostCursor()
+        generator = self.__generator(cursor)
+
+        def lose_connection(name):
+            cursor.connection.lost = True
+            raise RuntimeError("query execution failed")
+        self.settings.update(a=(1, 0, None), on_script=lose_connection)
+        with self.assertRaisesRegex(RuntimeError, "query execution failed"):
+            generator.upsert_tables(100000, "scripts")
+        self.assertIn("set transaction isolation level read committed;",
+                      cursor.statements)
+        generator.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
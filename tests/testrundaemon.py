@@ -0,0 +1,90 @@
+import argparse
+import threading
+import unittest
+
+import pyodbc
+from main import run_daemon
+
+
+class StubGenerator:
+    """Counts the runs of the daemon, the runs fail with the given errors."""
+
+    def __init__(self, stop_event, errors=(), stop_after=3):
+        self.stop_event = stop_event
+        self.errors = list(errors)
+        self.stop_after = stop_after
+        self.runs = 0
+        self.refreshes = 0
+        self.reconnects = 0
+
+    def refresh_metadata(self):
+        self.refreshes += 1
+        return False
+
+    def upsert_tables(self, file_size_limit, message, days_before=None,
+                      row_limit=None):
+        self.runs += 1
+        if self.runs >= self.stop_after:
+            self.stop_event.set()
+        if self.errors:
+            raise self.errors.pop(0)
+
+    def reconnect(self):
+        self.reconnects += 1
+
+
+class TestRunDaemon(unittest.TestCase):
+    script_config = {"upsert_message": "upsert", "upload_message": "upload"}
+
+    def setUp(self):
+        self.stop_event = threading.Event()
+        self.args = argparse.Namespace(interval=0.01, all=False, size=1000,
+                                       days=None, rows=None)
+
+    def __run(self, generator):
+        run_daemon(generator, self.args, self.script_config, self.stop_event,
+                   generator.reconnect)
+
+    def test_interval(self):
+        generator = StubGenerator(self.stop_event)
+        self.__run(generator)
+        self.assertEqual(generator.runs, 3)
+        self.assertEqual(generator.refreshes, 2)
+
+    def test_stop_event(self):
+        generator = StubGenerator(self.stop_event)
+        self.args.interval = 60
+        timer = threading.Timer(0.1, self.stop_event.set)
+        timer.start()
+        self.__run(generator)
+        timer.join()
+        self.assertEqual(generator.runs, 1)
+
+    def test_failed_cycle(self):
+        generator = StubGenerator(self.stop_event,
+                                  [RuntimeError("diff failed")])
+        self.__run(generator)
+        self.assertEqual(generator.runs, 3)
+        self.assertEqual(generator.reconnects, 0)
+
+    def test_interrupted_cycle(self):
+        generator = StubGenerator(self.stop_event, [InterruptedError()])
+        self.__run(generator)
+        self.assertEqual(generator.runs, 1)
+
+    def test_reconnect(self):
+        errors = []
+        for error in (pyodbc.OperationalError("08S01", "link failure"),
+                      pyodbc.Error("08001", "connection failure")):
+            try:
+                raise RuntimeError("query execution failed") from error
+            except RuntimeError as ex:
+                errors.append(ex)
+        generator = StubGenerator(self.stop_event, errors)
+        self.__run(generator)
+        self.assertEqual(generator.runs, 3)
+        self.assertEqual(generator.reconnects, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
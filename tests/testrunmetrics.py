@@ -0,0 +1,88 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from core.runmetrics import RunMetrics
+
+
+class TestRunMetrics(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.metrics = RunMetrics()
+        self.metrics.begin("upsert")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def __fill(self):
+        self.metrics.add_script("dbo.a", "upsert", 10, 100)
+        self.metrics.add_script("dbo.a", "upsert", 5, 50)
+        self.metrics.add_script("dbo.a", "delete", 2, 20)
+        self.metrics.add_queries("dbo.a", 2, 0.5, 17)
+        self.metrics.add_queries("dbo.b", 1, 0.25, 0)
+        with self.metrics.stage("liquibase"):
+            pass
+        self.metrics.set_file_count(3)
+        self.metrics.finish("success", 1)
+
+    def test_begin_cleans(self):
+        self.__fill()
+        self.metrics.begin("upload")
+        self.assertEqual(self.metrics.kind, "upload")
+        self.assertEqual(self.metrics.status, "")
+        self.assertEqual(self.metrics.tables, {})
+        self.assertEqual(self.metrics.stages, {})
+
+    def test_stage_failed(self):
+        with self.assertRaises(ValueError):
+            with self.metrics.stage("git_push"):
+                raise ValueError()
+        self.assertIn("git_push", self.metrics.stages)
+
+    def test_to_dict(self):
+        self.__fill()
+        result = self.metrics.to_dict()
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(result["files"], 3)
+        self.assertEqual(result["scripts"], 3)
+        self.assertEqual(result["rows_rendered"], 17)
+        self.assertEqual(result["bytes_written"], 170)
+        self.assertEqual(result["git_retries"], 1)
+        self.assertEqual(list(result["stages"]), ["liquibase"])
+        self.assertEqual(result["tables"]["dbo.a"]["phases"]["upsert"],
+                         {"scripts": 2, "rows_rendered": 15,
+                          "bytes_written": 150})
+        self.assertEqual(result["tables"]["dbo.b"],
+                         {"queries": 1, "query_seconds": 0.25,
+                          "rows_fetched": 0, "phases": {}})
+
+    def test_save_json(self):
+        self.__fill()
+        path = os.path.join(self.folder, "report", "run.json")
+        self.metrics.save_json(path)
+        with open(path) as file:
+            self.assertEqual(json.load(file), self.metrics.to_dict())
+
+    def test_save_prometheus(self):
+        self.__fill()
+        path = os.path.join(self.folder, "scriptgen.prom")
+        self.metrics.save_prometheus(path, {"pipeline": 'a"b'})
+        with open(path) as file:
+            lines = file.read().splitlines()
+        self.assertIn("# TYPE scriptgen_run_duration_seconds gauge", lines)
+        self.assertIn('scriptgen_run_success{kind="upsert",pipeline="a\\"b"} 1',
+                      lines)
+        self.assertIn('scriptgen_run_files{kind="upsert",pipeline="a\\"b"} 3',
+                      lines)
+        self.assertIn('scriptgen_table_rows_rendered{kind="upsert",'
+                      'phase="delete",pipeline="a\\"b",table="dbo.a"} 2',
+                      lines)
+        self.assertIn('scriptgen_table_rows_fetched{kind="upsert",'
+                      'pipeline="a\\"b",table="dbo.a"} 17', lines)
+        self.assertFalse(os.path.exists(path + ".tmp"))
+
+
+if __name__ == '__main__':
+    unittest.main()
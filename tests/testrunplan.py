@@ -0,0 +1,53 @@
+import unittest
+from core.runplan import RunPlan
+
+
+class TestRunPlan(unittest.TestCase):
+    def test_empty(self):
+        plan = RunPlan(100, 10)
+        self.assertEqual(plan.tables, [])
+        self.assertEqual(plan.row_count, 0)
+        self.assertEqual(plan.script_count, 0)
+        self.assertEqual(plan.size, 0)
+        self.assertEqual(plan.file_count, 0)
+
+    def test_add_upsert_and_delete(self):
+        plan = RunPlan(100, 10)
+        plan.add_upsert("dbo.a", 10, 2, 60)
+        plan.add_delete("dbo.a", 3, 1, 20)
+        plan.add_upsert("dbo.b", 0, 0, 0)
+        self.assertEqual(plan.tables, ["dbo.a", "dbo.b"])
+        self.assertEqual(plan.row_count, 13)
+        self.assertEqual(plan.script_count, 3)
+        self.assertEqual(plan.size, 80)
+
+    def test_file_count_size_limit(self):
+        plan = RunPlan(100, 10)
+        plan.add_upsert("dbo.a", 4, 4, 240)
+        self.assertEqual(plan.file_count, 2)
+
+    def test_file_count_shared_file(self):
+        plan = RunPlan(100, 10)
+        plan.add_upsert("dbo.a", 1, 1, 20)
+        plan.add_upsert("dbo.b", 1, 1, 20)
+        self.assertEqual(plan.file_count, 1)
+
+    def test_file_count_file_per_table(self):
+        plan = RunPlan(100, 10, file_per_table=True)
+        plan.add_upsert("dbo.a", 1, 1, 20)
+        plan.add_upsert("dbo.b", 1, 1, 20)
+        self.assertEqual(plan.file_count, 2)
+
+    def test_report(self):
+        plan = RunPlan(100, 10)
+        plan.add_upsert("dbo.a", 10, 2, 60)
+        plan.add_delete("dbo.a", 3, 1, 20)
+        lines = plan.report().split("\n")
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(lines[1].split(), ["dbo.a", "10", "3", "3", "80"])
+        self.assertEqual(lines[2].split(), ["total", "10", "3", "3", "80"])
+        self.assertEqual(lines[3], "files: 1")
+
+
+if __name__ == '__main__':
+    unittest.main()
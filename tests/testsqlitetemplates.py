@@ -0,0 +1,158 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from datetime import datetime, timedelta
+
+from core.dbtable import DbTable
+from core.sqlitetemplates import SqliteTemplates
+from core.sqlquerybuilder import SqlQueryBuilder
+from dbconstatnts import LOGGER_DICT_STUB
+
+CREATE_SCRIPT = """
+create table {0}.report(
+    id integer primary key,
+    name text,
+    amount real,
+    parent_id integer references report(id),
+    report_updDT text);
+create table {0}.tag(
+    id integer primary key,
+    report_id integer references report(id),
+    label text);
+"""
+
+
+class TestSqliteTemplates(unittest.TestCase):
+    """Runs the DbTable queries built with the SQLite templates on the work
+    and clear databases attached to one connection and applies the scripts
+    to the clear database."""
+
+    queries = SqlQueryBuilder(SqliteTemplates())
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.connection = sqlite3.connect(os.path.join(self.folder, "work.db"))
+        self.connection.execute("attach database ? as clear",
+                                (os.path.join(self.folder, "clear.db"),))
+        self.cursor = self.connection.cursor()
+        for db_name in ("main", "clear"):
+            self.cursor.executescript(CREATE_SCRIPT.format(db_name))
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.folder)
+
+    def __insert(self, db_name, table_name, rows):
+        marks = ",".join("?" * len(rows[0]))
+        self.cursor.executemany(
+            f"insert into {db_name}.{table_name} values({marks})", rows)
+        self.connection.commit()
+
+    def __table(self, table_name="report"):
+        return DbTable(LOGGER_DICT_STUB, self.cursor, self.queries,
+                       table_name, "main", "clear")
+
+    def __apply(self, scripts):
+        clear = sqlite3.connect(os.path.join(self.folder, "clear.db"))
+        clear.execute("pragma foreign_keys = on")
+        for script in scripts:
+            clear.executescript(script)
+        clear.commit()
+        clear.close()
+
+    def __select(self, db_name, table_name="report"):
+        return self.cursor.execute(
+            f"select * from {db_name}.{table_name} order by id").fetchall()
+
+    def test_metadata(self):
+        table = self.__table()
+        self.assertEqual(table.parent_key, "parent_id")
+        self.assertEqual(sorted(table.subordinate_tables), ["report", "tag"])
+        self.assertEqual(self.__table("tag").subordinate_tables, ())
+
+    def test_bucket_diff_self_reference(self):
+        with self.assertRaises(ValueError):
+            DbTable(LOGGER_DICT_STUB, self.cursor, self.queries, "report",
+                    "main", "clear", bucket_diff_settings={})
+        table = DbTable(LOGGER_DICT_STUB, self.cursor, self.queries, "tag",
+                        "main", "clear", bucket_diff_settings={})
+        self.assertEqual(table.parent_key, "")
+
+    def test_supports(self):
+        for feature in ("table_hint", "snapshot", "maxdop", "wait_stats",
+                        "statistics", "showplan", "bucket_diff"):
+            self.assertFalse(self.queries.supports(feature), feature)
+
+    def test_upsert_and_delete(self):
+        self.__insert("main", "report", [
+            (1, "a", 1.5, None, "2022-01-01 00:00:00.000"),
+            (2, "b'q", None, 1, "2022-01-02 00:00:00.000"),
+            (3, "c", 3.0, 2, "2022-01-03 00:00:00.000")])
+        self.__insert("clear", "report", [
+            (1, "a", 1.5, None, "2022-01-01 00:00:00.000"),
+            (2, "old", None, 1, "2021-01-01 00:00:00.000"),
+            (4, "d", None, None, "2021-01-01 00:00:00.000"),
+            (5, "e", None, 4, "2021-01-01 00:00:00.000")])
+        table = self.__table()
+        self.assertEqual(table.get_upsert_estimate(row_limit=1)[:2], (2, 2))
+        upsert_scripts = table.get_upsert_statement_list(row_limit=1)
+        delete_scripts = table.get_delete_statement_list()
+        self.assertEqual(len(upsert_scripts), 2)
+        self.assertIn("delete from report where id in (5,4);",
+                      delete_scripts[0])
+        self.__apply(upsert_scripts + delete_scripts)
+        self.assertEqual(self.__select("clear"), self.__select("main"))
+        self.assertEqual(table.get_upsert_statement_list(), [])
+        self.assertEqual(table.get_delete_statement_list(), [])
+
+    def test_hash_upsert(self):
+        self.__insert("main", "tag", [(1, None, "x"), (2, None, None),
+                                      (3, None, "z")])
+        self.__insert("clear", "tag", [(1, None, "x"), (2, None, "y")])
+        table = self.__table("tag")
+        scripts = table.get_upsert_statement_list()
+        self.assertEqual(len(scripts), 1)
+        self.assertIn("(2,null,null)", scripts[0])
+        self.assertIn("(3,null,'z')", scripts[0])
+        self.assertNotIn("(1,", scripts[0])
+        self.__apply(scripts)
+        self.assertEqual(self.__select("clear", "tag"),
+                         self.__select("main", "tag"))
+        self.assertEqual(table.get_upsert_statement_list(), [])
+
+    def test_days_before(self):
+        recent = (datetime.now() - timedelta(days=1)).isoformat(sep=" ")
+        self.__insert("main", "report", [
+            (1, "old", None, None, "2000-01-01 00:00:00.000"),
+            (2, "new", None, None, recent)])
+        scripts = self.__table().get_upsert_statement_list(days_before=5)
+        self.assertEqual(len(scripts), 1)
+        self.assertIn("'new'", scripts[0])
+        self.assertNotIn("'old'", scripts[0])
+
+    def test_hierarchy_key_after(self):
+        self.__insert("main", "report", [
+            (1, "child", None, 3, "2022-01-01"),
+            (2, "grandchild", None, 1, "2022-01-01"),
+            (3, "root", None, None, "2022-01-01")])
+        table = self.__table()
+        keys = [key for _, key, _
+                in table.iter_upsert_statements(row_limit=1, all_rows=True)]
+        self.assertEqual(keys, ["3", "1", "2"])
+        keys = [key for _, key, _ in table.iter_upsert_statements(
+            row_limit=1, all_rows=True, key_after="3")]
+        self.assertEqual(keys, ["1", "2"])
+
+    def test_not_supported(self):
+        with self.assertRaises(NotImplementedError):
+            self.queries.get_row_checksum_query("id", ["id"], "main",
+                                                "report", 1, 2)
+        with self.assertRaises(NotImplementedError):
+            self.queries.get_all_rows_query(["id"], "main", "report",
+                                            "nolock")
+
+
+if __name__ == '__main__':
+    unittest.main()
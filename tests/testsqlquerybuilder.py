@@ -1,9 +1,10 @@
 import unittest
 from datetime import datetime
+from decimal import Decimal
 from core.sqlquerybuilder import SqlQueryBuilder
 from core.sqlservertemplates import SqlServerTemplates
 from dbconstatnts import TABLE_NAME, PRIMARY_KEY_COL, UPDATE_DT_COL, COLUMNS,\
-    STR_COLUMNS, LINK_COLUMNS, INS_COLUMNS, WORK_DB_NAME, CLEAR_DB_NAME
+    TYPES, STR_COLUMNS, LINK_COLUMNS, INS_COLUMNS, WORK_DB_NAME, CLEAR_DB_NAME
 
 
 class TestSqlQueryBuilder(unittest.TestCase):
@@ -23,7 +24,7 @@ class TestSqlQueryBuilder(unittest.TestCase):
         query = self.templates.search_del_query.format(PRIMARY_KEY_COL,
                                                        TABLE_NAME,
                                                        WORK_DB_NAME,
-                                                       CLEAR_DB_NAME)
+                                                       CLEAR_DB_NAME, "")
         self.assertEqual(self.builder.get_search_del_query(PRIMARY_KEY_COL,
                                                            TABLE_NAME,
                                                            WORK_DB_NAME,
@@ -39,7 +40,7 @@ class TestSqlQueryBuilder(unittest.TestCase):
                                                           TABLE_NAME,
                                                           PRIMARY_KEY_COL,
                                                           update_dt_field,
-                                                          CLEAR_DB_NAME)
+                                                          CLEAR_DB_NAME, "")
         self.assertEqual(self.builder.get_search_upsert_query([column_list],
                                                               WORK_DB_NAME,
                                                               TABLE_NAME,
@@ -47,7 +48,7 @@ class TestSqlQueryBuilder(unittest.TestCase):
                                                               update_dt_field,
                                                               CLEAR_DB_NAME,
                                                               beg_date),
-                         query)
+                         (query, []))
 
     def test_get_search_upsert_query_multi_columns(self):
         columns_str = ",".join(["src.{0}".format(col) for col in COLUMNS])
@@ -57,7 +58,7 @@ class TestSqlQueryBuilder(unittest.TestCase):
                                                           TABLE_NAME,
                                                           PRIMARY_KEY_COL,
                                                           UPDATE_DT_COL,
-                                                          CLEAR_DB_NAME)
+                                                          CLEAR_DB_NAME, "")
         self.assertEqual(self.builder.get_search_upsert_query(COLUMNS,
                                                               WORK_DB_NAME,
                                                               TABLE_NAME,
@@ -65,15 +66,15 @@ class TestSqlQueryBuilder(unittest.TestCase):
                                                               UPDATE_DT_COL,
                                                               CLEAR_DB_NAME,
                                                               beg_date),
-                         query)
+                         (query, []))
 
     def test_get_search_upsert_query_multi_columns_with_date(self):
         columns_str = ",".join(["src.{0}".format(col) for col in COLUMNS])
-        beg_date = "01.01.2022"
-        template = self.templates.search_upsert_query + "\n\tand src.{4} >= {6}"
+        beg_date = datetime(2022, 1, 1)
+        template = self.templates.search_upsert_query + "\n\tand src.{4} >= {7}"
         query = template.format(columns_str, WORK_DB_NAME, TABLE_NAME,
                                 PRIMARY_KEY_COL, UPDATE_DT_COL, CLEAR_DB_NAME,
-                                beg_date)
+                                "", "?")
         self.assertEqual(self.builder.get_search_upsert_query(COLUMNS,
                                                               WORK_DB_NAME,
                                                               TABLE_NAME,
@@ -81,12 +82,35 @@ class TestSqlQueryBuilder(unittest.TestCase):
                                                               UPDATE_DT_COL,
                                                               CLEAR_DB_NAME,
                                                               beg_date),
-                         query)
+                         (query, [beg_date]))
+
+    def test_get_search_hash_upsert_query(self):
+        fields = ",".join(["src." + col for col in COLUMNS])
+        hash_columns = COLUMNS[1:]
+        src_hash = self.templates.row_hash_pattern.format(
+            ",".join(["src." + col for col in hash_columns]))
+        clr_hash = self.templates.row_hash_pattern.format(
+            ",".join(["clr." + col for col in hash_columns]))
+        query = self.templates.search_hash_upsert_query.format(
+            fields, WORK_DB_NAME, TABLE_NAME, PRIMARY_KEY_COL, CLEAR_DB_NAME,
+            src_hash, clr_hash, "")
+        self.assertEqual(self.builder.get_search_hash_upsert_query(
+            COLUMNS, WORK_DB_NAME, TABLE_NAME, PRIMARY_KEY_COL, CLEAR_DB_NAME),
+            query)
+
+    def test_get_search_hash_upsert_query_key_only(self):
+        key_hash = self.templates.row_hash_pattern.format(
+            "src." + PRIMARY_KEY_COL)
+        query = self.builder.get_search_hash_upsert_query(
+            [PRIMARY_KEY_COL], WORK_DB_NAME, TABLE_NAME, PRIMARY_KEY_COL,
+            CLEAR_DB_NAME)
+        self.assertIn(key_hash, query)
 
     def test_get_all_rows_query_single_column(self):
         column_list = "single_column"
         query = self.templates.all_rows_query.format("src." + column_list,
-                                                     WORK_DB_NAME, TABLE_NAME)
+                                                     WORK_DB_NAME, TABLE_NAME,
+                                                     "")
         self.assertEqual(self.builder.get_all_rows_query([column_list],
                                                          WORK_DB_NAME,
                                                          TABLE_NAME),
@@ -95,7 +119,7 @@ class TestSqlQueryBuilder(unittest.TestCase):
     def test_get_all_rows_query_multi_columns(self):
         columns_str = ",".join(["src.{0}".format(col) for col in COLUMNS])
         query = self.templates.all_rows_query.format(columns_str, WORK_DB_NAME,
-                                                     TABLE_NAME)
+                                                     TABLE_NAME, "")
         self.assertEqual(self.builder.get_all_rows_query(COLUMNS,
                                                          WORK_DB_NAME,
                                                          TABLE_NAME),
@@ -165,11 +189,265 @@ class TestSqlQueryBuilder(unittest.TestCase):
                                                            PRIMARY_KEY_COL),
                          query)
 
+    def test_get_upload_statement_without_copy(self):
+        data = [[1, 123, 1.5, "test", None]]
+        self.assertEqual(self.builder.get_upload_statement(TABLE_NAME, COLUMNS,
+                                                           data,
+                                                           PRIMARY_KEY_COL),
+                         self.builder.get_upsert_statement(TABLE_NAME, COLUMNS,
+                                                           data,
+                                                           PRIMARY_KEY_COL))
+
+    def test_get_upsert_statement_staged(self):
+        builder = SqlQueryBuilder(self.templates, stage_threshold=2)
+        data = [[num, 123, 1.5, "test", None] for num in range(2001)]
+        statement = builder.get_upsert_statement(TABLE_NAME, COLUMNS, data,
+                                                 PRIMARY_KEY_COL)
+        self.assertEqual(statement.count("insert into #stage("), 3)
+        self.assertEqual(statement.count("(1000,123,1.5,'test',null)"), 1)
+        self.assertIn(f"create unique clustered index ix_stage on "
+                      f"#stage({PRIMARY_KEY_COL});", statement)
+        self.assertNotIn("merge", statement)
+        self.assertEqual(builder.get_upsert_statement(TABLE_NAME, COLUMNS,
+                                                      data[:2],
+                                                      PRIMARY_KEY_COL),
+                         self.builder.get_upsert_statement(TABLE_NAME, COLUMNS,
+                                                           data[:2],
+                                                           PRIMARY_KEY_COL))
+
+    def test_estimate_upsert_size_staged(self):
+        builder = SqlQueryBuilder(self.templates, stage_threshold=2)
+        data = [[num, 123, 1.5, "test", None] for num in range(1500)]
+        statement = builder.get_upsert_statement(TABLE_NAME, COLUMNS, data,
+                                                 PRIMARY_KEY_COL)
+        data_length = sum(len(str(num)) + 3 + 3 + 4 + 4 for num in range(1500))
+        size = builder.estimate_upsert_size(TABLE_NAME, COLUMNS,
+                                            PRIMARY_KEY_COL, 1500, data_length,
+                                            1)
+        self.assertAlmostEqual(size, len(statement), delta=len(statement) / 10)
+
+    def test_get_upsert_statement_json(self):
+        builder = SqlQueryBuilder(self.templates, json_payload=True)
+        dt = datetime(2022, 1, 2, 3, 4, 5, 6000)
+        data = [[1, 123, Decimal("1.50"), "it's", dt],
+                [2, None, 1.5, "\u0436", None]]
+        payload = ("N'[[1,123,\"1.50\",\"it''s\",\"2022-01-02T03:04:05.006\"],"
+                   "[2,null,1.5,\"\u0436\",null]]'")
+        definitions = (',\n' + ' ' * 8).join(
+            f"{col} {col_type} '$[{num}]'"
+            for num, (col, col_type) in enumerate(zip(COLUMNS, TYPES)))
+        query = self.templates.json_upsert_statement.format(
+            TABLE_NAME, STR_COLUMNS, payload, PRIMARY_KEY_COL, LINK_COLUMNS,
+            INS_COLUMNS, definitions)
+        self.assertEqual(builder.get_upsert_statement(TABLE_NAME, COLUMNS,
+                                                      data, PRIMARY_KEY_COL,
+                                                      TYPES),
+                         query)
+        self.assertEqual(builder.get_upsert_statement(TABLE_NAME, COLUMNS,
+                                                      data[1:],
+                                                      PRIMARY_KEY_COL),
+                         self.builder.get_upsert_statement(TABLE_NAME, COLUMNS,
+                                                           data[1:],
+                                                           PRIMARY_KEY_COL))
+        self.assertRaises(TypeError, builder.get_upsert_statement,
+                          TABLE_NAME, COLUMNS, [[object()]], PRIMARY_KEY_COL,
+                          TYPES)
+
+    def test_estimate_upsert_size_json(self):
+        builder = SqlQueryBuilder(self.templates, json_payload=True)
+        data = [[num, 123, 1.5, "test", None] for num in range(500)]
+        statement = builder.get_upsert_statement(TABLE_NAME, COLUMNS, data,
+                                                 PRIMARY_KEY_COL, TYPES)
+        data_length = sum(len(str(num)) + 3 + 3 + 4 + 4 for num in range(500))
+        size = builder.estimate_upsert_size(TABLE_NAME, COLUMNS,
+                                            PRIMARY_KEY_COL, 500, data_length,
+                                            1, type_list=TYPES)
+        self.assertAlmostEqual(size, len(statement), delta=len(statement) / 10)
+
     def test_get_upsert_statement_type_error(self):
         data = [[tuple()]]
         self.assertRaises(TypeError, self.builder.get_upsert_statement,
                           TABLE_NAME, COLUMNS, data, PRIMARY_KEY_COL)
 
+    def test_get_count_query(self):
+        query = self.builder.get_search_del_query(PRIMARY_KEY_COL, TABLE_NAME,
+                                                  WORK_DB_NAME, CLEAR_DB_NAME)
+        length = self.templates.column_length_pattern.format(PRIMARY_KEY_COL)
+        count_query = self.templates.count_query.format(
+            query.rstrip().rstrip(';'), length)
+        self.assertEqual(self.builder.get_count_query(query,
+                                                      [PRIMARY_KEY_COL]),
+                         count_query)
+
+    def test_estimate_upsert_size_empty(self):
+        self.assertEqual(self.builder.estimate_upsert_size(
+            TABLE_NAME, COLUMNS, PRIMARY_KEY_COL, 0, 0, 0), 0)
+
+    def test_estimate_upsert_size(self):
+        data = [[1, 123, 1.5, "test", None]]
+        statement = self.builder.get_upsert_statement(TABLE_NAME, COLUMNS,
+                                                      data, PRIMARY_KEY_COL)
+        size = self.builder.estimate_upsert_size(TABLE_NAME, COLUMNS,
+                                                 PRIMARY_KEY_COL, 1, 18, 1)
+        self.assertAlmostEqual(size, len(statement), delta=len(statement) / 10)
+
+    def test_estimate_delete_size(self):
+        statement = self.builder.get_delete_statement(TABLE_NAME,
+                                                      PRIMARY_KEY_COL,
+                                                      ["1", "22", "333"])
+        size = self.builder.estimate_delete_size(TABLE_NAME, PRIMARY_KEY_COL,
+                                                 3, 6, 1)
+        self.assertEqual(size, len(statement) + 1)
+
+    def test_get_ordered_query(self):
+        query = self.builder.get_search_del_query(PRIMARY_KEY_COL, TABLE_NAME,
+                                                  WORK_DB_NAME, CLEAR_DB_NAME)
+        ordered_query = self.templates.ordered_query.format(
+            query.rstrip().rstrip(';'), PRIMARY_KEY_COL, "")
+        self.assertEqual(self.builder.get_ordered_query(query,
+                                                        PRIMARY_KEY_COL),
+                         ordered_query)
+
+    def test_get_ordered_query_key_after(self):
+        query = self.builder.get_all_rows_query(COLUMNS, WORK_DB_NAME,
+                                                TABLE_NAME)
+        condition = self.templates.key_after_condition.format(PRIMARY_KEY_COL,
+                                                              "10")
+        ordered_query = self.templates.ordered_query.format(
+            query.rstrip(), PRIMARY_KEY_COL, condition)
+        self.assertEqual(self.builder.get_ordered_query(query, PRIMARY_KEY_COL,
+                                                        "10"),
+                         ordered_query)
+
+    def test_get_literal(self):
+        self.assertEqual(self.builder.get_literal("it's"), "'it''s'")
+        self.assertEqual(self.builder.get_literal(None), "null")
+
+    def test_get_schema_version_query(self):
+        self.assertEqual(self.builder.get_schema_version_query(),
+                         self.templates.schema_version_query)
+
+    def test_get_key_range_query(self):
+        query = self.templates.key_range_query.format(PRIMARY_KEY_COL,
+                                                      WORK_DB_NAME, TABLE_NAME,
+                                                      "")
+        self.assertEqual(self.builder.get_key_range_query(PRIMARY_KEY_COL,
+                                                          WORK_DB_NAME,
+                                                          TABLE_NAME), query)
+
+    def test_get_bucket_checksum_query(self):
+        fields = ",".join(["src." + col for col in COLUMNS])
+        query = self.templates.bucket_checksum_query.format(
+            PRIMARY_KEY_COL, fields, WORK_DB_NAME, TABLE_NAME, "?", "?", "?",
+            "")
+        self.assertEqual(self.builder.get_bucket_checksum_query(
+            PRIMARY_KEY_COL, COLUMNS, WORK_DB_NAME, TABLE_NAME, 1, 100, 10),
+            (query, [1, 10, 1, 100]))
+
+    def test_get_row_checksum_query(self):
+        fields = ",".join(["src." + col for col in COLUMNS])
+        query = self.templates.row_checksum_query.format(
+            PRIMARY_KEY_COL, fields, CLEAR_DB_NAME, TABLE_NAME, "?", "?", "")
+        self.assertEqual(self.builder.get_row_checksum_query(
+            PRIMARY_KEY_COL, COLUMNS, CLEAR_DB_NAME, TABLE_NAME, 1, 100),
+            (query, [1, 100]))
+
+    def test_get_keys_rows_query(self):
+        fields = ",".join(["src." + col for col in COLUMNS])
+        query = self.templates.keys_rows_query.format(
+            fields, WORK_DB_NAME, TABLE_NAME, PRIMARY_KEY_COL, "?,?,?", "")
+        self.assertEqual(self.builder.get_keys_rows_query(
+            COLUMNS, WORK_DB_NAME, TABLE_NAME, PRIMARY_KEY_COL, [1, 5, 7]),
+            (query, [1, 5, 7]))
+
+    def test_get_statistics_statement(self):
+        self.assertEqual(self.builder.get_statistics_statement(True),
+                         "set statistics io, time on;")
+        self.assertEqual(self.builder.get_statistics_statement(False),
+                         "set statistics io, time off;")
+
+    def test_get_showplan_statement(self):
+        self.assertEqual(self.builder.get_showplan_statement(True),
+                         "set showplan_xml on;")
+        self.assertEqual(self.builder.get_showplan_statement(False),
+                         "set showplan_xml off;")
+
+
+    def test_get_self_reference_query(self):
+        query = self.templates.self_reference_query.format(TABLE_NAME)
+        self.assertEqual(self.builder.get_self_reference_query(TABLE_NAME),
+                         query)
+
+    def test_get_hierarchy_ordered_query(self):
+        query = self.builder.get_all_rows_query(COLUMNS, WORK_DB_NAME,
+                                                TABLE_NAME)
+        ordered_query = self.templates.hierarchy_ordered_query.format(
+            query.rstrip(), PRIMARY_KEY_COL, "", WORK_DB_NAME, TABLE_NAME,
+            "parent_id", "asc", "")
+        self.assertEqual(self.builder.get_hierarchy_ordered_query(
+            query, PRIMARY_KEY_COL, WORK_DB_NAME, TABLE_NAME, "parent_id"),
+            ordered_query)
+
+    def test_get_hierarchy_ordered_query_key_after_descending(self):
+        query = self.builder.get_search_del_query(PRIMARY_KEY_COL, TABLE_NAME,
+                                                  WORK_DB_NAME, CLEAR_DB_NAME)
+        condition = self.templates.hierarchy_key_after_condition.format(
+            PRIMARY_KEY_COL, "10", "<")
+        ordered_query = self.templates.hierarchy_ordered_query.format(
+            query.rstrip().rstrip(';'), PRIMARY_KEY_COL, condition,
+            CLEAR_DB_NAME, TABLE_NAME, "parent_id", "desc", "")
+        self.assertEqual(self.builder.get_hierarchy_ordered_query(
+            query, PRIMARY_KEY_COL, CLEAR_DB_NAME, TABLE_NAME, "parent_id",
+            "10", descending=True), ordered_query)
+
+    def test_get_all_rows_query_table_hint(self):
+        query = self.builder.get_all_rows_query(COLUMNS, WORK_DB_NAME,
+                                                TABLE_NAME, "nolock")
+        self.assertIn(f"from {WORK_DB_NAME}.{TABLE_NAME} as src with (nolock)",
+                      query)
+
+    def test_get_search_upsert_query_table_hint_with_date(self):
+        query, params = self.builder.get_search_upsert_query(
+            COLUMNS, WORK_DB_NAME, TABLE_NAME, PRIMARY_KEY_COL, UPDATE_DT_COL,
+            CLEAR_DB_NAME, datetime(2022, 1, 1), "readpast")
+        self.assertIn(f"from {WORK_DB_NAME}.{TABLE_NAME} as src with "
+                      f"(readpast)\n", query)
+        self.assertIn(f"from {CLEAR_DB_NAME}.{TABLE_NAME} as clr\n", query)
+        self.assertTrue(query.endswith(f"and src.{UPDATE_DT_COL} >= ?"))
+        self.assertEqual(params, [datetime(2022, 1, 1)])
+
+    def test_get_hierarchy_ordered_query_table_hint(self):
+        query = self.builder.get_hierarchy_ordered_query(
+            "select 1", PRIMARY_KEY_COL, WORK_DB_NAME, TABLE_NAME, "parent_id",
+            table_hint="nolock")
+        self.assertEqual(query.count(
+            f"from {WORK_DB_NAME}.{TABLE_NAME} as src with (nolock)\n"), 2)
+
+    def test_supports(self):
+        for feature in ("table_hint", "snapshot", "maxdop", "wait_stats",
+                        "statistics", "showplan", "bucket_diff"):
+            self.assertTrue(self.builder.supports(feature), feature)
+
+    def test_get_isolation_level_statement(self):
+        self.assertEqual(self.builder.get_isolation_level_statement("snapshot"),
+                         "set transaction isolation level snapshot;")
+
+    def test_get_maxdop_query(self):
+        query = self.builder.get_ordered_query("select 1 as id;", "id")
+        self.assertEqual(self.builder.get_maxdop_query(query, 2),
+                         query.rstrip().rstrip(";") + "\noption (maxdop 2);\n")
+
+    def test_get_maxdop_query_with_options(self):
+        query = self.builder.get_hierarchy_ordered_query(
+            "select 1", PRIMARY_KEY_COL, WORK_DB_NAME, TABLE_NAME, "parent_id")
+        maxdop_query = self.builder.get_maxdop_query(query, 1)
+        self.assertTrue(maxdop_query.endswith(
+            "\noption (maxrecursion 0, maxdop 1);\n"))
+        self.assertEqual(maxdop_query.count("option ("), 1)
+
+    def test_get_wait_stats_query(self):
+        self.assertEqual(self.builder.get_wait_stats_query(),
+                         self.templates.wait_stats_query)
 
 if __name__ == '__main__':
     unittest.main()
@@ -15,7 +15,22 @@ class TestSqlServerTemplates(unittest.TestCase):
             "select \n"
             "   c.name as ColumnName,\n"
             "   case when c.name like '%_updDT' then 1 else 0 end as IsUpdDT,\n"
-            "   sign(c.status & 128) as IsIdentity\n"
+            "   sign(c.status & 128) as IsIdentity,\n"
+            "   type_name(c.xtype) + case\n"
+            "       when type_name(c.xtype) in ('decimal', 'numeric')\n"
+            "           then '(' + cast(c.xprec as varchar(10)) + ','\n"
+            "               + cast(c.xscale as varchar(10)) + ')'\n"
+            "       when type_name(c.xtype) in ('datetime2', 'time',\n"
+            "           'datetimeoffset')\n"
+            "           then '(' + cast(c.xscale as varchar(10)) + ')'\n"
+            "       when c.length = -1\n"
+            "           and type_name(c.xtype) like '%char'\n"
+            "           then '(max)'\n"
+            "       when type_name(c.xtype) in ('nchar', 'nvarchar')\n"
+            "           then '(' + cast(c.length / 2 as varchar(10)) + ')'\n"
+            "       when type_name(c.xtype) in ('char', 'varchar')\n"
+            "           then '(' + cast(c.length as varchar(10)) + ')'\n"
+            "       else '' end as ColumnType\n"
             "from syscolumns as c\n"
             "   inner join systypes as t on c.xtype = t.xtype\n"
             "       and c.usertype = t.usertype\n"
@@ -39,7 +54,7 @@ class TestSqlServerTemplates(unittest.TestCase):
             "from {3}.{1} as clr\n"
             "where not exists(\n"
             "    select 1\n"
-            "    from {2}.{1} as src\n"
+            "    from {2}.{1} as src{4}\n"
             "    where clr.{0} = src.{0});\n")
         self.assertEqual(self.templates.search_del_query, search_del_query)
 
@@ -47,7 +62,7 @@ class TestSqlServerTemplates(unittest.TestCase):
         search_upsert_query = (
             "select\n"
             "    {0}\n"
-            "from {1}.{2} as src\n"
+            "from {1}.{2} as src{6}\n"
             "where not exists(\n"
             "    select 1\n"
             "    from {5}.{2} as clr\n"
@@ -60,7 +75,7 @@ class TestSqlServerTemplates(unittest.TestCase):
         all_rows_query = (
             "select\n"
             "    {0}\n"
-            "from {1}.{2} as src\n")
+            "from {1}.{2} as src{3}\n")
         self.assertEqual(self.templates.all_rows_query, all_rows_query)
 
     def test_delete_statement(self):
@@ -93,6 +108,201 @@ class TestSqlServerTemplates(unittest.TestCase):
             "GO\n")
         self.assertEqual(self.templates.upsert_statement, upsert_statement)
 
+    def test_count_query(self):
+        count_query = (
+            "select\n"
+            "    count(*) as row_count,\n"
+            "    isnull(sum(cast({1} as bigint)), 0) as data_length\n"
+            "from(\n"
+            "{0}) as q;\n")
+        self.assertEqual(self.templates.count_query, count_query)
+
+    def test_column_length_pattern(self):
+        self.assertEqual(self.templates.column_length_pattern,
+                         "isnull(datalength(q.{0}), 4)")
+
+    def test_ordered_query(self):
+        ordered_query = (
+            "select ord.*\n"
+            "from(\n"
+            "{0}) as ord\n"
+            "{2}"
+            "order by ord.{1};\n")
+        self.assertEqual(self.templates.ordered_query, ordered_query)
+
+    def test_key_after_condition(self):
+        self.assertEqual(self.templates.key_after_condition,
+                         "where ord.{0} > {1}\n")
+
+    def test_schema_version_query(self):
+        schema_version_query = (
+            "select checksum_agg(checksum(o.object_id, o.modify_date))\n"
+            "from sys.objects as o\n"
+            "where o.type in ('U', 'F');\n")
+        self.assertEqual(self.templates.schema_version_query,
+                         schema_version_query)
+
+    def test_key_range_query(self):
+        key_range_query = (
+            "select\n"
+            "    min(src.{0}) as min_key,\n"
+            "    max(src.{0}) as max_key\n"
+            "from {1}.{2} as src{3};\n")
+        self.assertEqual(self.templates.key_range_query, key_range_query)
+
+    def test_bucket_checksum_query(self):
+        bucket_checksum_query = (
+            "select\n"
+            "    b.bucket,\n"
+            "    count(*) as row_count,\n"
+            "    checksum_agg(b.row_hash) as bucket_hash\n"
+            "from(\n"
+            "    select\n"
+            "        (src.{0} - {4}) / {6} as bucket,\n"
+            "        binary_checksum({1}) as row_hash\n"
+            "    from {2}.{3} as src{7}\n"
+            "    where src.{0} between {4} and {5}) as b\n"
+            "group by b.bucket;\n")
+        self.assertEqual(self.templates.bucket_checksum_query,
+                         bucket_checksum_query)
+
+    def test_row_checksum_query(self):
+        row_checksum_query = (
+            "select\n"
+            "    src.{0} as row_key,\n"
+            "    binary_checksum({1}) as row_hash\n"
+            "from {2}.{3} as src{6}\n"
+            "where src.{0} between {4} and {5};\n")
+        self.assertEqual(self.templates.row_checksum_query,
+                         row_checksum_query)
+
+    def test_keys_rows_query(self):
+        keys_rows_query = (
+            "select\n"
+            "    {0}\n"
+            "from {1}.{2} as src{5}\n"
+            "where src.{3} in ({4})")
+        self.assertEqual(self.templates.keys_rows_query, keys_rows_query)
+
+    def test_search_hash_upsert_query(self):
+        search_hash_upsert_query = (
+            "select\n"
+            "    {0}\n"
+            "from {1}.{2} as src{7}\n"
+            "where not exists(\n"
+            "    select 1\n"
+            "    from {4}.{2} as clr\n"
+            "    where clr.{3} = src.{3}\n"
+            "        and {6} = {5})")
+        self.assertEqual(self.templates.search_hash_upsert_query,
+                         search_hash_upsert_query)
+
+    def test_row_hash_pattern(self):
+        row_hash_pattern = (
+            "hashbytes('SHA2_256', cast((select {0}\n"
+            "            for xml raw, binary base64) as nvarchar(max)))")
+        self.assertEqual(self.templates.row_hash_pattern, row_hash_pattern)
+
+    def test_statistics_statement(self):
+        self.assertEqual(self.templates.statistics_statement,
+                         "set statistics io, time {0};")
+
+    def test_showplan_statement(self):
+        self.assertEqual(self.templates.showplan_statement,
+                         "set showplan_xml {0};")
+
+    def test_self_reference_query(self):
+        self_reference_query = (
+            "select col_name(fkc.parent_object_id, fkc.parent_column_id)\n"
+            "    as column_name\n"
+            "from sys.foreign_key_columns as fkc\n"
+            "where fkc.parent_object_id = object_id('{0}')\n"
+            "    and fkc.referenced_object_id = object_id('{0}');")
+        self.assertEqual(self.templates.self_reference_query,
+                         self_reference_query)
+
+    def test_hierarchy_ordered_query(self):
+        hierarchy_ordered_query = (
+            "with hierarchy as(\n"
+            "    select\n"
+            "        src.{1} as row_key,\n"
+            "        0 as depth\n"
+            "    from {3}.{4} as src{7}\n"
+            "    where src.{5} is null\n"
+            "        or src.{5} = src.{1}\n"
+            "    union all\n"
+            "    select\n"
+            "        src.{1},\n"
+            "        hierarchy.depth + 1\n"
+            "    from {3}.{4} as src{7}\n"
+            "        join hierarchy on src.{5} = hierarchy.row_key\n"
+            "    where src.{5} <> src.{1})\n"
+            "select ord.*\n"
+            "from(\n"
+            "{0}) as ord\n"
+            "    left join hierarchy as hier on hier.row_key = ord.{1}\n"
+            "{2}"
+            "order by isnull(hier.depth, 2147483647) {6}, ord.{1}\n"
+            "option (maxrecursion 0);\n")
+        self.assertEqual(self.templates.hierarchy_ordered_query,
+                         hierarchy_ordered_query)
+
+    def test_hierarchy_key_after_condition(self):
+        hierarchy_key_after_condition = (
+            "where isnull(hier.depth, 2147483647) {2} isnull((\n"
+            "        select key_hier.depth\n"
+            "        from hierarchy as key_hier\n"
+            "        where key_hier.row_key = {1}), 2147483647)\n"
+            "    or (isnull(hier.depth, 2147483647) = isnull((\n"
+            "        select key_hier.depth\n"
+            "        from hierarchy as key_hier\n"
+            "        where key_hier.row_key = {1}), 2147483647)\n"
+            "        and ord.{0} > {1})\n")
+        self.assertEqual(self.templates.hierarchy_key_after_condition,
+                         hierarchy_key_after_condition)
+
+    def test_upsert_link_pattern(self):
+        self.assertEqual(self.templates.upsert_link_pattern,
+                         "trg.{0} = src.{0}")
+
+    def test_copy_statement(self):
+        self.assertEqual(self.templates.copy_statement, "")
+
+    def test_stage_insert_statement(self):
+        self.assertEqual(self.templates.stage_insert_statement,
+                         "insert into #stage(\n"
+                         "    {0})\n"
+                         "values\n"
+                         "    {1};\n")
+
+    def test_json_column_pattern(self):
+        self.assertEqual(self.templates.json_column_pattern,
+                         "{0} {1} '$[{2}]'")
+
+    def test_table_hint_pattern(self):
+        self.assertEqual(self.templates.table_hint_pattern, " with ({0})")
+
+    def test_isolation_level_statement(self):
+        self.assertEqual(self.templates.isolation_level_statement,
+                         "set transaction isolation level {0};")
+
+    def test_query_option_pattern(self):
+        self.assertEqual(self.templates.query_option_pattern,
+                         "{0}\noption ({1});\n")
+
+    def test_maxdop_option(self):
+        self.assertEqual(self.templates.maxdop_option, "maxdop {0}")
+
+    def test_wait_stats_query(self):
+        wait_stats_query = (
+            "select isnull(sum(wait_time_ms), 0) as wait_time_ms\n"
+            "from sys.dm_os_wait_stats\n"
+            "where wait_type like 'PAGEIOLATCH%'\n"
+            "    or wait_type like 'LCK_M_%'\n"
+            "    or wait_type in ('RESOURCE_SEMAPHORE', 'SOS_SCHEDULER_YIELD',\n"
+            "        'WRITELOG', 'CXPACKET');")
+        self.assertEqual(self.templates.wait_stats_query, wait_stats_query)
+
     def tearDown(self) -> None:
         self.templates = None
 
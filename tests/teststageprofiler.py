@@ -0,0 +1,79 @@
+import os
+import pstats
+import shutil
+import tempfile
+import threading
+import unittest
+
+from core.stageprofiler import StageProfiler
+from core.tracing import Tracer
+
+
+def render_rows(count):
+    return [f"row {num}" * 10 for num in range(count)]
+
+
+class TestStageProfiler(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.profiler = StageProfiler(self.folder, top_n=5, snapshot_limit=1)
+        self.tracer = Tracer()
+        self.tracer.add_listener(self.profiler)
+
+    def tearDown(self):
+        self.profiler.stop()
+        shutil.rmtree(self.folder)
+
+    def test_stages(self):
+        rows = []
+        with self.tracer.span("run", kind="upsert"):
+            with self.tracer.span("table", table="dbo.a"):
+                for _ in range(2):
+                    with self.tracer.span("render", table="dbo.a"):
+                        rows += render_rows(1000)
+            with self.tracer.span("liquibase"):
+                pass
+        self.assertEqual(self.tracer.spans, [])
+        self.assertEqual(sorted(self.profiler.stages),
+                         ["apply", "render.dbo.a", "run"])
+        memory = self.profiler.memory
+        self.assertEqual(memory["render.dbo.a"]["calls"], 2)
+        self.assertEqual(memory["render.dbo.a"]["snapshots"], 1)
+        self.assertGreater(memory["render.dbo.a"]["net_bytes"], 0)
+        self.assertGreater(memory["render.dbo.a"]["peak_bytes"], 0)
+        self.assertTrue(any(__file__ in site for site
+                            in memory["render.dbo.a"]["sites"]))
+        self.profiler.save()
+        stats = pstats.Stats(os.path.join(self.folder, "render.dbo.a.pstats"))
+        self.assertIn("render_rows",
+                      [func[2] for func in stats.stats])
+        stats = pstats.Stats(os.path.join(self.folder, "run.pstats"))
+        self.assertNotIn("render_rows", [func[2] for func in stats.stats])
+        with open(os.path.join(self.folder, StageProfiler.MEMORY_FILE)) \
+                as file:
+            summary = file.read()
+        self.assertIn("render.dbo.a: calls 2", summary)
+
+    def test_failed_stage(self):
+        with self.assertRaises(RuntimeError):
+            with self.tracer.span("run"):
+                with self.tracer.span("git_push"):
+                    raise RuntimeError("push failed")
+        self.assertEqual(self.profiler.memory["commit"]["calls"], 1)
+        self.assertEqual(self.profiler.memory["run"]["calls"], 1)
+
+    def test_other_thread(self):
+        thread = threading.Thread(target=self.__query)
+        thread.start()
+        thread.join()
+        self.assertEqual(self.profiler.stages, [])
+        self.__query()
+        self.assertEqual(self.profiler.stages, ["diff.dbo.b"])
+
+    def __query(self):
+        with self.tracer.span("query", table="dbo.b", kind="upsert"):
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from git import Repo
+
+from core.scriptgenerator import ScriptGenerator
+from core.sqlitetemplates import SqliteTemplates
+from core.sqlquerybuilder import SqlQueryBuilder
+from dbconstatnts import LOGGER_DICT_STUB
+
+LIQUIBASE_SKIP = {"skip_update": True, "liquibase_path": "",
+                  "liquibase_properties_path": "", "liquibase_string": "test\n"}
+
+
+class StubTable:
+    """A DbTable without foreign keys yielding the numbered scripts of the
+    table with a delay before each script, so the tables of a level are
+    produced out of order."""
+
+    def __init__(self, settings, table_name):
+        self.name = table_name
+        self.subordinate_tables = settings.get("references", {}).get(
+            table_name, ())
+        self.parent_key = ""
+        self.settings = settings
+        self.produced = 0
+
+    def with_cursor(self, cursor, clear_cursor=None):
+        return self
+
+    def reset_diff(self):
+        pass
+
+    def iter_upsert_statements(self, beg_date=None, row_limit=None,
+                               all_rows=False, key_after=None):
+        count, delay, error = self.settings[self.name]
+        for num in range(count):
+            time.sleep(delay)
+            self.produced += 1
+            self.settings["order"].append(self.name)
+            if self.settings.get("on_script"):
+                self.settings["on_script"](self.name)
+            yield f"-- {self.name} {num}\n", str(num), 1
+        if error:
+            raise error
+
+    def iter_delete_statements(self, row_limit=None, key_after=None):
+        return iter(())
+
+
+class TestTableWorkers(unittest.TestCase):
+    """Runs the table workers of the ScriptGenerator on the stub tables of a
+    single dependency level."""
+
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        origin = Repo.init(os.path.join(self.folder, "origin.git"), bare=True)
+        self.git_folder = os.path.join(self.folder, "repo")
+        repo = Repo.init(self.git_folder)
+        with open(os.path.join(self.git_folder, "init.txt"), "w") as file:
+            file.write("init")
+        repo.index.add(["init.txt"])
+        repo.index.commit("init")
+        repo.create_remote("origin", origin.git_dir)
+        repo.git.push("-u", "origin", repo.active_branch.name)
+        self.connection = sqlite3.connect(":memory:",
+                                          check_same_thread=False)
+        self.settings = {"order": []}
+        self.tables = {}
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.folder)
+
+    def __table(self, config_dict, cursor, queries, table_name, *args):
+        self.tables[table_name] = StubTable(self.settings, table_name)
+        return self.tables[table_name]
+
+    def __generator(self):
+        table_settings = {"table_list": ["a", "b", "c"],
+                          "upsert_only_list": [], "delete_only_list": [],
+                          "table_workers": 3}
+        with patch("core.scriptgenerator.DbTable", self.__table):
+            generator = ScriptGenerator(
+                LOGGER_DICT_STUB, self.connection.cursor(),
+                SqlQueryBuilder(SqliteTemplates()), "main", "clear",
+                self.git_folder, "out", table_settings, LIQUIBASE_SKIP,
+                cursor_factory=self.connection.cursor)
+        return generator
+
+    def __close(self, generator):
+        closing = threading.Thread(target=generator.close)
+        closing.start()
+        closing.join(5)
+        self.assertFalse(closing.is_alive(), "the table workers are hung")
+
+    def __scripts(self):
+        folder = os.path.join(self.git_folder, "out")
+        text = ""
+        for name in sorted(os.listdir(folder)):
+            if name.endswith(".sql"):
+                with open(os.path.join(folder, name)) as file:
+                    text += file.read()
+        return [line for line in text.splitlines() if line.startswith("--")]
+
+    def test_level_order(self):
+        self.settings.update(a=(3, 0.05, None), b=(3, 0.02, None),
+                             c=(3, 0, None))
+        generator = self.__generator()
+        generator.upsert_tables(100000, "scripts")
+        self.__close(generator)
+        self.assertNotEqual(self.settings["order"][:3], ["a", "a", "a"])
+        self.assertEqual(self.__scripts(),
+                         [f"-- {name} {num}" for name in "abc"
+                          for num in range(3)])
+
+    def test_worker_error(self):
+        self.settings.update(a=(2, 0, None),
+                             b=(1, 0, RuntimeError("b failed")),
+                             c=(2, 0, None))
+        generator = self.__generator()
+        with self.assertRaisesRegex(RuntimeError, "b failed"):
+            generator.upsert_tables(100000, "scripts")
+        self.__close(generator)
+
+    def test_foreign_key_cycle(self):
+        self.settings["references"] = {"a": ("a", "b"), "b": ("c",),
+                                       "c": ("a",)}
+        with self.assertRaisesRegex(ValueError, "a, b, c refer to each other"):
+            self.__generator()
+
+    def test_stop_releases_blocked_workers(self):
+        self.settings.update(a=(50, 0.01, None), b=(50, 0, None),
+                             c=(50, 0, None))
+        generator = self.__generator()
+        self.settings["on_script"] = \
+            lambda name: name == "a" and generator.request_stop()
+        with self.assertRaises(InterruptedError):
+            generator.upsert_tables(100000, "scripts")
+        self.__close(generator)
+        self.assertLess(self.tables["b"].produced, 50)
+        self.assertLess(self.tables["c"].produced, 50)
+        self.assertEqual(self.__scripts(), ["-- a 0"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -275,6 +275,128 @@ class TestTopoSorter(unittest.TestCase):
         self.assertCountEqual(self.sorter.topo_sorted_vertices, vertices)
         self.__check_toposort()
 
+    def test_topo_sorted_vertices_long_chain(self):
+        vertices = [f"v{number}" for number in range(5000)]
+        edges = [tuple((vertices[number], vertices[number + 1]))
+                 for number in range(len(vertices) - 1)]
+        self.sorter.set_vertices_and_clean_edges(vertices[::-1])
+        self.sorter.add_edges(edges)
+        self.assertEqual(self.sorter.topo_sorted_vertices, vertices)
+        self.assertFalse(self.sorter.has_loop)
+
+    def test_topo_sorted_vertices_cache_cleaned_by_edge(self):
+        vertices = ["a", "b", "c"]
+        self.sorter.set_vertices_and_clean_edges(vertices)
+        self.sorter.add_edge(tuple(("b", "a")))
+        self.__check_toposort()
+        self.sorter.add_edge(tuple(("c", "b")))
+        self.__check_toposort()
+        self.sorter.add_edge(tuple(("a", "c")))
+        self.assertTrue(self.sorter.has_loop)
+        self.assertRaises(GraphHasLoopError, getattr, self.sorter,
+                          "topo_sorted_vertices")
+
+    def test_topo_sorted_vertices_cache_cleaned_by_vertices(self):
+        self.sorter.set_vertices_and_clean_edges(["a", "b"])
+        self.sorter.add_edge(tuple(("a", "b")))
+        self.assertTrue(self.sorter.has_loop is False)
+        self.sorter.set_vertices_and_clean_edges(["c"])
+        self.assertEqual(self.sorter.topo_sorted_vertices, ["c"])
+
+    def test_topo_sorted_vertices_cache_copy(self):
+        vertices = ["a", "b"]
+        self.sorter.set_vertices_and_clean_edges(vertices)
+        self.sorter.add_edge(tuple(("a", "b")))
+        self.sorter.topo_sorted_vertices.append("c")
+        vertices.append("c")
+        self.assertEqual(self.sorter.topo_sorted_vertices, ["a", "b"])
+        self.assertEqual(self.sorter.vertices, tuple(["a", "b"]))
+
+    def test_topo_levels_empty(self):
+        self.assertEqual(self.sorter.topo_levels, [])
+
+    def test_topo_levels_without_edges(self):
+        vertices = ["c", "a", "b"]
+        self.sorter.set_vertices_and_clean_edges(vertices)
+        self.assertEqual(self.sorter.topo_levels, [vertices])
+
+    def test_topo_levels_over_3_level(self):
+        vertices = ["a", "b", "c", "d", "e", "f", "g", "h", "i", "j"]
+        edges = [tuple(("e", "a")), tuple(("e", "b")), tuple(("b", "j")),
+                 tuple(("b", "h")), tuple(("b", "g")), tuple(("h", "d")),
+                 tuple(("g", "d")), tuple(("c", "f")), tuple(("e", "d"))]
+        self.sorter.set_vertices_and_clean_edges(vertices)
+        self.sorter.add_edges(edges)
+        self.assertEqual(self.sorter.topo_levels,
+                         [["c", "e", "i"], ["a", "b", "f"], ["g", "h", "j"],
+                          ["d"]])
+
+    def test_topo_levels_duplicate_edges(self):
+        self.sorter.set_vertices_and_clean_edges(["a", "b"])
+        self.sorter.add_edges([tuple(("a", "b")), tuple(("a", "b"))])
+        self.assertEqual(self.sorter.topo_levels, [["a"], ["b"]])
+
+    def test_topo_levels_with_loop(self):
+        vertices = ["d", "b", "a", "c"]
+        edges = [tuple(("a", "b")), tuple(("b", "c")), tuple(("c", "a"))]
+        self.sorter.set_vertices_and_clean_edges(vertices)
+        self.sorter.add_edges(edges)
+        self.assertRaises(GraphHasLoopError, getattr, self.sorter,
+                          "topo_levels")
+        self.assertTrue(self.sorter.has_loop)
+
+    def test_strongly_connected_components_without_loop(self):
+        vertices = ["c", "b", "a"]
+        edges = [tuple(("a", "b")), tuple(("b", "c"))]
+        self.sorter.set_vertices_and_clean_edges(vertices)
+        self.sorter.add_edges(edges)
+        self.assertEqual(self.sorter.strongly_connected_components,
+                         [["a"], ["b"], ["c"]])
+        self.assertEqual(self.sorter.cyclic_components, [])
+
+    def test_strongly_connected_components_with_loops(self):
+        vertices = ["a", "b", "c", "d", "e", "f"]
+        edges = [tuple(("a", "b")), tuple(("b", "c")), tuple(("c", "b")),
+                 tuple(("c", "d")), tuple(("d", "d")), tuple(("e", "f")),
+                 tuple(("f", "e"))]
+        self.sorter.set_vertices_and_clean_edges(vertices)
+        self.sorter.add_edges(edges)
+        components = self.sorter.strongly_connected_components
+        self.assertCountEqual(components,
+                              [["a"], ["b", "c"], ["d"], ["e", "f"]])
+        self.assertLess(components.index(["a"]), components.index(["b", "c"]))
+        self.assertLess(components.index(["b", "c"]), components.index(["d"]))
+        self.assertCountEqual(self.sorter.cyclic_components,
+                              [["b", "c"], ["d"], ["e", "f"]])
+
+    def test_condensed_levels_without_loop(self):
+        vertices = ["a", "b", "c", "d", "e", "f", "g", "h", "i", "j"]
+        edges = [tuple(("e", "a")), tuple(("e", "b")), tuple(("b", "j")),
+                 tuple(("b", "h")), tuple(("b", "g")), tuple(("h", "d")),
+                 tuple(("g", "d")), tuple(("c", "f"))]
+        self.sorter.set_vertices_and_clean_edges(vertices)
+        self.sorter.add_edges(edges)
+        self.assertEqual(self.sorter.condensed_levels, self.sorter.topo_levels)
+
+    def test_condensed_levels_with_loops(self):
+        vertices = ["catalog", "report", "a", "b", "c"]
+        edges = [tuple(("catalog", "catalog")), tuple(("catalog", "report")),
+                 tuple(("a", "b")), tuple(("b", "a")), tuple(("b", "c"))]
+        self.sorter.set_vertices_and_clean_edges(vertices)
+        self.sorter.add_edges(edges)
+        self.assertEqual(self.sorter.condensed_levels,
+                         [["catalog", "a", "b"], ["report", "c"]])
+
+    def test_strongly_connected_components_long_chain(self):
+        vertices = [f"v{number}" for number in range(5000)]
+        edges = [tuple((vertices[number], vertices[number + 1]))
+                 for number in range(len(vertices) - 1)]
+        edges.append(tuple((vertices[-1], vertices[0])))
+        self.sorter.set_vertices_and_clean_edges(vertices)
+        self.sorter.add_edges(edges)
+        self.assertEqual(self.sorter.strongly_connected_components,
+                         [vertices])
+
     def tearDown(self) -> None:
         self.sorter = None
 
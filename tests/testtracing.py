@@ -0,0 +1,105 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from core.tracing import Tracer
+
+
+class TestTracing(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.tracer = Tracer(enabled=True)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_disabled(self):
+        tracer = Tracer()
+        self.assertFalse(tracer.enabled)
+        self.assertIs(tracer.span("run"), tracer.span("query", table="dbo.a"))
+        with tracer.span("run"):
+            pass
+        self.assertEqual(tracer.spans, [])
+
+    def test_nested(self):
+        with self.tracer.span("run", kind="upsert"):
+            with self.tracer.span("table", table="dbo.a"):
+                with self.tracer.span("query", table="dbo.a"):
+                    pass
+            with self.tracer.span("liquibase"):
+                pass
+        spans = {span["name"]: span for span in self.tracer.spans}
+        self.assertEqual([span["name"] for span in self.tracer.spans],
+                         ["query", "table", "liquibase", "run"])
+        self.assertIsNone(spans["run"]["parent_id"])
+        self.assertEqual(spans["table"]["parent_id"], spans["run"]["id"])
+        self.assertEqual(spans["query"]["parent_id"], spans["table"]["id"])
+        self.assertEqual(spans["liquibase"]["parent_id"], spans["run"]["id"])
+        self.assertEqual(spans["run"]["attrs"], {"kind": "upsert"})
+        self.assertGreaterEqual(spans["run"]["duration"],
+                                spans["table"]["duration"])
+
+    def test_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.tracer.span("git push"):
+                raise RuntimeError("push failed")
+        self.assertEqual(self.tracer.spans[0]["attrs"],
+                         {"error": "RuntimeError"})
+
+    def test_threads(self):
+        with self.tracer.span("run"):
+            worker = threading.Thread(target=self.__worker, name="table_0")
+            worker.start()
+            worker.join()
+        spans = {span["name"]: span for span in self.tracer.spans}
+        self.assertIsNone(spans["table"]["parent_id"])
+        self.assertEqual(spans["query"]["parent_id"], spans["table"]["id"])
+        self.assertNotEqual(spans["table"]["thread"], spans["run"]["thread"])
+
+    def __worker(self):
+        with self.tracer.span("table"):
+            with self.tracer.span("query"):
+                pass
+
+    def test_reset(self):
+        with self.tracer.span("run"):
+            pass
+        self.tracer.reset()
+        self.assertEqual(self.tracer.spans, [])
+
+    def test_save_chrome(self):
+        with self.tracer.span("run"):
+            with self.tracer.span("write", file="a.sql"):
+                pass
+        path = os.path.join(self.folder, "trace", "run.json")
+        self.tracer.save(path)
+        with open(path) as file:
+            trace = json.load(file)
+        events = trace["traceEvents"]
+        self.assertEqual([event["ph"] for event in events], ["M", "X", "X"])
+        self.assertEqual([event["name"] for event in events[1:]],
+                         ["run", "write"])
+        self.assertEqual(events[0]["args"]["name"],
+                         threading.current_thread().name)
+        self.assertEqual(events[2]["args"]["file"], "a.sql")
+        self.assertEqual(events[2]["args"]["parent_id"], events[1]["args"]["id"])
+        self.assertLessEqual(events[1]["ts"], events[2]["ts"])
+
+    def test_save_jsonl(self):
+        with self.tracer.span("run"):
+            with self.tracer.span("render", rows=10):
+                pass
+        path = os.path.join(self.folder, "run.jsonl")
+        self.tracer.save(path, "jsonl")
+        with open(path) as file:
+            spans = [json.loads(line) for line in file]
+        self.assertEqual(spans, self.tracer.spans)
+        with self.assertRaises(ValueError):
+            self.tracer.save(path, "xml")
+
+
+if __name__ == '__main__':
+    unittest.main()